@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold KG load time: Turtle parse vs binary snapshot
+
+Usage:
+    python scripts/benchmark-kg-snapshot.py            # All KGs
+    python scripts/benchmark-kg-snapshot.py 9 10 11    # Specific examples
+"""
+import sys
+import time
+from pathlib import Path
+from rdflib import Graph
+
+# Add src to path
+src_dir = Path(__file__).parent.parent / "src" / "graph-solver"
+sys.path.insert(0, str(src_dir))
+
+from kg_snapshot import compile_snapshot, SnapshotStore, snapshot_path_for
+
+
+def main():
+    kg_dir = Path(__file__).parent.parent / "data" / "knowledge-graphs"
+    if len(sys.argv) > 1:
+        kg_paths = [kg_dir / f"{example_id}_kg.ttl" for example_id in sys.argv[1:]]
+    else:
+        kg_paths = sorted(kg_dir.glob("*_kg.ttl"), key=lambda p: int(p.stem.split('_')[0]))
+
+    print(f"\n{'KG':<14} {'Triples':>8} {'TTL bytes':>10} {'Snap bytes':>11} {'Parse ms':>9} {'Snap ms':>8} {'Speedup':>8}")
+    print("=" * 74)
+
+    total_parse = 0.0
+    total_snapshot = 0.0
+    total_compile = 0.0
+
+    for kg_path in kg_paths:
+        start = time.perf_counter()
+        g = Graph()
+        g.parse(str(kg_path), format='turtle')
+        parse_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        snapshot_path = compile_snapshot(kg_path)
+        total_compile += time.perf_counter() - start
+
+        start = time.perf_counter()
+        snapshot_graph = Graph(SnapshotStore(snapshot_path))
+        snapshot_time = time.perf_counter() - start
+
+        if len(snapshot_graph) != len(g):
+            print(f"✗ {kg_path.name}: triple count mismatch ({len(g)} vs {len(snapshot_graph)})")
+            sys.exit(1)
+
+        total_parse += parse_time
+        total_snapshot += snapshot_time
+        print(f"{kg_path.stem:<14} {len(g):>8} {kg_path.stat().st_size:>10,} "
+              f"{snapshot_path_for(kg_path).stat().st_size:>11,} {parse_time * 1000:>9.1f} "
+              f"{snapshot_time * 1000:>8.1f} {parse_time / snapshot_time:>7.1f}x")
+
+    print("=" * 74)
+    print(f"{len(kg_paths)} KGs: Turtle parse {total_parse:.2f}s, snapshot load {total_snapshot:.2f}s "
+          f"({total_parse / total_snapshot:.1f}x faster), one-time compile {total_compile:.2f}s")
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-call LLM client overhead against a local stub server
+
+Starts a stub /v1/messages endpoint on localhost (HTTP/1.1 keep-alive,
+canned response, no model latency), then times N calls with a new
+Anthropic client per call (the old call_llm behaviour) against the pooled
+process-wide client from common.anthropic_client. Also reports how many TCP
+connections the server accepted for each mode.
+
+With --latency, the stub also sleeps per request to stand in for model
+latency, and a batch of calls is run through acall_llm at increasing
+concurrency limits (LLM_MAX_CONCURRENCY) to show throughput scaling.
+
+Usage:
+    python scripts/benchmark-llm-client.py             # 200 calls per mode
+    python scripts/benchmark-llm-client.py --calls 1000
+    python scripts/benchmark-llm-client.py --latency 0.2 --concurrency 1 4 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from anthropic import Anthropic
+
+STUB_RESPONSE = json.dumps({
+    "id": "msg_stub",
+    "type": "message",
+    "role": "assistant",
+    "model": "stub-model",
+    "content": [{"type": "text", "text": "42"}],
+    "stop_reason": "end_turn",
+    "stop_sequence": None,
+    "usage": {"input_tokens": 10, "output_tokens": 1},
+}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+    connections = 0
+    latency = 0.0
+
+    def setup(self):
+        super().setup()
+        StubHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(StubHandler.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _call(client):
+    response = client.messages.create(
+        model="stub-model",
+        max_tokens=16,
+        temperature=0,
+        messages=[{"role": "user", "content": "ping"}]
+    )
+    return response.content[0].text
+
+
+def _run(label, make_client, calls):
+    StubHandler.connections = 0
+    start = time.perf_counter()
+    for _ in range(calls):
+        assert _call(make_client()) == "42"
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / calls * 1000:>9.3f} ms/call {StubHandler.connections:>6} connections")
+    return elapsed
+
+
+def _run_concurrent(calls, concurrency_levels):
+    from common import llm_client
+    from common.rate_limiter import LLMRateLimiter
+
+    llm_client.llm_logs = None  # Time the LLM path only
+    llm_client._llm_loop()
+
+    async def batch():
+        return await asyncio.gather(*(llm_client.acall_llm(f"question {i}") for i in range(calls)))
+
+    for concurrency in concurrency_levels:
+        llm_client._limiter = LLMRateLimiter(concurrency)
+        start = time.perf_counter()
+        assert asyncio.run(batch()) == ["42"] * calls
+        elapsed = time.perf_counter() - start
+        print(f"acall_llm, concurrency {concurrency:<4} {calls / elapsed:>9.1f} calls/s "
+              f"{elapsed:>8.2f} s total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-call Anthropic client overhead")
+    parser.add_argument('--calls', type=int, default=200, help="Calls per mode")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Simulated model latency per request in seconds (enables the concurrency run)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help="Concurrency limits to compare with --latency")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ['ANTHROPIC_BASE_URL'] = base_url
+    os.environ.setdefault('ANTHROPIC_API_KEY', 'stub-key')
+
+    from common.anthropic_client import get_anthropic_client
+
+    print(f"\nStub server at {base_url}, {args.calls} calls per mode")
+    print("=" * 64)
+    # Warm imports and the pooled client's first connection
+    _call(get_anthropic_client())
+
+    per_call = _run("New client per call", lambda: Anthropic(
+        api_key=os.environ['ANTHROPIC_API_KEY'], base_url=base_url), args.calls)
+    pooled = _run("Pooled process-wide client", get_anthropic_client, args.calls)
+    print("=" * 64)
+    print(f"Pooled client saves {(per_call - pooled) / args.calls * 1000:.3f} ms per call "
+          f"({per_call / pooled:.1f}x less client overhead)")
+
+    if args.latency > 0:
+        StubHandler.latency = args.latency
+        print(f"\nSimulated latency {args.latency * 1000:.0f} ms, {args.calls} calls per level")
+        print("=" * 64)
+        _run_concurrent(args.calls, args.concurrency)
+        print("=" * 64)
+    print()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark pipeline throughput against the local mock LLM server
+
+Starts common.mock_llm_server on localhost and points ANTHROPIC_BASE_URL,
+OPENAI_BASE_URL and SERPER_BASE_URL at it, then for each stage and each
+concurrency level runs a batch of jobs in a fresh worker process:
+
+    graph-solver    KGExtractor.extract on a sample table + text (table semantics,
+                    table and text extraction - all Instructor calls)
+    simple-solver   ConvFinQASolver.solve_conversation on a sample two-turn conversation
+    python-demo     run_research from the LangGraph research workflow
+                    (packages/reference-implementations/python-demo)
+
+With the model's latency simulated (--latency) the numbers show how well each
+pipeline overlaps LLM calls; with --latency fixed:0 they show the non-LLM
+overhead per job. The LLM response cache is off in the workers so every call
+reaches the server. Logging stays as configured (LOG_BACKEND, MONGO_URI / MONGODB_URI).
+
+Usage:
+    python scripts/benchmark-pipeline.py
+    python scripts/benchmark-pipeline.py --stages graph-solver --jobs 16 --concurrency 1 4 16
+    python scripts/benchmark-pipeline.py --latency lognormal:0.8:0.4 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+TAKEAWAY_DIR = Path(__file__).parent.parent
+PYTHON_DEMO_DIR = TAKEAWAY_DIR.parent.parent.parent / "reference-implementations" / "python-demo"
+
+# Add src to path
+sys.path.insert(0, str(TAKEAWAY_DIR / "src"))
+
+STAGES = ('graph-solver', 'simple-solver', 'python-demo')
+
+SAMPLE_TABLE = {
+    "2009": {"net sales": 1200.5, "operating income": 310.2, "net income": 201.7},
+    "2008": {"net sales": 1105.0, "operating income": 287.9, "net income": 180.3},
+    "2007": {"net sales": 990.4, "operating income": 250.1, "net income": 160.8},
+}
+SAMPLE_TEXT = [
+    "Net sales increased 8.6% in 2009, driven by higher volumes in the industrial segment. "
+    "Amounts are in millions of dollars.",
+    "The company repurchased 2.1 million shares in 2009 at an average price of $42.10 per share.",
+]
+SAMPLE_RECORD = {
+    "id": "benchmark",
+    "doc": {"table": SAMPLE_TABLE, "pre_text": SAMPLE_TEXT[0], "post_text": SAMPLE_TEXT[1]},
+    "questions": ["what were net sales in 2009?", "what was the change from 2008?"],
+}
+SAMPLE_GOLD = [1200.5, 95.5]
+
+# Replies for the simple-solver's JSON stages; everything else gets the default text or a schema instance
+SIMPLE_SOLVER_TEMPLATES = [
+    {"match": r"Reply with ONLY a JSON object in this format",
+     "text": json.dumps({"rewritten_question": "What were net sales in 2009?", "changes_made": []})},
+    {"match": r"Analyze this question and provide a JSON response",
+     "text": json.dumps({
+         "question_type": "lookup",
+         "table_analysis": {"relevant_columns": ["2009"], "measurement_type": "net sales", "units": "millions"},
+         "extracted_values": [{"description": "net sales 2009", "value": 1200.5, "units": "millions",
+                               "source_location": "table[2009][net sales]"}],
+         "calculation_plan": {"reasoning": "Direct lookup", "steps": []},
+     })},
+]
+
+
+def _run_jobs(job, jobs, concurrency):
+    """Run job(i) for i in range(jobs) on a thread pool; returns (ok, failed, first error)"""
+    ok, failed, first_error = 0, 0, None
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(job, i) for i in range(jobs)]:
+            try:
+                future.result()
+                ok += 1
+            except Exception as e:
+                failed += 1
+                first_error = first_error or f"{type(e).__name__}: {e}"
+    return ok, failed, first_error
+
+
+def _graph_solver_worker(jobs, concurrency):
+    sys.path.insert(0, str(TAKEAWAY_DIR / "src" / "graph-solver"))
+    from kg_extractor import KGExtractor
+
+    preprocessed = {
+        'example_id': 'benchmark',
+        'table': SAMPLE_TABLE,
+        'knowledge_base': {'extracted_values': {}, 'table_metadata': {}, 'text_content': SAMPLE_TEXT},
+    }
+
+    def job(i):
+        KGExtractor().extract(preprocessed, f"benchmark-{i}")
+
+    return _run_jobs(job, jobs, concurrency)
+
+
+def _simple_solver_worker(jobs, concurrency):
+    sys.path.insert(0, str(TAKEAWAY_DIR / "src" / "simple-solver"))
+    from solver import ConvFinQASolver
+
+    def job(i):
+        solver = ConvFinQASolver(collection="benchmark_runs")
+        try:
+            solver.solve_conversation(SAMPLE_RECORD, SAMPLE_GOLD, example_id=f"benchmark-{i}")
+        finally:
+            solver.close()
+
+    return _run_jobs(job, jobs, concurrency)
+
+
+def _python_demo_worker(jobs, concurrency):
+    sys.path.insert(0, str(PYTHON_DEMO_DIR / "src"))
+    from main import run_research
+
+    async def batch():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def job(i):
+            async with semaphore:
+                state = await run_research(f"benchmark topic {i}")
+                if state.get('report') is None:
+                    raise RuntimeError(f"No report: {state.get('errors')}")
+
+        return await asyncio.gather(*(job(i) for i in range(jobs)), return_exceptions=True)
+
+    results = asyncio.run(batch())
+    errors = [r for r in results if isinstance(r, BaseException)]
+    first_error = f"{type(errors[0]).__name__}: {errors[0]}" if errors else None
+    return jobs - len(errors), len(errors), first_error
+
+
+WORKERS = {
+    'graph-solver': _graph_solver_worker,
+    'simple-solver': _simple_solver_worker,
+    'python-demo': _python_demo_worker,
+}
+
+
+def run_worker(stage, jobs, concurrency):
+    """Worker-process entry: run one batch and print a JSON result line"""
+    start = time.perf_counter()
+    ok, failed, first_error = WORKERS[stage](jobs, concurrency)
+    print(json.dumps({'ok': ok, 'failed': failed, 'elapsed': time.perf_counter() - start,
+                      'error': first_error}))
+
+
+def _run_level(stage, jobs, concurrency, env, server):
+    server.reset_stats()
+    cwd = PYTHON_DEMO_DIR / "src" if stage == 'python-demo' else TAKEAWAY_DIR
+    completed = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--worker', stage,
+         '--jobs', str(jobs), '--concurrency', str(concurrency)],
+        env=env, cwd=cwd, capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    try:
+        result = json.loads(lines[-1])
+    except (IndexError, json.JSONDecodeError):
+        tail = completed.stderr.strip().splitlines()[-1:] or ['no output']
+        result = {'ok': 0, 'failed': jobs, 'elapsed': 0.0, 'error': f"worker exited {completed.returncode}: {tail[0]}"}
+    stats = server.stats()
+    result['llm_requests'] = stats.get('anthropic_requests', 0) + stats.get('openai_requests', 0)
+    result['faults'] = stats.get('errors', 0) + stats.get('rate_limited', 0)
+    result['prompt_cache'] = (stats.get('prompt_cache_reads', 0), stats.get('prompt_cache_writes', 0))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline throughput against the mock LLM server")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help="Pipelines to run")
+    parser.add_argument('--jobs', type=int, default=8, help="Jobs per concurrency level")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help="Concurrency levels")
+    parser.add_argument('--latency', default='lognormal:0.5:0.3',
+                        help="Mock latency: fixed:S, uniform:LO:HI, normal:MEAN:STD, lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of LLM requests answered with 529/500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Share of LLM requests answered with 429")
+    parser.add_argument('--templates', help="Extra JSON/JSONL response templates (tried before the built-in ones)")
+    parser.add_argument('--recordings', help="LLM response cache database to replay recorded responses from")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for latency and fault sampling")
+    parser.add_argument('--worker', choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.jobs, args.concurrency[0])
+        return
+
+    from common.mock_llm_server import MockLLMServer, load_templates
+
+    templates = (load_templates(args.templates) if args.templates else []) + SIMPLE_SOLVER_TEMPLATES
+    recordings = None
+    if args.recordings:
+        from common.llm_cache import get_llm_cache
+        recordings = get_llm_cache(args.recordings)
+
+    with MockLLMServer(latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                       templates=templates, recordings=recordings, seed=args.seed) as server:
+        env = {
+            **os.environ,
+            **server.env(),
+            'ANTHROPIC_API_KEY': 'mock-key',
+            'OPENAI_API_KEY': 'mock-key',
+            'SERPER_API_KEY': 'mock-key',
+            'LLM_CACHE_MODE': 'off',
+        }
+        print(f"\nMock server at {server.url}, latency {args.latency}, {args.jobs} jobs per level")
+        print("=" * 88)
+        print(f"{'stage':<15} {'conc':>5} {'ok':>5} {'failed':>7} {'seconds':>9} {'jobs/s':>8} "
+              f"{'LLM calls':>10} {'calls/s':>8} {'faults':>7}")
+        print("-" * 88)
+        for stage in args.stages:
+            for concurrency in args.concurrency:
+                result = _run_level(stage, args.jobs, concurrency, env, server)
+                elapsed = result['elapsed'] or float('nan')
+                print(f"{stage:<15} {concurrency:>5} {result['ok']:>5} {result['failed']:>7} "
+                      f"{result['elapsed']:>9.2f} {result['ok'] / elapsed:>8.2f} "
+                      f"{result['llm_requests']:>10} {result['llm_requests'] / elapsed:>8.1f} {result['faults']:>7}")
+                if any(result['prompt_cache']):
+                    print(f"{'':<15} prompt cache: {result['prompt_cache'][0]} reads, "
+                          f"{result['prompt_cache'][1]} writes")
+                if result.get('error'):
+                    print(f"{'':<15} first error: {result['error'][:70]}")
+        print("=" * 88)
+        print()
+
+
+if __name__ == '__main__':
+    main()
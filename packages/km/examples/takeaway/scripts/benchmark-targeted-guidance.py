@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-example targeted guidance latency: per-element SPARQL vs artifact lookup
+
+"Before" re-reads example_sections.json and runs one SPARQL query per
+pattern, operation and value type against the cached ontology graph (the
+previous load_targeted_guidance). "After" is the current
+load_targeted_guidance. Both outputs are compared for every example.
+
+Usage:
+    python scripts/benchmark-targeted-guidance.py                 # All mapped examples
+    python scripts/benchmark-targeted-guidance.py 9 10 11         # Specific examples
+    python scripts/benchmark-targeted-guidance.py --sections path/to/example_sections.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+src_dir = Path(__file__).parent.parent / "src" / "graph-solver"
+sys.path.insert(0, str(src_dir))
+
+from ontology_loader import (_default_ontology_path, _default_sections_path, _load_ontology_graph,
+                             load_targeted_guidance)
+
+
+def legacy_targeted_guidance(example_id, sections_path, ontology_path):
+    """The previous implementation: JSON reload plus one query per section element"""
+    with open(sections_path) as f:
+        section = json.load(f)["examples"][str(example_id)]
+    g = _load_ontology_graph(ontology_path)
+
+    guidance_text = f"""TARGETED ONTOLOGY GUIDANCE FOR EXAMPLE {example_id}:
+===============================================
+
+{section['description']}
+
+"""
+    if section["patterns"]:
+        guidance_text += "\nRELEVANT LINGUISTIC PATTERNS:\n"
+        guidance_text += "-" * 60 + "\n"
+        for pattern_name in section["patterns"]:
+            pattern_uri = f"http://example.org/convfinqa/{pattern_name}"
+            query = f"""
+                PREFIX kg: <http://example.org/convfinqa/>
+                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+                SELECT ?phrase ?operation ?comment
+                WHERE {{
+                    <{pattern_uri}> kg:naturalLanguagePhrase ?phrase .
+                    <{pattern_uri}> kg:semanticOperation ?operation .
+                    OPTIONAL {{ <{pattern_uri}> rdfs:comment ?comment }}
+                }}
+            """
+            for row in g.query(query):
+                operation_name = str(row.operation).split("/")[-1] if row.operation else "Unknown"
+                guidance_text += f"\nPattern: {pattern_name}\n"
+                guidance_text += f"Phrase: \"{row.phrase}\"\n"
+                guidance_text += f"Operation: {operation_name}\n"
+                if row.comment:
+                    cleaned = str(row.comment).replace("\n", "\n  ")
+                    guidance_text += f"Guidance: {cleaned}\n"
+
+    for heading, names in (("RELEVANT SEMANTIC OPERATIONS", section["operations"]),
+                           ("RELEVANT VALUE TYPES", section["value_types"])):
+        if not names:
+            continue
+        guidance_text += "\n" + "=" * 60 + "\n"
+        guidance_text += f"\n{heading}:\n"
+        guidance_text += "-" * 60 + "\n"
+        for name in names:
+            uri = f"http://example.org/convfinqa/{name}"
+            query = f"""
+                PREFIX kg: <http://example.org/convfinqa/>
+                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+                SELECT ?label ?comment
+                WHERE {{
+                    <{uri}> rdfs:label ?label .
+                    OPTIONAL {{ <{uri}> rdfs:comment ?comment }}
+                }}
+            """
+            for row in g.query(query):
+                guidance_text += f"\n{row.label}:\n"
+                if row.comment:
+                    cleaned = str(row.comment).replace("\n", "\n  ")
+                    guidance_text += f"  {cleaned}\n"
+
+    return guidance_text
+
+
+def _time_call(func, repeat):
+    """Best-of-repeat latency in seconds, plus the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark targeted ontology guidance latency")
+    parser.add_argument("example_ids", nargs="*", help="Examples to benchmark (default: all mapped)")
+    parser.add_argument("--sections", default=str(_default_sections_path()), help="example_sections.json")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per example (best is reported)")
+    args = parser.parse_args()
+
+    sections_path = Path(args.sections)
+    if not sections_path.exists():
+        print(f"✗ {sections_path} not found - nothing to benchmark")
+        sys.exit(1)
+
+    ontology_path = _default_ontology_path()
+    with open(sections_path) as f:
+        example_ids = args.example_ids or sorted(json.load(f)["examples"], key=lambda e: (len(e), e))
+
+    # Warm both paths (SQLite ontology cache, artifact) so only per-call latency is measured
+    _load_ontology_graph(ontology_path)
+    load_targeted_guidance(example_ids[0], sections_path=sections_path)
+
+    print(f"\n{'Example':<10} {'Elements':>8} {'Before ms':>10} {'After ms':>9} {'Speedup':>8}")
+    print("=" * 50)
+
+    total_before = 0.0
+    total_after = 0.0
+    for example_id in example_ids:
+        before, expected = _time_call(
+            lambda example_id=example_id: legacy_targeted_guidance(example_id, sections_path, ontology_path),
+            args.repeat)
+        after, actual = _time_call(
+            lambda example_id=example_id: load_targeted_guidance(example_id, sections_path=sections_path),
+            args.repeat)
+
+        if actual != expected:
+            print(f"✗ Example {example_id}: guidance differs from the per-element queries")
+            sys.exit(1)
+
+        with open(sections_path) as f:
+            section = json.load(f)["examples"][str(example_id)]
+        elements = len(section["patterns"]) + len(section["operations"]) + len(section["value_types"])
+
+        total_before += before
+        total_after += after
+        print(f"{example_id:<10} {elements:>8} {before * 1000:>10.2f} {after * 1000:>9.3f} "
+              f"{before / after:>7.0f}x")
+
+    print("=" * 50)
+    print(f"{len(example_ids)} examples: before {total_before * 1000:.1f} ms, after {total_after * 1000:.2f} ms "
+          f"({total_before / total_after:.0f}x faster)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
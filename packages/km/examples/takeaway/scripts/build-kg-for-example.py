@@ -9,7 +9,7 @@ from rdflib import Graph, Namespace
 src_dir = Path(__file__).parent.parent / "src" / "graph-solver"
 sys.path.insert(0, str(src_dir))
 
-from kg_extractor import KGExtractor
+from kg_extractor import KGExtractor, preprocess_example
 
 
 def load_dataset():
@@ -89,49 +89,7 @@ def build_kg(example_num: int, force: bool = False):
     print(f"  Example ID: {example_id}")
     print(f"  → Rebuilding KG...")
 
-    # Create preprocessed data structure
-    preprocessed = {
-        'example_id': example_id,
-        'table': {},
-        'knowledge_base': {
-            'extracted_values': {},
-            'table_metadata': {}
-        }
-    }
-
-    # Extract table data
-    doc = example_data.get('doc', {})
-    if 'table' in doc and isinstance(doc['table'], dict):
-        # Table is already in dict format
-        preprocessed['table'] = doc['table']
-    elif 'table' in doc and isinstance(doc['table'], list):
-        # Convert table from list format
-        raw_table = doc['table']
-        if len(raw_table) > 1:
-            headers = raw_table[0]
-            for row in raw_table[1:]:
-                if len(row) > 0:
-                    row_label = str(row[0]).strip()
-                    preprocessed['table'][row_label] = {}
-                    for i, value in enumerate(row[1:], 1):
-                        if i < len(headers):
-                            col_label = str(headers[i]).strip()
-                            preprocessed['table'][row_label][col_label] = value
-
-    # Add text content for entity extraction
-    # CRITICAL: pre_text and post_text are character-by-character lists, must join them
-    text_parts = []
-    if 'pre_text' in doc:
-        pre_text = doc['pre_text']
-        if isinstance(pre_text, list):
-            pre_text = ''.join(pre_text)
-        text_parts.append(pre_text)
-    if 'post_text' in doc:
-        post_text = doc['post_text']
-        if isinstance(post_text, list):
-            post_text = ''.join(post_text)
-        text_parts.append(post_text)
-    preprocessed['knowledge_base']['text_content'] = text_parts
+    preprocessed = preprocess_example(example_data)
 
     # Extract entities and relationships (extractor already initialized above)
     print("  Extracting entities with LLM...")
@@ -12,9 +12,13 @@ Example:
 import sys
 import json
 from pathlib import Path
-from pymongo import MongoClient
 from datetime import datetime, timedelta
 
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from common.log_backend import log_database
+from common.prompt_store import load_prompt
+
 def load_test_result(example_id, turn):
     """Load test result from JSON file."""
     result_path = Path(f'data/test-results/current/by-example/{example_id}.json')
@@ -30,9 +34,8 @@ def load_test_result(example_id, turn):
     return None
 
 def get_mongodb_logs(example_id, turn):
-    """Get MongoDB logs for this example and turn."""
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['legion_tools']
+    """Get MongoDB (or local) logs for this example and turn."""
+    db = log_database()
 
     # Get logs from last hour (in case of recent re-runs)
     recent = datetime.utcnow() - timedelta(hours=1)
@@ -43,6 +46,12 @@ def get_mongodb_logs(example_id, turn):
         'timestamp': {'$gte': recent}
     }).sort('timestamp', -1))
 
+    # Reassemble prompts stored as content-addressed blobs
+    for log in logs:
+        prompt = load_prompt(log, db.prompt_blobs)
+        if prompt is not None:
+            log['prompt'] = prompt
+
     # Group by phase
     phase0_logs = [l for l in logs if l.get('metadata', {}).get('phase') == 'phase0_question_expansion']
     phase1_logs = [l for l in logs if l.get('stage') == 'semantic_query']
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Run the local Anthropic/OpenAI/Serper stand-in server (common.mock_llm_server)
+
+Prints the environment to export so the pipelines talk to it instead of the
+real APIs, then serves until interrupted.
+
+Usage:
+    python scripts/mock-llm-server.py
+    python scripts/mock-llm-server.py --port 8787 --latency lognormal:0.8:0.4 --error-rate 0.01
+    python scripts/mock-llm-server.py --templates data/mock_templates.jsonl --recordings data/.llm_cache.db
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from common.mock_llm_server import MockLLMServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Anthropic, OpenAI and Serper APIs")
+    parser.add_argument('--port', type=int, default=8787, help="Port on 127.0.0.1 (0 for any free port)")
+    parser.add_argument('--latency', default='fixed:0',
+                        help="Per-request latency: fixed:S, uniform:LO:HI, normal:MEAN:STD, lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 529/500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="retry-after seconds sent with 429s")
+    parser.add_argument('--templates', help="JSON/JSONL file of {\"match\": regex, \"text\"|\"input\": ...}")
+    parser.add_argument('--recordings', help="LLM response cache database to replay recorded responses from")
+    parser.add_argument('--default-text', default="42", help="Text reply when nothing else matches")
+    parser.add_argument('--seed', type=int, help="Seed for latency and fault sampling")
+    args = parser.parse_args()
+
+    recordings = None
+    if args.recordings:
+        from common.llm_cache import get_llm_cache
+        recordings = get_llm_cache(args.recordings)
+
+    server = MockLLMServer(port=args.port, latency=args.latency, error_rate=args.error_rate,
+                           rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                           templates=args.templates, recordings=recordings,
+                           default_text=args.default_text, seed=args.seed)
+    print(f"Mock LLM server at {server.url}")
+    for name, value in server.env().items():
+        print(f"  export {name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"\n{server.stats()}")
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
-"""Query LLM interaction logs from MongoDB"""
+"""Query LLM interaction logs (MongoDB or local log files, see common.log_backend)"""
 import sys
 import json
-from pymongo import MongoClient
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def _log_db():
+    """legion_tools log database (imported here so the usage message needs no driver)"""
+    from common.log_backend import log_database
+
+    return log_database()
 
 
 def show_phase(example_id, turn, phase):
     """Show prompt and response for a specific phase"""
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['legion_tools']
+    from common.prompt_store import load_prompt
 
+    db = _log_db()
     result = db.llm_interactions.find_one({
         'metadata.example_id': str(example_id),
         'metadata.turn': int(turn),
@@ -24,10 +34,11 @@ def show_phase(example_id, turn, phase):
     print(f"Example {example_id}, Turn {turn}, Phase: {phase}")
     print(f"{'='*80}\n")
 
+    prompt = load_prompt(result, db.prompt_blobs) or ''
     print("PROMPT:")
-    print(result['prompt'][:2000])
-    if len(result['prompt']) > 2000:
-        print(f"\n... (truncated, {len(result['prompt'])} total chars)")
+    print(prompt[:2000])
+    if len(prompt) > 2000:
+        print(f"\n... (truncated, {len(prompt)} total chars)")
 
     print(f"\n{'='*80}\n")
     print("RESPONSE:")
@@ -37,10 +48,7 @@ def show_phase(example_id, turn, phase):
 
 def list_phases(example_id, turn):
     """List all phases for a turn"""
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['legion_tools']
-
-    results = list(db.llm_interactions.find({
+    results = list(_log_db().llm_interactions.find({
         'metadata.example_id': str(example_id),
         'metadata.turn': int(turn)
     }).sort('timestamp', 1))
@@ -63,10 +71,7 @@ def list_phases(example_id, turn):
 
 def show_turn_flow(example_id, turn):
     """Show the flow of all phases for a turn"""
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['legion_tools']
-
-    results = list(db.llm_interactions.find({
+    results = list(_log_db().llm_interactions.find({
         'metadata.example_id': str(example_id),
         'metadata.turn': int(turn)
     }).sort('timestamp', 1))
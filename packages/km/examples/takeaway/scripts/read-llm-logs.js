@@ -8,6 +8,26 @@ import { MongoClient } from 'mongodb';
 const MONGO_URI = process.env.MONGO_URI || 'mongodb://localhost:27017';
 const DB_NAME = 'legion_tools';
 
+// Prompts may be stored as content-addressed chunks (see src/common/prompt_store.py)
+async function loadPrompt(db, log) {
+  if (log.prompt !== undefined || !log.prompt_blobs) {
+    return log.prompt;
+  }
+  const blobs = await db
+    .collection('prompt_blobs')
+    .find({ _id: { $in: [...new Set(log.prompt_blobs)] } })
+    .toArray();
+  const chunks = new Map(blobs.map((blob) => [
+    blob._id,
+    blob.encoding === 'utf-8'
+      ? blob.data
+      : `[zstd prompt blob ${blob._id.slice(0, 12)} - read it with scripts/query-llm-logs.py]\n`,
+  ]));
+  return log.prompt_blobs
+    .map((id) => chunks.get(id) ?? `[missing prompt blob ${id.slice(0, 12)}]\n`)
+    .join('');
+}
+
 async function readLogs(exampleId, turn = null, stage = null) {
   const client = new MongoClient(MONGO_URI);
 
@@ -47,7 +67,7 @@ async function readLogs(exampleId, turn = null, stage = null) {
       console.log('='.repeat(80));
 
       console.log('\n--- PROMPT ---');
-      console.log(log.prompt);
+      console.log(await loadPrompt(db, log));
 
       console.log('\n--- RESPONSE ---');
       console.log(log.response);
@@ -1,11 +1,26 @@
 #!/usr/bin/env python3
 """
 Rebuild multiple KGs in batch with the updated extraction logic
+
+By default each example is rebuilt by build-kg-for-example.py in turn. With
+--batch, every example's LLM calls go through Anthropic message batches
+(kg_batch.BatchKGExtractor) and each KG is written as soon as its results
+are in; rerunning after an interruption resumes from the batch journal.
+
+Usage:
+    python scripts/rebuild-kgs-batch.py 0 50
+    python scripts/rebuild-kgs-batch.py 0 3000 --batch
+    python scripts/rebuild-kgs-batch.py 0 3000 --batch --journal data/.kg_batch_journal.jsonl --poll 60
 """
+import argparse
+import json
 import sys
 import subprocess
 from pathlib import Path
 
+BASE_DIR = Path(__file__).parent.parent
+KG_DIR = BASE_DIR / "data" / "knowledge-graphs"
+
 def rebuild_kgs(start_id, end_id):
     """Rebuild KGs for a range of example IDs"""
     failed = []
@@ -49,13 +64,62 @@ def rebuild_kgs(start_id, end_id):
 
     return failed
 
-if __name__ == '__main__':
-    if len(sys.argv) < 3:
-        print("Usage: python rebuild-kgs-batch.py <start_id> <end_id>")
-        sys.exit(1)
+def rebuild_kgs_with_batches(start_id, end_id, journal_path=None, poll_seconds=None):
+    """Rebuild KGs for a range of example IDs through message batches"""
+    sys.path.insert(0, str(BASE_DIR / "src" / "graph-solver"))
+    from kg_batch import BATCH_POLL_SECONDS, BatchKGExtractor
+    from kg_extractor import KGExtractor, preprocess_example
+
+    with open(BASE_DIR / "data" / "convfinqa_dataset.json") as f:
+        data = json.load(f)
+    dataset = []
+    for split in ['train', 'dev', 'test']:
+        if split in data:
+            dataset.extend(data[split])
+
+    example_ids = [example_id for example_id in range(start_id, end_id + 1) if example_id < len(dataset)]
+    examples = {str(example_id): preprocess_example(dataset[example_id]) for example_id in example_ids}
+
+    extractor = KGExtractor()
+    batch_extractor = BatchKGExtractor(extractor, journal_path=journal_path,
+                                       poll_seconds=poll_seconds if poll_seconds is not None else BATCH_POLL_SECONDS)
+    KG_DIR.mkdir(parents=True, exist_ok=True)
+
+    built = set()
+    for example_id, extraction in batch_extractor.extract_all(examples):
+        try:
+            rdf_graph = extractor.build_rdflib_graph(extraction)
+            rdf_graph.serialize(destination=str(KG_DIR / f"{example_id}_kg.ttl"), format='turtle')
+            built.add(example_id)
+            print(f"✓ Example {example_id} KG rebuilt ({len(built)}/{len(examples)})")
+        except Exception as e:
+            print(f"✗ Example {example_id} ERROR: {e}")
+    failed = [int(example_id) for example_id in examples if example_id not in built]
 
-    start = int(sys.argv[1])
-    end = int(sys.argv[2])
+    print(f"\n{'='*80}")
+    print(f"BATCH REBUILD SUMMARY")
+    print(f"{'='*80}")
+    print(f"Total: {len(examples)} examples")
+    print(f"Succeeded: {len(built)}")
+    print(f"Failed: {len(failed)}")
+    print(f"Requests: {batch_extractor.stats()}")
+
+    if failed:
+        print(f"\nFailed examples: {failed}")
+
+    return failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild KGs for a range of examples")
+    parser.add_argument('start_id', type=int)
+    parser.add_argument('end_id', type=int)
+    parser.add_argument('--batch', action='store_true', help="Use message batches instead of one example at a time")
+    parser.add_argument('--journal', help="Batch journal for resuming (default data/.kg_batch_journal.jsonl)")
+    parser.add_argument('--poll', type=float, help="Seconds between batch status checks")
+    args = parser.parse_args()
 
-    failed = rebuild_kgs(start, end)
+    if args.batch:
+        failed = rebuild_kgs_with_batches(args.start_id, args.end_id, args.journal, args.poll)
+    else:
+        failed = rebuild_kgs(args.start_id, args.end_id)
     sys.exit(len(failed))
@@ -10,6 +10,15 @@ def test_examples(start_id, end_id):
     """Test examples for a range of IDs"""
     results = []
 
+    # Fill the KG cache up front so no example pays the Turtle ingest on its first turn
+    try:
+        subprocess.run(
+            ['uv', 'run', 'python', 'scripts/warm-kg-cache.py', *(str(i) for i in range(start_id, end_id + 1))],
+            timeout=600
+        )
+    except subprocess.TimeoutExpired:
+        print("KG cache warm-up timed out; continuing with a cold cache")
+
     for example_id in range(start_id, end_id + 1):
         print(f"\n{'='*80}")
         print(f"Testing Example {example_id}")
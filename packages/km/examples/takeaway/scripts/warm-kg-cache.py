@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Warm the SQLite KG cache (data/.kg_cache.db) before a batch run
+
+Parses every stale data/knowledge-graphs/*_kg.ttl file (and the ontology) in a
+process pool, then bulk-inserts them into the cache in large transactions.
+Files whose content hash is already cached are skipped.
+
+Usage:
+    python scripts/warm-kg-cache.py                 # All KGs + ontology
+    python scripts/warm-kg-cache.py 9 10 11         # Specific examples
+    python scripts/warm-kg-cache.py --workers 8 --batch-size 50
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Add src to path
+src_dir = Path(__file__).parent.parent / "src" / "graph-solver"
+sys.path.insert(0, str(src_dir))
+
+from kg_cache_db import cache_entry, file_content_hash, parse_turtle, store_parsed_graphs
+
+BASE_DIR = Path(__file__).parent.parent
+KG_DIR = BASE_DIR / "data" / "knowledge-graphs"
+ONTOLOGY_PATH = BASE_DIR / "ontology" / "convfinqa-ontology.ttl"
+DB_PATH = BASE_DIR / "data" / ".kg_cache.db"
+
+
+def _parse_job(job):
+    """Worker: parse one turtle file, returning the job with triples attached"""
+    start = time.perf_counter()
+    triples, namespaces = parse_turtle(job['turtle_path'])
+    return dict(job, triples=triples, namespaces=namespaces, parse_seconds=time.perf_counter() - start)
+
+
+def collect_jobs(example_ids, include_ontology):
+    """Cache entries to warm: (cache_key, turtle_path, graph_prefix) with content hashes"""
+    if example_ids:
+        kg_paths = [KG_DIR / f"{example_id}_kg.ttl" for example_id in example_ids]
+    else:
+        kg_paths = sorted(KG_DIR.glob("*_kg.ttl"), key=lambda p: int(p.stem.split('_')[0]))
+
+    jobs = []
+    for kg_path in kg_paths:
+        if not kg_path.exists():
+            print(f"✗ {kg_path.name}: not found")
+            continue
+        example_id = kg_path.stem.split('_')[0]
+        jobs.append({'cache_key': example_id, 'turtle_path': str(kg_path),
+                     'graph_prefix': f"example_{example_id}"})
+    if include_ontology and ONTOLOGY_PATH.exists():
+        jobs.append({'cache_key': 'ontology', 'turtle_path': str(ONTOLOGY_PATH), 'graph_prefix': 'ontology'})
+
+    for job in jobs:
+        job['content_hash'] = file_content_hash(job['turtle_path'])
+    return jobs
+
+
+def warm_cache(jobs, workers, batch_size):
+    """Parse stale entries in parallel and insert them in batches; returns summary counts"""
+    stale = []
+    for job in jobs:
+        entry = cache_entry(DB_PATH, job['cache_key'])
+        if entry is not None and entry['content_hash'] == job['content_hash']:
+            print(f"  {Path(job['turtle_path']).name:<28} {'cached':>8}")
+        else:
+            stale.append(job)
+
+    built = 0
+    failed = 0
+    total_triples = 0
+    insert_seconds = 0.0
+    batch = []
+
+    def flush():
+        nonlocal built, insert_seconds
+        start = time.perf_counter()
+        built += len(store_parsed_graphs(DB_PATH, batch))
+        insert_seconds += time.perf_counter() - start
+        batch.clear()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_parse_job, job): job for job in stale}
+        for future in as_completed(futures):
+            try:
+                parsed = future.result()
+            except Exception as e:
+                # One unparsable file mustn't cost the rest of the warm-up
+                failed += 1
+                print(f"  {Path(futures[future]['turtle_path']).name:<28} {'failed':>8}  {type(e).__name__}: {e}")
+                continue
+            total_triples += len(parsed['triples'])
+            print(f"  {Path(parsed['turtle_path']).name:<28} {len(parsed['triples']):>8} triples "
+                  f"{parsed['parse_seconds'] * 1000:>8.1f} ms parse")
+            batch.append(parsed)
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+
+    return {
+        'total': len(jobs),
+        'skipped': len(jobs) - len(stale),
+        'built': built,
+        'failed': failed,
+        'triples': total_triples,
+        'insert_seconds': insert_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-build the SQLite KG cache")
+    parser.add_argument('example_ids', nargs='*', help="Examples to warm (default: all KGs)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Parser processes")
+    parser.add_argument('--batch-size', type=int, default=25, help="KGs per insert transaction")
+    parser.add_argument('--no-ontology', action='store_true', help="Skip the ontology graph")
+    args = parser.parse_args()
+
+    print(f"\nWarming {DB_PATH.relative_to(BASE_DIR)}")
+    print("=" * 64)
+    start = time.perf_counter()
+    jobs = collect_jobs(args.example_ids, include_ontology=not args.no_ontology)
+    summary = warm_cache(jobs, workers=args.workers, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+
+    print("=" * 64)
+    print(f"{summary['total']} graphs: {summary['built']} built, {summary['skipped']} already cached, "
+          f"{summary['failed']} failed")
+    print(f"{summary['triples']:,} triples inserted in {summary['insert_seconds']:.2f}s, total {elapsed:.2f}s")
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Process-wide pooled Anthropic client shared by all LLM callers
+
+Creating an Anthropic client per call (or per component) throws away HTTP
+keep-alive connections and TLS sessions. get_anthropic_client() returns one
+client per (api_key, base_url) for the whole process, backed by an httpx
+connection pool. Timeouts and pool sizes come from the environment:
+
+    ANTHROPIC_TIMEOUT            read/write timeout in seconds (default 600)
+    ANTHROPIC_CONNECT_TIMEOUT    connect timeout in seconds (default 10)
+    ANTHROPIC_MAX_CONNECTIONS    pool size (default 20)
+    ANTHROPIC_MAX_KEEPALIVE      idle keep-alive connections kept (default 20)
+    ANTHROPIC_KEEPALIVE_EXPIRY   idle connection lifetime in seconds (default 60)
+    ANTHROPIC_MAX_RETRIES        SDK retries on 429/5xx/connection errors (default 2)
+
+The SDK (and .env) are only loaded when the first client is built, so
+importing this module is cheap.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from common.env import load_env
+
+_lock = threading.Lock()
+_clients = {}  # {(api_key, base_url): Anthropic}
+_instructor_clients = {}  # {(api_key, base_url): instructor-wrapped client}
+_async_clients = weakref.WeakKeyDictionary()  # {event loop: {(api_key, base_url): AsyncAnthropic}}
+
+
+def client_settings():
+    """
+    Connection settings for the pooled client, read from the environment
+
+    Returns:
+        dict with timeout, connect_timeout, max_connections,
+        max_keepalive_connections, keepalive_expiry and max_retries
+    """
+    load_env()
+    return {
+        "timeout": float(os.getenv("ANTHROPIC_TIMEOUT", "600")),
+        "connect_timeout": float(os.getenv("ANTHROPIC_CONNECT_TIMEOUT", "10")),
+        "max_connections": int(os.getenv("ANTHROPIC_MAX_CONNECTIONS", "20")),
+        "max_keepalive_connections": int(os.getenv("ANTHROPIC_MAX_KEEPALIVE", "20")),
+        "keepalive_expiry": float(os.getenv("ANTHROPIC_KEEPALIVE_EXPIRY", "60")),
+        "max_retries": int(os.getenv("ANTHROPIC_MAX_RETRIES", "2")),
+    }
+
+
+def _client_key():
+    load_env()
+    return (os.getenv("ANTHROPIC_API_KEY"), os.getenv("ANTHROPIC_BASE_URL"))
+
+
+def _build_client(api_key, base_url, asynchronous=False):
+    import httpx
+    from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient
+
+    settings = client_settings()
+    http_client_class, client_class = (DefaultAsyncHttpxClient, AsyncAnthropic) if asynchronous \
+        else (DefaultHttpxClient, Anthropic)
+    http_client = http_client_class(
+        timeout=httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+        limits=httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_keepalive_connections"],
+            keepalive_expiry=settings["keepalive_expiry"],
+        ),
+    )
+    return client_class(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=settings["max_retries"],
+        http_client=http_client,
+    )
+
+
+def get_anthropic_client():
+    """
+    Return the process-wide Anthropic client (thread-safe, created on first use)
+
+    One client is kept per ANTHROPIC_API_KEY / ANTHROPIC_BASE_URL pair, so
+    changing either in the environment yields a new pooled client.
+    """
+    key = _client_key()
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = _build_client(*key)
+    return client
+
+
+def get_async_anthropic_client():
+    """
+    Return the AsyncAnthropic client for the running event loop
+
+    An async connection pool belongs to the loop that opened it, so one
+    client is kept per loop (and per ANTHROPIC_API_KEY / ANTHROPIC_BASE_URL).
+    Must be called from a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    key = _client_key()
+    with _lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            client = loop_clients[key] = _build_client(*key, asynchronous=True)
+    return client
+
+
+def get_instructor_client():
+    """Return the process-wide Instructor wrapper around get_anthropic_client()"""
+    import instructor
+
+    key = _client_key()
+    client = _instructor_clients.get(key)
+    if client is None:
+        base_client = get_anthropic_client()
+        with _lock:
+            client = _instructor_clients.get(key)
+            if client is None:
+                client = _instructor_clients[key] = instructor.from_anthropic(base_client)
+    return client
+
+
+def reset_clients():
+    """Close and forget pooled clients (the next accessor call builds new ones)"""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _instructor_clients.clear()
+        # Async clients are closed by their own loops; just drop them here
+        _async_clients.clear()
+    for client in clients:
+        client.close()
+
+
+def _forget_clients_after_fork():
+    # Pooled connections must not be shared with a forked child - it builds its own
+    _clients.clear()
+    _instructor_clients.clear()
+    _async_clients.clear()
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_clients_after_fork)
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""Load .env once, on first use rather than at import time
+
+Modules that read settings from the environment call load_env() right before
+reading them, so importing them stays cheap and a script that never calls an
+LLM or logs anything never touches .env or python-dotenv.
+"""
+import threading
+
+_lock = threading.Lock()
+_loaded = False
+
+
+def load_env():
+    """Load .env into os.environ (existing variables win); later calls are no-ops"""
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if not _loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _loaded = True
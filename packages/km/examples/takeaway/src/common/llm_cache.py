@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Content-addressed SQLite cache for LLM responses (data/.llm_cache.db)
+
+Every pipeline LLM call is temperature 0, so re-running an example after an
+unrelated change re-issues identical requests. Responses are stored under
+the SHA-256 of the request (model, messages, max_tokens, temperature and,
+for Instructor calls, the response model's JSON schema). LLM_CACHE_MODE
+selects how the cache is used:
+
+    read-through    serve hits, call the API on a miss and store it (default)
+    write-through   always call the API and store/refresh the response
+    replay          serve hits only; a miss raises LLMCacheMiss (offline runs)
+    off             bypass the cache
+
+LLM_CACHE_PATH overrides the database file and LLM_CACHE_MAX_MB (default
+512) caps its size; least recently used responses are evicted past the cap.
+
+Each entry also records a prompt key (model and messages only), so the mock
+LLM server can replay recorded responses to requests it sees on the wire.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from common.env import load_env
+from common.prompt_cache import record_usage
+
+CACHE_MODES = ("read-through", "write-through", "replay", "off")
+CACHE_VERSION = 1
+BUSY_TIMEOUT_SECONDS = 30
+EVICT_TO_FRACTION = 0.9  # Evict down to this share of the cap so eviction isn't re-run on every write
+
+_lock = threading.Lock()
+_caches = {}  # {db_path: (pid, LLMResponseCache)}
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when a request has no cached response"""
+
+
+def cache_mode():
+    """Current LLM_CACHE_MODE (read on every call so scripts can switch it)"""
+    load_env()
+    mode = os.getenv("LLM_CACHE_MODE", "read-through")
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown LLM_CACHE_MODE {mode!r} (expected one of {CACHE_MODES})")
+    return mode
+
+
+def default_cache_path():
+    load_env()
+    return Path(os.getenv("LLM_CACHE_PATH", Path(__file__).parent.parent.parent / "data" / ".llm_cache.db"))
+
+
+def cache_key(request, response_model=None):
+    """
+    SHA-256 key of an LLM request
+
+    Args:
+        request: messages.create kwargs (model, messages, max_tokens, temperature, ...)
+        response_model: Pydantic model for Instructor calls (its schema is part of the key)
+
+    Returns:
+        Hex digest
+    """
+    payload = {
+        "version": CACHE_VERSION,
+        "request": request,
+        "response_schema": response_model.model_json_schema() if response_model is not None else None,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def prompt_key(request):
+    """SHA-256 of a request's model and messages (ignores sampling params and response schema)"""
+    encoded = json.dumps({"model": request.get("model"), "messages": request.get("messages")},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite table of responses keyed by request hash, with LRU size eviction
+
+    Args:
+        db_path: SQLite file
+        max_bytes: Total response size kept before evicting least recently used entries
+    """
+
+    def __init__(self, db_path, max_bytes):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_SECONDS * 1000}")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL,
+                last_used_at REAL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                prompt_key TEXT
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(llm_responses)")}
+        if "prompt_key" not in columns:
+            self._conn.execute("ALTER TABLE llm_responses ADD COLUMN prompt_key TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_prompt ON llm_responses (prompt_key)")
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+    def get(self, key):
+        """Cached response text for a key, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_used_at = ?, hits = hits + 1 WHERE key = ?",
+                               (time.time(), key))
+            self._stats["hits"] += 1
+            return row[0]
+
+    def get_by_prompt(self, prompt_key):
+        """Most recently used response recorded for a prompt key, or None (doesn't touch LRU order)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_responses WHERE prompt_key = ? ORDER BY last_used_at DESC LIMIT 1",
+                (prompt_key,)).fetchone()
+            return row[0] if row is not None else None
+
+    def put(self, key, model, response, prompt_key=None):
+        """Store (or refresh) a response, then evict if the cache is over its size cap"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO llm_responses
+                    (key, model, response, size, created_at, last_used_at, hits, prompt_key)
+                VALUES (?, ?, ?, ?, ?, ?, 0, ?)
+            """, (key, model, response, len(response.encode()), now, now, prompt_key))
+            self._stats["writes"] += 1
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Keep the most recently used entries that fit in the target size
+        deleted = self._conn.execute("""
+            DELETE FROM llm_responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used_at DESC, key) AS kept
+                    FROM llm_responses
+                ) WHERE kept > ?
+            )
+        """, (int(self.max_bytes * EVICT_TO_FRACTION),)).rowcount
+        self._stats["evicted"] += deleted
+
+    def clear(self):
+        """Delete every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+
+    def stats(self):
+        """In-process hit/miss/write/evict counters plus entry count and total size"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+            return {**self._stats, "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_llm_cache(db_path=None):
+    """Return this process's cache for a database file (LLM_CACHE_PATH by default)"""
+    db_path = Path(db_path) if db_path is not None else default_cache_path()
+    key = str(db_path)
+    with _lock:
+        entry = _caches.get(key)
+        if entry is not None and entry[0] == os.getpid() and db_path.exists():
+            return entry[1]
+        max_bytes = int(float(os.getenv("LLM_CACHE_MAX_MB", "512")) * 1024 * 1024)
+        cache = LLMResponseCache(db_path, max_bytes)
+        _caches[key] = (os.getpid(), cache)
+        return cache
+
+
+def lookup(request, response_model=None):
+    """
+    Resolve a request against the cache according to LLM_CACHE_MODE
+
+    Returns:
+        (key, cached response text or None); key is None when the cache is off
+
+    Raises:
+        LLMCacheMiss: in replay mode, if the response is not cached
+    """
+    mode = cache_mode()
+    if mode == "off":
+        return None, None
+    key = cache_key(request, response_model)
+    if mode == "write-through":
+        return key, None
+    cached = get_llm_cache().get(key)
+    if cached is None and mode == "replay":
+        raise LLMCacheMiss(f"No cached response for request {key[:16]} (LLM_CACHE_MODE=replay)")
+    return key, cached
+
+
+def store(key, request, response):
+    """Store a response under a key from lookup() (no-op when the cache is off)"""
+    if key is not None:
+        get_llm_cache().put(key, request.get("model"), response, prompt_key(request))
+
+
+def cached_structured_call(create, response_model, phase=None, **request):
+    """
+    Instructor messages.create through the cache
+
+    Args:
+        create: The Instructor client's messages.create
+        response_model: Pydantic model the response is validated into
+        phase: Phase name the API call's token usage is recorded under (see common.prompt_cache)
+        **request: model, max_tokens, temperature, messages, ...
+
+    Returns:
+        response_model instance (from the cache or a fresh call)
+    """
+    key, cached = lookup(request, response_model)
+    if cached is not None:
+        return response_model.model_validate_json(cached)
+    result = create(response_model=response_model, **request)
+    # Instructor keeps the raw Messages API response on the parsed model
+    record_usage(phase, getattr(getattr(result, "_raw_response", None), "usage", None))
+    store(key, request, result.model_dump_json())
+    return result
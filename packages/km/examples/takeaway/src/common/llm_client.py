@@ -1,62 +1,197 @@
 #!/usr/bin/env python3
-"""Shared LLM client with MongoDB logging for all graph-solver components"""
+"""Shared LLM client with MongoDB logging for all graph-solver components
+
+acall_llm() is the async entry point; call_llm() is a blocking wrapper
+around it. Every call runs on one background event loop per process, so a
+single limiter governs all callers, sync or async (settings are read when
+the first call starts the loop):
+
+    LLM_MAX_CONCURRENCY       calls in flight at once (default 8)
+    LLM_REQUESTS_PER_MINUTE   request budget, 0 = unlimited (default 0)
+    LLM_TOKENS_PER_MINUTE     input + output token budget, 0 = unlimited (default 0)
+    LLM_RATE_LIMIT_RETRIES    retries after a 429 (default 5)
+
+A 429 pauses every pending call for the server's retry-after. Connection
+errors and 5xx responses are retried with backoff up to ANTHROPIC_MAX_RETRIES.
+Responses go through the LLM response cache (see common.llm_cache). Interactions
+are logged to MongoDB by a background writer (see common.log_sink), with
+prompts stored as deduplicated blobs (see common.prompt_store).
+
+Pass static_prefix for the part of a prompt that is identical across calls; it
+is sent as a prompt-cache breakpoint (see common.prompt_cache) and each call's
+token usage, including cache reads and writes, is recorded under its phase.
+"""
+import asyncio
 import os
+import threading
 from datetime import datetime
-from pymongo import MongoClient
-from anthropic import Anthropic
-from dotenv import load_dotenv
+from common import llm_cache
+from common.anthropic_client import client_settings, get_async_anthropic_client
+from common.env import load_env
+from common.log_sink import get_log_sink
+from common.prompt_store import BLOB_COLLECTION, prompt_fields
+from common.prompt_cache import content_text, prompt_content, record_usage
+from common.rate_limiter import LLMRateLimiter, retry_after_seconds
+
+MAX_TOKENS = 4000
+CHARS_PER_TOKEN = 4  # Rough estimate used to reserve input tokens before a call
+
+# Background MongoDB writer (connects on its own thread when the first entry is logged)
+llm_logs = get_log_sink("llm_interactions")
+
+_loop_lock = threading.Lock()
+_loop = None
+_limiter = None
+
+
+def _llm_loop():
+    """The background event loop all LLM calls run on (started on first use)"""
+    global _loop, _limiter
+    with _loop_lock:
+        if _loop is None:
+            load_env()
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True).start()
+            _limiter = LLMRateLimiter(int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                                      float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")),
+                                      float(os.getenv("LLM_TOKENS_PER_MINUTE", "0")))
+            _loop = loop
+        return _loop
+
+
+def llm_limiter_stats():
+    """Counters of the process-wide limiter (empty before the first call)"""
+    return _limiter.stats() if _limiter is not None else {}
+
+
+def _phase(metadata):
+    return metadata.get("phase", "semantic_query") if metadata else "semantic_query"
+
+
+def _log_interaction(prompt, response_text, metadata, cached, usage=None):
+    if llm_logs is None:
+        return
+    log_entry = {
+        "timestamp": datetime.utcnow(),
+        "stage": _phase(metadata),
+        **prompt_fields(prompt, get_log_sink(BLOB_COLLECTION)),
+        "response": response_text,
+        "metadata": metadata or {},
+        "cached": cached
+    }
+    if usage is not None:
+        log_entry["usage"] = usage
+    llm_logs.put(log_entry)
+
+
+def _message_request(prompt, static_prefix=None):
+    return {
+        "model": os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514"),
+        "max_tokens": MAX_TOKENS,
+        "temperature": 0,
+        "messages": [{"role": "user", "content": prompt_content(static_prefix, prompt)}]
+    }
+
 
-load_dotenv()
+async def _create_message(request):
+    from anthropic import APIConnectionError, APIStatusError, RateLimitError
 
-# MongoDB connection (singleton)
-try:
-    mongo_client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
-    mongo_db = mongo_client['legion_tools']
-    llm_logs = mongo_db['llm_interactions']
-except Exception as e:
-    print(f"Warning: MongoDB connection failed: {e}")
-    llm_logs = None
+    # Retries happen here rather than in the SDK so a 429 pauses every caller
+    client = get_async_anthropic_client().with_options(max_retries=0)
+    estimated_tokens = len(content_text(request["messages"][0]["content"])) // CHARS_PER_TOKEN
+    max_retries = client_settings()["max_retries"]
+    rate_limit_retries = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "5"))
+    attempt = 0
+    while True:
+        delay = None
+        async with _limiter.slot(estimated_tokens):
+            try:
+                response = await client.messages.create(**request)
+            except RateLimitError as e:
+                _limiter.record_usage(estimated_tokens, 0)  # The API processed no tokens
+                if attempt >= rate_limit_retries:
+                    raise
+                _limiter.pause(retry_after_seconds(e.response.headers, default=2 ** attempt))
+            except (APIConnectionError, APIStatusError) as e:
+                _limiter.record_usage(estimated_tokens, 0)
+                retryable = isinstance(e, APIConnectionError) or e.status_code >= 500
+                if not retryable or attempt >= max_retries:
+                    raise
+                headers = e.response.headers if isinstance(e, APIStatusError) else None
+                delay = retry_after_seconds(headers, default=0.5 * 2 ** attempt)
+            else:
+                # Cache reads don't count against input-token rate limits; cache writes do
+                usage = response.usage
+                _limiter.record_usage(estimated_tokens, usage.input_tokens + usage.output_tokens
+                                      + (getattr(usage, "cache_creation_input_tokens", None) or 0))
+                return response
+        attempt += 1
+        if delay:
+            await asyncio.sleep(delay)
 
 
-def call_llm(prompt, metadata=None):
+async def _call_llm(prompt, metadata, static_prefix=None):
+    request = _message_request(prompt, static_prefix)
+    key, response_text = await asyncio.to_thread(llm_cache.lookup, request)
+    cached = response_text is not None
+    usage = None
+    if not cached:
+        response = await _create_message(request)
+        response_text = response.content[0].text
+        usage = response.usage.model_dump(exclude_none=True)
+        record_usage(_phase(metadata), usage)
+        await asyncio.to_thread(llm_cache.store, key, request, response_text)
+    full_prompt = content_text(request["messages"][0]["content"])
+    _log_interaction(full_prompt, response_text, metadata, cached, usage)
+    return response_text
+
+
+async def acall_llm(prompt, metadata=None, static_prefix=None):
     """
-    Call LLM with prompt and log to MongoDB
+    Call LLM with prompt and log to MongoDB, without blocking the event loop
 
     Args:
-        prompt: Full prompt string
+        prompt: Full prompt string (the per-call part when static_prefix is given)
         metadata: Dict with example_id, turn, question, phase, etc.
             Required fields: example_id, turn, question, phase
             Optional fields: resolved_question, values, formula, retrieved_values, etc.
+        static_prefix: Text sent before the prompt as a prompt-cache breakpoint
 
     Returns:
         LLM response text
+
+    Raises:
+        LLMCacheMiss: if LLM_CACHE_MODE=replay and the response is not cached
     """
-    client = Anthropic(
-        api_key=os.getenv("ANTHROPIC_API_KEY"),
-        base_url=os.getenv("ANTHROPIC_BASE_URL")
-    )
-
-    response = client.messages.create(
-        model=os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514"),
-        max_tokens=4000,
-        temperature=0,
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    response_text = response.content[0].text
-
-    # Log to MongoDB
-    if llm_logs is not None:
-        try:
-            log_entry = {
-                'timestamp': datetime.utcnow(),
-                'stage': metadata.get('phase', 'semantic_query') if metadata else 'semantic_query',
-                'prompt': prompt,
-                'response': response_text,
-                'metadata': metadata or {}
-            }
-            llm_logs.insert_one(log_entry)
-        except Exception as e:
-            print(f"Warning: Failed to log to MongoDB: {e}")
+    loop = _llm_loop()
+    if asyncio.get_running_loop() is loop:
+        return await _call_llm(prompt, metadata, static_prefix)
+    return await asyncio.wrap_future(
+        asyncio.run_coroutine_threadsafe(_call_llm(prompt, metadata, static_prefix), loop))
 
-    return response_text
+
+def call_llm(prompt, metadata=None, static_prefix=None):
+    """
+    Call LLM with prompt and log to MongoDB (blocking wrapper around acall_llm)
+
+    Args:
+        prompt: Full prompt string (the per-call part when static_prefix is given)
+        metadata: Dict with example_id, turn, question, phase, etc.
+        static_prefix: Text sent before the prompt as a prompt-cache breakpoint
+
+    Returns:
+        LLM response text
+    """
+    return asyncio.run_coroutine_threadsafe(_call_llm(prompt, metadata, static_prefix), _llm_loop()).result()
+
+
+def _forget_loop_after_fork():
+    # The loop thread does not exist in a forked child - it starts its own
+    global _loop, _limiter, _loop_lock
+    _loop = None
+    _limiter = None
+    _loop_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_loop_after_fork)
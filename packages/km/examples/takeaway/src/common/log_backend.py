@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""Pluggable log storage: MongoDB or local segmented JSONL files
+
+Log writers (common.log_sink, ConvFinQALogger, PreprocessorLogger) and the
+log query scripts get a database from log_database() and use the slice of the
+pymongo API they need: db[name] / db.name, insert_one/insert_many, find (with
+sort and limit), find_one, replace_one, update_one ($set/$push), delete_one
+and create_index. LOG_BACKEND picks what is behind it:
+
+    auto    MongoDB if it answers a ping, else local files (default)
+    mongo   MongoDB only
+    local   local files only - no external service
+
+The local backend appends each insert batch as one gzip member to the current
+segment file of data/logs/<database>/<collection>/. A segment is sealed once
+it passes LOG_LOCAL_SEGMENT_MB and the next batch starts a new one; every
+process writes its own segments, so appends never interleave. Segments are
+plain concatenated gzip (zcat works). index.sqlite in the database directory
+maps each document's _id, example_id, turn, phase and timestamp to its
+(segment, member offset, line), so a query reads only the members holding
+its candidates; the full filter is then checked against the documents.
+Replaced, updated or deleted documents stay in their segments but drop out
+of the index.
+
+    LOG_LOCAL_DIR             root directory (default data/logs)
+    LOG_LOCAL_SEGMENT_MB      segment size before rotation (default 64)
+    LOG_BACKEND_PROBE_MS      auto: MongoDB ping timeout (default 2000)
+"""
+import base64
+import gzip
+import json
+import operator
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from common.env import load_env
+
+BACKENDS = ("auto", "mongo", "local")
+LOG_DATABASE = "legion_tools"
+DEFAULT_MONGO_URI = "mongodb://localhost:27017/"
+DEFAULT_LOCAL_DIR = Path(__file__).parent.parent.parent / "data" / "logs"
+BUSY_TIMEOUT_SECONDS = 30
+COMPRESS_LEVEL = 6
+MEMBER_CACHE_SIZE = 8  # Decompressed gzip members kept for reads (documents of one batch share a member)
+SQL_PARAMS_PER_QUERY = 500
+# Index column: document paths it is filled from (first one present wins)
+INDEX_FIELDS = {
+    "example_id": ("example_id", "metadata.example_id"),
+    "turn": ("turn", "metadata.turn"),
+    "phase": ("phase", "metadata.phase"),
+}
+TIMESTAMP_FIELDS = ("timestamp", "run_timestamp")
+OPERATORS = {
+    "$eq": operator.eq,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$in": lambda value, options: value in options,
+}
+
+_lock = threading.Lock()
+_databases = {}  # {database directory: (pid, LocalLogDatabase)}
+_reachable = {}  # {MongoDB URI: answered the auto-mode ping}
+
+
+def log_backend():
+    """Current LOG_BACKEND"""
+    load_env()
+    backend = os.getenv("LOG_BACKEND", "auto")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LOG_BACKEND {backend!r} (expected one of {BACKENDS})")
+    return backend
+
+
+def local_log_dir():
+    load_env()
+    return Path(os.getenv("LOG_LOCAL_DIR", DEFAULT_LOCAL_DIR))
+
+
+def mongo_reachable(mongo_uri):
+    """Whether MongoDB answers a ping (checked once per URI and process)"""
+    with _lock:
+        if mongo_uri in _reachable:
+            return _reachable[mongo_uri]
+    try:
+        from pymongo import MongoClient
+
+        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=int(os.getenv("LOG_BACKEND_PROBE_MS", "2000")))
+        try:
+            client.admin.command("ping")
+        finally:
+            client.close()
+        reachable = True
+    except Exception as e:
+        print(f"Warning: MongoDB unavailable at {mongo_uri} ({e}); logging to {local_log_dir()}")
+        reachable = False
+    with _lock:
+        _reachable[mongo_uri] = reachable
+    return reachable
+
+
+def log_database(database=LOG_DATABASE, mongo_uri=None):
+    """
+    Database to log into or query, according to LOG_BACKEND
+
+    Args:
+        database: Database name (also the local backend's directory name)
+        mongo_uri: MongoDB connection string (default: MONGODB_URI env var)
+
+    Returns:
+        pymongo Database or LocalLogDatabase
+    """
+    backend = log_backend()
+    mongo_uri = mongo_uri or os.getenv("MONGODB_URI", DEFAULT_MONGO_URI)
+    if backend == "mongo" or (backend == "auto" and mongo_reachable(mongo_uri)):
+        from pymongo import MongoClient
+
+        # Fail fast when MongoDB goes down so log sinks reach their overflow policy
+        return MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)[database]
+    return local_log_database(database)
+
+
+def local_log_database(database=LOG_DATABASE, root=None):
+    """Return this process's LocalLogDatabase for a database directory"""
+    path = Path(root if root is not None else local_log_dir()) / database
+    key = str(path)
+    with _lock:
+        entry = _databases.get(key)
+        if entry is not None and entry[0] == os.getpid():
+            return entry[1]
+        segment_bytes = int(float(os.getenv("LOG_LOCAL_SEGMENT_MB", "64")) * 1024 * 1024)
+        db = LocalLogDatabase(path, segment_bytes)
+        _databases[key] = (os.getpid(), db)
+        return db
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, (bytes, bytearray)):
+        return {"$binary": base64.b64encode(bytes(value)).decode()}
+    return str(value)  # ObjectId, Decimal, ...
+
+
+def _decode(obj):
+    if len(obj) == 1:
+        if "$date" in obj:
+            return datetime.fromisoformat(obj["$date"])
+        if "$binary" in obj:
+            return base64.b64decode(obj["$binary"])
+    return obj
+
+
+def encode_document(document):
+    """One JSON line for a log document (datetimes and bytes tagged so decode_document restores them)"""
+    return json.dumps(document, default=_encode, ensure_ascii=False)
+
+
+def decode_document(line):
+    return json.loads(line, object_hook=_decode)
+
+
+def _values(document, path):
+    """Values at a dotted path, descending into lists the way MongoDB queries do"""
+    values = [document]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit():
+                    if int(part) < len(value):
+                        found.append(value[int(part)])
+                else:
+                    found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        values = found
+    return values
+
+
+def _compare(op, value, operand):
+    try:
+        return bool(OPERATORS[op](value, operand))
+    except TypeError:
+        return False
+
+
+def matches(document, query):
+    """Whether a document matches a MongoDB-style query (equality, $eq/$lt/$lte/$gt/$gte/$in on dotted paths)"""
+    for path, condition in (query or {}).items():
+        candidates = []
+        for value in _values(document, path):
+            candidates.append(value)
+            if isinstance(value, list):
+                candidates.extend(value)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            for op, operand in condition.items():
+                if op not in OPERATORS:
+                    raise ValueError(f"Unsupported query operator {op!r} for local logs (supported: {sorted(OPERATORS)})")
+                if not any(_compare(op, candidate, operand) for candidate in candidates):
+                    return False
+        elif not any(candidate == condition for candidate in candidates):
+            return False
+    return True
+
+
+def _sort_key(value):
+    # None sorts first, like MongoDB; mixed types sort by type name rather than raising
+    return (False, "", 0) if value is None else (True, type(value).__name__, value)
+
+
+def _index_value(document, paths):
+    for path in paths:
+        values = _values(document, path)
+        if values:
+            value = values[0]
+            return value if value is None or isinstance(value, (int, float)) else str(value)
+    return None
+
+
+def _set_path(document, path, value):
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        target = target[int(part)] if isinstance(target, list) else target.setdefault(part, {})
+    if isinstance(target, list):
+        target[int(parts[-1])] = value
+    else:
+        target[parts[-1]] = value
+
+
+def apply_update(document, update):
+    """Apply a $set / $push update document in place"""
+    for op, fields in update.items():
+        if op not in ("$set", "$push"):
+            raise ValueError(f"Unsupported update operator {op!r} for local logs (supported: $set, $push)")
+        for path, value in fields.items():
+            if op == "$set":
+                _set_path(document, path, value)
+            else:
+                existing = _values(document, path)
+                if existing:
+                    existing[0].append(value)
+                else:
+                    _set_path(document, path, [value])
+
+
+class LocalCursor:
+    """Lazy find() result supporting sort() and limit() like a pymongo Cursor"""
+
+    def __init__(self, collection, query):
+        self._collection = collection
+        self._query = query
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=1):
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def __iter__(self):
+        return iter(self._collection._find(self._query, self._sort, self._limit))
+
+
+class LocalLogCollection:
+    """One collection's segments and index rows (get it from LocalLogDatabase[name])"""
+
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self._file = None
+        self._segment = None
+        self._size = 0
+        self._sequence = 0
+
+    # --- writes
+
+    def insert_one(self, document):
+        self.insert_many([document])
+
+    def insert_many(self, documents, ordered=False):
+        """Append documents; _ids already in the collection are skipped (content-addressed blobs, reruns)"""
+        documents = list(documents)
+        for document in documents:
+            document.setdefault("_id", uuid.uuid4().hex)
+        with self.db._transaction() as conn:
+            existing = self._existing_ids(conn, [str(document["_id"]) for document in documents])
+            new = []
+            for document in documents:
+                if str(document["_id"]) not in existing:
+                    existing.add(str(document["_id"]))
+                    new.append(document)
+            if new:
+                self._append(conn, new, "IGNORE")
+
+    def replace_one(self, query, document, upsert=False):
+        """Replace the first match (its _id is kept), or insert when upsert is set"""
+        current = self.find_one(query)
+        if current is None and not upsert:
+            return
+        document = dict(document)
+        if current is not None:
+            document["_id"] = current["_id"]
+        elif "_id" not in document:
+            document["_id"] = query.get("_id", uuid.uuid4().hex)
+        with self.db._transaction() as conn:
+            self._append(conn, [document], "REPLACE")
+
+    def update_one(self, query, update, upsert=False):
+        """Read-modify-append the first match"""
+        document = self.find_one(query)
+        if document is None:
+            if not upsert:
+                return
+            document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+        apply_update(document, update)
+        self.replace_one({"_id": document["_id"]} if "_id" in document else query, document, upsert=True)
+
+    def delete_one(self, query):
+        document = self.find_one(query)
+        if document is not None:
+            with self.db._transaction() as conn:
+                conn.execute("DELETE FROM records WHERE collection = ? AND id = ?", (self.name, str(document["_id"])))
+
+    def create_index(self, keys, **kwargs):
+        """No-op: index.sqlite covers _id, example_id, turn, phase and timestamp; other fields are filtered on read"""
+        return keys if isinstance(keys, str) else "_".join(f"{key}_{direction}" for key, direction in keys)
+
+    def _existing_ids(self, conn, ids):
+        existing = set()
+        for start in range(0, len(ids), SQL_PARAMS_PER_QUERY):
+            chunk = ids[start:start + SQL_PARAMS_PER_QUERY]
+            existing.update(row[0] for row in conn.execute(
+                f"SELECT id FROM records WHERE collection = ? AND id IN ({','.join('?' * len(chunk))})",
+                (self.name, *chunk)))
+        return existing
+
+    def _append(self, conn, documents, conflict):
+        lines = [encode_document(document) for document in documents]
+        segment, offset = self._write_member(("\n".join(lines) + "\n").encode())
+        rows = []
+        for line, document in enumerate(documents):
+            indexed = {column: _index_value(document, paths) for column, paths in INDEX_FIELDS.items()}
+            timestamp = next((document[field] for field in TIMESTAMP_FIELDS if field in document), None)
+            if isinstance(timestamp, datetime):
+                timestamp = timestamp.isoformat()
+            rows.append((self.name, str(document["_id"]), indexed["example_id"], indexed["turn"], indexed["phase"],
+                         timestamp if timestamp is None else str(timestamp), segment, offset, line))
+        conn.executemany(f"""
+            INSERT OR {conflict} INTO records
+                (collection, id, example_id, turn, phase, timestamp, segment, member_offset, line)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    def _write_member(self, data):
+        """Append one gzip member to this process's current segment; returns (segment, member offset)"""
+        if self._file is None or self._size >= self.db.segment_bytes:
+            self._rotate()
+        member = gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+        offset = self._size
+        self._file.write(member)
+        self._file.flush()
+        self._size += len(member)
+        return self._segment, offset
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._sequence += 1
+        started = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        self._segment = f"{self.name}/{started}-{os.getpid()}-{self._sequence:04d}.jsonl.gz"
+        path = self.db.path / self._segment
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "ab")
+        self._size = path.stat().st_size
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # --- reads
+
+    def find(self, query=None):
+        return LocalCursor(self, query or {})
+
+    def find_one(self, query=None, sort=None):
+        cursor = self.find(query)
+        if sort:
+            cursor.sort(sort)
+        return next(iter(cursor.limit(1)), None)
+
+    def _prefilter(self, query):
+        """SQL conditions on index columns that every match must satisfy"""
+        where, params = [], []
+        for path, condition in query.items():
+            if path == "_id":
+                column = "id"
+            else:
+                column = next((column for column, paths in INDEX_FIELDS.items() if path in paths), None)
+            if column is None:
+                continue
+            if isinstance(condition, dict):
+                options = condition.get("$in") if set(condition) == {"$in"} else None
+                if options is None or len(options) > SQL_PARAMS_PER_QUERY:
+                    continue
+                options = [str(option) if column in ("id", "example_id", "phase") else option for option in options]
+                where.append(f"{column} IN ({','.join('?' * len(options))})")
+                params.extend(options)
+            elif isinstance(condition, (str, int, float)) and not isinstance(condition, bool):
+                where.append(f"{column} = ?")
+                params.append(str(condition) if column in ("id", "example_id", "phase") else condition)
+        return where, params
+
+    def _find(self, query, sort, limit):
+        where, params = self._prefilter(query)
+        order = "seq"
+        if sort and len(sort) == 1 and sort[0][0] in TIMESTAMP_FIELDS:
+            # Stream in timestamp order so limited queries stop at the first matches
+            order = "timestamp DESC, seq DESC" if sort[0][1] < 0 else "timestamp, seq"
+            sort = None
+        with self.db._lock:
+            rows = self.db._conn.execute(
+                f"SELECT segment, member_offset, line FROM records WHERE collection = ?"
+                f"{''.join(' AND ' + condition for condition in where)} ORDER BY {order}",
+                (self.name, *params)).fetchall()
+        results = []
+        for segment, offset, line in rows:
+            document = self.db._read(segment, offset, line)
+            if matches(document, query):
+                results.append(document)
+                if limit and not sort and len(results) == limit:
+                    break
+        for key, direction in reversed(sort or []):
+            results.sort(key=lambda document: _sort_key(next(iter(_values(document, key)), None)),
+                         reverse=direction < 0)
+        return results[:limit] if limit else results
+
+
+class LocalLogDatabase:
+    """
+    Directory of per-collection segments plus the index.sqlite side index
+
+    Args:
+        path: Database directory
+        segment_bytes: Segment size before a new segment is started
+    """
+
+    def __init__(self, path, segment_bytes):
+        self.path = Path(path)
+        self.segment_bytes = segment_bytes
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._collections = {}
+        self._members = {}  # {(segment, offset): lines}, insertion ordered for eviction
+        self._conn = sqlite3.connect(str(self.path / "index.sqlite"), timeout=BUSY_TIMEOUT_SECONDS,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_SECONDS * 1000}")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                example_id TEXT,
+                turn INTEGER,
+                phase TEXT,
+                timestamp TEXT,
+                segment TEXT NOT NULL,
+                member_offset INTEGER NOT NULL,
+                line INTEGER NOT NULL,
+                UNIQUE (collection, id)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS records_example ON records (collection, example_id, turn, phase)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS records_timestamp ON records (collection, timestamp)")
+
+    def __getitem__(self, name):
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = self._collections[name] = LocalLogCollection(self, name)
+            return collection
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    @property
+    def client(self):
+        """pymongo compatibility: callers close the database through db.client.close()"""
+        return self
+
+    @contextmanager
+    def _transaction(self):
+        """Database lock plus BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on the index"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _read(self, segment, offset, line):
+        key = (segment, offset)
+        with self._lock:
+            lines = self._members.get(key)
+            if lines is None:
+                lines = _read_member(self.path / segment, offset)
+                if len(self._members) >= MEMBER_CACHE_SIZE:
+                    self._members.pop(next(iter(self._members)))
+                self._members[key] = lines
+        return decode_document(lines[line])
+
+    def close(self):
+        """Close this process's open segments (the index connection stays open for other users of the database)"""
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+
+
+def _read_member(path, offset):
+    """Lines of the gzip member starting at offset"""
+    decompressor = zlib.decompressobj(wbits=31)
+    data = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while not decompressor.eof:
+            block = f.read(1 << 16)
+            if not block:
+                break
+            data.append(decompressor.decompress(block))
+    return b"".join(data).decode().splitlines()
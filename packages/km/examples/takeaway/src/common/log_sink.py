@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Background log writer for llm_interactions and kg_extraction_logs
+
+Log documents are put on a bounded in-memory queue and written by one daemon
+thread per collection with insert_many(ordered=False), so logging never waits
+on MongoDB on the request path. The collection comes from
+common.log_backend, so LOG_BACKEND=local (or auto with MongoDB down) batches
+into local segment files instead. The writer sends a batch once it holds
+LOG_SINK_BATCH_SIZE documents or LOG_SINK_FLUSH_SECONDS after the first one
+arrived, and every sink is flushed at interpreter exit.
+
+When the queue is full (or MongoDB rejects a batch) LOG_SINK_OVERFLOW decides
+what happens to the documents:
+
+    drop    count them as dropped (default)
+    spill   append them to data/.log_spill/<collection>.jsonl; the writer
+            re-inserts spilled documents after its next successful batch
+
+    LOG_SINK_MAX_QUEUE        queued documents per collection (default 10000)
+    LOG_SINK_BATCH_SIZE       documents per insert_many (default 200)
+    LOG_SINK_FLUSH_SECONDS    max delay before a partial batch is written (default 1.0)
+    LOG_SINK_EXIT_TIMEOUT     seconds to wait for the flush at exit (default 10)
+
+log_sink_stats() reports queue depth, written, dropped and spilled counts.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from common.log_backend import log_database
+
+OVERFLOW_POLICIES = ("drop", "spill")
+DEFAULT_SPILL_DIR = Path(__file__).parent.parent.parent / "data" / ".log_spill"
+DUPLICATE_KEY_ERROR = 11000
+
+_lock = threading.Lock()
+_sinks = {}  # {collection name: MongoLogSink}
+
+
+class MongoLogSink:
+    """
+    Bounded queue of log documents drained into one collection by a writer thread
+
+    Args:
+        name: Collection name (used for the spill file and stats)
+        collection_factory: Callable returning the collection; called on the writer thread
+        max_queue: Queued documents before the overflow policy applies
+        batch_size: Documents per insert_many
+        flush_seconds: Max delay before a partial batch is written
+        overflow: 'drop' or 'spill'
+        spill_path: JSONL file for spilled documents
+    """
+
+    def __init__(self, name, collection_factory, max_queue=10_000, batch_size=200, flush_seconds=1.0,
+                 overflow="drop", spill_path=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log sink overflow policy {overflow!r} (expected one of {OVERFLOW_POLICIES})")
+        self.name = name
+        self._collection_factory = collection_factory
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.overflow = overflow
+        self.spill_path = Path(spill_path) if spill_path is not None else DEFAULT_SPILL_DIR / f"{name}.jsonl"
+        self._stats = {"queued": 0, "written": 0, "duplicates": 0, "dropped": 0, "spilled": 0, "replayed": 0,
+                       "batches": 0, "failed_batches": 0}
+        self._stats_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Started on first put, and again in a forked child (which has no writer thread)
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._pending = 0
+            self._idle = threading.Condition()
+            self._collection = None
+            self._warned = False
+            self._closed = False
+            self._thread = threading.Thread(target=self._run, name=f"log-sink-{self.name}", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def put(self, document):
+        """
+        Queue a document for writing without blocking
+
+        Returns:
+            True if queued, False if the overflow policy dropped or spilled it
+        """
+        self._ensure_started()
+        with self._idle:
+            if self._closed:
+                accepted = False
+            else:
+                try:
+                    self._queue.put_nowait(document)
+                    self._pending += 1
+                    accepted = True
+                except queue.Full:
+                    accepted = False
+        if accepted:
+            self._count("queued", 1)
+        else:
+            self._overflow([document])
+        return accepted
+
+    def flush(self, timeout=None):
+        """Wait until every queued document has been written (or given up on); False on timeout"""
+        if self._pid != os.getpid():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Flush, stop accepting documents and hand anything left to the overflow policy"""
+        if self._pid != os.getpid():
+            return
+        self.flush(timeout)
+        with self._idle:
+            self._closed = True
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self._overflow(leftover)
+            self._done(len(leftover))
+
+    def stats(self):
+        """Counters since start plus the current queue depth"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize() if self._pid == os.getpid() else 0
+        stats["max_queue"] = self.max_queue
+        stats["overflow"] = self.overflow
+        return stats
+
+    def _count(self, name, amount):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _done(self, count):
+        with self._idle:
+            self._pending -= count
+            if self._pending <= 0:
+                self._idle.notify_all()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                if self._insert(batch) and self.overflow == "spill" and self._queue.empty():
+                    self._replay_spill()
+            except Exception as e:
+                # Whatever went wrong, the writer must keep draining the queue
+                self._count("failed_batches", 1)
+                self._warn(f"Warning: Failed to write {self.name} logs: {e}")
+            finally:
+                self._done(len(batch))
+
+    def _warn(self, message):
+        """Print a warning once until the next successful write"""
+        if not self._warned:
+            print(message)
+            self._warned = True
+
+    def _insert(self, documents):
+        """insert_many the documents; failures go to the overflow policy. Returns True if MongoDB was reachable"""
+        try:
+            if self._collection is None:
+                self._collection = self._collection_factory()
+            self._collection.insert_many(documents, ordered=False)
+        except Exception as e:
+            # BulkWriteError: unordered, so everything but the rejected documents was written
+            write_errors = (getattr(e, "details", None) or {}).get("writeErrors")
+            if write_errors:
+                # Duplicate keys are content-addressed documents that already exist
+                rejected = [error for error in write_errors if error.get("code") != DUPLICATE_KEY_ERROR]
+                self._count("written", len(documents) - len(write_errors))
+                self._count("duplicates", len(write_errors) - len(rejected))
+                if rejected:
+                    self._count("failed_batches", 1)
+                    self._overflow([documents[error["index"]] for error in rejected])
+                return True
+            self._count("failed_batches", 1)
+            self._warn(f"Warning: Failed to write {self.name} logs to MongoDB: {e}")
+            self._overflow(documents)
+            return False
+        self._count("written", len(documents))
+        self._count("batches", 1)
+        self._warned = False
+        return True
+
+    def _overflow(self, documents):
+        if self.overflow == "drop":
+            self._count("dropped", len(documents))
+            return
+        spilled = 0
+        try:
+            from bson import json_util
+
+            with self._spill_lock:
+                self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.spill_path, "a") as f:
+                    for document in documents:
+                        document.pop("_id", None)
+                        f.write(json_util.dumps(document) + "\n")
+                        spilled += 1
+        except Exception as e:
+            # Spill directory unwritable, disk full, ...: fall back to dropping
+            self._warn(f"Warning: Failed to spill {self.name} logs to {self.spill_path}: {e}")
+        self._count("spilled", spilled)
+        self._count("dropped", len(documents) - spilled)
+
+    def _replay_spill(self):
+        from bson import json_util
+
+        replaying = self.spill_path.with_suffix(f".replay-{os.getpid()}.jsonl")
+        try:
+            with self._spill_lock:
+                if not self.spill_path.exists():
+                    return
+                self.spill_path.rename(replaying)
+            with open(replaying) as f:
+                lines = [line for line in f if line.strip()]
+            replaying.unlink()
+        except OSError as e:
+            self._warn(f"Warning: Failed to replay spilled {self.name} logs: {e}")
+            return
+        documents = []
+        for line in lines:
+            try:
+                documents.append(json_util.loads(line))
+            except Exception:
+                self._count("dropped", 1)  # Corrupt line (e.g. torn write when the disk filled up)
+        for start in range(0, len(documents), self.batch_size):
+            chunk = documents[start:start + self.batch_size]
+            # A failed chunk is spilled again and retried after the next successful batch
+            if self._insert(chunk):
+                self._count("replayed", len(chunk))
+
+
+def get_log_sink(name):
+    """Return this process's sink for a log collection (configured from LOG_SINK_* env vars)"""
+    with _lock:
+        sink = _sinks.get(name)
+        if sink is None:
+            sink = MongoLogSink(
+                name,
+                lambda: log_database()[name],
+                max_queue=int(os.getenv("LOG_SINK_MAX_QUEUE", "10000")),
+                batch_size=int(os.getenv("LOG_SINK_BATCH_SIZE", "200")),
+                flush_seconds=float(os.getenv("LOG_SINK_FLUSH_SECONDS", "1.0")),
+                overflow=os.getenv("LOG_SINK_OVERFLOW", "drop"),
+            )
+            _sinks[name] = sink
+        return sink
+
+
+def flush_log_sinks(timeout=None):
+    """Flush every sink; False if any timed out"""
+    with _lock:
+        sinks = list(_sinks.values())
+    return all([sink.flush(timeout) for sink in sinks])
+
+
+def log_sink_stats():
+    """{collection name: sink stats} for every sink created in this process"""
+    with _lock:
+        sinks = dict(_sinks)
+    return {name: sink.stats() for name, sink in sinks.items()}
+
+
+def _close_at_exit():
+    timeout = float(os.getenv("LOG_SINK_EXIT_TIMEOUT", "10"))
+    with _lock:
+        sinks = list(_sinks.values())
+    for sink in sinks:
+        sink.close(timeout)
+
+
+atexit.register(_close_at_exit)
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Anthropic and OpenAI APIs, for offline throughput benchmarks
+
+Implements enough of three APIs for the pipelines to run end to end against
+localhost (point ANTHROPIC_BASE_URL, OPENAI_BASE_URL and SERPER_BASE_URL at it):
+
+    POST /v1/messages            Anthropic Messages API (text and tool_use)
+    /v1/messages/batches         Anthropic Message Batches (create, retrieve, results, cancel)
+    POST /v1/chat/completions    OpenAI Chat Completions (text, tool_calls, json_schema)
+    POST /search                 Serper search, results link to /pages/<n>
+    GET|HEAD /pages/<n>          Static HTML page for the link checker and content extractor
+
+Each response is picked in order from:
+    1. templates    [{"match": regex, "text": ...} or {"match": regex, "input": {...}}]
+                    the first regex found in the prompt wins ("input" is a tool/JSON payload)
+    2. recordings   responses recorded in the LLM response cache (common.llm_cache),
+                    looked up by model and messages
+    3. default      default_text for text requests; tool and json_schema requests get a
+                    minimal instance synthesized from the requested JSON schema
+
+Latency is drawn per request from a distribution ("fixed:0.2", "uniform:0.1:0.5",
+"normal:0.3:0.1", "lognormal:0.3:0.5" - median and sigma), and error_rate /
+rate_limit_rate inject 529 (OpenAI: 500) and 429 responses. A message batch
+ends batch_latency seconds after it is created; faults become errored results.
+
+Anthropic prompt caching is accounted like the real API: the content up to the
+last cache_control breakpoint is reported as cache_creation_input_tokens the
+first time it is seen and as cache_read_input_tokens after that (prefixes under
+MIN_CACHEABLE_TOKENS are not cached; entries never expire).
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+CHARS_PER_TOKEN = 4
+MAX_SCHEMA_DEPTH = 8  # Recursive schemas stop growing here (empty arrays, required fields only)
+PAGE_PARAGRAPHS = 5
+MIN_CACHEABLE_TOKENS = 1024  # Shortest prompt-cache prefix the API caches (Sonnet/Opus)
+BATCH_PATH = re.compile(r".*/messages/batches(?:/(?P<id>[^/]+)(?:/(?P<action>results|cancel))?)?")
+
+
+def parse_latency(spec):
+    """
+    Parse a latency spec into a sampler
+
+    Args:
+        spec: "fixed:S", "uniform:LO:HI", "normal:MEAN:STD" or "lognormal:MEDIAN:SIGMA"
+            (seconds; a bare number means fixed)
+
+    Returns:
+        Function taking a random.Random and returning a delay in seconds (never negative)
+    """
+    parts = str(spec).split(":")
+    if len(parts) == 1:
+        parts = ["fixed"] + parts
+    kind, args = parts[0], [float(p) for p in parts[1:]]
+    expected_args = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+    if kind not in LATENCY_DISTRIBUTIONS or len(args) != expected_args[kind]:
+        raise ValueError(f"Bad latency spec {spec!r} (expected one of fixed:S, uniform:LO:HI, "
+                         f"normal:MEAN:STD, lognormal:MEDIAN:SIGMA)")
+    if kind == "fixed":
+        return lambda rng: max(args[0], 0.0)
+    if kind == "uniform":
+        return lambda rng: max(rng.uniform(*args), 0.0)
+    if kind == "normal":
+        return lambda rng: max(rng.gauss(*args), 0.0)
+    median, sigma = args
+    return lambda rng: median * rng.lognormvariate(0, sigma) if median > 0 else 0.0
+
+
+def load_templates(path):
+    """Read response templates from a JSON list or JSONL file"""
+    text = Path(path).read_text()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def example_from_schema(schema, defs=None, depth=0, name=None):
+    """
+    Minimal instance of a JSON schema (as produced by Pydantic / Instructor / LangChain)
+
+    Every property is filled (required ones only past MAX_SCHEMA_DEPTH), arrays
+    get minItems items (at least one), and enums, consts and defaults are honoured.
+    """
+    defs = defs if defs is not None else schema.get("$defs", schema.get("definitions", {}))
+    if "$ref" in schema:
+        return example_from_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, depth, name)
+    if "const" in schema:
+        return schema["const"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    if "default" in schema and schema["default"] is not None:
+        return schema["default"]
+    for combinator in ("anyOf", "oneOf", "allOf"):
+        if combinator in schema:
+            options = [s for s in schema[combinator] if s.get("type") != "null"] or schema[combinator]
+            return example_from_schema(options[0], defs, depth, name)
+
+    kind = schema.get("type", "object" if "properties" in schema else "string")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        required = set(schema.get("required", []))
+        return {
+            key: example_from_schema(prop, defs, depth + 1, key)
+            for key, prop in schema.get("properties", {}).items()
+            if depth < MAX_SCHEMA_DEPTH or key in required
+        }
+    if kind == "array":
+        count = schema.get("minItems", 1) if depth < MAX_SCHEMA_DEPTH else schema.get("minItems", 0)
+        return [example_from_schema(schema.get("items", {}), defs, depth + 1, name) for _ in range(count)]
+    if kind == "integer":
+        return int(max(schema.get("minimum", 1), schema.get("exclusiveMinimum", 0) + 1))
+    if kind == "number":
+        return float(max(schema.get("minimum", 1.0), schema.get("exclusiveMinimum", 0.0) + 1.0))
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    formats = {"date": "2024-01-01", "date-time": "2024-01-01T00:00:00Z",
+               "uri": "http://example.com/", "email": "mock@example.com"}
+    value = formats.get(schema.get("format"), f"mock {name}" if name else "mock")
+    return value.ljust(schema.get("minLength", 0), "x")
+
+
+def _prompt_text(messages):
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+    return "\n".join(parts)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+
+    def setup(self):
+        super().setup()
+        self.server.mock.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            request = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            return self._send_json(400, {"error": {"type": "invalid_request_error", "message": "Invalid JSON"}})
+        path = self.path.split("?", 1)[0]
+        batch_match = BATCH_PATH.fullmatch(path)
+        if batch_match is not None:
+            return self._respond_batch(batch_match, request)
+        if path.endswith("/messages"):
+            return self._respond_llm(request, "anthropic")
+        if path.endswith("/chat/completions"):
+            return self._respond_llm(request, "openai")
+        if path.endswith("/search"):
+            return self._send_json(200, self.server.mock.search_response(request, self._base_url()))
+        self._send_json(404, {"error": {"type": "not_found_error", "message": f"No route {path}"}})
+
+    def do_GET(self):
+        batch_match = BATCH_PATH.fullmatch(self.path.split("?", 1)[0])
+        if batch_match is not None:
+            return self._respond_batch(batch_match)
+        self._send_page(head_only=False)
+
+    def do_HEAD(self):
+        self._send_page(head_only=True)
+
+    def _base_url(self):
+        return f"http://{self.headers.get('Host', '%s:%d' % self.server.server_address[:2])}"
+
+    def _respond_llm(self, request, api):
+        mock = self.server.mock
+        mock.count(f"{api}_requests")
+        if request.get("stream"):
+            return self._send_json(400, {"error": {"type": "invalid_request_error",
+                                                   "message": "Streaming is not supported by the mock server"}})
+        delay, fault = mock.draw()
+        time.sleep(delay)
+        if fault == "rate_limit":
+            mock.count("rate_limited")
+            return self._send_json(429, {"type": "error", "error": {"type": "rate_limit_error",
+                                                                    "message": "Mock rate limit"}},
+                                   headers={"retry-after": str(mock.retry_after)})
+        if fault == "error":
+            mock.count("errors")
+            if api == "anthropic":
+                return self._send_json(529, {"type": "error", "error": {"type": "overloaded_error",
+                                                                        "message": "Mock overload"}})
+            return self._send_json(500, {"error": {"type": "server_error", "message": "Mock server error"}})
+        build = mock.anthropic_response if api == "anthropic" else mock.openai_response
+        self._send_json(200, build(request))
+
+    def _respond_batch(self, match, request=None):
+        mock = self.server.mock
+        batch_id, action = match.group("id"), match.group("action")
+        if batch_id is None:
+            if request is None:
+                return self._send_json(405, {"type": "error", "error": {"type": "invalid_request_error",
+                                                                        "message": "Listing batches is not supported"}})
+            batch_id = mock.create_batch(request.get("requests", []))
+        elif not mock.has_batch(batch_id):
+            return self._send_json(404, {"type": "error", "error": {"type": "not_found_error",
+                                                                    "message": f"No batch {batch_id}"}})
+        elif action == "cancel":
+            mock.cancel_batch(batch_id)
+        elif action == "results":
+            results = mock.batch_results(batch_id)
+            if results is None:
+                return self._send_json(400, {"type": "error", "error": {"type": "invalid_request_error",
+                                                                        "message": "Batch has not ended"}})
+            body = "".join(json.dumps(line) + "\n" for line in results).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/binary")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._send_json(200, mock.batch_object(batch_id, self._base_url()))
+
+    def _send_page(self, head_only):
+        match = re.fullmatch(r"/pages/(\d+)", self.path.split("?", 1)[0])
+        if match is None:
+            return self._send_json(404, {"error": {"type": "not_found_error", "message": self.path}})
+        self.server.mock.count("page_requests")
+        page = self.server.mock.page_html(int(match.group(1))).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(page)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockLLMServer:
+    """
+    Threaded local API server (see module docstring)
+
+    Args:
+        port: Port to bind on 127.0.0.1 (0 picks a free one)
+        latency: Latency spec per LLM request (see parse_latency)
+        error_rate: Share of LLM requests answered with 529 (OpenAI: 500)
+        rate_limit_rate: Share of LLM requests answered with 429
+        retry_after: retry-after seconds sent with 429s
+        templates: List of {"match": regex, "text"|"input": ...} entries (or a path to a JSON/JSONL file)
+        recordings: LLMResponseCache to replay recorded responses from (None to skip)
+        default_text: Text reply when nothing else matches
+        seed: Seed for latency and fault sampling (deterministic runs)
+        batch_latency: Seconds from creating a message batch until it ends
+    """
+
+    def __init__(self, port=0, latency="fixed:0", error_rate=0.0, rate_limit_rate=0.0, retry_after=1,
+                 templates=None, recordings=None, default_text="42", seed=None, batch_latency=0.0):
+        self._sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        if isinstance(templates, (str, Path)):
+            templates = load_templates(templates)
+        self.templates = [(re.compile(t["match"]), t) for t in templates or []]
+        self.recordings = recordings
+        self.default_text = default_text
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = 0
+        self._stats = {}
+        self.batch_latency = batch_latency
+        self._batches = {}  # {batch_id: {'created_at', 'ended_at', 'results', 'canceled'}}
+        self._prompt_cache = set()  # Hashes of cached prompt prefixes
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), MockLLMHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self):
+        """Serve on a background thread; returns self"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def env(self):
+        """Environment variables that point the Anthropic, OpenAI and Serper clients here"""
+        return {
+            "ANTHROPIC_BASE_URL": self.url,
+            "OPENAI_BASE_URL": f"{self.url}/v1",
+            "OPENAI_API_BASE": f"{self.url}/v1",
+            "SERPER_BASE_URL": self.url,
+        }
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] = self._stats.get(name, 0) + amount
+
+    def stats(self):
+        """Request, connection, error and rate-limit counters since start (or the last reset)"""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def draw(self):
+        """Sample (delay seconds, fault) for one LLM request; fault is None, 'rate_limit' or 'error'"""
+        with self._lock:
+            delay = self._sample_latency(self._rng)
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            return delay, "rate_limit"
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, "error"
+        return delay, None
+
+    def _next_id(self, prefix):
+        with self._lock:
+            self._ids += 1
+            return f"{prefix}_mock_{self._ids:08d}"
+
+    def _pick(self, request, schema):
+        """(text, structured payload) for a request; structured payload is None for plain text"""
+        prompt = _prompt_text(request.get("messages", []))
+        for pattern, template in self.templates:
+            if pattern.search(prompt):
+                if "input" in template:
+                    return json.dumps(template["input"]), template["input"]
+                return template["text"], None
+        if self.recordings is not None:
+            from common.llm_cache import prompt_key
+
+            recorded = self.recordings.get_by_prompt(
+                prompt_key({"model": request.get("model"), "messages": request.get("messages")}))
+            if recorded is not None:
+                self.count("recorded")
+                if schema is None:
+                    return recorded, None
+                try:
+                    return recorded, json.loads(recorded)
+                except json.JSONDecodeError:
+                    pass
+        if schema is not None:
+            payload = example_from_schema(schema)
+            return json.dumps(payload), payload
+        return self.default_text, None
+
+    @staticmethod
+    def _usage(request, text):
+        prompt_tokens = max(len(_prompt_text(request.get("messages", []))) // CHARS_PER_TOKEN, 1)
+        return prompt_tokens, max(len(text) // CHARS_PER_TOKEN, 1)
+
+    def _prompt_cache_usage(self, request):
+        """(cache_creation_input_tokens, cache_read_input_tokens) for a request's last cache breakpoint"""
+        blocks, cached = [], None
+        for message in request.get("messages", []):
+            content = message.get("content")
+            for block in content if isinstance(content, list) else [{"type": "text", "text": content}]:
+                blocks.append(block)
+                if isinstance(block, dict) and block.get("cache_control"):
+                    cached = list(blocks)
+        if cached is None:
+            return 0, 0
+        tokens = len("".join(block.get("text", "") for block in cached)) // CHARS_PER_TOKEN
+        if tokens < MIN_CACHEABLE_TOKENS:
+            return 0, 0
+        digest = hashlib.sha256(json.dumps([request.get("model"), cached], sort_keys=True).encode()).hexdigest()
+        with self._lock:
+            hit = digest in self._prompt_cache
+            self._prompt_cache.add(digest)
+        self.count("prompt_cache_reads" if hit else "prompt_cache_writes")
+        return (0, tokens) if hit else (tokens, 0)
+
+    def anthropic_response(self, request):
+        tools = request.get("tools") or []
+        tool = None
+        if tools:
+            choice = request.get("tool_choice") or {}
+            tool = next((t for t in tools if t.get("name") == choice.get("name")), tools[0])
+        text, payload = self._pick(request, tool.get("input_schema", {}) if tool else None)
+        if tool is not None:
+            content = [{"type": "tool_use", "id": self._next_id("toolu"), "name": tool["name"], "input": payload}]
+            stop_reason = "tool_use"
+        else:
+            content = [{"type": "text", "text": text}]
+            stop_reason = "end_turn"
+        input_tokens, output_tokens = self._usage(request, text)
+        cache_creation, cache_read = self._prompt_cache_usage(request)
+        return {
+            "id": self._next_id("msg"),
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "mock-model"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": max(input_tokens - cache_creation - cache_read, 0),
+                      "cache_creation_input_tokens": cache_creation, "cache_read_input_tokens": cache_read,
+                      "output_tokens": output_tokens},
+        }
+
+    def openai_response(self, request):
+        tools = request.get("tools") or []
+        response_format = request.get("response_format") or {}
+        tool = None
+        if tools:
+            choice = request.get("tool_choice")
+            wanted = choice.get("function", {}).get("name") if isinstance(choice, dict) else None
+            tool = next((t for t in tools if t.get("function", {}).get("name") == wanted), tools[0])
+            schema = tool.get("function", {}).get("parameters", {})
+        elif response_format.get("type") == "json_schema":
+            schema = response_format.get("json_schema", {}).get("schema", {})
+        else:
+            schema = None
+        text, payload = self._pick(request, schema)
+        message = {"role": "assistant", "content": text, "refusal": None}
+        finish_reason = "stop"
+        if tool is not None:
+            message["content"] = None
+            message["tool_calls"] = [{
+                "id": self._next_id("call"),
+                "type": "function",
+                "function": {"name": tool["function"]["name"], "arguments": json.dumps(payload)},
+            }]
+            finish_reason = "tool_calls"
+        prompt_tokens, completion_tokens = self._usage(request, text)
+        return {
+            "id": self._next_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock-model"),
+            "choices": [{"index": 0, "message": message, "logprobs": None, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def create_batch(self, requests):
+        """Answer every request of a new message batch now; they become visible once the batch ends"""
+        self.count("batches")
+        self.count("batch_requests", len(requests))
+        results = []
+        for entry in requests:
+            _, fault = self.draw()
+            if fault is None:
+                result = {"type": "succeeded", "message": self.anthropic_response(entry.get("params", {}))}
+            else:
+                self.count("errors")
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": "overloaded_error", "message": "Mock overload"}}}
+            results.append({"custom_id": entry.get("custom_id"), "result": result})
+        batch_id = self._next_id("msgbatch")
+        created_at = time.time()
+        with self._lock:
+            self._batches[batch_id] = {"created_at": created_at, "ended_at": created_at + self.batch_latency,
+                                       "results": results, "canceled": False}
+        return batch_id
+
+    def has_batch(self, batch_id):
+        with self._lock:
+            return batch_id in self._batches
+
+    def cancel_batch(self, batch_id):
+        with self._lock:
+            batch = self._batches[batch_id]
+            if time.time() < batch["ended_at"]:
+                batch["canceled"] = True
+                batch["ended_at"] = time.time()
+
+    def _batch_results(self, batch):
+        if batch["canceled"]:
+            return [{"custom_id": r["custom_id"], "result": {"type": "canceled"}} for r in batch["results"]]
+        return batch["results"]
+
+    def batch_results(self, batch_id):
+        """Result lines of an ended batch, or None while it is still processing"""
+        with self._lock:
+            batch = self._batches[batch_id]
+        if time.time() < batch["ended_at"]:
+            return None
+        return self._batch_results(batch)
+
+    def batch_object(self, batch_id, base_url):
+        with self._lock:
+            batch = self._batches[batch_id]
+        ended = time.time() >= batch["ended_at"]
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        if ended:
+            for line in self._batch_results(batch):
+                counts[line["result"]["type"]] += 1
+        else:
+            counts["processing"] = len(batch["results"])
+
+        def timestamp(seconds):
+            return datetime.fromtimestamp(seconds, timezone.utc).isoformat().replace("+00:00", "Z")
+
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts,
+            "created_at": timestamp(batch["created_at"]),
+            "expires_at": timestamp(batch["created_at"] + timedelta(days=1).total_seconds()),
+            "ended_at": timestamp(batch["ended_at"]) if ended else None,
+            "cancel_initiated_at": timestamp(batch["ended_at"]) if batch["canceled"] else None,
+            "archived_at": None,
+            "results_url": f"{base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def search_response(self, request, base_url):
+        self.count("search_requests")
+        query = request.get("q", "")
+        return {
+            "searchParameters": {"q": query, "type": "search"},
+            "organic": [{
+                "title": f"{query} - result {i}",
+                "link": f"{base_url}/pages/{i}",
+                "snippet": f"Mock search result {i} for {query}.",
+                "position": i,
+            } for i in range(1, min(int(request.get("num", 10)), 100) + 1)],
+        }
+
+    def page_html(self, number):
+        paragraphs = "".join(
+            f"<p>Mock page {number}, paragraph {i}: findings, figures and commentary for benchmarking.</p>"
+            for i in range(1, PAGE_PARAGRAPHS + 1))
+        return f"<html><head><title>Mock page {number}</title></head><body><h1>Mock page {number}</h1>" \
+               f"{paragraphs}</body></html>"
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Anthropic prompt caching for static prompt prefixes, with per-phase usage counters
+
+The extraction and planning prompts open with a large block that is the same
+on every call (ontology and semantic guidance, calculation rules, task rules
+and output format). Sending that block as its own content block with a
+cache_control breakpoint lets the API reuse it across calls: the first call
+pays cache_creation_input_tokens, later calls within the cache TTL read it as
+cache_read_input_tokens instead of full-price input_tokens.
+
+This is separate from common.llm_cache, which stores whole responses locally;
+prompt caching still makes the API call but skips reprocessing the prefix.
+
+record_usage() collects the usage block of every API response by phase, so
+llm_usage_stats() shows how much of each phase's input came from the cache.
+"""
+import threading
+
+USAGE_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens", "output_tokens")
+
+_lock = threading.Lock()
+_usage = {}  # {phase: {'calls': n, <USAGE_FIELDS>: tokens}}
+
+
+def prompt_content(static_prefix, prompt):
+    """
+    Message content for a prompt, with the static prefix marked as a cache breakpoint
+
+    Args:
+        static_prefix: Text that is identical across calls (None or empty for no caching)
+        prompt: Per-call remainder of the prompt
+
+    Returns:
+        The prompt string unchanged, or a list of two text content blocks
+    """
+    if not static_prefix:
+        return prompt
+    return [
+        {"type": "text", "text": static_prefix, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": prompt},
+    ]
+
+
+def content_text(content):
+    """Plain text of message content (a string or a list of text blocks)"""
+    if isinstance(content, str):
+        return content
+    return "\n\n".join(block.get("text", "") for block in content)
+
+
+def record_usage(phase, usage):
+    """
+    Add one API response's token usage to a phase's counters
+
+    Args:
+        phase: Pipeline phase name (e.g. phase1_value_planning, kg_table_extraction)
+        usage: The response's usage object or dict (None is ignored)
+    """
+    if usage is None:
+        return
+    if not isinstance(usage, dict):
+        usage = {field: getattr(usage, field, None) for field in USAGE_FIELDS}
+    with _lock:
+        counters = _usage.setdefault(phase or "unknown", dict.fromkeys(("calls",) + USAGE_FIELDS, 0))
+        counters["calls"] += 1
+        for field in USAGE_FIELDS:
+            counters[field] += usage.get(field) or 0
+
+
+def llm_usage_stats():
+    """
+    Token usage per phase since start (or the last reset)
+
+    Returns:
+        {phase: {'calls', 'input_tokens', 'cache_creation_input_tokens',
+                 'cache_read_input_tokens', 'output_tokens', 'cache_read_share'}}
+        cache_read_share is the fraction of the phase's input tokens read from the cache
+    """
+    with _lock:
+        stats = {phase: dict(counters) for phase, counters in _usage.items()}
+    for counters in stats.values():
+        total_input = (counters["input_tokens"] + counters["cache_creation_input_tokens"]
+                       + counters["cache_read_input_tokens"])
+        counters["cache_read_share"] = counters["cache_read_input_tokens"] / total_input if total_input else 0.0
+    return stats
+
+
+def reset_usage_stats():
+    """Clear the per-phase token usage counters"""
+    with _lock:
+        _usage.clear()
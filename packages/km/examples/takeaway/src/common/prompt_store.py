@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Content-addressed prompt blobs for llm_interactions and kg_extraction_logs
+
+Logged prompts are dominated by blocks that repeat across calls (ontology
+guidance, calculation rules, KG context for the same example). Instead of the
+full text, log documents store the prompt as a list of chunk hashes:
+
+    {'prompt_blobs': [sha256, ...], 'prompt_chars': 41873, ...}
+
+and each chunk is written once to the prompt_blobs collection:
+
+    {'_id': sha256, 'data': text or zstd bytes, 'encoding': 'utf-8' | 'zstd', 'size': chars}
+
+Chunk boundaries are content-defined (a cut before a line whose CRC falls in
+a fixed bucket, once the chunk is at least MIN_CHUNK_CHARS), so a block that
+recurs in another prompt - even at a different offset - splits into the same
+chunks. Chunks concatenate back to the exact prompt.
+
+    LOG_PROMPT_STORE          blobs (default) or inline (full 'prompt' field, as before)
+    LOG_PROMPT_COMPRESSION    zstd (default when the zstandard package is installed) or none
+
+load_prompt() reassembles a document's prompt and accepts both layouts.
+"""
+import hashlib
+import os
+import threading
+import zlib
+
+from common.env import load_env
+
+BLOB_COLLECTION = "prompt_blobs"
+MIN_CHUNK_CHARS = 512
+MAX_CHUNK_CHARS = 16_384
+BOUNDARY_MODULUS = 32  # About one line in 32 starts a new chunk (past the minimum size)
+ZSTD_LEVEL = 3
+KNOWN_BLOBS_MAX = 200_000  # Blob ids remembered as already written (per process)
+
+_lock = threading.Lock()
+_known_blobs = set()
+_failures_seen = 0
+
+
+def chunk_prompt(text):
+    """Split text into content-defined chunks that concatenate back to it"""
+    chunks, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        boundary = (size >= MIN_CHUNK_CHARS and line.strip()
+                    and zlib.crc32(line.encode()) % BOUNDARY_MODULUS == 0)
+        if current and (boundary or size + len(line) > MAX_CHUNK_CHARS):
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def blob_id(chunk):
+    """Blob id (SHA-256 hex digest) of a chunk"""
+    return hashlib.sha256(chunk.encode()).hexdigest()
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def encode_blob(chunk, compression=None):
+    """Blob document for a chunk (compressed with zstd when requested and available)"""
+    if compression is None:
+        load_env()
+        compression = os.getenv("LOG_PROMPT_COMPRESSION", "zstd")
+    document = {"_id": blob_id(chunk), "size": len(chunk)}
+    zstandard = _zstd() if compression == "zstd" else None
+    if zstandard is not None:
+        document.update(data=zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(chunk.encode()), encoding="zstd")
+    else:
+        document.update(data=chunk, encoding="utf-8")
+    return document
+
+
+def decode_blob(document):
+    """Chunk text of a blob document"""
+    if document["encoding"] == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise ImportError("zstandard is required to read zstd-compressed prompt blobs")
+        return zstandard.ZstdDecompressor().decompress(bytes(document["data"])).decode()
+    return document["data"]
+
+
+def prompt_store_mode():
+    """Current LOG_PROMPT_STORE ('blobs' or 'inline')"""
+    load_env()
+    mode = os.getenv("LOG_PROMPT_STORE", "blobs")
+    if mode not in ("blobs", "inline"):
+        raise ValueError(f"Unknown LOG_PROMPT_STORE {mode!r} (expected 'blobs' or 'inline')")
+    return mode
+
+
+def prompt_fields(prompt, blob_sink):
+    """
+    Log document fields for a prompt, queueing blobs this process hasn't written yet
+
+    Args:
+        prompt: Full prompt text
+        blob_sink: Sink (see common.log_sink) for the prompt_blobs collection
+
+    Returns:
+        {'prompt': text} in inline mode, else {'prompt_blobs': [ids], 'prompt_chars': n}
+    """
+    global _failures_seen
+    if prompt_store_mode() == "inline":
+        return {"prompt": prompt}
+    # A dropped or failed blob write may have lost blobs marked as written - forget them so they are sent again
+    sink_stats = blob_sink.stats()
+    failures = sink_stats["dropped"] + sink_stats["failed_batches"]
+    if failures != _failures_seen:
+        with _lock:
+            _known_blobs.clear()
+            _failures_seen = failures
+    ids = []
+    for chunk in chunk_prompt(prompt):
+        chunk_id = blob_id(chunk)
+        ids.append(chunk_id)
+        with _lock:
+            known = chunk_id in _known_blobs
+            if not known:
+                if len(_known_blobs) >= KNOWN_BLOBS_MAX:
+                    _known_blobs.clear()
+                _known_blobs.add(chunk_id)
+        if not known:
+            # Another process may have written it already; the duplicate insert is ignored
+            blob_sink.put(encode_blob(chunk))
+    return {"prompt_blobs": ids, "prompt_chars": len(prompt)}
+
+
+def load_prompt(document, blobs):
+    """
+    Full prompt of a log document
+
+    Args:
+        document: llm_interactions or kg_extraction_logs document
+        blobs: The prompt_blobs collection (anything with find({'_id': {'$in': ids}}))
+
+    Returns:
+        Prompt text, with a placeholder for any chunk not found, or None if the document has no prompt
+    """
+    if "prompt" in document:
+        return document["prompt"]
+    ids = document.get("prompt_blobs")
+    if ids is None:
+        return None
+    chunks = {blob["_id"]: decode_blob(blob) for blob in blobs.find({"_id": {"$in": list(set(ids))}})}
+    return "".join(chunks.get(chunk_id, f"[missing prompt blob {chunk_id[:12]}]\n") for chunk_id in ids)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Concurrency and rate limiting for async LLM calls
+
+LLMRateLimiter gates calls with a semaphore (max in-flight requests) and
+two token buckets: requests per minute and tokens per minute. Buckets
+refill continuously and may go into debt - a reservation larger than the
+current level is granted, and later callers wait until it is repaid - so
+an oversized prompt never deadlocks. A 429 pauses every caller until the
+server's retry-after has passed, not just the one that received it.
+
+The limiter is not thread-safe; it is meant to live on one event loop
+(see common.llm_client).
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding up to one minute's allowance"""
+
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """
+        Take amount from the bucket
+
+        Returns:
+            Seconds the caller must wait before the reservation is covered
+        """
+        self._refill()
+        self.level -= amount
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+    def adjust(self, amount):
+        """Charge (positive) or refund (negative) amount after the fact"""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+def retry_after_seconds(headers, default):
+    """
+    Seconds to wait from retry-after-ms / retry-after response headers
+
+    Args:
+        headers: Response headers (mapping with case-insensitive get)
+        default: Value used when neither header is present or parseable
+
+    Returns:
+        Non-negative delay in seconds
+    """
+    if headers is None:
+        return default
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return default
+
+
+class LLMRateLimiter:
+    """
+    Semaphore plus requests/tokens-per-minute buckets for one event loop
+
+    Args:
+        max_concurrency: Maximum calls in flight
+        requests_per_minute: Request budget (0 = unlimited)
+        tokens_per_minute: Token budget, input + output (0 = unlimited)
+    """
+
+    def __init__(self, max_concurrency, requests_per_minute=0, tokens_per_minute=0,
+                 clock=time.monotonic, sleep=asyncio.sleep):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._requests = TokenBucket(requests_per_minute, clock) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute, clock) if tokens_per_minute > 0 else None
+        self._clock = clock
+        self._sleep = sleep
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._stats = {"requests": 0, "rate_limited": 0, "throttled_seconds": 0.0, "peak_in_flight": 0}
+
+    def pause(self, seconds):
+        """Hold back every caller for seconds (e.g. a 429 retry-after)"""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+        self._stats["rate_limited"] += 1
+
+    def record_usage(self, reserved_tokens, used_tokens):
+        """Settle a token reservation against the usage the API reported"""
+        if self._tokens is not None:
+            self._tokens.adjust(used_tokens - reserved_tokens)
+
+    async def _wait(self, seconds):
+        if seconds > 0:
+            self._stats["throttled_seconds"] += seconds
+            await self._sleep(seconds)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens=0):
+        """
+        Wait for a concurrency slot and rate budget, then hold the slot
+
+        Args:
+            estimated_tokens: Tokens reserved up front (settle with record_usage)
+        """
+        async with self._semaphore:
+            await self._wait(self._paused_until - self._clock())
+            delay = 0.0
+            if self._requests is not None:
+                delay = self._requests.reserve(1)
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.reserve(estimated_tokens))
+            await self._wait(delay)
+            # A 429 seen while this caller waited on the buckets still applies to it
+            await self._wait(self._paused_until - self._clock())
+
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+
+    def stats(self):
+        """Counters: requests, rate_limited, throttled_seconds, peak_in_flight, max_concurrency"""
+        return {**self._stats, "max_concurrency": self.max_concurrency}
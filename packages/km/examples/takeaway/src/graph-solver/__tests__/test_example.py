@@ -243,7 +243,8 @@ def test_example(example_id, verbose=True, log_file=None):
     # Initialize context
     context = {
         'results_by_name': {},
-        'kg_graph': kg_graph
+        'kg_graph': kg_graph,
+        'example_id': example_id
     }
 
     # Track results for each turn
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Unit tests for fact_index.py (array-backed value lookup)"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rdflib import Namespace
+from execution import load_graph, execute_sparql, retrieve_values
+from fact_index import load_fact_index, answer_from_index, parse_fact_query
+
+KG = Namespace('http://example.org/convfinqa/')
+EXAMPLES = ["9", "10", "11", "47"]
+
+CELL_QUERY = """
+SELECT ?value ?scale WHERE {{
+  ?metric a kg:FinancialMetric .
+  ?metric kg:tableRow ?row .
+  ?metric kg:tableColumn ?col .
+  FILTER(LCASE(?row) = "{row}" && LCASE(?col) = "{col}")
+  ?metric kg:hasValue ?valueEntity .
+  ?valueEntity kg:numericValue ?value .
+  ?valueEntity kg:hasScale ?scaleURI .
+  BIND(REPLACE(STR(?scaleURI), ".*[/#]", "") AS ?scale)
+}}
+"""
+
+
+def _assert_same(index_result, sparql_result, query):
+    assert index_result is not None, f"Fact index missed:\n{query}"
+    assert abs(index_result['value'] - sparql_result['value']) <= 1e-9 * max(1.0, abs(sparql_result['value'])), query
+    assert index_result['scale'] == sparql_result['scale'], query
+
+
+def test_every_table_cell_matches_sparql():
+    """Test index answers equal SPARQL answers for every (row, column) cell"""
+    print("Test: Every table cell matches SPARQL...")
+    checked = 0
+    for example_id in EXAMPLES:
+        graph = load_graph(example_id, backend='memory')
+        index = load_fact_index(example_id)
+        cells = {(str(r).lower(), str(c).lower())
+                 for m, r in graph.subject_objects(KG.tableRow)
+                 for c in graph.objects(m, KG.tableColumn)
+                 if (m, KG.hasValue, None) in graph}
+        for row, col in sorted(cells):
+            if '"' in row or '"' in col or '\\' in row or '\\' in col:
+                continue
+            query = CELL_QUERY.format(row=row, col=col)
+            _assert_same(answer_from_index(index, query), execute_sparql(graph, query), query)
+            checked += 1
+    assert checked > 0
+    print(f"✓ PASS ({checked} cells)")
+
+
+def test_contains_and_year_queries():
+    """Test CONTAINS filters, literal objects and year patterns"""
+    print("\nTest: CONTAINS / year queries...")
+    graph = load_graph("9", backend='memory')
+    index = load_fact_index("9")
+    queries = [
+        """SELECT ?value ?scale WHERE {
+            ?metric a kg:FinancialMetric . ?metric kg:label ?label .
+            FILTER(CONTAINS(LCASE(?label), "compensation"))
+            ?metric kg:forTimePeriod ?year . ?year kg:yearValue 2012 .
+            ?metric kg:hasValue ?v . ?v kg:numericValue ?value . ?v kg:hasScale ?scaleURI .
+            BIND(REPLACE(STR(?scaleURI), ".*[/#]", "") AS ?scale) }""",
+        """SELECT ?value WHERE { ?m kg:tableRow "granted" ; kg:tableColumn ?col ; kg:hasValue ?v .
+            ?v kg:numericValue ?value . FILTER(CONTAINS(LCASE(?col), "2013")) }""",
+        """PREFIX kg: <http://example.org/convfinqa/>
+        SELECT ?value ?scale WHERE { ?m kg:tableRow ?row ; kg:hasValue ?v .
+            ?v kg:numericValue ?value ; kg:hasScale ?scale . FILTER(CONTAINS(LCASE(?row), "vested")) }""",
+    ]
+    for query in queries:
+        sparql_query = query if 'PREFIX' in query else query
+        _assert_same(answer_from_index(index, query), execute_sparql(graph, sparql_query), query)
+    print("✓ PASS")
+
+
+def test_unsupported_queries_fall_back():
+    """Test that queries outside the subset are not answered from the index"""
+    print("\nTest: Unsupported queries fall back...")
+    unsupported = [
+        "SELECT (SUM(?value) AS ?total) WHERE { ?m kg:hasValue ?v . ?v kg:numericValue ?value }",
+        "SELECT DISTINCT ?value WHERE { ?m kg:hasValue ?v . ?v kg:numericValue ?value }",
+        "SELECT ?value WHERE { ?m kg:hasValue ?v . ?v kg:numericValue ?value . OPTIONAL { ?m kg:label ?l } }",
+        "SELECT ?value WHERE { ?m kg:hasValue ?v . ?v kg:numericValue ?value } ORDER BY ?value",
+        "SELECT ?value WHERE { ?m kg:inCategory ?c ; kg:hasValue ?v . ?v kg:numericValue ?value }",
+        "SELECT ?value WHERE { ?m kg:hasValue ?v . ?v kg:numericValue ?value . FILTER(?value > 10) }",
+        "SELECT ?label WHERE { ?m kg:label ?label ; kg:hasValue ?v . ?v kg:numericValue ?value }",
+    ]
+    for query in unsupported:
+        assert parse_fact_query(query) is None, query
+    print("✓ PASS")
+
+
+def test_retrieve_values_fast_path():
+    """Test retrieve_values answers from the index without touching the graph"""
+    print("\nTest: retrieve_values fast path...")
+    values_spec = {
+        'granted_2013': {
+            'description': 'restricted stock granted in 2013',
+            'source': 'knowledge_graph',
+            'sparql': """SELECT ?value ?scale WHERE { ?m kg:tableRow "granted" ; kg:tableColumn ?col ; kg:hasValue ?v .
+                ?v kg:numericValue ?value ; kg:hasScale ?s . FILTER(CONTAINS(LCASE(?col), "2013"))
+                BIND(REPLACE(STR(?s), ".*[/#]", "") AS ?scale) }"""
+        }
+    }
+    expected = execute_sparql(load_graph("9", backend='memory'), values_spec['granted_2013']['sparql'])
+
+    # kg_graph=None proves SPARQL was never run
+    context = {'results_by_name': {}, 'kg_graph': None, 'example_id': '9'}
+    value_objects = retrieve_values(values_spec, context)
+    assert value_objects['granted_2013']['value'] == expected['value']
+    assert value_objects['granted_2013']['scale'] == expected['scale']
+    print("✓ PASS")
+
+
+def test_direct_lookup():
+    """Test FactIndex.lookup by normalized row/column labels"""
+    print("\nTest: Direct (row, column) lookup...")
+    index = load_fact_index("9")
+    result = index.lookup(row="  Granted ", column="2013")
+    assert result is not None
+    assert result['scale'] in ('Units', 'Thousands', 'Millions', 'Billions')
+    assert index.lookup(row="no such row", column="2013") is None
+    print("✓ PASS")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("TESTING: fact_index.py")
+    print("="*80)
+
+    tests = [
+        test_every_table_cell_matches_sparql,
+        test_contains_and_year_queries,
+        test_unsupported_queries_fall_back,
+        test_retrieve_values_fast_path,
+        test_direct_lookup
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*80)
+    print(f"Results: {passed}/{len(tests)} tests passed")
+    if failed == 0:
+        print("✓ ALL TESTS PASSED")
+    else:
+        print(f"✗ {failed} tests failed")
+    print("="*80)
+
+    exit(0 if failed == 0 else 1)
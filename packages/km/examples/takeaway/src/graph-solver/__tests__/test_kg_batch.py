@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Unit tests for kg_batch.py (message batch KG extraction) against the local mock server"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add parent directories to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import kg_extractor
+from common.anthropic_client import reset_clients
+from common.log_backend import local_log_database
+from common.log_sink import MongoLogSink
+from common.mock_llm_server import MockLLMServer
+from kg_batch import BatchJournal, BatchKGExtractor
+from kg_extractor import KGExtractor
+
+EXAMPLES = {
+    "1": {
+        'example_id': 'Single_A/2009/page_1.pdf',
+        'table': {"2009": {"net sales": 1200.5}, "2008": {"net sales": 1105.0}},
+        'knowledge_base': {'text_content': ["Net sales grew 8.6% in 2009 (in millions)."]},
+    },
+    "2": {
+        'example_id': 'Single_B/2010/page_2.pdf',
+        'table': {"2010": {"revenue": 88.0}},
+        'knowledge_base': {'text_content': []},
+    },
+}
+
+
+class InterruptedBatches:
+    """Batches resource that submits normally but is interrupted while polling"""
+
+    def __init__(self, batches):
+        self.create = batches.create
+
+    def retrieve(self, batch_id):
+        raise KeyboardInterrupt()
+
+
+@contextmanager
+def mock_server(**kwargs):
+    """Mock server with the Anthropic client, LLM cache and extraction logs pointed away from real state"""
+    names = ('ANTHROPIC_BASE_URL', 'ANTHROPIC_API_KEY', 'LLM_CACHE_MODE', 'LOG_BACKEND', 'LOG_LOCAL_DIR')
+    saved = {name: os.environ.get(name) for name in names}
+    saved_get_log_sink = kg_extractor.get_log_sink
+    with tempfile.TemporaryDirectory() as log_dir, MockLLMServer(**kwargs) as server:
+        os.environ.update({'ANTHROPIC_BASE_URL': server.url, 'ANTHROPIC_API_KEY': 'mock-key',
+                           'LLM_CACHE_MODE': 'off', 'LOG_BACKEND': 'local', 'LOG_LOCAL_DIR': log_dir})
+        # The process-wide sinks may already be bound to MongoDB: log through throwaway ones instead
+        sinks = {}
+
+        def get_log_sink(name):
+            if name not in sinks:
+                sinks[name] = MongoLogSink(name, lambda: local_log_database(root=log_dir)[name], flush_seconds=0.05)
+            return sinks[name]
+
+        kg_extractor.get_log_sink = get_log_sink
+        reset_clients()
+        try:
+            yield server
+        finally:
+            for sink in sinks.values():
+                sink.close(timeout=5)
+            kg_extractor.get_log_sink = saved_get_log_sink
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            reset_clients()
+
+
+def test_batches_and_resume():
+    """Test that both rounds go through batches and a rerun is served from the journal"""
+    print("Test: Batch extraction and resume from journal...")
+    with tempfile.TemporaryDirectory() as tmp_dir, mock_server(batch_latency=0.2) as server:
+        journal_path = Path(tmp_dir) / "journal.jsonl"
+        extractor = KGExtractor()
+        batch_extractor = BatchKGExtractor(extractor, journal_path=journal_path, poll_seconds=0.05)
+        extractions = dict(batch_extractor.extract_all(EXAMPLES))
+
+        assert set(extractions) == {"1", "2"}
+        assert extractions["1"]['_meta']['extraction_passes'] == 2
+        assert extractions["2"]['_meta']['extraction_passes'] == 1
+        assert '_table_semantics' in extractions["1"]
+        stats = batch_extractor.stats()
+        # 2 semantics + 2 table passes + 1 text pass, in one batch per round
+        assert stats['submitted'] == 5 and stats['batches'] == 2 and stats['fallbacks'] == 0
+        assert server.stats()['batch_requests'] == 5
+
+        rerun = BatchKGExtractor(KGExtractor(), journal_path=journal_path, poll_seconds=0.05)
+        assert set(dict(rerun.extract_all(EXAMPLES))) == {"1", "2"}
+        assert rerun.stats()['journaled'] == 5 and rerun.stats()['submitted'] == 0
+        assert server.stats()['batches'] == 2
+    print("✓ PASS")
+
+
+def test_resumes_open_batch():
+    """Test that a batch submitted before an interruption is polled, not resubmitted"""
+    print("\nTest: Resume an open batch...")
+    with tempfile.TemporaryDirectory() as tmp_dir, mock_server(batch_latency=0.2) as server:
+        journal_path = Path(tmp_dir) / "journal.jsonl"
+        first = BatchKGExtractor(KGExtractor(), journal_path=journal_path, poll_seconds=0.05)
+        first.batches = InterruptedBatches(first.batches)
+        try:
+            dict(first.extract_all(EXAMPLES))
+        except KeyboardInterrupt:
+            pass
+        assert len(BatchJournal(journal_path).batches) == 1
+
+        resumed = BatchKGExtractor(KGExtractor(), journal_path=journal_path, poll_seconds=0.05)
+        assert set(dict(resumed.extract_all(EXAMPLES))) == {"1", "2"}
+        # Round 1 came from the resumed batch; only round 2 was submitted
+        assert resumed.stats()['batches'] == 1
+        assert server.stats()['batches'] == 2
+        assert BatchJournal(journal_path).batches == {}
+    print("✓ PASS")
+
+
+def test_errored_results_fall_back():
+    """Test that errored batch results are retried synchronously"""
+    print("\nTest: Errored results fall back to synchronous calls...")
+    with tempfile.TemporaryDirectory() as tmp_dir, mock_server(error_rate=1.0) as server:
+        batch_extractor = BatchKGExtractor(KGExtractor(), journal_path=Path(tmp_dir) / "journal.jsonl",
+                                           poll_seconds=0.05)
+        examples = {"2": EXAMPLES["2"]}
+        # Batch requests all error; the synchronous retries succeed
+        original_create = server.create_batch
+
+        def create_then_recover(requests):
+            server.error_rate = 1.0
+            batch_id = original_create(requests)
+            server.error_rate = 0.0
+            return batch_id
+
+        server.create_batch = create_then_recover
+        extractions = dict(batch_extractor.extract_all(examples))
+        assert set(extractions) == {"2"}
+        assert batch_extractor.stats()['fallbacks'] == 2
+    print("✓ PASS")
+
+
+def test_failed_fallback_skips_example():
+    """Test that a request failing synchronously too skips its example and is retried on rerun"""
+    print("\nTest: Failed fallbacks skip the example...")
+    with tempfile.TemporaryDirectory() as tmp_dir, mock_server(error_rate=1.0) as server:
+        journal_path = Path(tmp_dir) / "journal.jsonl"
+        saved_retries = os.environ.get("ANTHROPIC_MAX_RETRIES")
+        os.environ["ANTHROPIC_MAX_RETRIES"] = "0"
+        reset_clients()
+        try:
+            batch_extractor = BatchKGExtractor(KGExtractor(), journal_path=journal_path, poll_seconds=0.05)
+            assert dict(batch_extractor.extract_all({"2": EXAMPLES["2"]})) == {}
+        finally:
+            if saved_retries is None:
+                os.environ.pop("ANTHROPIC_MAX_RETRIES")
+            else:
+                os.environ["ANTHROPIC_MAX_RETRIES"] = saved_retries
+            reset_clients()
+        stats = batch_extractor.stats()
+        # The semantics request failed, so the table pass was never submitted
+        assert stats["failed"] == 1 and stats["submitted"] == 1
+        assert BatchJournal(journal_path).results == {}
+
+        server.error_rate = 0.0
+        rerun = BatchKGExtractor(KGExtractor(), journal_path=journal_path, poll_seconds=0.05)
+        assert set(dict(rerun.extract_all({"2": EXAMPLES["2"]}))) == {"2"}
+        assert rerun.stats()["failed"] == 0
+    print("✓ PASS")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("TESTING: kg_batch.py")
+    print("="*80)
+
+    tests = [
+        test_batches_and_resume,
+        test_resumes_open_batch,
+        test_errored_results_fall_back,
+        test_failed_fallback_skips_example
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*80)
+    print(f"Results: {passed}/{len(tests)} tests passed")
+    if failed == 0:
+        print("✓ ALL TESTS PASSED")
+    else:
+        print(f"✗ {failed} tests failed")
+    print("="*80)
+
+    exit(0 if failed == 0 else 1)
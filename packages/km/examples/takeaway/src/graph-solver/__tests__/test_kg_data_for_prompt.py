@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Unit tests for kg_data_for_prompt.py (prompt-context cache)"""
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from kg_data_for_prompt import (NO_KG_MESSAGE, PromptContextCache, format_kg_data_for_prompt,
+                                prompt_context_cache_stats)
+
+
+def test_memory_then_disk_levels():
+    """Test that lookups hit memory first, then disk, across cache instances"""
+    print("Test: Memory then disk cache levels...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = PromptContextCache(tmp_dir, max_entries=2)
+        key = ("9", "a" * 64, 1)
+        assert cache.get(key) is None
+        cache.put(key, "AVAILABLE DATA")
+        assert cache.get(key) == "AVAILABLE DATA"
+
+        # A new process (fresh instance) reads the file written by the first
+        other = PromptContextCache(tmp_dir)
+        assert other.get(key) == "AVAILABLE DATA"
+        assert other.get(key) == "AVAILABLE DATA"
+
+        assert cache.stats()['memory_hits'] == 1 and cache.stats()['misses'] == 1
+        assert other.stats()['disk_hits'] == 1 and other.stats()['memory_hits'] == 1
+        assert other.stats()['hit_rate'] == 1.0
+    print("✓ PASS")
+
+
+def test_keys_and_eviction():
+    """Test LRU bound and that new KG contents replace old files"""
+    print("\nTest: Cache keys and eviction...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = PromptContextCache(tmp_dir, max_entries=2)
+        for example_id in ("1", "10", "11"):
+            cache.put((example_id, "a" * 64, 1), f"context {example_id}")
+        assert cache.stats()['entries'] == 2
+        assert len(list(Path(tmp_dir).glob("*.txt"))) == 3
+
+        # New content hash for example 1 drops its old file only
+        cache.put(("1", "b" * 64, 1), "context 1 (edited KG)")
+        assert len(list(Path(tmp_dir).glob("1-*.txt"))) == 1
+        assert len(list(Path(tmp_dir).glob("*.txt"))) == 3
+        assert cache.get(("1", "a" * 64, 1)) is None
+        # Formatter version is part of the key
+        assert cache.get(("1", "b" * 64, 2)) is None
+
+        cache.clear(disk=True)
+        assert not list(Path(tmp_dir).glob("*"))
+    print("✓ PASS")
+
+
+def test_format_uses_cache():
+    """Test that cached prompt context equals a fresh render"""
+    print("\nTest: format_kg_data_for_prompt uses cache...")
+    fresh = format_kg_data_for_prompt("9", use_cache=False)
+    assert fresh.startswith("AVAILABLE DATA FROM KNOWLEDGE GRAPH:")
+
+    before = prompt_context_cache_stats()
+    assert format_kg_data_for_prompt("9") == fresh
+    after = prompt_context_cache_stats()
+    assert after['memory_hits'] + after['disk_hits'] == before['memory_hits'] + before['disk_hits'] + 1
+
+    assert format_kg_data_for_prompt("99999") == NO_KG_MESSAGE
+    print("✓ PASS")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("TESTING: kg_data_for_prompt.py")
+    print("="*80)
+
+    tests = [
+        test_memory_then_disk_levels,
+        test_keys_and_eviction,
+        test_format_uses_cache
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*80)
+    print(f"Results: {passed}/{len(tests)} tests passed")
+    if failed == 0:
+        print("✓ ALL TESTS PASSED")
+    else:
+        print(f"✗ {failed} tests failed")
+    print("="*80)
+
+    exit(0 if failed == 0 else 1)
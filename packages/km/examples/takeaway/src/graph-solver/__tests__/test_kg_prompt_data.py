@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Unit tests for kg_prompt_data.py (single-pass prompt extraction)"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rdflib import Graph, Literal, Namespace
+from rdflib.namespace import RDF, RDFS, XSD
+from execution import extract_sample_entities, load_graph
+from kg_prompt_data import kg_prompt_data_for_graph, load_kg_prompt_data, scan_kg_prompt_data
+from phase2_llm_extraction import extract_table_data_for_prompt
+
+KG = Namespace('http://example.org/convfinqa/')
+ENTITY = Namespace('http://example.org/convfinqa/entity/')
+
+
+def _metric(g, name, value=None, scale='Millions', row=None, column=None, label=None, text=None):
+    metric = ENTITY[name]
+    g.add((metric, RDF.type, KG.FinancialMetric))
+    if row:
+        g.add((metric, KG.tableRow, Literal(row)))
+    if column:
+        g.add((metric, KG.tableColumn, Literal(column)))
+    if label:
+        g.add((metric, KG.label, Literal(label)))
+    if text:
+        g.add((metric, KG.textValue, Literal(text)))
+    if value is not None:
+        value_entity = ENTITY[f"{name}_value"]
+        g.add((metric, KG.hasValue, value_entity))
+        g.add((value_entity, KG.numericValue, Literal(value, datatype=XSD.decimal)))
+        g.add((value_entity, KG.hasScale, KG[scale]))
+    return metric
+
+
+def _sample_graph():
+    g = Graph()
+    g.add((ENTITY.FinancialTable, KG.tableOrientation, Literal("column-first")))
+    g.add((ENTITY.FinancialTable, KG.tableCaption, Literal("Net sales")))
+    revenue = _metric(g, 'revenue_2012', 120.5, row='revenue', column='2012')
+    g.add((revenue, RDFS.comment, Literal("Excludes discontinued operations")))
+    _metric(g, 'revenue_2013', 130.0, row='revenue', column='2013')
+    _metric(g, 'segment_2013', row='segment', column='2013', text='n/a')
+    _metric(g, 'header_9889', 9889, scale='Units', column='$ 9889')
+    _metric(g, 'row_header', 42, row='total shares')
+    expense = _metric(g, 'comp_expense', 3.2, label='Capitalized compensation expense')
+    g.add((expense, KG.forTimePeriod, ENTITY.Year2011))
+    g.add((ENTITY.Year2011, KG.yearValue, Literal(2011)))
+    return g
+
+
+def test_sample_entities():
+    """Test that sample entities come out of the single scan"""
+    print("Test: Sample entities from single scan...")
+    entities = scan_kg_prompt_data(_sample_graph())['sample_entities']
+    assert entities['table_metadata'] == {'orientation': 'column-first', 'caption': 'Net sales'}
+    assert entities['financial_metrics']['row_labels'] == ['revenue', 'segment', 'total shares']
+    assert entities['financial_metrics']['column_labels'] == ['$ 9889', '2012', '2013']
+    assert entities['extracted_metrics'] == [{'label': 'Capitalized compensation expense', 'year': 2011}]
+    print("✓ PASS")
+
+
+def test_table_data():
+    """Test that every metric kind lands in the right table-data section"""
+    print("\nTest: Table data from single scan...")
+    table = scan_kg_prompt_data(_sample_graph())['table_data']
+    cells = {row['metric']: row for row in table['table_cells']}
+    assert cells['revenue']['2012'] == {'value': 120.5, 'scale': 'Millions'}
+    assert cells['revenue']['2013'] == {'value': 130.0, 'scale': 'Millions'}
+    assert cells['segment']['2013'] == 'n/a'
+    assert table['column_header_values'] == [{'label': '$ 9889', 'value': 9889.0, 'scale': 'Units'}]
+    assert table['row_header_values'] == [{'label': 'total shares', 'value': 42.0, 'scale': 'Millions'}]
+    assert table['text_derived_metrics'] == [
+        {'label': 'Capitalized compensation expense', 'value': 3.2, 'scale': 'Millions'}]
+    assert table['metric_comments'] == {'revenue': 'Excludes discontinued operations'}
+    print("✓ PASS")
+
+
+def test_graph_memo_returns_copies():
+    """Test that memoized results are copies and modified graphs are rescanned"""
+    print("\nTest: Graph memo returns copies...")
+    g = _sample_graph()
+    entities = extract_sample_entities(g)
+    entities['table_data'] = []  # Phase 2A extends the dict like this
+    assert 'table_data' not in extract_sample_entities(g)
+
+    _metric(g, 'revenue_2014', 140.0, row='revenue', column='2014')
+    cells = {row['metric']: row for row in extract_table_data_for_prompt(g)['table_cells']}
+    assert '2014' in cells['revenue'], "Graph changed but memo was not refreshed"
+    print("✓ PASS")
+
+
+def test_example_memo_matches_graph_scan():
+    """Test per-example data against a direct scan of the same KG"""
+    print("\nTest: Per-example memo matches graph scan...")
+    data = load_kg_prompt_data("9")
+    assert data == kg_prompt_data_for_graph(load_graph("9"))
+    assert data['table_data']['table_cells'], "Example 9 should have table cells"
+    assert load_kg_prompt_data("9") == data
+    with pytest.raises(FileNotFoundError):
+        load_kg_prompt_data("99999")
+    print(f"✓ PASS - {len(data['table_data']['table_cells'])} table rows")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("TESTING: kg_prompt_data.py")
+    print("="*80)
+
+    tests = [
+        test_sample_entities,
+        test_table_data,
+        test_graph_memo_returns_copies,
+        test_example_memo_matches_graph_scan
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*80)
+    print(f"Results: {passed}/{len(tests)} tests passed")
+    if failed == 0:
+        print("✓ ALL TESTS PASSED")
+    else:
+        print(f"✗ {failed} tests failed")
+    print("="*80)
+
+    exit(0 if failed == 0 else 1)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Unit tests for kg_snapshot.py (binary KG snapshots)"""
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rdflib import Graph, Namespace
+from kg_snapshot import compile_snapshot, load_snapshot_graph, read_snapshot_digest, snapshot_path_for
+from execution import extract_sample_entities, load_graph, invalidate_graph
+from phase2_llm_extraction import extract_table_data_for_prompt
+
+KG_DIR = Path(__file__).parent.parent.parent.parent / "data" / "knowledge-graphs"
+KG = Namespace('http://example.org/convfinqa/')
+
+
+def _copy_kg(example_id, tmp_dir):
+    """Copy a KG into a temp dir so snapshots don't land in data/"""
+    kg_path = Path(tmp_dir) / f"{example_id}_kg.ttl"
+    shutil.copy(KG_DIR / f"{example_id}_kg.ttl", kg_path)
+    return kg_path
+
+
+def test_snapshot_roundtrip():
+    """Test that a snapshot holds exactly the triples of the turtle file"""
+    print("Test: Snapshot round-trip...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kg_path = _copy_kg("9", tmp_dir)
+        turtle_graph = Graph()
+        turtle_graph.parse(str(kg_path), format='turtle')
+
+        snapshot_graph = load_snapshot_graph(kg_path)
+        assert snapshot_path_for(kg_path).exists()
+        assert len(snapshot_graph) == len(turtle_graph)
+        assert set(snapshot_graph) == set(turtle_graph)
+        assert str(dict(snapshot_graph.namespaces())['kg']) == str(KG)
+    print("✓ PASS")
+
+
+def test_snapshot_triple_patterns():
+    """Test bound-term triple patterns against the turtle graph"""
+    print("\nTest: Snapshot triple patterns...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kg_path = _copy_kg("9", tmp_dir)
+        turtle_graph = Graph()
+        turtle_graph.parse(str(kg_path), format='turtle')
+        snapshot_graph = load_snapshot_graph(kg_path)
+
+        metric = next(turtle_graph.subjects(KG.tableRow, None))
+        value = next(turtle_graph.objects(metric, KG.hasValue))
+        patterns = [
+            (metric, None, None),
+            (metric, KG.tableRow, None),
+            (None, KG.tableColumn, None),
+            (None, KG.hasValue, value),
+            (None, None, value),
+            (value, None, next(turtle_graph.objects(value, KG.numericValue))),
+            (KG.NotInThisGraph, None, None),
+        ]
+        for pattern in patterns:
+            assert set(snapshot_graph.triples(pattern)) == set(turtle_graph.triples(pattern)), pattern
+    print("✓ PASS")
+
+
+def test_snapshot_prompt_extraction():
+    """Test that prompt extraction gives the same data from a snapshot"""
+    print("\nTest: Prompt extraction from snapshot...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kg_path = _copy_kg("9", tmp_dir)
+        turtle_graph = Graph()
+        turtle_graph.parse(str(kg_path), format='turtle')
+        snapshot_graph = load_snapshot_graph(kg_path)
+
+        entities_ttl = extract_sample_entities(turtle_graph)
+        entities_snap = extract_sample_entities(snapshot_graph)
+        assert entities_ttl['financial_metrics'] == entities_snap['financial_metrics']
+        assert entities_ttl['table_metadata'] == entities_snap['table_metadata']
+        assert sorted(entities_ttl['extracted_metrics'], key=str) == sorted(entities_snap['extracted_metrics'], key=str)
+
+        table_ttl = extract_table_data_for_prompt(turtle_graph)
+        table_snap = extract_table_data_for_prompt(snapshot_graph)
+        assert sorted(table_ttl['table_cells'], key=str) == sorted(table_snap['table_cells'], key=str)
+        assert table_ttl['metric_comments'] == table_snap['metric_comments']
+    print("✓ PASS")
+
+
+def test_snapshot_sparql():
+    """Test that SPARQL runs over a snapshot graph"""
+    print("\nTest: SPARQL over snapshot...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kg_path = _copy_kg("9", tmp_dir)
+        turtle_graph = Graph()
+        turtle_graph.parse(str(kg_path), format='turtle')
+        snapshot_graph = load_snapshot_graph(kg_path)
+
+        query = """
+        PREFIX kg: <http://example.org/convfinqa/>
+        SELECT ?row ?col ?value WHERE {
+            ?metric kg:tableRow ?row ; kg:tableColumn ?col ; kg:hasValue ?v .
+            ?v kg:numericValue ?value .
+        }
+        """
+        assert set(snapshot_graph.query(query)) == set(turtle_graph.query(query))
+    print("✓ PASS")
+
+
+def test_stale_snapshot_recompiled():
+    """Test that an edited turtle file triggers recompilation"""
+    print("\nTest: Stale snapshot recompiled...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kg_path = _copy_kg("9", tmp_dir)
+        compile_snapshot(kg_path)
+        old_digest = read_snapshot_digest(snapshot_path_for(kg_path))
+
+        with open(kg_path, 'a') as f:
+            f.write('\n<http://example.org/convfinqa/entity/Extra> <http://example.org/convfinqa/label> "extra" .\n')
+
+        g = load_snapshot_graph(kg_path)
+        assert read_snapshot_digest(snapshot_path_for(kg_path)) != old_digest
+        assert (None, KG.label, None) in g
+        assert len(list(g.subjects(KG.label, None))) > 0
+    print("✓ PASS")
+
+
+def test_snapshot_backend_read_only():
+    """Test load_graph(backend='snapshot') returns a pooled, read-only graph"""
+    print("\nTest: load_graph snapshot backend...")
+    invalidate_graph()
+    g = load_graph("9", backend="snapshot")
+    try:
+        assert load_graph("9", backend="snapshot") is g
+        try:
+            g.add((KG.a, KG.b, KG.c))
+            raise AssertionError("Snapshot graph should be read-only")
+        except TypeError:
+            pass
+    finally:
+        invalidate_graph("9")
+        snapshot_path_for(KG_DIR / "9_kg.ttl").unlink(missing_ok=True)
+    print("✓ PASS")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("TESTING: kg_snapshot.py")
+    print("="*80)
+
+    tests = [
+        test_snapshot_roundtrip,
+        test_snapshot_triple_patterns,
+        test_snapshot_prompt_extraction,
+        test_snapshot_sparql,
+        test_stale_snapshot_recompiled,
+        test_snapshot_backend_read_only
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*80)
+    print(f"Results: {passed}/{len(tests)} tests passed")
+    if failed == 0:
+        print("✓ ALL TESTS PASSED")
+    else:
+        print(f"✗ {failed} tests failed")
+    print("="*80)
+
+    exit(0 if failed == 0 else 1)
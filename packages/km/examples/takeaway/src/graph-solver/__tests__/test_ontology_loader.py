@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 """Unit tests for ontology_loader.py"""
+import json
+import shutil
 import sys
 from pathlib import Path
 
+import pytest
+
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from ontology_loader import load_semantic_guidance
+import ontology_loader
+from ontology_loader import load_ontology_artifact, load_semantic_guidance, load_targeted_guidance
 
 
 def test_loads_without_error():
@@ -87,6 +92,133 @@ def test_specific_patterns():
     print("✓ PASS")
 
 
+def test_artifact_matches_fresh_build():
+    """Test that the materialized artifact matches a build straight from the ontology"""
+    print("\nTest: Artifact matches fresh build...")
+    artifact = load_ontology_artifact()
+    fresh = load_ontology_artifact(use_cache=False)
+
+    assert artifact['guidance_text'] == fresh['guidance_text']
+    assert artifact['patterns'] == fresh['patterns']
+    assert artifact['operations'] == fresh['operations']
+    assert load_semantic_guidance() == artifact['guidance_text']
+    assert artifact['version'] and artifact['modified'], "Missing ontology version info"
+
+    print(f"✓ PASS - {len(artifact['patterns'])} patterns, ontology v{artifact['version']}")
+
+
+def test_artifact_reused_until_content_changes():
+    """Test that the artifact is reused by content hash and rebuilt when stale"""
+    print("\nTest: Artifact reused until content changes...")
+    source = Path(ontology_loader._default_ontology_path())
+    tmp_dir = Path(__file__).parent / ".tmp_ontology_artifact"
+    tmp_dir.mkdir(exist_ok=True)
+    ontology_copy = tmp_dir / "artifact-test-ontology.ttl"
+    shutil.copy(source, ontology_copy)
+    artifact_path = ontology_loader._artifact_path_for(ontology_copy)
+
+    try:
+        first = load_ontology_artifact(ontology_copy)
+        assert artifact_path.exists()
+        # Memoized in-process while the file is unchanged
+        assert load_ontology_artifact(ontology_copy) is first
+
+        # A touch (new mtime, same content) reuses the artifact file as-is
+        ontology_loader._artifact_memo.clear()
+        mtime_before = artifact_path.stat().st_mtime_ns
+        ontology_copy.touch()
+        assert load_ontology_artifact(ontology_copy) == first
+        assert artifact_path.stat().st_mtime_ns == mtime_before
+
+        # An artifact recorded for other content is rebuilt
+        stale = dict(first, content_hash='0' * 64, guidance_text='stale')
+        artifact_path.write_text(json.dumps(stale))
+        ontology_loader._artifact_memo.clear()
+        rebuilt = load_ontology_artifact(ontology_copy)
+        assert rebuilt['content_hash'] == first['content_hash']
+        assert rebuilt['guidance_text'] == first['guidance_text']
+    finally:
+        ontology_loader._artifact_memo.clear()
+        artifact_path.unlink(missing_ok=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("✓ PASS")
+
+
+def test_targeted_guidance_from_index():
+    """Test targeted guidance lookup and the cached sections mapping"""
+    print("\nTest: Targeted guidance from artifact index...")
+    artifact = load_ontology_artifact()
+    pattern_name = next(iter(artifact['pattern_rows']))
+    operation_name = next(op['name'] for op in artifact['operations'] if op['name'] in artifact['description_rows'])
+
+    tmp_dir = Path(__file__).parent / ".tmp_targeted_guidance"
+    tmp_dir.mkdir(exist_ok=True)
+    sections_path = tmp_dir / "example_sections.json"
+    sections_path.write_text(json.dumps({'examples': {'42': {
+        'description': 'Example 42 needs one pattern and one operation',
+        'patterns': [pattern_name, 'NoSuchPattern'],
+        'operations': [operation_name],
+        'value_types': []
+    }}}))
+
+    try:
+        guidance = load_targeted_guidance(42, sections_path=sections_path)
+        assert "TARGETED ONTOLOGY GUIDANCE FOR EXAMPLE 42" in guidance
+        assert f"Pattern: {pattern_name}" in guidance
+        assert artifact['pattern_rows'][pattern_name][0]['phrase'] in guidance
+        assert artifact['description_rows'][operation_name][0]['label'] in guidance
+        assert "NoSuchPattern" not in guidance
+        assert "RELEVANT VALUE TYPES" not in guidance
+
+        # The sections file is parsed once and reused until it changes
+        assert ontology_loader._load_example_sections(sections_path) is \
+            ontology_loader._load_example_sections(sections_path)
+
+        with pytest.raises(ValueError, match="42"):
+            load_targeted_guidance(7, sections_path=sections_path)
+    finally:
+        ontology_loader._sections_memo.clear()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("✓ PASS")
+
+
+def test_keyword_index_scoring():
+    """Test that the inverted keyword index scores only candidate patterns, as before"""
+    print("\nTest: Keyword index scoring...")
+    patterns = [
+        {'phrase': 'percentage change', 'operation': 'PercentageChange', 'guidance': ''},
+        {'phrase': 'net', 'operation': 'Net', 'guidance': ''},
+        {'phrase': 'what was', 'operation': 'Lookup', 'guidance': ''},
+        {'phrase': 'dividend yield', 'operation': 'Ratio', 'guidance': ''},
+        {'phrase': 'change in', 'operation': 'Difference', 'guidance': ''},
+    ]
+    index = ontology_loader._build_keyword_index(patterns)
+    assert index['postings']['change'] == [0, 4]
+    assert 'what' not in index['postings'], "Stopwords must not be indexed"
+
+    scored = dict((pattern_id, score) for score, pattern_id in
+                  ontology_loader._score_keyword_matches(index, "What was the percentage change in internet sales?"))
+    # exact 100 + all words 50 + 2 overlaps 20 + 2 key terms 40
+    assert scored[0] == 210
+    # "net" occurs inside "internet": exact substring only
+    assert scored[1] == 100
+    # Stopword-only phrase matched verbatim
+    assert scored[2] == 100
+    # exact 100 + all words 50 + overlap 10 + key term 20
+    assert scored[4] == 180
+    assert 3 not in scored
+
+    ranked = ontology_loader._score_keyword_matches(index, "what was the percentage change in internet sales?")
+    assert [pattern_id for _, pattern_id in ranked] == [0, 4, 1, 2], "Ties keep pattern order"
+
+    guidance = ontology_loader._load_keyword_matched_patterns("what was the percentage change in revenue?")
+    assert "by keyword matching" in guidance and "Phrase:" in guidance
+
+    print("✓ PASS")
+
+
 if __name__ == "__main__":
     print("="*80)
     print("TESTING: ontology_loader.py")
@@ -98,7 +230,11 @@ if __name__ == "__main__":
         test_contains_semantic_operations,
         test_format_is_readable,
         test_guidance_length,
-        test_specific_patterns
+        test_specific_patterns,
+        test_artifact_matches_fresh_build,
+        test_artifact_reused_until_content_changes,
+        test_targeted_guidance_from_index,
+        test_keyword_index_scoring
     ]
 
     passed = 0
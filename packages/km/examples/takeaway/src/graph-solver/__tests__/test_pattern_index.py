@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Unit tests for pattern_index.py"""
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pattern_index
+from ontology_loader import _distinct_patterns, load_ontology_artifact
+from pattern_index import (PatternIndex, get_pattern_index, load_embedding_store, normalize_rows,
+                           save_embedding_store)
+
+
+def _random_index(n_patterns=40, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    patterns = [{'phrase': f"phrase {i}", 'operation': 'Ratio', 'guidance': ''} for i in range(n_patterns)]
+    return PatternIndex(patterns, rng.normal(size=(n_patterns, dim))), rng
+
+
+def test_normalized_float32_matrix():
+    """Test that embeddings are stored as contiguous, L2-normalized float32"""
+    print("Test: Normalized float32 embedding matrix...")
+    index, _ = _random_index()
+    assert index.embeddings.dtype == np.float32
+    assert index.embeddings.flags['C_CONTIGUOUS']
+    assert np.allclose(np.linalg.norm(index.embeddings, axis=1), 1.0, atol=1e-5)
+
+    # All-zero rows must not turn into NaN
+    assert not np.isnan(normalize_rows(np.zeros((2, 4)))).any()
+    print("✓ PASS")
+
+
+def test_top_k_matches_full_cosine_sort():
+    """Test that argpartition top-k equals a full cosine-similarity sort"""
+    print("\nTest: Top-k matches full cosine sort...")
+    index, rng = _random_index()
+    raw = index.embeddings.astype(np.float64)
+
+    for _ in range(20):
+        query = rng.normal(size=raw.shape[1])
+        cosine = raw @ query / (np.linalg.norm(raw, axis=1) * np.linalg.norm(query))
+        expected = list(np.argsort(-cosine)[:10])
+
+        results = index.top_k(query * 3.0, 10)  # Scale must not matter
+        assert [index.patterns.index(p) for p, _ in results] == expected
+        assert np.allclose([score for _, score in results], cosine[expected], atol=1e-5)
+
+    assert len(index.top_k(rng.normal(size=raw.shape[1]), 100)) == len(index.patterns)
+    assert index.top_k(rng.normal(size=raw.shape[1]), 0) == []
+    print("✓ PASS")
+
+
+def test_index_resident_per_content_hash():
+    """Test that the .npy store is memory-mapped once and the index stays resident"""
+    print("\nTest: Index resident per ontology content hash...")
+    artifact = load_ontology_artifact()
+    patterns = [dict(p) for p in _distinct_patterns(artifact['patterns'])]
+    embeddings = np.random.default_rng(1).normal(size=(len(patterns), 8)).astype(np.float32)
+
+    tmp_dir = Path(__file__).parent / ".tmp_pattern_index"
+    tmp_dir.mkdir(exist_ok=True)
+    original_store_dir = pattern_index._store_dir
+    pattern_index._store_dir = lambda: tmp_dir
+    pattern_index._indexes.clear()
+    try:
+        save_embedding_store(PatternIndex(patterns, embeddings), artifact['content_hash'], 'float32')
+        index = get_pattern_index(dtype='float32')
+        assert isinstance(index.embeddings, np.memmap), "Expected a memory-mapped matrix"
+        assert index.patterns == patterns
+        assert np.allclose(index.embeddings, normalize_rows(embeddings))
+
+        # Later calls don't touch the files at all
+        for path in tmp_dir.iterdir():
+            path.unlink()
+        assert get_pattern_index(dtype='float32') is index
+    finally:
+        pattern_index._store_dir = original_store_dir
+        pattern_index._indexes.clear()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("✓ PASS")
+
+
+def test_store_rejects_stale_or_corrupt_files():
+    """Test that a stale hash or damaged sidecar is reported as a miss, not loaded"""
+    print("\nTest: Store rejects stale or corrupt files...")
+    index, _ = _random_index()
+    tmp_dir = Path(__file__).parent / ".tmp_pattern_store"
+    tmp_dir.mkdir(exist_ok=True)
+    original_store_dir = pattern_index._store_dir
+    pattern_index._store_dir = lambda: tmp_dir
+    try:
+        save_embedding_store(index, 'a' * 64, 'float32')
+        assert load_embedding_store('a' * 64, 'float32') is not None
+        assert load_embedding_store('b' * 64, 'float32') is None
+
+        # A new ontology hash replaces the old matrix file
+        save_embedding_store(index, 'b' * 64, 'float32')
+        assert len(list(tmp_dir.glob(".pattern_embeddings.*.float32.npy"))) == 1
+        assert not list(tmp_dir.glob("*.tmp"))
+
+        sidecar_path = pattern_index._sidecar_path('float32')
+        sidecar = json.loads(sidecar_path.read_text())
+        sidecar['shape'] = [1, 1]
+        sidecar_path.write_text(json.dumps(sidecar))
+        assert load_embedding_store('b' * 64, 'float32') is None
+
+        sidecar_path.write_text("{not json")
+        assert load_embedding_store('b' * 64, 'float32') is None
+    finally:
+        pattern_index._store_dir = original_store_dir
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("✓ PASS")
+
+
+def test_int8_store_ranks_like_float32():
+    """Test that the int8-quantized store gives nearly the same similarities"""
+    print("\nTest: int8 store ranks like float32...")
+    index, rng = _random_index(n_patterns=200, dim=384)
+    tmp_dir = Path(__file__).parent / ".tmp_pattern_int8"
+    tmp_dir.mkdir(exist_ok=True)
+    original_store_dir = pattern_index._store_dir
+    pattern_index._store_dir = lambda: tmp_dir
+    try:
+        save_embedding_store(index, 'c' * 64, 'int8')
+        quantized = load_embedding_store('c' * 64, 'int8')
+        assert quantized.embeddings.dtype == np.int8
+        assert quantized.embeddings.nbytes * 4 == index.embeddings.nbytes
+
+        for _ in range(10):
+            query = rng.normal(size=384)
+            exact = dict((p['phrase'], s) for p, s in index.top_k(query, 200))
+            approx = quantized.top_k(query, 5)
+            for p, score in approx:
+                assert abs(score - exact[p['phrase']]) < 0.01
+            # The true best match is always in the quantized top 5
+            assert index.top_k(query, 1)[0][0] in [p for p, _ in approx]
+    finally:
+        pattern_index._store_dir = original_store_dir
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("✓ PASS")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("TESTING: pattern_index.py")
+    print("="*80)
+
+    tests = [
+        test_normalized_float32_matrix,
+        test_top_k_matches_full_cosine_sort,
+        test_index_resident_per_content_hash,
+        test_store_rejects_stale_or_corrupt_files,
+        test_int8_store_ranks_like_float32
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*80)
+    print(f"Results: {passed}/{len(tests)} tests passed")
+    if failed == 0:
+        print("✓ ALL TESTS PASSED")
+    else:
+        print(f"✗ {failed} tests failed")
+    print("="*80)
+
+    exit(0 if failed == 0 else 1)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Unit tests for sparql_cache.py (prepared-query cache)"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rdflib import Literal
+from sparql_cache import PreparedQueryCache, parameterize_query
+from execution import add_namespaces, execute_sparql, load_graph, sparql_query_stats
+
+QUERIES = [
+    # Exact row/column lookup
+    """SELECT ?value ?scale WHERE {
+        ?metric kg:tableRow ?row ; kg:tableColumn ?col ; kg:hasValue ?v .
+        FILTER(LCASE(?row) = "granted" && CONTAINS(LCASE(?col), "2013"))
+        ?v kg:numericValue ?value ; kg:hasScale ?s .
+        BIND(REPLACE(STR(?s), ".*[/#]", "") AS ?scale) }""",
+    # Literal object and year pattern
+    """SELECT ?value WHERE { ?m kg:tableRow "vested" ; kg:hasValue ?v ; kg:forTimePeriod ?y .
+        ?y kg:yearValue 2012 . ?v kg:numericValue ?value }""",
+    # Aggregation with GROUP BY / HAVING / ORDER BY / LIMIT
+    """SELECT ?row (SUM(?value) AS ?total) WHERE { ?m kg:tableRow ?row ; kg:hasValue ?v .
+        ?v kg:numericValue ?value . FILTER(?value > 10.5) }
+        GROUP BY ?row HAVING (SUM(?value) > 100) ORDER BY DESC(?total) LIMIT 3""",
+    # OPTIONAL, REGEX flags, language-tagged and typed literals
+    """SELECT ?value ?label WHERE { ?m kg:hasValue ?v . ?v kg:numericValue ?value .
+        OPTIONAL { ?m kg:label ?label FILTER(REGEX(?label, "^unvested", "i")) }
+        FILTER(?value != "x"@en && ?value >= "0"^^xsd:integer) }""",
+    # SELECT * and VALUES keep their literals
+    """SELECT * WHERE { ?m kg:tableRow "granted" ; kg:hasValue ?v . ?v kg:numericValue ?value }""",
+    """SELECT ?value WHERE { VALUES ?row { "granted" "vested" } ?m kg:tableRow ?row ; kg:hasValue ?v .
+        ?v kg:numericValue ?value }""",
+    # Scientific notation and negative numbers
+    """SELECT ?value WHERE { ?m kg:hasValue ?v . ?v kg:numericValue ?value .
+        FILTER(?value > 1.5e3 || ?value < -1) }""",
+]
+
+
+def _rows(results):
+    return sorted(tuple(str(term) for term in row) for row in results)
+
+
+def test_cached_results_match_rdflib():
+    """Test the cached path returns the same rows as graph.query() on raw text"""
+    print("Test: Cached results match rdflib...")
+    cache = PreparedQueryCache(max_entries=32)
+    for example_id in ["9", "10", "47"]:
+        g = load_graph(example_id, backend='memory')
+        for query in QUERIES:
+            query = add_namespaces(query.replace('xsd:integer', '<http://www.w3.org/2001/XMLSchema#integer>'))
+            expected = _rows(g.query(query))
+            assert _rows(cache.query(g, query)) == expected, query
+            # Second run is served from the cache
+            assert _rows(cache.query(g, query)) == expected, query
+    assert cache.stats()['fallbacks'] == 0
+    print("✓ PASS")
+
+
+def test_constants_share_one_template():
+    """Test that queries differing only in constants reuse one prepared query"""
+    print("\nTest: Constants share one template...")
+    cache = PreparedQueryCache(max_entries=8)
+    g = load_graph("9", backend='memory')
+    template = 'SELECT ?value WHERE { ?m kg:tableRow "%s" ; kg:hasValue ?v . ?v kg:numericValue ?value }'
+    for row in ["granted", "vested", "forfeited", "granted"]:
+        query = add_namespaces(template % row)
+        assert _rows(cache.query(g, query)) == _rows(g.query(query))
+    stats = cache.stats()
+    assert stats['entries'] == 1
+    assert stats['misses'] == 1
+    assert stats['hits'] == 3
+    assert stats['parse_seconds'] > 0 and stats['eval_seconds'] > 0
+    print("✓ PASS")
+
+
+def test_parameterize_query():
+    """Test which literals are lifted into placeholders"""
+    print("\nTest: parameterize_query...")
+    template, bindings = parameterize_query(
+        'SELECT ?v WHERE { ?m kg:year 2012 ; kg:row "a\\"b" ; kg:lang "x"@en ; kg:n "1"^^xsd:int } LIMIT 5')
+    assert bindings == {'__pq0': Literal(2012), '__pq1': Literal('a"b')}
+    assert '"x"@en' in template and '"1"^^xsd:int' in template
+    assert template.endswith('LIMIT 5')
+
+    template, bindings = parameterize_query('SELECT * WHERE { ?m kg:row "a" }')
+    assert bindings == {} and '"a"' in template
+
+    # Whitespace and comments don't split the cache
+    a, _ = parameterize_query('SELECT ?v WHERE {\n  ?m kg:row "a" . # comment\n}')
+    b, _ = parameterize_query('SELECT ?v WHERE { ?m kg:row "b" . }')
+    assert a == b
+    print("✓ PASS")
+
+
+def test_lru_eviction():
+    """Test that the cache stays within max_entries"""
+    print("\nTest: LRU eviction...")
+    cache = PreparedQueryCache(max_entries=2)
+    for predicate in ["tableRow", "tableColumn", "label"]:
+        cache.prepare(add_namespaces(f'SELECT ?x WHERE {{ ?m kg:{predicate} ?x }}'))
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['evictions'] == 1
+    print("✓ PASS")
+
+
+def test_execute_sparql_uses_cache():
+    """Test execute_sparql() goes through the process-wide cache"""
+    print("\nTest: execute_sparql uses the cache...")
+    g = load_graph("9", backend='memory')
+    # ORDER BY keeps it off the BGP fast path
+    query = 'SELECT ?value WHERE { ?m kg:tableRow "granted" ; kg:tableColumn ?c ; kg:hasValue ?v . ?v kg:numericValue ?value . FILTER(CONTAINS(?c, "%s")) } ORDER BY ?value'
+    before = sparql_query_stats()
+    first = execute_sparql(g, query % "2013")
+    execute_sparql(g, query % "2012")
+    after = sparql_query_stats()
+    assert after['hits'] >= before['hits'] + 1
+    assert first['value'] == float(next(iter(g.query(add_namespaces(query % "2013")))).value)
+    print("✓ PASS")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("TESTING: sparql_cache.py")
+    print("="*80)
+
+    tests = [
+        test_cached_results_match_rdflib,
+        test_constants_share_one_template,
+        test_parameterize_query,
+        test_lru_eviction,
+        test_execute_sparql_uses_cache
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*80)
+    print(f"Results: {passed}/{len(tests)} tests passed")
+    if failed == 0:
+        print("✓ ALL TESTS PASSED")
+    else:
+        print(f"✗ {failed} tests failed")
+    print("="*80)
+
+    exit(0 if failed == 0 else 1)
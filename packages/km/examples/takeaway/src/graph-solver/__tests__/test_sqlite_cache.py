@@ -20,7 +20,11 @@ from pathlib import Path
 src_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(src_dir))
 
-from execution import load_graph, _get_cache_db_path, _init_cache_db, _is_cache_valid
+from execution import (
+    load_graph, _get_cache_db_path, _init_cache_db, _is_cache_valid,
+    invalidate_graph, graph_pool_stats
+)
+from kg_cache_db import cache_stats, file_content_hash, load_cached_graph, parse_turtle, store_parsed_graphs
 
 
 def test_cache_initialization():
@@ -33,6 +37,7 @@ def test_cache_initialization():
     cache_path = _get_cache_db_path()
     if cache_path.exists():
         cache_path.unlink()
+    invalidate_graph()  # Pooled graphs point at the deleted DB
 
     # Initialize cache
     _init_cache_db(cache_path)
@@ -63,6 +68,7 @@ def test_cache_miss_then_hit():
     cache_path = _get_cache_db_path()
     if cache_path.exists():
         cache_path.unlink()
+    invalidate_graph()  # Pooled graphs point at the deleted DB
 
     # First load - should be cache miss
     print("\nFirst load (cache miss expected)...")
@@ -105,6 +111,7 @@ def test_cache_invalidation():
     cache_path = _get_cache_db_path()
     if cache_path.exists():
         cache_path.unlink()
+    invalidate_graph()  # Pooled graphs point at the deleted DB
 
     # Load to populate cache
     print("\nInitial load...")
@@ -119,21 +126,42 @@ def test_cache_invalidation():
     assert _is_cache_valid("9", kg_path, cache_path), "Cache should be valid"
     print("✓ Cache is valid")
 
-    # Simulate file change by updating mtime
-    print("\nSimulating file modification...")
+    # Touching the file (git checkout, copy) must not invalidate a content-keyed cache
+    print("\nSimulating mtime-only change...")
     time.sleep(0.1)  # Ensure time difference
     kg_path.touch()  # Update mtime
-
-    # Check cache is now invalid
-    assert not _is_cache_valid("9", kg_path, cache_path), "Cache should be invalid"
-    print("✓ Cache correctly invalidated after file touch")
-
-    # Load again - should rebuild cache
-    print("\nReloading after file change...")
+    invalidate_graph("9")  # Pool is content-keyed; drop it to exercise the SQLite path
+    assert _is_cache_valid("9", kg_path, cache_path), "Touch should not invalidate the cache"
+    rebuilds_before = cache_stats()['rebuilds']
     g2 = load_graph("9", use_cache=True)
-    count2 = len(list(g2))
-    assert count1 == count2, "Triple count changed after reload"
-    print(f"✓ Reloaded correctly with {count2} triples")
+    assert cache_stats()['rebuilds'] == rebuilds_before, "Touch should not trigger a rebuild"
+    assert len(list(g2)) == count1
+    print("✓ Cache still valid after touch (no rebuild)")
+
+    # Different content under the same example id invalidates it
+    print("\nSimulating content change...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        edited_path = Path(tmp_dir) / "9_kg.ttl"
+        shutil.copy(kg_path, edited_path)
+        with open(edited_path, 'a') as f:
+            f.write('\n<http://example.org/convfinqa/entity/Extra> <http://example.org/convfinqa/label> "extra" .\n')
+        assert not _is_cache_valid("9", edited_path, cache_path), "Cache should be invalid"
+        print("✓ Cache correctly invalidated by content change")
+
+        # Rebuild from the edited file swaps in a new named graph
+        g3 = load_cached_graph(cache_path, "9", edited_path, graph_prefix="example_9")
+        assert len(list(g3)) == count1 + 1, "Rebuilt graph should include the new triple"
+        assert _is_cache_valid("9", edited_path, cache_path)
+        print(f"✓ Rebuilt into named graph {g3.identifier}")
+
+    # Reload from the original file - should rebuild back and drop the edited graph
+    print("\nReloading original file...")
+    invalidate_graph("9")
+    g4 = load_graph("9", use_cache=True)
+    count4 = len(list(g4))
+    assert count1 == count4, "Triple count changed after reload"
+    assert len(list(g3)) == 0, "Old named graph should be dropped after the swap"
+    print(f"✓ Reloaded correctly with {count4} triples")
 
     # Cache should be valid again
     assert _is_cache_valid("9", kg_path, cache_path), "Cache should be valid after rebuild"
@@ -152,6 +180,7 @@ def test_query_correctness():
     cache_path = _get_cache_db_path()
     if cache_path.exists():
         cache_path.unlink()
+    invalidate_graph()  # Pooled graphs point at the deleted DB
 
     # Load without cache
     print("\nLoading without cache...")
@@ -205,6 +234,7 @@ def test_multiple_examples():
     cache_path = _get_cache_db_path()
     if cache_path.exists():
         cache_path.unlink()
+    invalidate_graph()  # Pooled graphs point at the deleted DB
 
     # Load multiple examples
     examples = ["9", "10", "11"]
@@ -247,6 +277,181 @@ def test_fallback_mode():
     print("\nTest 6 PASSED ✅\n")
 
 
+def test_graph_pool():
+    """Test that repeated loads share one pooled graph per example"""
+    print("=" * 80)
+    print("TEST 7: Process-wide Graph Pool")
+    print("=" * 80)
+
+    invalidate_graph()
+    before = graph_pool_stats()
+
+    g1 = load_graph("9", use_cache=False)
+    g2 = load_graph("9", use_cache=False)
+    assert g1 is g2, "Second load should return the pooled graph"
+    print("✓ Second load returned pooled graph")
+
+    stats = graph_pool_stats()
+    assert stats['misses'] == before['misses'] + 1
+    assert stats['hits'] == before['hits'] + 1
+    assert stats['triples'] == len(g1)
+    print(f"✓ Pool stats: {stats['hits']} hits, {stats['misses']} misses, {stats['triples']} triples")
+
+    # Pool bypass always opens a fresh graph
+    g3 = load_graph("9", use_cache=False, use_pool=False)
+    assert g3 is not g1
+    print("✓ use_pool=False bypasses the pool")
+
+    # Explicit invalidation forces a reload
+    assert invalidate_graph("9") == 1
+    g4 = load_graph("9", use_cache=False)
+    assert g4 is not g1
+    print("✓ invalidate_graph() forces a reload")
+
+    print("\nTest 7 PASSED ✅\n")
+
+
+def test_graph_pool_eviction():
+    """Test LRU eviction bounded by total triple count"""
+    print("=" * 80)
+    print("TEST 8: Graph Pool LRU Eviction")
+    print("=" * 80)
+
+    from execution import GraphPool
+
+    pool = GraphPool(max_triples=250)
+    pool.put(("1", "h1", "memory"), "g1", 100)
+    pool.put(("2", "h2", "memory"), "g2", 100)
+    assert pool.get(("1", "h1", "memory")) == "g1"  # 1 is now most recently used
+
+    pool.put(("3", "h3", "memory"), "g3", 100)
+    assert pool.get(("2", "h2", "memory")) is None, "LRU entry should be evicted"
+    assert pool.get(("1", "h1", "memory")) == "g1"
+    assert pool.stats()['evictions'] == 1
+    assert pool.stats()['triples'] == 200
+    print("✓ Least recently used graph evicted over triple budget")
+
+    # New content hash for the same example replaces the old entry
+    pool.put(("1", "h1b", "memory"), "g1b", 100)
+    assert pool.get(("1", "h1", "memory")) is None
+    assert pool.stats()['graphs'] == 2
+    print("✓ New content version replaces stale entry")
+
+    print("\nTest 8 PASSED ✅\n")
+
+
+def _worker_load(example_ids):
+    """Load KGs in a separate process; returns (rebuilds, triple counts)"""
+    counts = {ex: len(load_graph(ex, use_cache=True)) for ex in example_ids}
+    return cache_stats()['rebuilds'], counts
+
+
+def test_concurrent_workers():
+    """Test parallel workers load KGs from one cache without lock errors or duplicate rebuilds"""
+    print("=" * 80)
+    print("TEST 9: Concurrent Workers")
+    print("=" * 80)
+
+    import multiprocessing
+
+    cache_path = _get_cache_db_path()
+    if cache_path.exists():
+        cache_path.unlink()
+    invalidate_graph()
+
+    examples = ["9", "10", "11"]
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(4) as pool:
+        results = pool.map(_worker_load, [examples] * 4)
+
+    total_rebuilds = sum(rebuilds for rebuilds, _ in results)
+    assert total_rebuilds == len(examples), \
+        f"Each KG should be built exactly once across workers, got {total_rebuilds} rebuilds"
+    expected = {ex: len(load_graph(ex, use_cache=False, use_pool=False)) for ex in examples}
+    for _, counts in results:
+        assert counts == expected, f"Worker saw {counts}, expected {expected}"
+    print(f"✓ 4 workers, {len(examples)} KGs, {total_rebuilds} rebuilds, no lock errors")
+
+    import sqlite3
+    conn = sqlite3.connect(str(cache_path))
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    conn.close()
+    print("✓ Cache DB is in WAL mode")
+
+    print("\nTest 9 PASSED ✅\n")
+
+
+def test_bulk_warm_up():
+    """Test bulk insert of pre-parsed KGs followed by cache hits"""
+    print("=" * 80)
+    print("TEST 10: Bulk Cache Warm-up")
+    print("=" * 80)
+
+    cache_path = _get_cache_db_path()
+    if cache_path.exists():
+        cache_path.unlink()
+    invalidate_graph()
+
+    kg_dir = Path(__file__).parent.parent.parent.parent / "data" / "knowledge-graphs"
+    entries = []
+    for ex in ["9", "10"]:
+        kg_path = kg_dir / f"{ex}_kg.ttl"
+        triples, namespaces = parse_turtle(kg_path)
+        entries.append({'cache_key': ex, 'turtle_path': kg_path, 'graph_prefix': f"example_{ex}",
+                        'content_hash': file_content_hash(kg_path),
+                        'triples': triples, 'namespaces': namespaces})
+
+    assert sorted(store_parsed_graphs(cache_path, entries)) == ["10", "9"]
+    assert store_parsed_graphs(cache_path, entries) == [], "Cached content should be skipped"
+    print("✓ Both KGs inserted in one batch; second pass skipped")
+
+    rebuilds_before = cache_stats()['rebuilds']
+    for entry in entries:
+        g = load_graph(entry['cache_key'], use_cache=True)
+        assert len(g) == len(entry['triples'])
+    assert cache_stats()['rebuilds'] == rebuilds_before, "Warm cache should not rebuild"
+    print("✓ load_graph() served from the warm cache")
+
+    print("\nTest 10 PASSED ✅\n")
+
+
+def test_hits_during_rebuild():
+    """Test that cache hits in one thread don't wait for another thread's rebuild"""
+    print("=" * 80)
+    print("TEST 11: Cache Hits During a Rebuild")
+    print("=" * 80)
+
+    import threading
+
+    from kg_cache_db import _build_lock
+
+    cache_path = _get_cache_db_path()
+    kg_path = Path(__file__).parent.parent.parent.parent / "data" / "knowledge-graphs" / "9_kg.ttl"
+    expected = len(load_cached_graph(cache_path, "9", kg_path, "example_9"))
+
+    rebuilding, release = threading.Event(), threading.Event()
+
+    def slow_rebuild():
+        with _build_lock(cache_path):
+            rebuilding.set()
+            release.wait(10)
+
+    builder = threading.Thread(target=slow_rebuild)
+    builder.start()
+    rebuilding.wait(5)
+    counts = []
+    reader = threading.Thread(target=lambda: counts.append(len(load_cached_graph(cache_path, "9", kg_path,
+                                                                                 "example_9"))))
+    reader.start()
+    reader.join(5)
+    release.set()
+    builder.join()
+    assert counts == [expected], "Cache hit should not wait for the rebuild lock"
+    print("✓ Cache hit served while another thread held the rebuild lock")
+
+    print("\nTest 11 PASSED ✅\n")
+
+
 def run_all_tests():
     """Run all cache tests"""
     print("\n" + "=" * 80)
@@ -260,6 +465,11 @@ def run_all_tests():
         ("Query Correctness", test_query_correctness),
         ("Multiple Examples", test_multiple_examples),
         ("Fallback Mode", test_fallback_mode),
+        ("Graph Pool", test_graph_pool),
+        ("Graph Pool Eviction", test_graph_pool_eviction),
+        ("Concurrent Workers", test_concurrent_workers),
+        ("Bulk Warm-up", test_bulk_warm_up),
+        ("Hits During Rebuild", test_hits_during_rebuild),
     ]
 
     passed = 0
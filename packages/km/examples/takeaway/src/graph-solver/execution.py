@@ -1,19 +1,17 @@
 #!/usr/bin/env python3
 """Phase 3 & 4: Clean, generic value retrieval and formula execution"""
 import ast
+import hashlib
 import os
-import sqlite3
-from rdflib import Graph, Namespace
-from rdflib.store import Store
-from rdflib import plugin
+import threading
+from collections import OrderedDict
+from rdflib import Graph
 from pathlib import Path
-
-# Register SQLite plugin for RDFLib
-try:
-    import rdflib_sqlalchemy
-    rdflib_sqlalchemy.registerplugins()
-except ImportError:
-    pass  # SQLite plugin not available, will use fallback
+from fact_index import answer_from_index, fact_index_for_graph, load_fact_index
+from sparql_cache import PreparedQueryCache
+from sparql_fastpath import fast_query
+from kg_cache_db import get_cache_connection, is_cache_valid, load_cached_graph
+from kg_prompt_data import kg_prompt_data_for_graph
 
 
 def retrieve_values(values_spec, context):
@@ -24,11 +22,15 @@ def retrieve_values(values_spec, context):
         values_spec: From Phase 1 - {name: {source, description, semantic_type, sparql?}}
         context: {
             'results_by_name': {var_name: value_obj, ...},
-            'kg_graph': rdflib.Graph (optional)
+            'kg_graph': rdflib.Graph (optional),
+            'example_id': str (optional)
         }
 
     Returns:
         {name: value_object} where value_object = {value, scale, source, description}
+
+    context may also carry 'example_id' (or a prebuilt 'fact_index') so simple
+    row/column lookups are answered from the fact index without running SPARQL.
     """
     value_objects = {}
 
@@ -43,10 +45,15 @@ def retrieve_values(values_spec, context):
             value_objects[name] = context['results_by_name'][name]
 
         elif spec['source'] == 'knowledge_graph':
-            # Execute SPARQL and create value object
+            # Answer from the fact index, falling back to SPARQL on a miss
             if 'sparql' not in spec:
                 raise ValueError(f"No SPARQL query for {name}")
-            result = execute_sparql(context['kg_graph'], spec['sparql'])
+            result = None
+            fact_index = _context_fact_index(context)
+            if fact_index is not None:
+                result = answer_from_index(fact_index, spec['sparql'])
+            if result is None:
+                result = execute_sparql(context['kg_graph'], spec['sparql'])
             value_objects[name] = {
                 'value': result['value'],
                 'scale': result.get('scale', 'Units'),
@@ -57,6 +64,20 @@ def retrieve_values(values_spec, context):
     return value_objects
 
 
+def _context_fact_index(context):
+    """Fact index for the retrieval context (by example_id if known, else by graph)"""
+    if context.get('fact_index') is not None:
+        return context['fact_index']
+    try:
+        if context.get('example_id') is not None:
+            context['fact_index'] = load_fact_index(context['example_id'])
+        elif context.get('kg_graph') is not None:
+            context['fact_index'] = fact_index_for_graph(context['kg_graph'])
+    except FileNotFoundError:
+        return None
+    return context.get('fact_index')
+
+
 def validate_formula(formula, variable_names):
     """
     Validate formula before execution
@@ -247,8 +268,11 @@ def execute_sparql(graph, sparql_query):
     if 'PREFIX' not in sparql_query:
         sparql_query = add_namespaces(sparql_query)
 
-    # Execute query
-    results = list(graph.query(sparql_query))
+    # Execute query: simple BGPs run directly on the triple indexes, anything
+    # else through rdflib (parsed/compiled once per query shape, constants re-bound)
+    results = fast_query(graph, sparql_query)
+    if results is None:
+        results = _query_cache.query(graph, sparql_query)
 
     if not results:
         raise ValueError(f"SPARQL query returned no results: {sparql_query}")
@@ -285,6 +309,14 @@ def execute_sparql(graph, sparql_query):
     }
 
 
+_query_cache = PreparedQueryCache(max_entries=int(os.getenv('KG_QUERY_CACHE_SIZE', '256')))
+
+
+def sparql_query_stats():
+    """Return prepared-query cache counters and cumulative parse vs. eval seconds"""
+    return _query_cache.stats()
+
+
 def add_namespaces(sparql_query):
     """Add standard namespace prefixes to SPARQL query"""
     prefixes = """
@@ -303,105 +335,194 @@ def _get_cache_db_path():
 
 
 def _init_cache_db(db_path):
-    """Initialize cache metadata table"""
-    conn = sqlite3.connect(str(db_path))
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS cache_metadata (
-            example_id TEXT PRIMARY KEY,
-            turtle_mtime REAL,
-            cached_at REAL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    """Initialize cache metadata table (WAL mode, shared per-process connection)"""
+    get_cache_connection(db_path)
 
 
 def _is_cache_valid(example_id, turtle_path, db_path):
-    """Check if cached graph is up-to-date"""
-    if not db_path.exists():
-        return False
+    """Check if cached graph was built from the turtle file's current contents"""
+    return is_cache_valid(db_path, example_id, turtle_path)
+
+
+def _kg_path(example_id):
+    """Path to the turtle KG for an example"""
+    return Path(__file__).parent.parent.parent / "data" / "knowledge-graphs" / f"{example_id}_kg.ttl"
+
+
+# Content hashes memoized by (mtime_ns, size) so a pool lookup doesn't re-read the file
+_content_hash_memo = {}
+
+
+def _kg_content_hash(kg_path):
+    """SHA-256 of the turtle file contents (re-hashed only when mtime or size changes)"""
+    stat = kg_path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    memo = _content_hash_memo.get(str(kg_path))
+    if memo is not None and memo[0] == signature:
+        return memo[1]
+
+    digest = hashlib.sha256(kg_path.read_bytes()).hexdigest()
+    _content_hash_memo[str(kg_path)] = (signature, digest)
+    return digest
+
+
+class GraphPool:
+    """
+    Process-wide LRU pool of loaded knowledge graphs
+
+    Entries are keyed by (example_id, KG content hash, backend), so an edited
+    turtle file never returns a stale graph. Eviction is LRU, bounded by the
+    total number of triples held rather than the number of graphs.
+    """
+
+    def __init__(self, max_triples=500_000):
+        self.max_triples = max_triples
+        self._entries = OrderedDict()  # {(example_id, content_hash, backend): (graph, triple_count)}
+        self._lock = threading.Lock()
+        self.total_triples = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return pooled graph for key (marking it most recently used), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, graph, triple_count):
+        """Add graph to the pool, evicting least recently used graphs over budget"""
+        with self._lock:
+            # Drop any older content versions of the same example/backend
+            for old_key in [k for k in self._entries if k[0] == key[0] and k[2] == key[2]]:
+                self._remove(old_key)
+
+            self._entries[key] = (graph, triple_count)
+            self.total_triples += triple_count
+
+            # Always keep the graph just added, even if it alone exceeds the budget
+            while self.total_triples > self.max_triples and len(self._entries) > 1:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, example_id=None):
+        """Drop pooled graphs for one example (or all examples if example_id is None)"""
+        with self._lock:
+            if example_id is None:
+                keys = list(self._entries)
+            else:
+                keys = [k for k in self._entries if k[0] == str(example_id)]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def stats(self):
+        """Hit/miss counters and current pool occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'graphs': len(self._entries),
+                'triples': self.total_triples,
+                'max_triples': self.max_triples
+            }
+
+    def _remove(self, key):
+        _, triple_count = self._entries.pop(key)
+        self.total_triples -= triple_count
+
+
+_graph_pool = GraphPool(max_triples=int(os.getenv('KG_POOL_MAX_TRIPLES', '500000')))
 
-    turtle_mtime = turtle_path.stat().st_mtime
 
-    conn = sqlite3.connect(str(db_path))
-    cursor = conn.execute(
-        "SELECT turtle_mtime FROM cache_metadata WHERE example_id = ?",
-        (example_id,)
-    )
-    row = cursor.fetchone()
-    conn.close()
+def invalidate_graph(example_id=None):
+    """
+    Drop pooled graphs so the next load_graph() re-opens them
 
-    if row is None:
-        return False
+    Args:
+        example_id: Example to invalidate, or None to clear the whole pool
 
-    cached_mtime = row[0]
-    return cached_mtime >= turtle_mtime
+    Returns:
+        Number of pooled graphs dropped
+    """
+    return _graph_pool.invalidate(example_id)
 
 
-def _mark_cached(example_id, turtle_mtime, db_path):
-    """Record cache metadata"""
-    import time
-    conn = sqlite3.connect(str(db_path))
-    conn.execute("""
-        INSERT OR REPLACE INTO cache_metadata (example_id, turtle_mtime, cached_at)
-        VALUES (?, ?, ?)
-    """, (example_id, turtle_mtime, time.time()))
-    conn.commit()
-    conn.close()
+def graph_pool_stats():
+    """Return hit/miss/eviction counters for the process-wide graph pool"""
+    return _graph_pool.stats()
 
 
-def load_graph(example_id, use_cache=True):
+GRAPH_BACKENDS = ('sqlite', 'memory', 'snapshot')
+
+
+def load_graph(example_id, use_cache=True, use_pool=True, backend=None):
     """
     Load knowledge graph for example with optional SQLite caching
 
+    Graphs are shared through a process-wide pool keyed by example and KG
+    content hash, so repeated calls within a conversation open each KG once.
+
     Args:
         example_id: Example identifier (e.g., "10")
         use_cache: If True, use SQLite cache (default). If False, load from turtle directly.
+        use_pool: If True, return a pooled graph when one is loaded (default)
+        backend: 'sqlite', 'memory' or 'snapshot' (read-only binary snapshot, see
+            kg_snapshot.py). Defaults to 'sqlite' if use_cache else 'memory'.
 
     Returns:
         rdflib.Graph with KG data
     """
-    base_path = Path(__file__).parent.parent.parent / "data"
-    kg_path = base_path / "knowledge-graphs" / f"{example_id}_kg.ttl"
+    kg_path = _kg_path(example_id)
 
     if not kg_path.exists():
         raise FileNotFoundError(f"Knowledge graph not found: {kg_path}")
 
-    if not use_cache:
-        # Fallback: load from turtle directly (old behavior)
-        g = Graph()
-        g.parse(str(kg_path), format='turtle')
-        return g
+    if backend is None:
+        backend = 'sqlite' if use_cache else 'memory'
+    if backend not in GRAPH_BACKENDS:
+        raise ValueError(f"Unknown graph backend '{backend}'. Expected one of {GRAPH_BACKENDS}")
 
-    # Use SQLite caching
-    db_path = _get_cache_db_path()
-    _init_cache_db(db_path)
+    if not use_pool:
+        return _open_graph(example_id, kg_path, backend)
 
-    # Check if cache is valid
-    cache_valid = _is_cache_valid(str(example_id), kg_path, db_path)
+    pool_key = (str(example_id), _kg_content_hash(kg_path), backend)
+    g = _graph_pool.get(pool_key)
+    if g is None:
+        g = _open_graph(example_id, kg_path, backend)
+        _graph_pool.put(pool_key, g, len(g))
 
-    # Create graph with SQLAlchemy store (backed by SQLite)
-    store = plugin.get('SQLAlchemy', Store)()
-    g = Graph(store, identifier=f'example_{example_id}')
+    return g
 
-    if not cache_valid:
-        # Cache miss or stale - rebuild from turtle
-        g.open(f"sqlite:///{db_path}", create=True)
 
-        # Clear existing data for this example
-        g.remove((None, None, None))
+def _open_graph(example_id, kg_path, backend):
+    """Open KG from the SQLite cache (rebuilding if stale), a binary snapshot, or turtle"""
+    if backend == 'snapshot':
+        from kg_snapshot import load_snapshot_graph
+        return load_snapshot_graph(kg_path, content_hash=_kg_content_hash(kg_path))
 
-        # Parse turtle into SQLite
+    if backend == 'memory':
+        # Fallback: load from turtle directly (old behavior)
+        g = Graph()
         g.parse(str(kg_path), format='turtle')
+        return g
 
-        # Mark as cached
-        turtle_mtime = kg_path.stat().st_mtime
-        _mark_cached(str(example_id), turtle_mtime, db_path)
-    else:
-        # Cache hit - just open the store
-        g.open(f"sqlite:///{db_path}", create=False)
-
-    return g
+    # Use SQLite caching (content-hash keyed, rebuilt atomically when stale)
+    return load_cached_graph(_get_cache_db_path(), str(example_id), kg_path,
+                             graph_prefix=f'example_{example_id}',
+                             content_hash=_kg_content_hash(kg_path))
 
 
 def extract_sample_entities(graph):
@@ -433,66 +554,8 @@ def extract_sample_entities(graph):
             }
         }
     """
-    from rdflib.namespace import RDF
-
-    KG = Namespace('http://example.org/convfinqa/')
-    ENTITY = Namespace('http://example.org/convfinqa/entity/')
-
-    extracted_metrics = []
-    row_labels = set()
-    col_labels = set()
-
-    # Query for table metadata (orientation, caption)
-    table_metadata = {
-        "orientation": None,
-        "caption": None
-    }
-
-    table_uri = ENTITY['FinancialTable']
-    for orientation in graph.objects(table_uri, KG.tableOrientation):
-        table_metadata["orientation"] = str(orientation)
-    for caption in graph.objects(table_uri, KG.tableCaption):
-        table_metadata["caption"] = str(caption)
-
-    # Query for metrics with tableRow/tableColumn
-    for s, p, o in graph.triples((None, KG.tableRow, None)):
-        row_labels.add(str(o))
-    for s, p, o in graph.triples((None, KG.tableColumn, None)):
-        col_labels.add(str(o))
-
-    # Query for extracted metrics (have label but no tableRow)
-    for metric in graph.subjects(RDF.type, KG.FinancialMetric):
-        has_table = False
-        for _ in graph.triples((metric, KG.tableRow, None)):
-            has_table = True
-            break
-        if not has_table:
-            label = None
-            for l in graph.objects(metric, KG.label):
-                label = str(l)
-                break
-
-            if label:
-                # Check if metric has year
-                year = None
-                for year_entity in graph.objects(metric, KG.forTimePeriod):
-                    for year_val in graph.objects(year_entity, KG.yearValue):
-                        year = int(year_val)
-                        break
-
-                extracted_metrics.append({
-                    "label": label,
-                    "year": year
-                })
-
-    return {
-        "extracted_metrics": extracted_metrics,
-        "table_metadata": table_metadata,
-        "financial_metrics": {
-            "row_labels": sorted(list(row_labels)),
-            "column_labels": sorted(list(col_labels))
-        }
-    }
+    # Single scan shared with extract_table_data_for_prompt (see kg_prompt_data.py)
+    return kg_prompt_data_for_graph(graph)['sample_entities']
 
 
 if __name__ == "__main__":
@@ -0,0 +1,722 @@
+#!/usr/bin/env python3
+"""Array-backed fact index: direct (row, column, year) value lookup without SPARQL
+
+Each KG is compiled once into a FactIndex holding NumPy arrays of canonical
+values and scales, plus dict indexes from normalized row/column/label text and
+year to fact positions. retrieve_values() answers simple metric lookups from
+the index and only falls back to execute_sparql() on a miss.
+"""
+import math
+import re
+import weakref
+from rdflib import Literal, Namespace
+from rdflib.namespace import RDF, XSD
+import numpy as np
+
+KG = Namespace('http://example.org/convfinqa/')
+
+# Scale names in code order (unknown scales are appended per index)
+SCALE_NAMES = ['Units', 'Thousands', 'Millions', 'Billions']
+NO_SCALE = -1
+NO_YEAR = -1
+
+
+def normalize_label(text):
+    """Lowercase and collapse whitespace for label index keys"""
+    return ' '.join(str(text).lower().split())
+
+
+class FactIndex:
+    """
+    Per-example index of FinancialMetric values
+
+    One fact per (metric, value entity, numericValue) - the same rows a SPARQL
+    BGP over kg:hasValue/kg:numericValue produces. Facts whose metric has more
+    than one row, column, label, year or scale are flagged ambiguous for that
+    field, and lookups constraining it are left to SPARQL.
+    """
+
+    def __init__(self, values, scale_codes, scale_names, years, rows, columns, labels, is_metric, ambiguous):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.scale_codes = np.asarray(scale_codes, dtype=np.int16)
+        self.scale_names = scale_names
+        self.years = np.asarray(years, dtype=np.int32)
+        self.is_metric = np.asarray(is_metric, dtype=bool)
+        # {field: bool array} for 'row', 'column', 'label', 'year', 'scale'
+        self.ambiguous = {field: np.asarray(flags, dtype=bool) for field, flags in ambiguous.items()}
+        self.rows = rows          # Raw label per fact (None if absent)
+        self.columns = columns
+        self.labels = labels
+
+        self.row_index = self._build_label_index(rows)
+        self.column_index = self._build_label_index(columns)
+        self.label_index = self._build_label_index(labels)
+        self.year_index = {}
+        for pos, year in enumerate(self.years.tolist()):
+            if year != NO_YEAR:
+                self.year_index.setdefault(year, []).append(pos)
+
+    @staticmethod
+    def _build_label_index(labels):
+        index = {}
+        for pos, label in enumerate(labels):
+            if label is not None:
+                index.setdefault(normalize_label(label), []).append(pos)
+        return index
+
+    def __len__(self):
+        return len(self.values)
+
+    def scale_name(self, pos):
+        """Local scale name for a fact (e.g. 'Millions'), or None if it has no kg:hasScale"""
+        code = int(self.scale_codes[pos])
+        return None if code == NO_SCALE else self.scale_names[code]
+
+    def _match_label(self, index, raw_labels, constraint):
+        """Positions whose label satisfies one (mode, text) constraint"""
+        mode, text = constraint
+        if mode == 'exists':
+            return {pos for positions in index.values() for pos in positions}
+        if mode in ('equals', 'lcase_equals'):
+            # Normalized key narrows candidates; exact SPARQL semantics checked per fact
+            candidates = index.get(normalize_label(text), [])
+            if mode == 'equals':
+                return {pos for pos in candidates if raw_labels[pos] == text}
+            return {pos for pos in candidates if raw_labels[pos].lower() == text}
+        if mode == 'lcase_contains':
+            return {
+                pos
+                for key, positions in index.items()
+                for pos in positions
+                if text in raw_labels[pos].lower()
+            }
+        raise ValueError(f"Unknown label constraint mode: {mode}")
+
+    def find(self, row=None, column=None, label=None, year=None, metric_only=False, require_scale=False):
+        """
+        Fact positions matching all given constraints
+
+        Args:
+            row/column/label: list of (mode, text) constraints, mode one of
+                'exists', 'equals', 'lcase_equals', 'lcase_contains'
+            year: integer year (kg:forTimePeriod/kg:yearValue)
+            metric_only: only facts typed kg:FinancialMetric
+            require_scale: only facts with a kg:hasScale
+
+        Returns:
+            Sorted list of positions, or None if an ambiguous fact would be involved
+        """
+        candidates = None
+        touched = [field for field, used in (('row', row), ('column', column), ('label', label),
+                                             ('year', year is not None), ('scale', require_scale)) if used]
+
+        def narrow(positions):
+            nonlocal candidates
+            candidates = set(positions) if candidates is None else candidates & set(positions)
+
+        if year is not None:
+            narrow(self.year_index.get(year, []))
+        for constraints, index, raw in ((row, self.row_index, self.rows),
+                                        (column, self.column_index, self.columns),
+                                        (label, self.label_index, self.labels)):
+            for constraint in constraints or []:
+                narrow(self._match_label(index, raw, constraint))
+        if candidates is None:
+            candidates = set(range(len(self)))
+
+        positions = sorted(candidates)
+        if metric_only:
+            positions = [pos for pos in positions if self.is_metric[pos]]
+        if require_scale:
+            positions = [pos for pos in positions if self.scale_codes[pos] != NO_SCALE]
+        for field in touched:
+            if positions and self.ambiguous[field][positions].any():
+                return None
+        return positions
+
+    def lookup(self, row=None, column=None, year=None):
+        """
+        Convenience lookup by normalized row/column label and year
+
+        Returns:
+            {value, scale} for a single matching fact, or None
+        """
+        positions = self.find(
+            row=[('lcase_equals', normalize_label(row))] if row is not None else None,
+            column=[('lcase_equals', normalize_label(column))] if column is not None else None,
+            year=year
+        )
+        if not positions or len(positions) != 1:
+            return None
+        pos = positions[0]
+        return {'value': float(self.values[pos]), 'scale': self.scale_name(pos) or 'Units'}
+
+
+def build_fact_index(graph):
+    """Scan a KG once and compile its metric values into a FactIndex"""
+    values, scale_codes, years = [], [], []
+    rows, columns, labels, is_metric = [], [], [], []
+    ambiguous = {field: [] for field in ('row', 'column', 'label', 'year', 'scale')}
+    scale_names = list(SCALE_NAMES)
+    metric_subjects = set(graph.subjects(RDF.type, KG.FinancialMetric))
+
+    def single(subject, predicate):
+        objects = list(graph.objects(subject, predicate))
+        return (objects[0] if objects else None), len(objects) > 1
+
+    def label_flag(term, multiple):
+        # Exact-match semantics need a single plain literal
+        return multiple or (term is not None and (
+            not isinstance(term, Literal) or term.datatype is not None or term.language is not None))
+
+    for metric, value_entity in graph.subject_objects(KG.hasValue):
+        row, multi_row = single(metric, KG.tableRow)
+        column, multi_column = single(metric, KG.tableColumn)
+        label, multi_label = single(metric, KG.label)
+        scale_uri, multi_scale = single(value_entity, KG.hasScale)
+
+        year = NO_YEAR
+        periods = list(graph.objects(metric, KG.forTimePeriod))
+        year_values = [y for period in periods for y in graph.objects(period, KG.yearValue)]
+        # Periods without a kg:yearValue never match a year pattern, so only values count
+        multi_year = len(year_values) > 1
+        if year_values:
+            # A query's integer literal only matches xsd:integer year values
+            if getattr(year_values[0], 'datatype', None) != XSD.integer:
+                multi_year = True
+            else:
+                year = int(year_values[0])
+
+        if scale_uri is None:
+            scale_code = NO_SCALE
+        else:
+            scale_name = str(scale_uri).split('/')[-1].split('#')[-1]
+            if scale_name not in scale_names:
+                scale_names.append(scale_name)
+            scale_code = scale_names.index(scale_name)
+
+        flags = {
+            'row': label_flag(row, multi_row),
+            'column': label_flag(column, multi_column),
+            'label': label_flag(label, multi_label),
+            'year': multi_year,
+            'scale': multi_scale
+        }
+
+        for numeric in graph.objects(value_entity, KG.numericValue):
+            try:
+                values.append(float(numeric))
+            except (TypeError, ValueError):
+                continue
+            scale_codes.append(scale_code)
+            years.append(year)
+            rows.append(str(row) if row is not None else None)
+            columns.append(str(column) if column is not None else None)
+            labels.append(str(label) if label is not None else None)
+            is_metric.append(metric in metric_subjects)
+            for field, flag in flags.items():
+                ambiguous[field].append(flag)
+
+    return FactIndex(values, scale_codes, scale_names, years, rows, columns, labels, is_metric, ambiguous)
+
+
+# Memoized per (example_id, KG content hash) and per graph object
+_example_indexes = {}
+_graph_indexes = weakref.WeakKeyDictionary()
+
+
+def load_fact_index(example_id):
+    """
+    Fact index for an example, rebuilt only when its KG content changes
+
+    Built from the binary snapshot backend so compiling never touches SQLite.
+    """
+    from execution import load_graph, _kg_content_hash, _kg_path
+
+    content_hash = _kg_content_hash(_kg_path(example_id))
+    key = (str(example_id), content_hash)
+    index = _example_indexes.get(key)
+    if index is None:
+        for stale_key in [k for k in _example_indexes if k[0] == str(example_id)]:
+            del _example_indexes[stale_key]
+        index = _example_indexes[key] = build_fact_index(load_graph(example_id, backend='snapshot'))
+    return index
+
+
+def fact_index_for_graph(graph):
+    """Fact index for an already-loaded graph (memoized on the graph object)"""
+    index = _graph_indexes.get(graph)
+    if index is None:
+        index = _graph_indexes[graph] = build_fact_index(graph)
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Recognizer for simple metric-lookup SPARQL
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+|\#[^\n]*)
+  | (?P<iri><[^<>\s]*>)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<var>[?$][A-Za-z_][A-Za-z0-9_]*)
+  | (?P<number>[+-]?\d+(?:\.\d+)?)
+  | (?P<op>&&|\|\||!=|<=|>=|[{}().;,=<>*/+-])
+  | (?P<name>[A-Za-z_][A-Za-z0-9_\-]*(?::[A-Za-z0-9_\-]*)?|:[A-Za-z0-9_\-]+)
+''', re.VERBOSE)
+
+_UNESCAPE_RE = re.compile(r'\\(.)')
+_SCALE_LOCAL_NAME_PATTERN = '.*[/#]'
+
+# Predicates a metric-lookup query may use, keyed by prefixed name
+_METRIC_PREDICATES = {'kg:tableRow': 'row', 'kg:tableColumn': 'column', 'kg:label': 'label'}
+
+
+def tokenize_sparql(query):
+    """Split SPARQL text into (kind, text) tokens; raises ValueError on unknown input"""
+    tokens = []
+    pos = 0
+    while pos < len(query):
+        match = _TOKEN_RE.match(query, pos)
+        if not match:
+            raise ValueError(f"Unexpected SPARQL input at {pos}: {query[pos:pos + 20]!r}")
+        kind = match.lastgroup
+        if kind != 'ws':
+            text = match.group(kind)
+            if kind == 'string':
+                text = _UNESCAPE_RE.sub(r'\1', text[1:-1])
+            tokens.append((kind, text))
+        pos = match.end()
+    return tokens
+
+
+def _expand_name(token, prefixes):
+    """Normalize IRIs to 'kg:localName' / 'rdf:type' form where the prefix is known"""
+    kind, text = token
+    if kind == 'name' and text == 'a':
+        return 'rdf:type'
+    if kind == 'iri':
+        iri = text[1:-1]
+    elif kind == 'name' and ':' in text:
+        prefix, local = text.split(':', 1)
+        if prefix not in prefixes:
+            return text
+        iri = prefixes[prefix] + local
+    else:
+        return None
+    for prefix, namespace in (('kg', str(KG)), ('rdf', str(RDF))):
+        if iri.startswith(namespace) and '/' not in iri[len(namespace):]:
+            return f"{prefix}:{iri[len(namespace):]}"
+    return f"<{iri}>"
+
+
+class _Parser:
+    """Tiny recursive-descent parser for single-BGP SELECT queries"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        idx = self.pos + offset
+        return self.tokens[idx] if idx < len(self.tokens) else (None, None)
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, text):
+        token = self.next()
+        if token[1] is None or token[1].upper() != text.upper():
+            raise ValueError(f"Expected {text!r}, got {token[1]!r}")
+        return token
+
+    def keyword(self, text):
+        return self.peek()[1] is not None and self.peek()[0] == 'name' and self.peek()[1].upper() == text
+
+
+def parse_select_query(query):
+    """
+    Parse a single-BGP SELECT query into its parts
+
+    Returns:
+        {'select': [var...], 'distinct': bool, 'triples': [(s, p, o)...],
+         'filters': [expr...], 'binds': [(expr, var)...], 'modifiers': [token...],
+         'prefixes': {declared prefix...}}
+        where terms are ('var', name) | ('iri', 'kg:x') | ('literal', value)
+
+    Raises:
+        ValueError: for anything outside the supported subset
+    """
+    p = _Parser(tokenize_sparql(query))
+    prefixes = {}
+    while p.keyword('PREFIX'):
+        p.next()
+        kind, name = p.next()
+        _, iri = p.next()
+        if kind != 'name' or not name.endswith(':') or not iri.startswith('<'):
+            raise ValueError("Malformed PREFIX declaration")
+        prefixes[name[:-1]] = iri[1:-1]
+    declared_prefixes = set(prefixes)
+    # Default prefixes that add_namespaces() would add
+    prefixes.setdefault('kg', str(KG))
+    prefixes.setdefault('rdf', str(RDF))
+
+    p.expect('SELECT')
+    distinct = False
+    if p.keyword('DISTINCT') or p.keyword('REDUCED'):
+        p.next()
+        distinct = True
+
+    select = []
+    aggregates = []
+    while not p.keyword('WHERE') and p.peek()[1] != '{':
+        token = p.peek()
+        if token[0] == 'var':
+            select.append(p.next()[1][1:])
+        elif token[1] == '(':
+            aggregates.append(_parse_aggregate(p))
+        else:
+            raise ValueError(f"Unsupported projection {token[1]!r}")
+    if p.keyword('WHERE'):
+        p.next()
+    p.expect('{')
+
+    triples, filters, binds = [], [], []
+    while p.peek()[1] != '}':
+        if p.peek()[1] is None:
+            raise ValueError("Unterminated WHERE clause")
+        if p.keyword('FILTER'):
+            p.next()
+            filters.append(_parse_bracketed_expr(p, prefixes))
+        elif p.keyword('BIND'):
+            p.next()
+            p.expect('(')
+            expr = _parse_expr(p, prefixes)
+            p.expect('AS')
+            kind, var = p.next()
+            if kind != 'var':
+                raise ValueError("BIND target must be a variable")
+            p.expect(')')
+            binds.append((expr, var[1:]))
+        elif p.peek()[1] == '.':
+            p.next()
+        elif p.peek()[0] == 'name' and p.peek()[1].upper() in ('OPTIONAL', 'UNION', 'MINUS', 'GRAPH', 'SERVICE', 'VALUES'):
+            raise ValueError(f"Unsupported graph pattern {p.peek()[1]}")
+        elif p.peek()[1] == '{':
+            raise ValueError("Nested group patterns are not supported")
+        else:
+            triples.extend(_parse_triples_block(p, prefixes))
+    p.expect('}')
+
+    modifiers = p.tokens[p.pos:]
+    return {
+        'select': select,
+        'aggregates': aggregates,
+        'distinct': distinct,
+        'triples': triples,
+        'filters': filters,
+        'binds': binds,
+        'modifiers': modifiers,
+        'prefixes': declared_prefixes,
+    }
+
+
+def _parse_aggregate(p):
+    """(SUM(?x) AS ?y) projection"""
+    p.expect('(')
+    kind, func = p.next()
+    if kind != 'name' or func.upper() not in ('SUM', 'AVG', 'COUNT', 'MIN', 'MAX', 'SAMPLE'):
+        raise ValueError(f"Unsupported projection expression {func!r}")
+    p.expect('(')
+    kind, var = p.next()
+    if kind != 'var':
+        raise ValueError("Aggregate argument must be a variable")
+    p.expect(')')
+    p.expect('AS')
+    _, alias = p.next()
+    p.expect(')')
+    return (func.upper(), var[1:], alias[1:])
+
+
+def _parse_term(p, prefixes):
+    token = p.next()
+    kind, text = token
+    if kind == 'var':
+        return ('var', text[1:])
+    if kind == 'string':
+        # Typed/language-tagged literals (^^, @) are rejected by the tokenizer
+        return ('literal', text)
+    if kind == 'number':
+        if '.' in text:
+            raise ValueError("Decimal literals are not supported")
+        return ('literal', int(text))
+    name = _expand_name(token, prefixes)
+    if name is None:
+        raise ValueError(f"Unsupported term {text!r}")
+    return ('iri', name)
+
+
+def _parse_triples_block(p, prefixes):
+    """subject predicate object (, object)* (; predicate object)* ."""
+    triples = []
+    subject = _parse_term(p, prefixes)
+    while True:
+        predicate = _parse_term(p, prefixes)
+        if predicate[0] != 'iri':
+            raise ValueError("Variable predicates are not supported")
+        triples.append((subject, predicate, _parse_term(p, prefixes)))
+        while p.peek()[1] == ',':
+            p.next()
+            triples.append((subject, predicate, _parse_term(p, prefixes)))
+        if p.peek()[1] == ';':
+            p.next()
+            if p.peek()[1] in ('.', '}'):
+                break
+            continue
+        break
+    if p.peek()[1] == '.':
+        p.next()
+    return triples
+
+
+def _parse_bracketed_expr(p, prefixes):
+    p.expect('(')
+    expr = _parse_expr(p, prefixes)
+    p.expect(')')
+    return expr
+
+
+def _parse_expr(p, prefixes):
+    """Conjunctions of comparisons/function calls -> ('and', [atoms])"""
+    atoms = [_parse_comparison(p, prefixes)]
+    while p.peek()[1] == '&&':
+        p.next()
+        atoms.append(_parse_comparison(p, prefixes))
+    return ('and', atoms) if len(atoms) > 1 else atoms[0]
+
+
+def _parse_comparison(p, prefixes):
+    left = _parse_primary(p, prefixes)
+    if p.peek()[1] == '=':
+        p.next()
+        return ('=', left, _parse_primary(p, prefixes))
+    return left
+
+
+def _parse_primary(p, prefixes):
+    token = p.peek()
+    if token[1] == '(':
+        return _parse_bracketed_expr(p, prefixes)
+    if token[0] == 'name' and p.peek(1)[1] == '(' and ':' not in token[1]:
+        func = p.next()[1].upper()
+        p.expect('(')
+        args = [_parse_expr(p, prefixes)]
+        while p.peek()[1] == ',':
+            p.next()
+            args.append(_parse_expr(p, prefixes))
+        p.expect(')')
+        return ('call', func, args)
+    return ('term', _parse_term(p, prefixes))
+
+
+def _label_constraint(expr):
+    """Map a FILTER atom to (var, (mode, text)), or raise ValueError"""
+    def var_of(arg, lcase):
+        # ?v, STR(?v), LCASE(?v), LCASE(STR(?v))
+        if arg[0] == 'call' and arg[1] == 'LCASE' and len(arg[2]) == 1:
+            return var_of(arg[2][0], True)
+        if arg[0] == 'call' and arg[1] == 'STR' and len(arg[2]) == 1:
+            return var_of(arg[2][0], lcase)
+        if arg[0] == 'term' and arg[1][0] == 'var':
+            return arg[1][1], lcase
+        raise ValueError("Unsupported FILTER argument")
+
+    def string_of(arg):
+        if arg[0] == 'term' and arg[1][0] == 'literal' and isinstance(arg[1][1], str):
+            return arg[1][1]
+        raise ValueError("FILTER comparison must be against a string literal")
+
+    if expr[0] == 'call' and expr[1] == 'CONTAINS' and len(expr[2]) == 2:
+        var, lcase = var_of(expr[2][0], False)
+        if not lcase:
+            raise ValueError("Only CONTAINS(LCASE(?v), ...) is supported")
+        return var, ('lcase_contains', string_of(expr[2][1]))
+    if expr[0] == '=':
+        left, right = expr[1], expr[2]
+        if left[0] == 'term' and left[1][0] == 'literal':
+            left, right = right, left
+        var, lcase = var_of(left, False)
+        return var, ('lcase_equals' if lcase else 'equals', string_of(right))
+    raise ValueError("Unsupported FILTER expression")
+
+
+def parse_fact_query(sparql_query):
+    """
+    Recognize a SPARQL metric lookup the fact index can answer
+
+    Supported shape (any subset, any order):
+        ?m a kg:FinancialMetric .
+        ?m kg:tableRow ?row | "text" .   ?m kg:tableColumn ?col | "text" .   ?m kg:label ?l | "text" .
+        ?m kg:forTimePeriod ?y . ?y kg:yearValue 2015 .
+        ?m kg:hasValue ?v . ?v kg:numericValue ?value . ?v kg:hasScale ?scaleURI .
+        FILTER(CONTAINS(LCASE(?row), "...")) / FILTER(LCASE(?col) = "...") / FILTER(?l = "...")
+        BIND(REPLACE(STR(?scaleURI), ".*[/#]", "") AS ?scale)
+
+    Returns:
+        Keyword arguments for FactIndex.find() plus 'scale_format'
+        ('local', 'uri' or None), or None if the query is outside the subset
+    """
+    try:
+        parsed = parse_select_query(sparql_query)
+        return _fact_query_from_parsed(parsed)
+    except (ValueError, IndexError):
+        return None
+
+
+def _fact_query_from_parsed(parsed):
+    if parsed['distinct'] or parsed['aggregates'] or parsed['modifiers']:
+        raise ValueError("Only plain SELECT queries are answered from the fact index")
+
+    by_predicate = {}
+    for s, p, o in parsed['triples']:
+        if p[1] in by_predicate and p[1] != 'rdf:type':
+            raise ValueError(f"Repeated predicate {p[1]}")
+        by_predicate.setdefault(p[1], []).append((s, o))
+
+    def only(predicate):
+        entries = by_predicate.pop(predicate, [])
+        if len(entries) > 1:
+            raise ValueError(f"Repeated predicate {predicate}")
+        return entries[0] if entries else None
+
+    has_value = only('kg:hasValue')
+    numeric = only('kg:numericValue')
+    if has_value is None or numeric is None:
+        raise ValueError("Query must reach kg:numericValue through kg:hasValue")
+    metric, value_entity = has_value
+    if metric[0] != 'var' or value_entity[0] != 'var' or numeric[0] != value_entity or numeric[1][0] != 'var':
+        raise ValueError("Unexpected hasValue/numericValue shape")
+    value_var = numeric[1][1]
+    bound_vars = {metric[1], value_entity[1], value_var}
+
+    query = {'metric_only': False, 'require_scale': False}
+    types = by_predicate.pop('rdf:type', [])
+    for subject, obj in types:
+        if subject != metric or obj != ('iri', 'kg:FinancialMetric'):
+            raise ValueError("Only '?metric a kg:FinancialMetric' is supported")
+        query['metric_only'] = True
+
+    scale_var = None
+    scale = only('kg:hasScale')
+    if scale is not None:
+        if scale[0] != value_entity or scale[1][0] != 'var':
+            raise ValueError("Unexpected hasScale shape")
+        scale_var = scale[1][1]
+        bound_vars.add(scale_var)
+        query['require_scale'] = True
+
+    label_vars = {}
+    for predicate, field in _METRIC_PREDICATES.items():
+        entry = only(predicate)
+        if entry is None:
+            continue
+        subject, obj = entry
+        if subject != metric:
+            raise ValueError(f"{predicate} must hang off the metric")
+        if obj[0] == 'var':
+            if obj[1] in bound_vars:
+                raise ValueError("Variable reused across roles")
+            bound_vars.add(obj[1])
+            label_vars[obj[1]] = field
+            query[field] = [('exists', None)]
+        elif obj[0] == 'literal' and isinstance(obj[1], str):
+            query[field] = [('equals', obj[1])]
+        else:
+            raise ValueError(f"Unsupported object for {predicate}")
+
+    period = only('kg:forTimePeriod')
+    year_value = only('kg:yearValue')
+    if period is not None or year_value is not None:
+        if period is None or year_value is None or period[0] != metric or period[1][0] != 'var' \
+                or year_value[0] != period[1] or year_value[1][0] != 'literal' \
+                or not isinstance(year_value[1][1], int) or period[1][1] in bound_vars:
+            raise ValueError("Year must be '?m kg:forTimePeriod ?y . ?y kg:yearValue NNNN'")
+        bound_vars.add(period[1][1])
+        query['year'] = year_value[1][1]
+
+    if by_predicate:
+        raise ValueError(f"Unsupported predicates: {sorted(by_predicate)}")
+
+    for expr in parsed['filters']:
+        atoms = expr[1] if expr[0] == 'and' else [expr]
+        for atom in atoms:
+            var, constraint = _label_constraint(atom)
+            if var not in label_vars:
+                raise ValueError(f"FILTER on unsupported variable ?{var}")
+            query[label_vars[var]].append(constraint)
+
+    scale_format = None
+    scale_aliases = {}
+    for expr, alias in parsed['binds']:
+        # BIND(REPLACE(STR(?scaleURI), ".*[/#]", "") AS ?scale)
+        if scale_var is None or alias in bound_vars or not (
+                expr[0] == 'call' and expr[1] == 'REPLACE' and len(expr[2]) == 3
+                and expr[2][0] == ('call', 'STR', [('term', ('var', scale_var))])
+                and expr[2][1] == ('term', ('literal', _SCALE_LOCAL_NAME_PATTERN))
+                and expr[2][2] == ('term', ('literal', ''))):
+            raise ValueError("Unsupported BIND")
+        scale_aliases[alias] = 'local'
+
+    # Mirror execute_sparql(): row.value if projected, else the first column
+    select = parsed['select']
+    if not select:
+        raise ValueError("SELECT * is not supported")
+    value_column = 'value' if 'value' in select else select[0]
+    if value_column != value_var:
+        raise ValueError("Projected value is not the numericValue")
+    if 'scale' in select:
+        if 'scale' in scale_aliases:
+            scale_format = 'local'
+        elif 'scale' == scale_var:
+            scale_format = 'uri'
+        else:
+            raise ValueError("Projected scale is not the hasScale value")
+    for var in select:
+        if var not in bound_vars and var not in scale_aliases:
+            raise ValueError(f"Projected variable ?{var} is unbound")
+
+    query['scale_format'] = scale_format
+    return query
+
+
+def answer_from_index(index, sparql_query):
+    """
+    Answer an execute_sparql() lookup from a fact index
+
+    Returns:
+        {value, scale, source} exactly as execute_sparql() would, or None on a miss
+    """
+    query = parse_fact_query(sparql_query)
+    if query is None:
+        return None
+    scale_format = query.pop('scale_format')
+
+    positions = index.find(**query)
+    if not positions:
+        return None
+
+    def scale_of(pos):
+        name = index.scale_name(pos)
+        if scale_format is None or name is None:
+            return 'Units'
+        return name if scale_format == 'local' else str(KG[name])
+
+    # Multiple matches are summed (same as execute_sparql)
+    scales = {scale_of(pos) for pos in positions}
+    return {
+        'value': math.fsum(index.values[positions].tolist()),
+        'scale': scales.pop() if len(scales) == 1 else 'Units',
+        'source': 'knowledge graph'
+    }
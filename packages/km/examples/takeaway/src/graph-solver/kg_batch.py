@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Message Batches mode for bulk KG extraction
+
+KGExtractor.extract makes up to three blocking Instructor calls per example.
+BatchKGExtractor submits the same calls for many examples as Anthropic
+message batches instead, in two rounds:
+
+    Round 1: table semantics for every example with a table
+    Round 2: table pass and text pass (both need the table semantics)
+
+Round 2 results are streamed back as each batch ends, and an example's
+extraction is yielded as soon as both of its passes are in, ready for
+build_rdflib_graph.
+
+Every submitted batch and every parsed result is appended to a JSONL journal
+(data/.kg_batch_journal.jsonl by default). A rerun after an interruption
+reuses journaled results, re-polls batches that were still open and only
+submits what is missing. Requests are identified by a hash of their full
+parameters, so a changed prompt or ontology never reuses a stale result.
+Responses are also written to the LLM response cache (common.llm_cache), and
+requests it already holds are never submitted.
+
+Results that errored, expired or fail validation fall back to the normal
+synchronous Instructor call (which retries with validation feedback). If that
+fails too, the examples that needed the request are skipped and counted in
+stats()['failed']; nothing is journaled for them, so a rerun retries them.
+
+Extraction requests carry KGExtractor's static prompt prefix as a cache
+breakpoint, and each result's token usage is recorded per phase (see
+common.prompt_cache).
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+from anthropic import NotFoundError
+from pydantic import ValidationError
+
+# Add parent directories to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from common import llm_cache
+from common.anthropic_client import get_anthropic_client
+from common.llm_cache import cached_structured_call
+from common.prompt_cache import record_usage
+from extraction_models import ExtractionResult
+from table_models import TableSemantics
+
+DEFAULT_JOURNAL_PATH = Path(__file__).parent.parent.parent / "data" / ".kg_batch_journal.jsonl"
+BATCH_POLL_SECONDS = float(os.getenv("KG_BATCH_POLL_SECONDS", "30"))
+MAX_BATCH_REQUESTS = 10_000  # API limit is 100,000 requests / 256 MB per batch; smaller batches end sooner
+CALL_PHASES = {"semantics": "kg_table_semantics", "table": "kg_table_extraction", "text": "kg_text_extraction"}
+
+
+def tool_request(request: Dict[str, Any], response_model) -> Dict[str, Any]:
+    """
+    messages.create parameters forcing a tool call that returns response_model (as Instructor does)
+
+    Args:
+        request: model, max_tokens, temperature, messages
+        response_model: Pydantic model the tool input is validated into
+
+    Returns:
+        Request with tools and tool_choice added
+    """
+    name = response_model.__name__
+    return {
+        **request,
+        "tools": [{
+            "name": name,
+            "description": (response_model.__doc__ or name).strip(),
+            "input_schema": response_model.model_json_schema(),
+        }],
+        "tool_choice": {"type": "tool", "name": name},
+    }
+
+
+def parse_tool_result(message, response_model):
+    """Validate the tool_use input of a batch result message into response_model"""
+    for block in message.content:
+        if block.type == "tool_use":
+            return response_model.model_validate(block.input)
+    raise ValueError(f"No tool_use block in message {message.id}")
+
+
+def _custom_id(call: str, example_id: str, request: Dict[str, Any], response_model) -> str:
+    # Batch custom_ids are limited to 64 characters of [a-zA-Z0-9_-]
+    digest = hashlib.sha256(json.dumps(tool_request(request, response_model), sort_keys=True,
+                                       default=str).encode()).hexdigest()[:24]
+    return f"{call}-{re.sub(r'[^a-zA-Z0-9_-]', '_', str(example_id))[:24]}-{digest}"
+
+
+def _phase(custom_id: str) -> str:
+    return CALL_PHASES.get(custom_id.split("-", 1)[0])
+
+
+class BatchJournal:
+    """
+    Append-only JSONL record of submitted batches and parsed results
+
+    Lines are {"event": "submitted", "batch_id", "custom_ids"},
+    {"event": "result", "custom_id", "response"} and {"event": "ended", "batch_id"}.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.batches = {}  # {batch_id: [custom_id, ...]} for batches not fully streamed yet
+        self.results = {}  # {custom_id: response JSON}
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from an interrupted write
+                    if entry["event"] == "submitted":
+                        self.batches[entry["batch_id"]] = entry["custom_ids"]
+                    elif entry["event"] == "result":
+                        self.results[entry["custom_id"]] = entry["response"]
+                    elif entry["event"] == "ended":
+                        self.batches.pop(entry["batch_id"], None)
+
+    def _append(self, entry):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def record_submitted(self, batch_id, custom_ids):
+        self.batches[batch_id] = list(custom_ids)
+        self._append({"event": "submitted", "batch_id": batch_id, "custom_ids": list(custom_ids)})
+
+    def record_result(self, custom_id, response):
+        self.results[custom_id] = response
+        self._append({"event": "result", "custom_id": custom_id, "response": response})
+
+    def record_ended(self, batch_id):
+        self.batches.pop(batch_id, None)
+        self._append({"event": "ended", "batch_id": batch_id})
+
+
+class BatchKGExtractor:
+    """
+    Runs KGExtractor's LLM calls for many examples through message batches
+
+    Args:
+        extractor: KGExtractor (prompts, model and post-processing)
+        journal_path: JSONL journal for resuming (DEFAULT_JOURNAL_PATH by default)
+        poll_seconds: Wait between batch status checks
+        max_batch_requests: Requests per submitted batch
+    """
+
+    def __init__(self, extractor, journal_path=None, poll_seconds: float = BATCH_POLL_SECONDS,
+                 max_batch_requests: int = MAX_BATCH_REQUESTS):
+        self.extractor = extractor
+        self.journal = BatchJournal(journal_path or DEFAULT_JOURNAL_PATH)
+        self.poll_seconds = poll_seconds
+        self.max_batch_requests = max_batch_requests
+        self.batches = get_anthropic_client().messages.batches
+        self._stats = {"journaled": 0, "cached": 0, "submitted": 0, "batches": 0,
+                       "succeeded": 0, "fallbacks": 0, "failed": 0}
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of requests served from the journal/cache, submitted, sent synchronously, and failed"""
+        return dict(self._stats)
+
+    def _finish(self, custom_id, request, response_model, key, result):
+        response = result.model_dump_json()
+        self.journal.record_result(custom_id, response)
+        llm_cache.store(key, request, response)
+        return result
+
+    def _fallback(self, custom_id, request, response_model, key):
+        self._stats["fallbacks"] += 1
+        try:
+            result = cached_structured_call(self.extractor.client.messages.create, response_model,
+                                            phase=_phase(custom_id), **request)
+        except Exception as e:
+            self._stats["failed"] += 1
+            print(f"  Warning: synchronous fallback for {custom_id} failed: {e}")
+            return None
+        return self._finish(custom_id, request, response_model, key, result)
+
+    def _run_round(self, calls: Dict[str, Tuple[Dict[str, Any], Any]]) -> Iterator[Tuple[str, Any]]:
+        """
+        Resolve structured calls through the journal, the LLM cache and message batches
+
+        Args:
+            calls: {custom_id: (request, response_model)}
+
+        Yields:
+            (custom_id, response_model instance), journal and cache hits first,
+            then batch results as their batches end; the instance is None for
+            requests whose synchronous fallback failed
+        """
+        pending = {}
+        for custom_id, (request, response_model) in calls.items():
+            if custom_id in self.journal.results:
+                self._stats["journaled"] += 1
+                yield custom_id, response_model.model_validate_json(self.journal.results[custom_id])
+                continue
+            key, cached = llm_cache.lookup(request, response_model)
+            if cached is not None:
+                self._stats["cached"] += 1
+                yield custom_id, self._finish(custom_id, request, response_model, key,
+                                              response_model.model_validate_json(cached))
+                continue
+            pending[custom_id] = (request, response_model, key)
+
+        # Resume batches an earlier run submitted, then submit whatever they don't cover
+        open_batches = [batch_id for batch_id, custom_ids in self.journal.batches.items()
+                        if pending.keys() & set(custom_ids)]
+        in_flight = {custom_id for batch_id in open_batches for custom_id in self.journal.batches[batch_id]}
+        to_submit = [custom_id for custom_id in pending if custom_id not in in_flight]
+        for start in range(0, len(to_submit), self.max_batch_requests):
+            chunk = to_submit[start:start + self.max_batch_requests]
+            batch = self.batches.create(requests=[
+                {"custom_id": custom_id, "params": tool_request(*pending[custom_id][:2])} for custom_id in chunk
+            ])
+            self.journal.record_submitted(batch.id, chunk)
+            open_batches.append(batch.id)
+            self._stats["submitted"] += len(chunk)
+            self._stats["batches"] += 1
+            print(f"  Submitted batch {batch.id} ({len(chunk)} requests)")
+
+        while open_batches:
+            for batch_id in list(open_batches):
+                try:
+                    batch = self.batches.retrieve(batch_id)
+                    if batch.processing_status != "ended":
+                        continue
+                    entries = self.batches.results(batch_id)
+                except NotFoundError:
+                    print(f"  Warning: batch {batch_id} no longer exists, resubmitting synchronously")
+                    entries = []
+                for entry in entries:
+                    if entry.custom_id not in pending:
+                        continue
+                    request, response_model, key = pending.pop(entry.custom_id)
+                    result = None
+                    if entry.result.type == "succeeded":
+                        record_usage(_phase(entry.custom_id), entry.result.message.usage)
+                        try:
+                            result = parse_tool_result(entry.result.message, response_model)
+                        except (ValueError, ValidationError) as e:
+                            print(f"  Warning: invalid batch result for {entry.custom_id}: {e}")
+                    if result is None:
+                        yield entry.custom_id, self._fallback(entry.custom_id, request, response_model, key)
+                    else:
+                        self._stats["succeeded"] += 1
+                        yield entry.custom_id, self._finish(entry.custom_id, request, response_model, key, result)
+                self.journal.record_ended(batch_id)
+                open_batches.remove(batch_id)
+            if open_batches:
+                time.sleep(self.poll_seconds)
+
+        # Requests whose batch lost them (expired, deleted) go through the normal path
+        for custom_id, (request, response_model, key) in list(pending.items()):
+            yield custom_id, self._fallback(custom_id, request, response_model, key)
+
+    def extract_all(self, examples: Dict[str, Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Extract many examples through message batches
+
+        Args:
+            examples: {example_id: preprocessed data} (see kg_extractor.preprocess_example)
+
+        Yields:
+            (example_id, extraction) in completion order - the same dict KGExtractor.extract returns.
+            Examples with a failed request are skipped (see stats()['failed'])
+        """
+        extractor = self.extractor
+        table_processor = extractor.table_processor
+        structures, semantics, failed = {}, {}, set()
+
+        # Round 1: table semantics
+        semantics_calls, owners = {}, {}
+        for example_id, data in examples.items():
+            table = data.get("table", {})
+            if not table:
+                continue
+            text_content = data.get("knowledge_base", {}).get("text_content", [])
+            structures[example_id] = table_processor.extract_structure(table)
+            request = table_processor.semantics_request(structures[example_id],
+                                                        "\n".join(text_content) if text_content else "")
+            custom_id = _custom_id("semantics", example_id, request, TableSemantics)
+            semantics_calls[custom_id] = (request, TableSemantics)
+            owners[custom_id] = example_id
+        print(f"Round 1: table semantics for {len(semantics_calls)} examples")
+        for custom_id, result in self._run_round(semantics_calls):
+            if result is None:
+                failed.add(owners[custom_id])
+            else:
+                semantics[owners[custom_id]] = result
+
+        # Round 2: table and text passes
+        extraction_calls, owners, passes_needed = {}, {}, {}
+        for example_id, data in examples.items():
+            if example_id in failed:
+                print(f"  ✗ Example {example_id} skipped: table semantics request failed")
+                continue
+            table = data.get("table", {})
+            kb = data.get("knowledge_base", {})
+            text_content = kb.get("text_content", [])
+            prompts = {"table": extractor._table_prompt(table, kb, example_id, structures.get(example_id),
+                                                        semantics.get(example_id))}
+            if text_content:
+                prompts["text"] = extractor._text_prompt(table, text_content, example_id, semantics.get(example_id))
+            for pass_name, prompt in prompts.items():
+                request = extractor.extraction_request(prompt)
+                custom_id = _custom_id(pass_name, example_id, request, ExtractionResult)
+                extraction_calls[custom_id] = (request, ExtractionResult)
+                owners[custom_id] = (example_id, pass_name, prompt)
+            passes_needed[example_id] = len(prompts)
+        print(f"Round 2: {len(extraction_calls)} table/text passes for {len(passes_needed)} examples")
+
+        done = {example_id: {} for example_id in passes_needed}
+        for custom_id, result in self._run_round(extraction_calls):
+            example_id, pass_name, prompt = owners[custom_id]
+            if example_id in failed:
+                continue
+            if result is None:
+                print(f"  ✗ Example {example_id} skipped: {pass_name} pass request failed")
+                failed.add(example_id)
+                done.pop(example_id)
+                continue
+            data = examples[example_id]
+            if pass_name == "table":
+                done[example_id]["table"] = extractor._finish_table_extraction(
+                    result, prompt, example_id, structures.get(example_id))
+            else:
+                done[example_id]["text"] = extractor._finish_text_extraction(
+                    result, prompt, example_id, data.get("knowledge_base", {}).get("text_content", []))
+            if len(done[example_id]) == passes_needed[example_id]:
+                passes = done.pop(example_id)
+                yield example_id, extractor._assemble_extraction(
+                    data, example_id, passes["table"], passes.get("text"),
+                    structures.get(example_id), semantics.get(example_id))
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Shared SQLite store for cached KG and ontology graphs (data/.kg_cache.db)
+
+Cache entries are keyed by the SHA-256 of the turtle file, not its mtime, so
+git checkouts and touches don't force rebuilds. Each process keeps one
+metadata connection and one opened rdflib-sqlalchemy store per database
+file, with WAL journaling so readers never block on a writer.
+
+A rebuild parses the turtle file in memory, inserts it in one transaction
+into a fresh content-addressed named graph ({prefix}@{hash}), then swaps the
+metadata row to point at it and drops the old graph. Rebuilds are
+serialized across processes with a lock file, and re-checked after taking
+the lock, so parallel batch workers never rebuild the same KG twice. Within
+a process, rebuilds wait on a per-database lock, so cache hits never queue
+behind a rebuild.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from rdflib import Graph
+from rdflib.store import Store
+from rdflib import plugin
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds are only serialized within a process
+    fcntl = None
+
+# Register SQLite plugin for RDFLib
+try:
+    import rdflib_sqlalchemy
+    rdflib_sqlalchemy.registerplugins()
+except ImportError:
+    pass  # SQLite plugin not available, will use fallback
+
+BUSY_TIMEOUT_SECONDS = 30
+
+_lock = threading.RLock()  # Guards the handle and metadata dicts below, never held during a rebuild
+_connections = {}  # {db_path: (pid, file_id, sqlite3.Connection)}
+_stores = {}  # {db_path: (pid, file_id, SQLAlchemy store)}
+_stats = {"hits": 0, "rebuilds": 0}
+_build_locks = {}  # {db_path: (pid, threading.RLock serializing this process's rebuilds)}
+_build_lock_depth = {}  # {db_path: re-entry depth of the lock file held by this process}
+
+
+def _file_id(db_path):
+    try:
+        stat = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+
+def _drop_handles(key, same_process):
+    """Forget cached handles for a database file (closing them if this process opened them)"""
+    conn_entry = _connections.pop(key, None)
+    store_entry = _stores.pop(key, None)
+    if not same_process:
+        return  # Never close SQLite handles inherited across fork()
+    if store_entry is not None:
+        store_entry[2].close()
+    if conn_entry is not None:
+        conn_entry[2].close()
+
+
+def _ensure_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cache_metadata (
+            example_id TEXT PRIMARY KEY,
+            turtle_mtime REAL,
+            cached_at REAL
+        )
+    """)
+    # Databases created before content-hash keys only have the mtime columns
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(cache_metadata)")}
+    for column in ("content_hash", "graph_id"):
+        if column not in columns:
+            try:
+                conn.execute(f"ALTER TABLE cache_metadata ADD COLUMN {column} TEXT")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):
+                    raise  # Another worker migrated it first otherwise
+
+
+def get_cache_connection(db_path):
+    """
+    Return this process's shared metadata connection for a cache database
+
+    The connection is reopened if the database file was deleted or replaced
+    (or after fork). The connection is shared across threads, so use it only
+    through the helpers in this module, which serialize access.
+
+    Args:
+        db_path: Path to the SQLite cache file
+
+    Returns:
+        sqlite3.Connection in autocommit mode with WAL journaling
+    """
+    db_path = Path(db_path)
+    key = str(db_path)
+    with _lock:
+        entry = _connections.get(key)
+        file_id = _file_id(db_path)
+        if entry is not None and entry[0] == os.getpid() and entry[1] == file_id and file_id is not None:
+            return entry[2]
+        if entry is not None or key in _stores:
+            _drop_handles(key, same_process=entry is None or entry[0] == os.getpid())
+
+        if file_id is None:
+            # A WAL left behind by a deleted database must not be replayed into a new one
+            for suffix in ("-wal", "-shm"):
+                Path(key + suffix).unlink(missing_ok=True)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(key, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_SECONDS * 1000}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        _ensure_schema(conn)
+        _connections[key] = (os.getpid(), _file_id(db_path), conn)
+        return conn
+
+
+def get_cache_store(db_path):
+    """Return this process's shared, opened rdflib-sqlalchemy store for a cache database"""
+    db_path = Path(db_path)
+    key = str(db_path)
+    with _lock:
+        get_cache_connection(db_path)  # Reopens everything if the file changed
+        entry = _stores.get(key)
+        if entry is not None:
+            return entry[2]
+
+    # Table creation races between processes, so do it under the build lock
+    with _build_lock(db_path):
+        with _lock:
+            get_cache_connection(db_path)
+            entry = _stores.get(key)
+            if entry is not None:
+                return entry[2]  # Another thread opened it while we waited
+        store = plugin.get("SQLAlchemy", Store)()
+        store.open({"url": f"sqlite:///{db_path}",
+                    "connect_args": {"timeout": BUSY_TIMEOUT_SECONDS}}, create=True)
+        with _lock:
+            _stores[key] = (os.getpid(), _file_id(db_path), store)
+        return store
+
+
+@contextmanager
+def _build_lock(db_path):
+    """Exclusive cross-process lock for rebuilding entries in one cache database (re-entrant)"""
+    key = str(db_path)
+    with _lock:
+        entry = _build_locks.get(key)
+        if entry is None or entry[0] != os.getpid():
+            entry = _build_locks[key] = (os.getpid(), threading.RLock())
+    with entry[1]:
+        if fcntl is None or _build_lock_depth.get(key):
+            _build_lock_depth[key] = _build_lock_depth.get(key, 0) + 1
+            try:
+                yield
+            finally:
+                _build_lock_depth[key] -= 1
+            return
+        with open(f"{db_path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            _build_lock_depth[key] = 1
+            try:
+                yield
+            finally:
+                _build_lock_depth[key] = 0
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def file_content_hash(path):
+    """SHA-256 hex digest of a file's contents"""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def cache_entry(db_path, cache_key):
+    """
+    Look up the metadata row for a cached graph
+
+    Returns:
+        {'content_hash', 'graph_id', 'cached_at'} or None if never cached
+    """
+    with _lock:
+        row = get_cache_connection(db_path).execute(
+            "SELECT content_hash, graph_id, cached_at FROM cache_metadata WHERE example_id = ?",
+            (cache_key,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {"content_hash": row[0], "graph_id": row[1], "cached_at": row[2]}
+
+
+def is_cache_valid(db_path, cache_key, turtle_path, content_hash=None):
+    """Check whether the cached graph was built from the turtle file's current contents"""
+    if not Path(db_path).exists():
+        return False
+    entry = cache_entry(db_path, cache_key)
+    if entry is None or entry["content_hash"] is None:
+        return False
+    return entry["content_hash"] == (content_hash or file_content_hash(turtle_path))
+
+
+def load_cached_graph(db_path, cache_key, turtle_path, graph_prefix, content_hash=None):
+    """
+    Open a cached graph, rebuilding it atomically if missing or stale
+
+    Args:
+        db_path: Path to the SQLite cache file
+        cache_key: Metadata key (example id, or 'ontology')
+        turtle_path: Source turtle file
+        graph_prefix: Named-graph prefix (also the pre-content-hash graph name)
+        content_hash: SHA-256 of the turtle file (computed if not given)
+
+    Returns:
+        rdflib.Graph over the shared SQLite store
+    """
+    content_hash = content_hash or file_content_hash(turtle_path)
+
+    entry = cache_entry(db_path, cache_key)
+    if entry is None or entry["content_hash"] != content_hash:
+        with _build_lock(db_path):
+            # Another worker may have finished the same rebuild while we waited
+            entry = cache_entry(db_path, cache_key)
+            if entry is None or entry["content_hash"] != content_hash:
+                triples, namespaces = parse_turtle(turtle_path)
+                store_parsed_graphs(db_path, [{
+                    "cache_key": cache_key, "turtle_path": turtle_path, "graph_prefix": graph_prefix,
+                    "content_hash": content_hash, "triples": triples, "namespaces": namespaces,
+                }])
+                entry = cache_entry(db_path, cache_key)
+            else:
+                with _lock:
+                    _stats["hits"] += 1
+    else:
+        with _lock:
+            _stats["hits"] += 1
+
+    return Graph(get_cache_store(db_path), identifier=entry["graph_id"])
+
+
+def parse_turtle(turtle_path):
+    """
+    Parse a turtle file into plain triples and namespace bindings
+
+    Returns:
+        (triples, namespaces) - picklable, so parsing can run in worker processes
+    """
+    parsed = Graph()
+    parsed.parse(str(turtle_path), format="turtle")
+    return list(parsed), [(prefix, str(namespace)) for prefix, namespace in parsed.namespaces()]
+
+
+def store_parsed_graphs(db_path, entries):
+    """
+    Bulk-insert already parsed graphs and swap their metadata rows in
+
+    All stale entries go into one insert transaction followed by one metadata
+    transaction. Entries whose content hash is already cached are skipped.
+
+    Args:
+        db_path: Path to the SQLite cache file
+        entries: dicts with cache_key, turtle_path, graph_prefix, content_hash,
+            triples and namespaces (see parse_turtle)
+
+    Returns:
+        List of cache keys that were (re)built
+    """
+    with _build_lock(db_path):
+        store = get_cache_store(db_path)
+        pending = []
+        for entry in entries:
+            current = cache_entry(db_path, entry["cache_key"])
+            if current is not None and current["content_hash"] == entry["content_hash"]:
+                continue  # Another worker already built this content
+            old_graph_id = (current["graph_id"] or entry["graph_prefix"]) if current else None
+            g = Graph(store, identifier=f"{entry['graph_prefix']}@{entry['content_hash'][:16]}")
+
+            # Leftovers from an interrupted build of the same content
+            store.remove((None, None, None), context=g)
+            for prefix, namespace in entry["namespaces"]:
+                g.bind(prefix, namespace)
+            pending.append((entry, g, old_graph_id))
+
+        if not pending:
+            return []
+
+        store.addN((s, p, o, g) for entry, g, _ in pending for s, p, o in entry["triples"])
+
+        now = time.time()
+        rows = [(entry["cache_key"], Path(entry["turtle_path"]).stat().st_mtime, now,
+                 entry["content_hash"], str(g.identifier)) for entry, g, _ in pending]
+        with _lock:
+            conn = get_cache_connection(db_path)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO cache_metadata
+                        (example_id, turtle_mtime, cached_at, content_hash, graph_id)
+                    VALUES (?, ?, ?, ?, ?)
+                """, rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        for _, g, old_graph_id in pending:
+            if old_graph_id and old_graph_id != str(g.identifier):
+                store.remove((None, None, None), context=Graph(store, identifier=old_graph_id))
+        with _lock:
+            _stats["rebuilds"] += len(pending)
+        return [entry["cache_key"] for entry, _, _ in pending]
+
+
+def cache_stats():
+    """Return hit/rebuild counters for this process"""
+    with _lock:
+        return dict(_stats)
@@ -1,12 +1,124 @@
 #!/usr/bin/env python3
-"""Extract KG data for inclusion in Phase 0 and Phase 1 prompts"""
+"""Extract KG data for inclusion in Phase 0 and Phase 1 prompts
+
+The rendered text is the same for every turn of a conversation and for both
+phases, so it is cached in two levels keyed by (example_id, KG content hash,
+FORMATTER_VERSION): an in-process LRU, then one text file per key under
+data/.prompt_context/ that is shared across runs and parallel workers.
+"""
+import os
 import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from execution import load_graph, extract_sample_entities
-from phase2_llm_extraction import extract_table_data_for_prompt
+from execution import _kg_content_hash, _kg_path
+from kg_prompt_data import load_kg_prompt_data
+
+# Bump when the rendered text changes so stale on-disk entries are ignored
+FORMATTER_VERSION = 1
+
+NO_KG_MESSAGE = "No knowledge graph available for this example."
+
+
+class PromptContextCache:
+    """
+    Two-level cache of rendered prompt context
+
+    Level 1 is an in-process LRU of rendered strings; level 2 is a directory
+    of text files named by example, KG content hash and formatter version,
+    written atomically.
+    """
+
+    def __init__(self, cache_dir, max_entries=128):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # {(example_id, content_hash, version): text}
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        example_id, content_hash, version = key
+        return self.cache_dir / f"{example_id}-{content_hash[:16]}-v{version}.txt"
+
+    def get(self, key):
+        """Return cached text for key (from memory, then disk), or None"""
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return text
+
+        try:
+            text = self._path(key).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, text)
+        return text
+
+    def put(self, key, text):
+        """Store rendered text in memory and on disk"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding='utf-8')
+        os.replace(tmp_path, path)
+
+        # Entries for older KG contents or formatter versions are dead
+        for old_path in self.cache_dir.glob(f"{key[0]}-*.txt"):
+            if old_path != path:
+                old_path.unlink(missing_ok=True)
+
+        with self._lock:
+            self._remember(key, text)
 
+    def _remember(self, key, text):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
 
-def format_kg_data_for_prompt(example_id, verbose=False):
+    def clear(self, disk=False):
+        """Drop in-process entries (and the on-disk files if disk=True); stats are kept"""
+        with self._lock:
+            self._entries.clear()
+        if disk:
+            for path in self.cache_dir.glob("*.txt"):
+                path.unlink(missing_ok=True)
+
+    def stats(self):
+        """Hit counters per level and overall hit rate"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+
+_prompt_cache = PromptContextCache(
+    Path(__file__).parent.parent.parent / "data" / ".prompt_context",
+    max_entries=int(os.getenv('KG_PROMPT_CACHE_SIZE', '128'))
+)
+
+
+def prompt_context_cache_stats():
+    """Return hit/miss counters for the rendered prompt-context cache"""
+    return _prompt_cache.stats()
+
+
+def format_kg_data_for_prompt(example_id, verbose=False, use_cache=True):
     """
     Extract and format KG data structure for Phase 0 and Phase 1 prompts
 
@@ -17,17 +129,42 @@ def format_kg_data_for_prompt(example_id, verbose=False):
     - Column/row header values
 
     This helps the LLM ground its understanding in actual available data.
+    Rendered text is cached per KG content hash (see PromptContextCache);
+    use_cache=False re-renders it and refreshes the cache.
     """
+    kg_path = _kg_path(example_id)
+    if not kg_path.exists():
+        if verbose:
+            print(f"Warning: No KG found for example {example_id}")
+        return NO_KG_MESSAGE
+
+    key = (str(example_id), _kg_content_hash(kg_path), FORMATTER_VERSION)
+    if use_cache:
+        text = _prompt_cache.get(key)
+        if text is not None:
+            return text
+
     try:
-        kg_graph = load_graph(example_id)
+        # Extract structured data (one scan per KG content hash)
+        kg_prompt_data = load_kg_prompt_data(example_id)
     except FileNotFoundError:
         if verbose:
             print(f"Warning: No KG found for example {example_id}")
-        return "No knowledge graph available for this example."
+        return NO_KG_MESSAGE
+
+    text = render_kg_data_for_prompt(kg_prompt_data)
+    _prompt_cache.put(key, text)
+    return text
 
-    # Extract structured data
-    sample_entities = extract_sample_entities(kg_graph)
-    table_data = extract_table_data_for_prompt(kg_graph)
+
+def render_kg_data_for_prompt(kg_prompt_data):
+    """
+    Render prompt data from kg_prompt_data.load_kg_prompt_data() as prompt text
+
+    Changes to the output must bump FORMATTER_VERSION.
+    """
+    sample_entities = kg_prompt_data['sample_entities']
+    table_data = kg_prompt_data['table_data']
 
     # Build formatted output
     lines = []
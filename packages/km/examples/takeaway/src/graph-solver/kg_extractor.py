@@ -13,25 +13,34 @@ Extracts:
 - Relationships (hasMetric, hasValue, forTimePeriod, inCategory)
 
 All values must be proper entities, not raw literals!
+
+The Anthropic SDK, Instructor, Jinja2 and RDFLib are imported on first use,
+so importing this module (e.g. for preprocess_example) stays cheap.
 """
 
 import json
 import os
+import sys
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 from datetime import datetime
-from dotenv import load_dotenv
-import instructor
-from anthropic import Anthropic, APIError
-from jinja2 import Environment, FileSystemLoader
-from rdflib import Graph, Namespace, Literal, URIRef
-from rdflib.namespace import RDF, RDFS, XSD, OWL, DCTERMS
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from pymongo import MongoClient
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
+
+# Add parent directories to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from common.anthropic_client import get_instructor_client
+from common.env import load_env
+from common.llm_cache import cached_structured_call
+from common.log_sink import get_log_sink
+from common.prompt_cache import content_text, prompt_content
+from common.prompt_store import BLOB_COLLECTION, prompt_fields
 from extraction_models import ExtractionResult
 from table_processor import TableProcessor
 from table_models import TableStructure, TableSemantics
 
+if TYPE_CHECKING:
+    from rdflib import Graph
+
 
 # Scale factors for canonical value conversion
 SCALE_FACTORS = {
@@ -41,27 +50,12 @@ SCALE_FACTORS = {
     'Billions': 1_000_000_000
 }
 
-# MongoDB connection for logging KG extraction (separate from llm_interactions)
+# MongoDB logging of KG extraction (separate from llm_interactions)
 # This logs to kg_extraction_logs collection to track KG building process
-_mongo_client = None
-_kg_extraction_logs = None
 
 def _get_mongo_logs():
-    """Get MongoDB collection for KG extraction logs (singleton pattern)"""
-    global _mongo_client, _kg_extraction_logs
-
-    if _kg_extraction_logs is None:
-        try:
-            load_dotenv()
-            mongo_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
-            _mongo_client = MongoClient(mongo_uri)
-            mongo_db = _mongo_client['legion_tools']
-            _kg_extraction_logs = mongo_db['kg_extraction_logs']
-        except Exception as e:
-            print(f"Warning: MongoDB connection for KG extraction logs failed: {e}")
-            _kg_extraction_logs = None
-
-    return _kg_extraction_logs
+    """Background writer for the kg_extraction_logs collection (see common.log_sink)"""
+    return get_log_sink('kg_extraction_logs')
 
 
 def canonicalize_values(extraction_result: Dict) -> Dict:
@@ -107,67 +101,125 @@ def canonicalize_values(extraction_result: Dict) -> Dict:
     return extraction_result
 
 
+def preprocess_example(example_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build KGExtractor.extract input from a ConvFinQA dataset record
+
+    Args:
+        example_data: Dataset record with 'id' and 'doc' (table, pre_text, post_text)
+
+    Returns:
+        Dict with 'example_id', 'table' ({row: {column: value}}) and 'knowledge_base'
+    """
+    preprocessed = {
+        'example_id': example_data['id'],
+        'table': {},
+        'knowledge_base': {
+            'extracted_values': {},
+            'table_metadata': {}
+        }
+    }
+
+    # Extract table data
+    doc = example_data.get('doc', {})
+    if 'table' in doc and isinstance(doc['table'], dict):
+        # Table is already in dict format
+        preprocessed['table'] = doc['table']
+    elif 'table' in doc and isinstance(doc['table'], list):
+        # Convert table from list format
+        raw_table = doc['table']
+        if len(raw_table) > 1:
+            headers = raw_table[0]
+            for row in raw_table[1:]:
+                if len(row) > 0:
+                    row_label = str(row[0]).strip()
+                    preprocessed['table'][row_label] = {}
+                    for i, value in enumerate(row[1:], 1):
+                        if i < len(headers):
+                            col_label = str(headers[i]).strip()
+                            preprocessed['table'][row_label][col_label] = value
+
+    # Add text content for entity extraction
+    # CRITICAL: pre_text and post_text are character-by-character lists, must join them
+    text_parts = []
+    if 'pre_text' in doc:
+        pre_text = doc['pre_text']
+        if isinstance(pre_text, list):
+            pre_text = ''.join(pre_text)
+        text_parts.append(pre_text)
+    if 'post_text' in doc:
+        post_text = doc['post_text']
+        if isinstance(post_text, list):
+            post_text = ''.join(post_text)
+        text_parts.append(post_text)
+    preprocessed['knowledge_base']['text_content'] = text_parts
+
+    return preprocessed
+
+
+def _retryable(exception: BaseException) -> bool:
+    """API errors and malformed JSON are retried (anthropic is imported only once a call failed)"""
+    if isinstance(exception, json.JSONDecodeError):
+        return True
+    from anthropic import APIError
+    return isinstance(exception, APIError)
+
+
 class KGExtractor:
     """Extracts knowledge graphs from financial documents using ConvFinQA ontology as guidance"""
 
     def __init__(self):
         """Initialize extractor with Instructor for structured outputs"""
-        load_dotenv()
-
-        # Create base Anthropic client
-        base_client = Anthropic(
-            api_key=os.getenv("ANTHROPIC_API_KEY"),
-            base_url=os.getenv("ANTHROPIC_BASE_URL")
-        )
+        from jinja2 import Environment, FileSystemLoader
 
-        # Wrap with Instructor for structured outputs
-        self.client = instructor.from_anthropic(base_client)
+        load_env()
         self.model = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
 
-        # Load ontology (semantic guidance only, not full TTL)
-        from ontology_loader import load_semantic_guidance
+        # Load ontology guidance and version from the materialized artifact (no TTL parse)
+        from ontology_loader import load_ontology_artifact
         ontology_path = Path(__file__).parent.parent.parent / "ontology" / "convfinqa-ontology.ttl"
-        self.ontology_guidance = load_semantic_guidance(ontology_path)
+        ontology_artifact = load_ontology_artifact(ontology_path)
+        self.ontology_guidance = ontology_artifact['guidance_text']
 
         # Read ontology version
-        self.ontology_version, self.ontology_modified = self._read_ontology_version(ontology_path)
+        self.ontology_version, self.ontology_modified = self._read_ontology_version(ontology_path, ontology_artifact)
 
         # Set up Jinja2
         template_dir = Path(__file__).parent / "prompts"
         self.jinja_env = Environment(loader=FileSystemLoader(str(template_dir)))
 
+        # Ontology guidance and extraction rules are the same for every table and text
+        # pass; rendered once and sent as a prompt-cache breakpoint before the document
+        self.static_prefix = self.jinja_env.get_template('ontology_extraction_prefix.j2').render(
+            ontology=self.ontology_guidance
+        )
+
         # Initialize TableProcessor for programmatic table structure extraction
         self.table_processor = TableProcessor()
 
-    def _read_ontology_version(self, ontology_path: Path) -> tuple[str, str]:
+    @property
+    def client(self):
+        """Shared pooled Anthropic client, wrapped with Instructor for structured outputs (built on first use)"""
+        return get_instructor_client()
+
+    def _read_ontology_version(self, ontology_path: Path, artifact: Optional[Dict[str, Any]] = None) -> tuple[str, str]:
         """
         Read version information from the ontology
 
         Args:
             ontology_path: Path to ontology .ttl file
+            artifact: Materialized ontology artifact (loaded if not given)
 
         Returns:
             Tuple of (version_string, modified_date_string)
         """
-        g = Graph()
-        g.parse(str(ontology_path), format='turtle')
+        if artifact is None:
+            from ontology_loader import load_ontology_artifact
+            artifact = load_ontology_artifact(ontology_path)
 
-        KG = Namespace("http://example.org/convfinqa/")
-
-        # Find the ontology resource
-        ontology_uri = KG.ConvFinQAOntology
-
-        # Read owl:versionInfo
-        version = None
-        for _, _, v in g.triples((ontology_uri, OWL.versionInfo, None)):
-            version = str(v)
-            break
-
-        # Read dc:modified
-        modified = None
-        for _, _, m in g.triples((ontology_uri, DCTERMS.modified, None)):
-            modified = str(m)
-            break
+        # owl:versionInfo and dc:modified of kg:ConvFinQAOntology
+        version = artifact['version']
+        modified = artifact['modified']
 
         if version is None:
             raise ValueError(f"Ontology {ontology_path} missing owl:versionInfo")
@@ -236,7 +288,24 @@ class KGExtractor:
                 example_id,
                 table_semantics  # Pass table semantics for context
             )
+        else:
+            text_extraction = None
+
+        return self._assemble_extraction(preprocessed_data, example_id, table_extraction, text_extraction,
+                                         table_structure, table_semantics)
 
+    def _assemble_extraction(
+        self,
+        preprocessed_data: Dict[str, Any],
+        example_id: str,
+        table_extraction: Dict[str, Any],
+        text_extraction: Optional[Dict[str, Any]],
+        table_structure: Optional[TableStructure],
+        table_semantics: Optional[TableSemantics]
+    ) -> Dict[str, Any]:
+        """Merge the passes and attach metadata and table structure (shared with batch extraction)"""
+        text_content = preprocessed_data.get('knowledge_base', {}).get('text_content', [])
+        if text_extraction is not None:
             # Merge extractions
             extraction = self._merge_extractions(table_extraction, text_extraction)
         else:
@@ -261,7 +330,7 @@ class KGExtractor:
         return extraction
 
     @retry(
-        retry=retry_if_exception_type((APIError, json.JSONDecodeError)),
+        retry=retry_if_exception(_retryable),
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10)
     )
@@ -274,9 +343,28 @@ class KGExtractor:
         table_semantics: Optional[TableSemantics] = None
     ) -> Dict[str, Any]:
         """Extract metrics from table with programmatic structure and semantic enhancement"""
+        prompt = self._table_prompt(table, kb, example_id, table_structure, table_semantics)
+
+        # Use Instructor for structured output with Pydantic validation (through the response cache)
+        result = cached_structured_call(
+            self.client.messages.create,
+            ExtractionResult,
+            phase='kg_table_extraction',
+            **self.extraction_request(prompt)
+        )
+
+        return self._finish_table_extraction(result, prompt, example_id, table_structure)
+
+    def _table_prompt(
+        self,
+        table: Dict,
+        kb: Dict,
+        example_id: str,
+        table_structure: Optional[TableStructure] = None,
+        table_semantics: Optional[TableSemantics] = None
+    ) -> str:
         template = self.jinja_env.get_template('ontology_extraction.j2')
-        prompt = template.render(
-            ontology=self.ontology_guidance,
+        return template.render(
             example_id=example_id,
             table=table,
             knowledge_base=kb,
@@ -285,15 +373,22 @@ class KGExtractor:
             table_semantics=table_semantics.model_dump() if table_semantics else None
         )
 
-        # Use Instructor for structured output with Pydantic validation
-        result = self.client.messages.create(
-            model=self.model,
-            max_tokens=8000,
-            temperature=0,
-            messages=[{"role": "user", "content": prompt}],
-            response_model=ExtractionResult
-        )
+    def extraction_request(self, prompt: str) -> Dict[str, Any]:
+        """messages.create parameters (without response_model) for a table or text extraction pass"""
+        return {
+            'model': self.model,
+            'max_tokens': 8000,
+            'temperature': 0,
+            'messages': [{"role": "user", "content": prompt_content(self.static_prefix, prompt)}]
+        }
 
+    def _finish_table_extraction(
+        self,
+        result: ExtractionResult,
+        prompt: str,
+        example_id: str,
+        table_structure: Optional[TableStructure] = None
+    ) -> Dict[str, Any]:
         # Convert Pydantic model to dict
         result_dict = result.model_dump()
 
@@ -311,7 +406,8 @@ class KGExtractor:
                 log_entry = {
                     'timestamp': datetime.utcnow(),
                     'extraction_pass': 'table',
-                    'prompt': prompt,
+                    **prompt_fields(content_text(prompt_content(self.static_prefix, prompt)),
+                                    get_log_sink(BLOB_COLLECTION)),
                     'response': json.dumps(result_dict, indent=2),
                     'metadata': {
                         'example_id': example_id,
@@ -324,14 +420,14 @@ class KGExtractor:
                         'complete': len(result_dict.get('metrics', [])) >= expected_cells if expected_cells > 0 else None
                     }
                 }
-                logs.insert_one(log_entry)
+                logs.put(log_entry)
             except Exception as e:
                 print(f"Warning: Failed to log table extraction to MongoDB: {e}")
 
         return result_dict
 
     @retry(
-        retry=retry_if_exception_type((APIError, json.JSONDecodeError)),
+        retry=retry_if_exception(_retryable),
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10)
     )
@@ -343,9 +439,27 @@ class KGExtractor:
         table_semantics: Optional[TableSemantics] = None
     ) -> Dict[str, Any]:
         """Extract metrics from narrative text with table context and semantic information"""
+        prompt = self._text_prompt(table, text_content, example_id, table_semantics)
+
+        # Use Instructor for structured output with Pydantic validation (through the response cache)
+        result = cached_structured_call(
+            self.client.messages.create,
+            ExtractionResult,
+            phase='kg_text_extraction',
+            **self.extraction_request(prompt)
+        )
+
+        return self._finish_text_extraction(result, prompt, example_id, text_content)
+
+    def _text_prompt(
+        self,
+        table: Dict,
+        text_content: list,
+        example_id: str,
+        table_semantics: Optional[TableSemantics] = None
+    ) -> str:
         template = self.jinja_env.get_template('ontology_extraction.j2')
-        prompt = template.render(
-            ontology=self.ontology_guidance,
+        return template.render(
             example_id=example_id,
             table=table,
             knowledge_base={'text_content': text_content},
@@ -353,15 +467,13 @@ class KGExtractor:
             table_semantics=table_semantics.model_dump() if table_semantics else None
         )
 
-        # Use Instructor for structured output with Pydantic validation
-        result = self.client.messages.create(
-            model=self.model,
-            max_tokens=8000,
-            temperature=0,
-            messages=[{"role": "user", "content": prompt}],
-            response_model=ExtractionResult
-        )
-
+    def _finish_text_extraction(
+        self,
+        result: ExtractionResult,
+        prompt: str,
+        example_id: str,
+        text_content: list
+    ) -> Dict[str, Any]:
         # Convert Pydantic model to dict
         result_dict = result.model_dump()
 
@@ -375,7 +487,8 @@ class KGExtractor:
                 log_entry = {
                     'timestamp': datetime.utcnow(),
                     'extraction_pass': 'text',
-                    'prompt': prompt,
+                    **prompt_fields(content_text(prompt_content(self.static_prefix, prompt)),
+                                    get_log_sink(BLOB_COLLECTION)),
                     'response': json.dumps(result_dict, indent=2),
                     'metadata': {
                         'example_id': example_id,
@@ -386,7 +499,7 @@ class KGExtractor:
                         'extracted_metrics': len(result_dict.get('metrics', []))
                     }
                 }
-                logs.insert_one(log_entry)
+                logs.put(log_entry)
             except Exception as e:
                 print(f"Warning: Failed to log text extraction to MongoDB: {e}")
 
@@ -430,7 +543,7 @@ class KGExtractor:
         }
         return merged
 
-    def build_rdflib_graph(self, extraction: Dict[str, Any]) -> Graph:
+    def build_rdflib_graph(self, extraction: Dict[str, Any]) -> "Graph":
         """
         Convert Pydantic extraction result to RDFLib graph
 
@@ -440,6 +553,9 @@ class KGExtractor:
         Returns:
             RDFLib Graph
         """
+        from rdflib import Graph, Namespace, Literal, URIRef
+        from rdflib.namespace import RDF, RDFS, XSD, OWL, DCTERMS
+
         g = Graph()
 
         # Namespaces
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Single-pass extraction of the KG data shown in prompts
+
+extract_sample_entities() and extract_table_data_for_prompt() used to walk
+every FinancialMetric with 5-7 graph.objects() calls each - one SQLite round
+trip per call on the SQLAlchemy store. scan_kg_prompt_data() instead reads
+the graph in one triples() scan (plus one lookup for the metric list),
+indexes the predicates both need, and builds both structures from that.
+Results are memoized per graph object and per (example_id, KG content hash).
+"""
+import copy
+import threading
+import weakref
+from collections import defaultdict
+from rdflib import Namespace
+from rdflib.namespace import RDF, RDFS
+
+KG = Namespace('http://example.org/convfinqa/')
+ENTITY = Namespace('http://example.org/convfinqa/entity/')
+
+# Predicates read by either extraction
+_PREDICATES = frozenset({
+    KG.tableRow, KG.tableColumn, KG.hasValue, KG.numericValue, KG.hasScale, KG.textValue,
+    KG.label, KG.forTimePeriod, KG.yearValue, KG.tableOrientation, KG.tableCaption, RDFS.comment
+})
+
+_lock = threading.Lock()
+_graph_data = weakref.WeakKeyDictionary()  # {graph: (triple count, data)}
+_example_data = {}  # {(example_id, content_hash): data}
+
+
+class _ObjectIndex:
+    """
+    {predicate: {subject: [objects]}} for the prompt predicates, from one triples() scan
+
+    Scan order is arbitrary, so when a subject has several objects for one
+    predicate they are re-read with graph.objects() on first use - the rare
+    case where "first"/"last" must match the per-metric walk this replaces.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.objects = {predicate: defaultdict(list) for predicate in _PREDICATES}
+        for s, p, o in graph.triples((None, None, None)):
+            if p in self.objects:
+                self.objects[p][s].append(o)
+        self._ordered = set()
+
+    def all(self, predicate, subject):
+        values = self.objects[predicate].get(subject)
+        if not values:
+            return []
+        if len(values) > 1 and (predicate, subject) not in self._ordered:
+            values[:] = self.graph.objects(subject, predicate)
+            self._ordered.add((predicate, subject))
+        return values
+
+    def unordered(self, predicate, subject):
+        return self.objects[predicate].get(subject, [])
+
+    def first(self, predicate, subject):
+        values = self.all(predicate, subject)
+        return values[0] if values else None
+
+    def last(self, predicate, subject):
+        values = self.all(predicate, subject)
+        return values[-1] if values else None
+
+    def has(self, predicate, subject):
+        return subject in self.objects[predicate]
+
+    def all_objects(self, predicate):
+        """Every object of a predicate (unordered)"""
+        return [o for values in self.objects[predicate].values() for o in values]
+
+
+def _sample_entities(metrics, index):
+    """Same structure as execution.extract_sample_entities()"""
+    table_metadata = {
+        "orientation": None,
+        "caption": None
+    }
+    table_uri = ENTITY['FinancialTable']
+    orientation = index.last(KG.tableOrientation, table_uri)
+    if orientation is not None:
+        table_metadata["orientation"] = str(orientation)
+    caption = index.last(KG.tableCaption, table_uri)
+    if caption is not None:
+        table_metadata["caption"] = str(caption)
+
+    row_labels = {str(o) for o in index.all_objects(KG.tableRow)}
+    col_labels = {str(o) for o in index.all_objects(KG.tableColumn)}
+
+    # Extracted metrics (have label but no tableRow)
+    extracted_metrics = []
+    for metric in metrics:
+        if index.has(KG.tableRow, metric):
+            continue
+        label = index.first(KG.label, metric)
+        label = str(label) if label is not None else None
+        if not label:
+            continue
+        # The last period with a year wins; order only matters if the years differ
+        years = {index.first(KG.yearValue, e) for e in index.unordered(KG.forTimePeriod, metric)} - {None}
+        year = int(next(iter(years))) if len(years) == 1 else None
+        if len(years) > 1:
+            for year_entity in index.all(KG.forTimePeriod, metric):
+                year_val = index.first(KG.yearValue, year_entity)
+                if year_val is not None:
+                    year = int(year_val)
+        extracted_metrics.append({
+            "label": label,
+            "year": year
+        })
+
+    return {
+        "extracted_metrics": extracted_metrics,
+        "table_metadata": table_metadata,
+        "financial_metrics": {
+            "row_labels": sorted(row_labels),
+            "column_labels": sorted(col_labels)
+        }
+    }
+
+
+def _table_data(metrics, index):
+    """Same structure as phase2_llm_extraction.extract_table_data_for_prompt()"""
+    rows_data = defaultdict(dict)  # {row_label: {col_label: {value, scale} or text_value}}
+    column_header_values = []
+    row_header_values = []
+    text_derived_metrics = []
+    metric_comments = {}
+
+    for metric in metrics:
+        row = index.first(KG.tableRow, metric)
+        col = index.first(KG.tableColumn, metric)
+        cmt = index.first(RDFS.comment, metric)
+        row_label = str(row) if row is not None else None
+        col_label = str(col) if col is not None else None
+        comment = str(cmt) if cmt is not None else None
+
+        value = None
+        scale = None
+        text_value = None
+        value_entity = index.first(KG.hasValue, metric)
+        if value_entity is not None:
+            num_val = index.last(KG.numericValue, value_entity)
+            if num_val is not None:
+                value = float(num_val)
+            scale_uri = index.last(KG.hasScale, value_entity)
+            if scale_uri is not None:
+                scale = str(scale_uri).split('/')[-1].split('#')[-1]
+
+        if value is None:
+            text_val = index.first(KG.textValue, metric)
+            if text_val is not None:
+                text_value = str(text_val)
+
+        if value is None and text_value is None:
+            continue
+
+        if row_label and comment and row_label not in metric_comments:
+            metric_comments[row_label] = comment
+
+        if row_label and col_label:
+            if value is not None:
+                rows_data[row_label][col_label] = {
+                    "value": value,
+                    "scale": scale or "Units"
+                }
+            else:
+                rows_data[row_label][col_label] = text_value
+        elif col_label and not row_label and value is not None:
+            column_header_values.append({
+                "label": col_label,
+                "value": value,
+                "scale": scale or "Units"
+            })
+        elif row_label and not col_label and value is not None:
+            row_header_values.append({
+                "label": row_label,
+                "value": value,
+                "scale": scale or "Units"
+            })
+        elif not row_label and not col_label and value is not None:
+            metric_label = index.first(KG.label, metric)
+            if metric_label is not None:
+                text_derived_metrics.append({
+                    "label": str(metric_label),
+                    "value": value,
+                    "scale": scale or "Units"
+                })
+
+    table_rows = []
+    for row_label, columns in rows_data.items():
+        row_obj = {"metric": row_label}
+        row_obj.update(columns)
+        table_rows.append(row_obj)
+
+    return {
+        "table_cells": table_rows,
+        "column_header_values": column_header_values,
+        "row_header_values": row_header_values,
+        "text_derived_metrics": text_derived_metrics,
+        "metric_comments": metric_comments
+    }
+
+
+def scan_kg_prompt_data(graph):
+    """
+    Extract sample entities and table data from a graph in a single scan
+
+    Returns:
+        {"sample_entities": ..., "table_data": ...} - see
+        execution.extract_sample_entities and
+        phase2_llm_extraction.extract_table_data_for_prompt
+    """
+    index = _ObjectIndex(graph)
+    # Same metric order as the per-metric walk (row order in the prompt)
+    metrics = list(dict.fromkeys(graph.subjects(RDF.type, KG.FinancialMetric)))
+    return {
+        "sample_entities": _sample_entities(metrics, index),
+        "table_data": _table_data(metrics, index)
+    }
+
+
+def kg_prompt_data_for_graph(graph):
+    """
+    Prompt data for an already-loaded graph, memoized on the graph object
+
+    The memo is keyed on the triple count too, so a graph that was modified
+    since is scanned again. Returns a copy the caller may modify.
+    """
+    triple_count = len(graph)
+    with _lock:
+        entry = _graph_data.get(graph)
+    if entry is None or entry[0] != triple_count:
+        entry = (triple_count, scan_kg_prompt_data(graph))
+        with _lock:
+            _graph_data[graph] = entry
+    return copy.deepcopy(entry[1])
+
+
+def load_kg_prompt_data(example_id):
+    """
+    Prompt data for an example, scanned once per KG content hash
+
+    Returns:
+        {"sample_entities": ..., "table_data": ...} (a copy the caller may modify)
+
+    Raises:
+        FileNotFoundError: if the example has no KG
+    """
+    from execution import _kg_content_hash, _kg_path, load_graph
+
+    kg_path = _kg_path(example_id)
+    if not kg_path.exists():
+        raise FileNotFoundError(f"Knowledge graph not found: {kg_path}")
+    key = (str(example_id), _kg_content_hash(kg_path))
+    with _lock:
+        data = _example_data.get(key)
+    if data is None:
+        data = scan_kg_prompt_data(load_graph(example_id))
+        with _lock:
+            for stale_key in [k for k in _example_data if k[0] == key[0]]:
+                del _example_data[stale_key]
+            _example_data[key] = data
+    return copy.deepcopy(data)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""Compact binary KG snapshots: interned term dictionary + integer triple arrays
+
+A snapshot ({id}_kg.snap, next to {id}_kg.ttl) is compiled once from the
+Turtle KG and loaded with mmap, so opening a KG no longer pays for a full
+Turtle parse.
+
+File layout (little-endian):
+    header      magic, version, n_terms, n_triples, terms_len, ns_len, sha256(ttl)
+    offsets     uint32[n_terms + 1] - byte offsets of each term in the term blob
+    terms       UTF-8 term encodings ('U' iri | 'B' bnode | 'L' lexical NUL datatype NUL lang)
+    namespaces  UTF-8 "prefix NUL uri" records separated by newlines
+    triples     uint32[3 * n_triples] - (s, p, o) term ids, sorted
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.store import Store
+
+SNAPSHOT_MAGIC = b"KGSNAP01"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<8sIIIII32s")
+_SEP = "\x00"
+
+
+def snapshot_path_for(kg_path):
+    """Snapshot file that sits next to a *_kg.ttl file"""
+    return Path(kg_path).with_suffix(".snap")
+
+
+def _encode_term(term):
+    if isinstance(term, URIRef):
+        return "U" + str(term)
+    if isinstance(term, BNode):
+        return "B" + str(term)
+    if isinstance(term, Literal):
+        datatype = str(term.datatype) if term.datatype else ""
+        lang = term.language or ""
+        return "L" + str(term) + _SEP + datatype + _SEP + lang
+    raise ValueError(f"Unsupported RDF term in snapshot: {term!r}")
+
+
+def _decode_term(encoded):
+    kind, body = encoded[0], encoded[1:]
+    if kind == "U":
+        return URIRef(body)
+    if kind == "B":
+        return BNode(body)
+    lexical, datatype, lang = body.split(_SEP)
+    return Literal(lexical, datatype=URIRef(datatype) if datatype else None, lang=lang or None)
+
+
+def _pad4(n):
+    return (4 - n % 4) % 4
+
+
+def _as_uint32(buffer):
+    """Zero-copy uint32 view of a little-endian buffer (copied only on big-endian hosts)"""
+    if sys.byteorder == "little":
+        return buffer.cast("I")
+    values = array("I")
+    values.frombytes(bytes(buffer))
+    values.byteswap()
+    return values
+
+
+def _to_le_bytes(values):
+    values = array("I", values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def compile_snapshot(kg_path, snapshot_path=None):
+    """
+    Compile a Turtle KG into a binary snapshot
+
+    Args:
+        kg_path: Path to {id}_kg.ttl
+        snapshot_path: Output path (defaults to {id}_kg.snap next to the turtle file)
+
+    Returns:
+        Path of the written snapshot
+    """
+    kg_path = Path(kg_path)
+    snapshot_path = Path(snapshot_path) if snapshot_path else snapshot_path_for(kg_path)
+
+    data = kg_path.read_bytes()
+    digest = hashlib.sha256(data).digest()
+
+    g = Graph()
+    g.parse(data=data, format="turtle")
+
+    # Intern terms
+    term_ids = {}
+    encoded_terms = []
+    id_triples = []
+    for triple in g:
+        ids = []
+        for term in triple:
+            term_id = term_ids.get(term)
+            if term_id is None:
+                term_id = term_ids[term] = len(encoded_terms)
+                encoded_terms.append(_encode_term(term).encode("utf-8"))
+            ids.append(term_id)
+        id_triples.append(tuple(ids))
+    id_triples.sort()
+
+    offsets = [0]
+    for encoded in encoded_terms:
+        offsets.append(offsets[-1] + len(encoded))
+    terms_blob = b"".join(encoded_terms)
+    ns_blob = "\n".join(f"{prefix}{_SEP}{uri}" for prefix, uri in g.namespaces()).encode("utf-8")
+
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(encoded_terms), len(id_triples),
+                          len(terms_blob), len(ns_blob), digest)
+    strings = terms_blob + ns_blob
+    strings += b"\x00" * _pad4(len(header) + 4 * len(offsets) + len(strings))
+
+    # Write-then-rename so concurrent readers never see a partial snapshot
+    tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(_to_le_bytes(offsets))
+        f.write(strings)
+        f.write(_to_le_bytes(v for triple in id_triples for v in triple))
+    os.replace(tmp_path, snapshot_path)
+
+    return snapshot_path
+
+
+def read_snapshot_digest(snapshot_path):
+    """Return the SHA-256 hex digest of the turtle file a snapshot was compiled from"""
+    with open(snapshot_path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    magic, version, *_, digest = _HEADER.unpack(header)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        return None
+    return digest.hex()
+
+
+class SnapshotStore(Store):
+    """
+    Read-only rdflib store backed by a binary KG snapshot
+
+    Answers triple patterns from in-memory id indexes, so graph.triples(),
+    graph.objects()/subjects() and SPARQL (via rdflib's evaluator) all work.
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, snapshot_path):
+        super().__init__()
+        self.snapshot_path = Path(snapshot_path)
+        self._namespaces = {}
+        self._load()
+
+    def _load(self):
+        with open(self.snapshot_path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                magic, version, n_terms, n_triples, terms_len, ns_len, digest = _HEADER.unpack_from(view)
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    raise ValueError(f"Not a v{SNAPSHOT_VERSION} KG snapshot: {self.snapshot_path}")
+                self.content_hash = digest.hex()
+
+                pos = _HEADER.size
+                offsets = _as_uint32(view[pos:pos + 4 * (n_terms + 1)])
+                pos += 4 * (n_terms + 1)
+                strings = view[pos:pos + terms_len + ns_len]
+                pos += terms_len + ns_len
+                pos += _pad4(pos)
+                triple_ids = _as_uint32(view[pos:pos + 12 * n_triples])
+
+                terms_blob = strings[:terms_len]
+                self._terms = [
+                    _decode_term(str(terms_blob[offsets[i]:offsets[i + 1]], "utf-8"))
+                    for i in range(n_terms)
+                ]
+                ns_text = str(strings[terms_len:], "utf-8")
+                flat = triple_ids.tolist()
+
+                # Release buffer exports before the mmap closes
+                del offsets, strings, terms_blob, triple_ids
+            finally:
+                view.release()
+
+        for record in filter(None, ns_text.split("\n")):
+            prefix, uri = record.split(_SEP)
+            self._namespaces[prefix] = URIRef(uri)
+
+        self._term_ids = {term: i for i, term in enumerate(self._terms)}
+        self._triples = [tuple(flat[i:i + 3]) for i in range(0, len(flat), 3)]
+
+        # Indexes over triple positions for each bound-term combination
+        self._by_s, self._by_p, self._by_o = {}, {}, {}
+        self._by_sp, self._by_po = {}, {}
+        for idx, (s, p, o) in enumerate(self._triples):
+            self._by_s.setdefault(s, []).append(idx)
+            self._by_p.setdefault(p, []).append(idx)
+            self._by_o.setdefault(o, []).append(idx)
+            self._by_sp.setdefault((s, p), []).append(idx)
+            self._by_po.setdefault((p, o), []).append(idx)
+
+    def _candidates(self, s, p, o):
+        """Triple positions matching the bound ids (None = unbound)"""
+        if s is not None and p is not None:
+            candidates = self._by_sp.get((s, p), [])
+            return [i for i in candidates if self._triples[i][2] == o] if o is not None else candidates
+        if p is not None and o is not None:
+            return self._by_po.get((p, o), [])
+        if s is not None:
+            candidates = self._by_s.get(s, [])
+            return [i for i in candidates if self._triples[i][2] == o] if o is not None else candidates
+        if p is not None:
+            return self._by_p.get(p, [])
+        if o is not None:
+            return self._by_o.get(o, [])
+        return range(len(self._triples))
+
+    def triples(self, triple_pattern, context=None):
+        """Yield ((s, p, o), contexts) for every triple matching the pattern"""
+        ids = []
+        for term in triple_pattern:
+            if term is None:
+                ids.append(None)
+                continue
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                return  # Term not in this KG - no matches
+            ids.append(term_id)
+
+        terms = self._terms
+        for idx in self._candidates(*ids):
+            s, p, o = self._triples[idx]
+            yield (terms[s], terms[p], terms[o]), iter(())
+
+    def __len__(self, context=None):
+        return len(self._triples)
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        if override or prefix not in self._namespaces:
+            self._namespaces[prefix] = URIRef(namespace)
+
+    def namespace(self, prefix):
+        return self._namespaces.get(prefix)
+
+    def prefix(self, namespace):
+        for prefix, uri in self._namespaces.items():
+            if uri == URIRef(namespace):
+                return prefix
+        return None
+
+    def namespaces(self):
+        yield from self._namespaces.items()
+
+    def add(self, triple, context=None, quoted=False):
+        raise TypeError("KG snapshot graphs are read-only")
+
+    def addN(self, quads):  # noqa: N802 - rdflib Store API name
+        raise TypeError("KG snapshot graphs are read-only")
+
+    def remove(self, triple, context=None):
+        raise TypeError("KG snapshot graphs are read-only")
+
+
+def load_snapshot_graph(kg_path, content_hash=None):
+    """
+    Open a KG through its binary snapshot, compiling it first if missing or stale
+
+    Args:
+        kg_path: Path to {id}_kg.ttl
+        content_hash: SHA-256 hex digest of the turtle file (computed if not given)
+
+    Returns:
+        rdflib.Graph backed by a read-only SnapshotStore
+    """
+    kg_path = Path(kg_path)
+    snapshot_path = snapshot_path_for(kg_path)
+    if content_hash is None:
+        content_hash = hashlib.sha256(kg_path.read_bytes()).hexdigest()
+
+    if not snapshot_path.exists() or read_snapshot_digest(snapshot_path) != content_hash:
+        compile_snapshot(kg_path, snapshot_path)
+
+    return Graph(SnapshotStore(snapshot_path))
+
+
+if __name__ == "__main__":
+    # Compile snapshots for the given examples (default: all KGs)
+    kg_dir = Path(__file__).parent.parent.parent / "data" / "knowledge-graphs"
+    if len(sys.argv) > 1:
+        kg_paths = [kg_dir / f"{example_id}_kg.ttl" for example_id in sys.argv[1:]]
+    else:
+        kg_paths = sorted(kg_dir.glob("*_kg.ttl"))
+
+    for kg_path in kg_paths:
+        snapshot_path = compile_snapshot(kg_path)
+        print(f"✓ {kg_path.name} → {snapshot_path.name} ({snapshot_path.stat().st_size:,} bytes)")
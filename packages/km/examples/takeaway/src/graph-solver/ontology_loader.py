@@ -1,18 +1,13 @@
 #!/usr/bin/env python3
 """Extract semantic guidance from ConvFinQA ontology for formula planning"""
+import hashlib
+import json
 import os
-import sqlite3
+from functools import lru_cache
 from rdflib import Graph, Namespace
-from rdflib.store import Store
-from rdflib import plugin
+from rdflib.namespace import DCTERMS, OWL
 from pathlib import Path
-
-# Register SQLite plugin for RDFLib
-try:
-    import rdflib_sqlalchemy
-    rdflib_sqlalchemy.registerplugins()
-except ImportError:
-    pass  # SQLite plugin not available, will use fallback
+from kg_cache_db import load_cached_graph
 
 
 def _load_ontology_graph(ontology_path, use_cache=True):
@@ -32,118 +27,142 @@ def _load_ontology_graph(ontology_path, use_cache=True):
         g.parse(str(ontology_path), format='turtle')
         return g
 
-    # Use shared SQLite cache (same as KG cache)
-    base_path = Path(__file__).parent.parent.parent / "data"
-    db_path = base_path / ".kg_cache.db"
+    # Use shared SQLite cache (same as KG cache), keyed by ontology content hash
+    db_path = Path(__file__).parent.parent.parent / "data" / ".kg_cache.db"
+    return load_cached_graph(db_path, 'ontology', ontology_path, graph_prefix='ontology')
 
-    # Initialize cache DB if needed
-    if not db_path.exists():
-        db_path.parent.mkdir(parents=True, exist_ok=True)
 
-    conn = sqlite3.connect(str(db_path))
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS cache_metadata (
-            example_id TEXT PRIMARY KEY,
-            turtle_mtime REAL,
-            cached_at REAL
-        )
-    """)
-    conn.commit()
-
-    # Check if ontology is cached and up-to-date
-    turtle_mtime = ontology_path.stat().st_mtime
-    cursor = conn.execute(
-        "SELECT turtle_mtime FROM cache_metadata WHERE example_id = ?",
-        ('ontology',)
-    )
-    row = cursor.fetchone()
-    cache_valid = row is not None and row[0] >= turtle_mtime
-
-    conn.close()
-
-    # Create graph with SQLAlchemy store (backed by SQLite)
-    store = plugin.get('SQLAlchemy', Store)()
-    g = Graph(store, identifier='ontology')
-
-    if not cache_valid:
-        # Cache miss or stale - rebuild from turtle
-        g.open(f"sqlite:///{db_path}", create=True)
-        g.remove((None, None, None))
-        g.parse(str(ontology_path), format='turtle')
+ARTIFACT_VERSION = 2
 
-        # Mark as cached
-        import time
-        conn = sqlite3.connect(str(db_path))
-        conn.execute("""
-            INSERT OR REPLACE INTO cache_metadata (example_id, turtle_mtime, cached_at)
-            VALUES (?, ?, ?)
-        """, ('ontology', turtle_mtime, time.time()))
-        conn.commit()
-        conn.close()
-    else:
-        # Cache hit - just open the store
-        g.open(f"sqlite:///{db_path}", create=False)
+KG_NAMESPACE = "http://example.org/convfinqa/"
 
-    return g
+_PATTERN_QUERY = """
+    PREFIX kg: <http://example.org/convfinqa/>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    SELECT ?pattern ?phrase ?operation ?comment
+    WHERE {
+        ?pattern a kg:LinguisticPattern .
+        ?pattern kg:naturalLanguagePhrase ?phrase .
+        ?pattern kg:semanticOperation ?operation .
+        OPTIONAL { ?pattern rdfs:comment ?comment }
+    }
+"""
 
+_OPERATION_QUERY = """
+    PREFIX kg: <http://example.org/convfinqa/>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX owl: <http://www.w3.org/2002/07/owl#>
+    SELECT ?operation ?label ?comment
+    WHERE {
+        ?operation rdfs:subClassOf kg:SemanticOperation .
+        OPTIONAL { ?operation rdfs:label ?label }
+        OPTIONAL { ?operation rdfs:comment ?comment }
+    }
+"""
 
-def load_semantic_guidance(ontology_path=None, use_cache=True):
+# Targeted-guidance index: every kg: resource's phrase/operation/comment rows ...
+_PATTERN_ROWS_QUERY = """
+    PREFIX kg: <http://example.org/convfinqa/>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    SELECT ?resource ?phrase ?operation ?comment
+    WHERE {
+        ?resource kg:naturalLanguagePhrase ?phrase .
+        ?resource kg:semanticOperation ?operation .
+        OPTIONAL { ?resource rdfs:comment ?comment }
+    }
+"""
+
+# ... and label/comment rows (operations and value types)
+_DESCRIPTION_ROWS_QUERY = """
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    SELECT ?resource ?label ?comment
+    WHERE {
+        ?resource rdfs:label ?label .
+        OPTIONAL { ?resource rdfs:comment ?comment }
+    }
+"""
+
+# In-process memo: {artifact_path: ((mtime_ns, size) of ontology, artifact)}
+_artifact_memo = {}
+
+
+def _default_ontology_path():
+    return Path(__file__).parent.parent.parent / "ontology" / "convfinqa-ontology.ttl"
+
+
+def _artifact_path_for(ontology_path):
+    """Guidance artifact for an ontology file: data/.{stem}.guidance.json"""
+    return Path(__file__).parent.parent.parent / "data" / f".{Path(ontology_path).stem}.guidance.json"
+
+
+def load_ontology_artifact(ontology_path=None, use_cache=True):
     """
-    Extract semantic guidance from ontology for formula planning
+    Load the materialized ontology guidance, building it once per ontology content hash
+
+    The artifact holds everything consumers need from the ontology, so they
+    don't have to parse or query it:
+        content_hash, version, modified, guidance_text,
+        patterns   [{uri, phrase, operation, guidance}]
+        operations [{name, label, description}]
 
     Args:
         ontology_path: Path to ontology file (defaults to ontology/convfinqa-ontology.ttl)
-        use_cache: If True, use SQLite cache for faster loading (default)
+        use_cache: If False, rebuild from the ontology graph without reading or
+            writing the artifact
 
     Returns:
-        Formatted string with patterns, operations, and rules for LLM prompts
+        Artifact dict
     """
-    if ontology_path is None:
-        # Default: relative to this file's location
-        base_dir = Path(__file__).parent.parent.parent
-        ontology_path = base_dir / "ontology" / "convfinqa-ontology.ttl"
-
+    ontology_path = Path(ontology_path) if ontology_path else _default_ontology_path()
+    if not use_cache:
+        return _build_ontology_artifact(ontology_path, None, use_cache=False)
+
+    artifact_path = _artifact_path_for(ontology_path)
+    stat = ontology_path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    memo = _artifact_memo.get(str(artifact_path))
+    if memo is not None and memo[0] == signature:
+        return memo[1]
+
+    content_hash = hashlib.sha256(ontology_path.read_bytes()).hexdigest()
+    artifact = None
+    if artifact_path.exists():
+        try:
+            with open(artifact_path) as f:
+                artifact = json.load(f)
+        except (OSError, ValueError):
+            artifact = None  # Corrupt or partial - rebuild
+    if artifact is None or artifact.get('artifact_version') != ARTIFACT_VERSION \
+            or artifact.get('content_hash') != content_hash:
+        artifact = _build_ontology_artifact(ontology_path, content_hash, use_cache=True)
+
+        # Write-then-rename so concurrent readers never see a partial artifact
+        artifact_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = artifact_path.with_name(f"{artifact_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(artifact, f, indent=1)
+        os.replace(tmp_path, artifact_path)
+
+    _artifact_memo[str(artifact_path)] = (signature, artifact)
+    return artifact
+
+
+def _build_ontology_artifact(ontology_path, content_hash, use_cache=True):
+    """Query the ontology graph once and render everything consumers need"""
     g = _load_ontology_graph(ontology_path, use_cache=use_cache)
 
-    kg = Namespace("http://example.org/convfinqa/")
-
-    # Extract LinguisticPatterns
     patterns = []
-    pattern_query = """
-        PREFIX kg: <http://example.org/convfinqa/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        SELECT ?pattern ?phrase ?operation ?comment
-        WHERE {
-            ?pattern a kg:LinguisticPattern .
-            ?pattern kg:naturalLanguagePhrase ?phrase .
-            ?pattern kg:semanticOperation ?operation .
-            OPTIONAL { ?pattern rdfs:comment ?comment }
-        }
-    """
-
-    for row in g.query(pattern_query):
+    for row in g.query(_PATTERN_QUERY):
         operation_name = str(row.operation).split('/')[-1] if row.operation else 'Unknown'
         patterns.append({
+            'uri': str(row.pattern),
             'phrase': str(row.phrase),
             'operation': operation_name,
             'guidance': str(row.comment) if row.comment else ''
         })
 
-    # Extract Semantic Operations
     operations = []
-    operation_query = """
-        PREFIX kg: <http://example.org/convfinqa/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX owl: <http://www.w3.org/2002/07/owl#>
-        SELECT ?operation ?label ?comment
-        WHERE {
-            ?operation rdfs:subClassOf kg:SemanticOperation .
-            OPTIONAL { ?operation rdfs:label ?label }
-            OPTIONAL { ?operation rdfs:comment ?comment }
-        }
-    """
-
-    for row in g.query(operation_query):
+    for row in g.query(_OPERATION_QUERY):
         operation_name = str(row.operation).split('/')[-1] if row.operation else 'Unknown'
         operations.append({
             'name': operation_name,
@@ -151,7 +170,68 @@ def load_semantic_guidance(ontology_path=None, use_cache=True):
             'description': str(row.comment) if row.comment else ''
         })
 
-    # Format as readable guidance text for LLM
+    pattern_rows = {}
+    for row in g.query(_PATTERN_ROWS_QUERY):
+        name = _kg_local_name(row.resource)
+        if name is not None:
+            pattern_rows.setdefault(name, []).append({
+                'phrase': str(row.phrase),
+                'operation': str(row.operation).split('/')[-1] if row.operation else 'Unknown',
+                'comment': str(row.comment) if row.comment else None
+            })
+
+    description_rows = {}
+    for row in g.query(_DESCRIPTION_ROWS_QUERY):
+        name = _kg_local_name(row.resource)
+        if name is not None:
+            description_rows.setdefault(name, []).append({
+                'label': str(row.label),
+                'comment': str(row.comment) if row.comment else None
+            })
+
+    # Row order depends on the store backend - fix it so the artifact is deterministic
+    patterns.sort(key=lambda p: (p['uri'], p['phrase'], p['operation'], p['guidance']))
+    operations.sort(key=lambda op: (op['name'], op['label'], op['description']))
+    for rows in list(pattern_rows.values()) + list(description_rows.values()):
+        rows.sort(key=lambda r: tuple(v or '' for v in r.values()))
+
+    ontology_uri = Namespace(KG_NAMESPACE).ConvFinQAOntology
+    version = g.value(ontology_uri, OWL.versionInfo)
+    modified = g.value(ontology_uri, DCTERMS.modified)
+
+    return {
+        'artifact_version': ARTIFACT_VERSION,
+        'content_hash': content_hash or hashlib.sha256(Path(ontology_path).read_bytes()).hexdigest(),
+        'version': str(version) if version is not None else None,
+        'modified': str(modified) if modified is not None else None,
+        'patterns': patterns,
+        'operations': operations,
+        'pattern_rows': dict(sorted(pattern_rows.items())),
+        'description_rows': dict(sorted(description_rows.items())),
+        'guidance_text': _render_semantic_guidance(patterns, operations),
+    }
+
+
+def _kg_local_name(resource):
+    """Name after the kg: namespace, or None for resources outside it"""
+    resource = str(resource)
+    return resource[len(KG_NAMESPACE):] if resource.startswith(KG_NAMESPACE) else None
+
+
+def _distinct_patterns(patterns):
+    """Patterns de-duplicated like SELECT DISTINCT (first occurrence wins)"""
+    seen = set()
+    distinct = []
+    for p in patterns:
+        key = (p['uri'], p['phrase'], p['operation'], p['guidance'])
+        if key not in seen:
+            seen.add(key)
+            distinct.append(p)
+    return distinct
+
+
+def _render_semantic_guidance(patterns, operations):
+    """Format patterns and operations as readable guidance text for LLM"""
     guidance_text = """SEMANTIC PATTERNS AND OPERATIONS FROM ONTOLOGY:
 ===============================================
 
@@ -186,80 +266,161 @@ This ontology defines how to interpret financial questions and build formulas.
     return guidance_text
 
 
-def _load_keyword_matched_patterns(question, ontology_path=None, use_cache=True, top_k=10):
+def load_semantic_guidance(ontology_path=None, use_cache=True):
     """
-    Fallback: Load patterns using improved keyword matching (when sentence-transformers unavailable)
+    Extract semantic guidance from ontology for formula planning
+
+    Args:
+        ontology_path: Path to ontology file (defaults to ontology/convfinqa-ontology.ttl)
+        use_cache: If True, use SQLite cache for faster loading (default)
+
+    Returns:
+        Formatted string with patterns, operations, and rules for LLM prompts
+        (rendered once per ontology content hash, see load_ontology_artifact)
     """
-    if ontology_path is None:
-        base_dir = Path(__file__).parent.parent.parent
-        ontology_path = base_dir / "ontology" / "convfinqa-ontology.ttl"
+    return load_ontology_artifact(ontology_path, use_cache=use_cache)['guidance_text']
 
-    g = _load_ontology_graph(ontology_path, use_cache=use_cache)
 
-    # Extract keywords from question, filtering stopwords
-    question_lower = question.lower()
+# Common stopwords ignored by keyword matching
+_STOPWORDS = frozenset({
+    'what', 'was', 'were', 'is', 'are', 'the', 'a', 'an', 'in', 'of', 'and',
+    'to', 'for', 'on', 'with', 'as', 'at', 'by', 'from', 'this', 'that',
+    'it', 'they', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does',
+    'did', 'will', 'would', 'should', 'could', 'may', 'might'
+})
 
-    # Common stopwords to ignore
-    stopwords = {'what', 'was', 'were', 'is', 'are', 'the', 'a', 'an', 'in', 'of', 'and',
-                 'to', 'for', 'on', 'with', 'as', 'at', 'by', 'from', 'this', 'that',
-                 'it', 'they', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does',
-                 'did', 'will', 'would', 'should', 'could', 'may', 'might'}
+# Key financial terms that boost a match when both question and phrase use them
+_KEY_TERMS = frozenset({
+    'change', 'difference', 'percentage', 'percent', 'net', 'total',
+    'increase', 'decrease', 'ratio', 'growth', 'decline'
+})
 
-    question_words = {w for w in question_lower.split() if w not in stopwords}
+_PHRASE_END = None  # Trie key marking the end of one or more phrases
 
-    # Query all patterns
-    patterns = []
-    pattern_query = """
-        PREFIX kg: <http://example.org/convfinqa/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        SELECT DISTINCT ?pattern ?phrase ?operation ?comment
-        WHERE {
-            ?pattern a kg:LinguisticPattern .
-            ?pattern kg:naturalLanguagePhrase ?phrase .
-            ?pattern kg:semanticOperation ?operation .
-            OPTIONAL { ?pattern rdfs:comment ?comment }
-        }
-    """
+# In-process memo: {ontology content hash: keyword index}
+_keyword_indexes = {}
 
-    for row in g.query(pattern_query):
-        operation_name = str(row.operation).split('/')[-1] if row.operation else 'Unknown'
-        phrase_lower = str(row.phrase).lower()
 
-        # Score based on multiple factors
-        score = 0
+def _build_keyword_index(patterns):
+    """
+    Precompute everything keyword scoring needs per pattern
+
+    Returns:
+        dict with 'patterns', per-pattern 'phrase_words' and 'key_terms',
+        'postings' (token -> pattern ids) and 'trie' (lowercase phrase
+        characters -> pattern ids, for exact phrase-in-question matches)
+    """
+    postings = {}
+    trie = {}
+    phrase_words = []
+    key_terms = []
+    for pattern_id, pattern in enumerate(patterns):
+        phrase_lower = pattern['phrase'].lower()
+        words = frozenset(w for w in phrase_lower.split() if w not in _STOPWORDS)
+        phrase_words.append(words)
+        key_terms.append(words & _KEY_TERMS)
+        for word in words:
+            postings.setdefault(word, []).append(pattern_id)
+
+        node = trie
+        for ch in phrase_lower:
+            node = node.setdefault(ch, {})
+        node.setdefault(_PHRASE_END, []).append(pattern_id)
+
+    return {
+        'patterns': patterns,
+        'phrase_words': phrase_words,
+        'key_terms': key_terms,
+        'postings': postings,
+        'trie': trie,
+    }
+
+
+def _keyword_index(artifact):
+    """Keyword index for an ontology artifact, built once per content hash"""
+    index = _keyword_indexes.get(artifact['content_hash'])
+    if index is None:
+        index = _build_keyword_index(_distinct_patterns(artifact['patterns']))
+        _keyword_indexes[artifact['content_hash']] = index
+    return index
+
+
+def _exact_phrase_matches(trie, text):
+    """Ids of patterns whose lowercase phrase occurs anywhere in text"""
+    matches = set(trie.get(_PHRASE_END, ()))
+    for start in range(len(text)):
+        node = trie
+        for ch in text[start:]:
+            node = node.get(ch)
+            if node is None:
+                break
+            if _PHRASE_END in node:
+                matches.update(node[_PHRASE_END])
+    return matches
+
+
+def _score_keyword_matches(index, question):
+    """
+    Score patterns against a question, touching only candidate patterns
 
-        # Factor 1: Exact phrase match (highest priority)
-        if phrase_lower in question_lower:
-            score += 100
+    Candidates share a non-stopword token with the question or occur in it
+    verbatim; every other pattern would score 0.
 
-        # Factor 2: All phrase words present in question
-        phrase_words = {w for w in phrase_lower.split() if w not in stopwords}
-        if phrase_words and phrase_words.issubset(question_words):
+    Returns:
+        List of (score, pattern_id) with score > 0, best first (ties in pattern order)
+    """
+    question_lower = question.lower()
+    question_words = {w for w in question_lower.split() if w not in _STOPWORDS}
+    question_key_terms = question_words & _KEY_TERMS
+
+    overlap = {}
+    for word in question_words:
+        for pattern_id in index['postings'].get(word, ()):
+            overlap[pattern_id] = overlap.get(pattern_id, 0) + 1
+    exact = _exact_phrase_matches(index['trie'], question_lower)
+
+    scored = []
+    for pattern_id in exact.union(overlap):
+        shared = overlap.get(pattern_id, 0)
+        phrase_words = index['phrase_words'][pattern_id]
+
+        # Exact phrase match (highest priority)
+        score = 100 if pattern_id in exact else 0
+        # All phrase words present in question
+        if phrase_words and shared == len(phrase_words):
             score += 50
+        # Keyword overlap (filtered stopwords)
+        score += shared * 10
+        # Key financial terms in both
+        if shared:
+            score += len(index['key_terms'][pattern_id] & question_key_terms) * 20
 
-        # Factor 3: Keyword overlap (filtered stopwords)
-        overlap = len(question_words & phrase_words)
-        score += overlap * 10
+        if score > 0:
+            scored.append((score, pattern_id))
 
-        # Factor 4: Check for key financial terms in both
-        key_terms = {'change', 'difference', 'percentage', 'percent', 'net', 'total',
-                    'increase', 'decrease', 'ratio', 'growth', 'decline'}
-        phrase_key_terms = phrase_words & key_terms
-        question_key_terms = question_words & key_terms
-        common_key_terms = phrase_key_terms & question_key_terms
-        score += len(common_key_terms) * 20
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return scored
 
-        if score > 0:
-            patterns.append({
-                'phrase': str(row.phrase),
-                'operation': operation_name,
-                'guidance': str(row.comment) if row.comment else '',
-                'score': score
-            })
 
-    # Sort by score and take top K
-    patterns.sort(key=lambda x: x['score'], reverse=True)
-    matched_patterns = patterns[:top_k]
+def _load_keyword_matched_patterns(question, ontology_path=None, use_cache=True, top_k=10):
+    """
+    Fallback: Load patterns using improved keyword matching (when sentence-transformers unavailable)
+
+    Scores come from an inverted token index built once per ontology hash
+    (see _build_keyword_index), so only candidate patterns are scored.
+    """
+    artifact = load_ontology_artifact(ontology_path, use_cache=use_cache)
+    index = _keyword_index(artifact)
+
+    matched_patterns = []
+    for score, pattern_id in _score_keyword_matches(index, question)[:top_k]:
+        row = index['patterns'][pattern_id]
+        matched_patterns.append({
+            'phrase': row['phrase'],
+            'operation': row['operation'],
+            'guidance': row['guidance'],
+            'score': score
+        })
 
     # Format as readable guidance text
     guidance_text = f"""RELEVANT ONTOLOGY PATTERNS (top {len(matched_patterns)} by keyword matching):
@@ -283,6 +444,17 @@ Question: {question}
     return guidance_text
 
 
+@lru_cache(maxsize=1)
+def _embeddings_available():
+    """Check once whether sentence-transformers and NumPy can be imported"""
+    try:
+        import numpy  # noqa: F401
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
 def load_question_relevant_guidance(question, ontology_path=None, use_cache=True, top_k=10):
     """
     Load only ontology patterns that are semantically relevant to the given question.
@@ -294,102 +466,19 @@ def load_question_relevant_guidance(question, ontology_path=None, use_cache=True
     Args:
         question: The question text to analyze
         ontology_path: Path to ontology file
-        use_cache: If True, use cached pattern embeddings
+        use_cache: If True, use the resident/cached pattern embeddings
         top_k: Number of most relevant patterns to return (default: 10)
 
     Returns:
         Formatted string with only relevant patterns for this question
     """
-    if ontology_path is None:
-        base_dir = Path(__file__).parent.parent.parent
-        ontology_path = base_dir / "ontology" / "convfinqa-ontology.ttl"
-
-    # Check if sentence-transformers is available
-    try:
-        from sentence_transformers import SentenceTransformer
-        import numpy as np
-        import pickle
-    except ImportError:
+    if not _embeddings_available():
         # Fallback: use simple keyword matching instead
         return _load_keyword_matched_patterns(question, ontology_path, use_cache, top_k)
 
-    # Cache file path
-    cache_dir = Path(__file__).parent.parent.parent / "data"
-    cache_dir.mkdir(exist_ok=True)
-    cache_file = cache_dir / ".pattern_embeddings_cache.pkl"
-
-    # Load or build pattern embeddings cache
-    ontology_mtime = Path(ontology_path).stat().st_mtime
-
-    if use_cache and cache_file.exists():
-        try:
-            with open(cache_file, 'rb') as f:
-                cache_data = pickle.load(f)
-                if cache_data['ontology_mtime'] >= ontology_mtime:
-                    # Cache is valid
-                    patterns = cache_data['patterns']
-                    pattern_embeddings = cache_data['embeddings']
-                    model = SentenceTransformer('all-MiniLM-L6-v2')
-                else:
-                    # Cache is stale, rebuild
-                    cache_data = None
-        except:
-            cache_data = None
-    else:
-        cache_data = None
-
-    if cache_data is None:
-        # Build cache from scratch
-        g = _load_ontology_graph(ontology_path, use_cache=use_cache)
-
-        # Query all patterns
-        patterns = []
-        pattern_query = """
-            PREFIX kg: <http://example.org/convfinqa/>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            SELECT DISTINCT ?pattern ?phrase ?operation ?comment
-            WHERE {
-                ?pattern a kg:LinguisticPattern .
-                ?pattern kg:naturalLanguagePhrase ?phrase .
-                ?pattern kg:semanticOperation ?operation .
-                OPTIONAL { ?pattern rdfs:comment ?comment }
-            }
-        """
-
-        for row in g.query(pattern_query):
-            operation_name = str(row.operation).split('/')[-1] if row.operation else 'Unknown'
-            patterns.append({
-                'phrase': str(row.phrase),
-                'operation': operation_name,
-                'guidance': str(row.comment) if row.comment else '',
-                'uri': str(row.pattern)
-            })
-
-        # Load model and compute embeddings
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-
-        # Embed pattern phrases (including their guidance text for better matching)
-        pattern_texts = [f"{p['phrase']}. {p['guidance'][:200]}" for p in patterns]
-        pattern_embeddings = model.encode(pattern_texts, show_progress_bar=False)
-
-        # Save to cache
-        with open(cache_file, 'wb') as f:
-            pickle.dump({
-                'ontology_mtime': ontology_mtime,
-                'patterns': patterns,
-                'embeddings': pattern_embeddings
-            }, f)
-
-    # Embed the question
-    question_embedding = model.encode([question], show_progress_bar=False)[0]
-
-    # Compute cosine similarity
-    from sklearn.metrics.pairwise import cosine_similarity
-    similarities = cosine_similarity([question_embedding], pattern_embeddings)[0]
-
-    # Get top-K most similar patterns
-    top_indices = similarities.argsort()[-top_k:][::-1]
-    matched_patterns = [patterns[i] for i in top_indices]
+    # Resident model and pattern index (see pattern_index.py)
+    from pattern_index import question_relevant_patterns
+    matched_patterns = question_relevant_patterns(question, ontology_path, use_cache=use_cache, top_k=top_k)
 
     # Format as readable guidance text
     guidance_text = f"""RELEVANT ONTOLOGY PATTERNS (top {len(matched_patterns)} by semantic similarity):
@@ -413,28 +502,46 @@ Question: {question}
     return guidance_text
 
 
-def load_targeted_guidance(example_id, ontology_path=None, use_cache=True):
+# In-process memo: {sections_path: ((mtime_ns, size), sections_data)}
+_sections_memo = {}
+
+
+def _default_sections_path():
+    return Path(__file__).parent.parent.parent / "ontology" / "example_sections.json"
+
+
+def _load_example_sections(sections_path=None):
+    """Load example_sections.json, re-reading it only when the file changes"""
+    sections_path = Path(sections_path) if sections_path else _default_sections_path()
+    stat = sections_path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    memo = _sections_memo.get(str(sections_path))
+    if memo is not None and memo[0] == signature:
+        return memo[1]
+
+    with open(sections_path) as f:
+        sections_data = json.load(f)
+    _sections_memo[str(sections_path)] = (signature, sections_data)
+    return sections_data
+
+
+def load_targeted_guidance(example_id, ontology_path=None, use_cache=True, sections_path=None):
     """
     Load only the ontology elements needed for a specific example
 
+    Patterns, operations and value types are looked up in the materialized
+    ontology artifact (see load_ontology_artifact), so no SPARQL runs per call.
+
     Args:
         example_id: Example ID to load sections for
         ontology_path: Path to ontology file (defaults to ontology/convfinqa-ontology.ttl)
-        use_cache: If True, use SQLite cache for faster loading (default)
+        use_cache: If True, use the materialized artifact and SQLite cache (default)
+        sections_path: Path to example sections mapping (defaults to ontology/example_sections.json)
 
     Returns:
         Formatted string with only the relevant patterns, operations, and types for this example
     """
-    import json
-
-    if ontology_path is None:
-        base_dir = Path(__file__).parent.parent.parent
-        ontology_path = base_dir / "ontology" / "convfinqa-ontology.ttl"
-
-    # Load example sections mapping
-    sections_path = Path(__file__).parent.parent.parent / "ontology" / "example_sections.json"
-    with open(sections_path) as f:
-        sections_data = json.load(f)
+    sections_data = _load_example_sections(sections_path)
 
     example_id_str = str(example_id)
     if example_id_str not in sections_data['examples']:
@@ -446,9 +553,9 @@ def load_targeted_guidance(example_id, ontology_path=None, use_cache=True):
 
     section = sections_data['examples'][example_id_str]
 
-    # Load ontology graph
-    g = _load_ontology_graph(ontology_path, use_cache=use_cache)
-    kg = Namespace("http://example.org/convfinqa/")
+    artifact = load_ontology_artifact(ontology_path, use_cache=use_cache)
+    pattern_rows = artifact['pattern_rows']
+    description_rows = artifact['description_rows']
 
     guidance_text = f"""TARGETED ONTOLOGY GUIDANCE FOR EXAMPLE {example_id}:
 ===============================================
@@ -463,70 +570,28 @@ def load_targeted_guidance(example_id, ontology_path=None, use_cache=True):
         guidance_text += "-" * 60 + "\n"
 
         for pattern_name in section['patterns']:
-            pattern_uri = f"http://example.org/convfinqa/{pattern_name}"
-            query = f"""
-                PREFIX kg: <http://example.org/convfinqa/>
-                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-                SELECT ?phrase ?operation ?comment
-                WHERE {{
-                    <{pattern_uri}> kg:naturalLanguagePhrase ?phrase .
-                    <{pattern_uri}> kg:semanticOperation ?operation .
-                    OPTIONAL {{ <{pattern_uri}> rdfs:comment ?comment }}
-                }}
-            """
-            for row in g.query(query):
-                operation_name = str(row.operation).split('/')[-1] if row.operation else 'Unknown'
+            for row in pattern_rows.get(pattern_name, []):
                 guidance_text += f"\nPattern: {pattern_name}\n"
-                guidance_text += f"Phrase: \"{row.phrase}\"\n"
-                guidance_text += f"Operation: {operation_name}\n"
-                if row.comment:
-                    cleaned = str(row.comment).replace('\n', '\n  ')
+                guidance_text += f"Phrase: \"{row['phrase']}\"\n"
+                guidance_text += f"Operation: {row['operation']}\n"
+                if row['comment']:
+                    cleaned = row['comment'].replace('\n', '\n  ')
                     guidance_text += f"Guidance: {cleaned}\n"
 
-    # Load specified operations
-    if section['operations']:
-        guidance_text += "\n" + "=" * 60 + "\n"
-        guidance_text += "\nRELEVANT SEMANTIC OPERATIONS:\n"
-        guidance_text += "-" * 60 + "\n"
-
-        for op_name in section['operations']:
-            op_uri = f"http://example.org/convfinqa/{op_name}"
-            query = f"""
-                PREFIX kg: <http://example.org/convfinqa/>
-                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-                SELECT ?label ?comment
-                WHERE {{
-                    <{op_uri}> rdfs:label ?label .
-                    OPTIONAL {{ <{op_uri}> rdfs:comment ?comment }}
-                }}
-            """
-            for row in g.query(query):
-                guidance_text += f"\n{row.label}:\n"
-                if row.comment:
-                    cleaned = str(row.comment).replace('\n', '\n  ')
-                    guidance_text += f"  {cleaned}\n"
-
-    # Load specified value types
-    if section['value_types']:
+    # Load specified operations and value types
+    for heading, names in (("RELEVANT SEMANTIC OPERATIONS", section['operations']),
+                           ("RELEVANT VALUE TYPES", section['value_types'])):
+        if not names:
+            continue
         guidance_text += "\n" + "=" * 60 + "\n"
-        guidance_text += "\nRELEVANT VALUE TYPES:\n"
+        guidance_text += f"\n{heading}:\n"
         guidance_text += "-" * 60 + "\n"
 
-        for type_name in section['value_types']:
-            type_uri = f"http://example.org/convfinqa/{type_name}"
-            query = f"""
-                PREFIX kg: <http://example.org/convfinqa/>
-                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-                SELECT ?label ?comment
-                WHERE {{
-                    <{type_uri}> rdfs:label ?label .
-                    OPTIONAL {{ <{type_uri}> rdfs:comment ?comment }}
-                }}
-            """
-            for row in g.query(query):
-                guidance_text += f"\n{row.label}:\n"
-                if row.comment:
-                    cleaned = str(row.comment).replace('\n', '\n  ')
+        for name in names:
+            for row in description_rows.get(name, []):
+                guidance_text += f"\n{row['label']}:\n"
+                if row['comment']:
+                    cleaned = row['comment'].replace('\n', '\n  ')
                     guidance_text += f"  {cleaned}\n"
 
     return guidance_text
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Resident sentence-embedding model and top-k index over ontology patterns
+
+load_question_relevant_guidance() runs on every Phase 2B turn. The
+SentenceTransformer is loaded once per process, the pattern embeddings are
+kept as one L2-normalized, C-contiguous float32 matrix per ontology content
+hash, and question embeddings go through an LRU. A lookup is then one
+matrix-vector product plus argpartition.
+
+On disk the matrix is a .npy file named by ontology hash, opened with
+mmap_mode='r' so parallel solver workers share one page-cached copy, plus
+a JSON sidecar (pattern metadata, ontology hash, model, dtype) that points
+at it. Both are written atomically; the sidecar is the commit point. An
+int8 variant (PATTERN_EMBEDDING_DTYPE=int8) stores rows quantized with a
+per-row scale for a 4x smaller matrix.
+"""
+import json
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from ontology_loader import _distinct_patterns, load_ontology_artifact
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Distinct questions whose embeddings are kept (PATTERN_QUESTION_CACHE_SIZE)
+QUESTION_CACHE_SIZE = int(os.environ.get('PATTERN_QUESTION_CACHE_SIZE', '1024'))
+
+# On-disk/resident matrix type: 'float32' or 'int8' (PATTERN_EMBEDDING_DTYPE)
+EMBEDDING_DTYPE = os.environ.get('PATTERN_EMBEDDING_DTYPE', 'float32')
+EMBEDDING_DTYPES = ('float32', 'int8')
+
+STORE_VERSION = 1
+
+_lock = threading.RLock()
+_model = None
+_indexes = {}  # {(ontology content hash, dtype): PatternIndex}
+
+
+def get_embedding_model():
+    """Return this process's SentenceTransformer, loading it on first use"""
+    global _model
+    with _lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(MODEL_NAME)
+        return _model
+
+
+def normalize_rows(embeddings):
+    """L2-normalize rows into a C-contiguous float32 matrix (all-zero rows stay zero)"""
+    matrix = np.array(embeddings, dtype=np.float32, order='C', ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def quantize_rows(embeddings):
+    """
+    Quantize normalized rows to int8 with one scale per row
+
+    Returns:
+        (int8 matrix, float32 row scales) - row i is approximately matrix[i] * row_scales[i]
+    """
+    matrix = normalize_rows(embeddings)
+    row_scales = np.abs(matrix).max(axis=1) / 127.0
+    row_scales[row_scales == 0] = 1.0
+    quantized = np.rint(matrix / row_scales[:, None]).astype(np.int8)
+    return np.ascontiguousarray(quantized), row_scales.astype(np.float32)
+
+
+class PatternIndex:
+    """
+    Ontology patterns with their normalized embeddings
+
+    Dot products against a normalized query equal cosine similarities. The
+    matrix may be a read-only memmap; for int8 matrices, row_scales holds
+    the per-row dequantization factors.
+    """
+
+    def __init__(self, patterns, embeddings, row_scales=None, normalized=False):
+        self.patterns = patterns
+        self.embeddings = embeddings if normalized else normalize_rows(embeddings)
+        self.row_scales = row_scales
+        if len(self.patterns) != len(self.embeddings):
+            raise ValueError(f"{len(self.patterns)} patterns but {len(self.embeddings)} embeddings")
+
+    def top_k(self, query_embedding, k):
+        """
+        Most similar patterns to a query embedding
+
+        Args:
+            query_embedding: Query vector (normalized here if it isn't already)
+            k: Number of patterns to return
+
+        Returns:
+            List of (pattern, cosine similarity), most similar first
+        """
+        k = min(k, len(self.patterns))
+        if k <= 0:
+            return []
+        query = normalize_rows(query_embedding)[0]
+        scores = self.embeddings @ query
+        if self.row_scales is not None:
+            scores = scores * self.row_scales
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.patterns[i], float(scores[i])) for i in top]
+
+
+@lru_cache(maxsize=QUESTION_CACHE_SIZE)
+def embed_question(question):
+    """Normalized (read-only) embedding of a question, memoized per text"""
+    embedding = normalize_rows(get_embedding_model().encode([question], show_progress_bar=False))[0]
+    embedding.setflags(write=False)
+    return embedding
+
+
+def _store_dir():
+    return Path(__file__).parent.parent.parent / "data"
+
+
+def _sidecar_path(dtype):
+    return _store_dir() / f".pattern_embeddings.{dtype}.json"
+
+
+def _pattern_text(pattern):
+    # Phrase plus the start of its guidance text matches questions better than the phrase alone
+    return f"{pattern['phrase']}. {pattern['guidance'][:200]}"
+
+
+def _build_index(artifact):
+    patterns = [dict(p) for p in _distinct_patterns(artifact['patterns'])]
+    embeddings = get_embedding_model().encode([_pattern_text(p) for p in patterns], show_progress_bar=False)
+    return PatternIndex(patterns, embeddings)
+
+
+def _atomic_write(path, write):
+    """Write a file via a temp file and rename, so readers never see it partially written"""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def save_embedding_store(index, content_hash, dtype=EMBEDDING_DTYPE):
+    """
+    Write a pattern index as a .npy matrix plus JSON sidecar
+
+    Args:
+        index: PatternIndex with float embeddings
+        content_hash: Ontology content hash the embeddings were built from
+        dtype: 'float32' or 'int8' (quantized with per-row scales)
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype {dtype!r} (expected one of {EMBEDDING_DTYPES})")
+    store_dir = _store_dir()
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    if dtype == 'int8':
+        matrix, row_scales = quantize_rows(index.embeddings)
+    else:
+        matrix, row_scales = normalize_rows(index.embeddings), None
+
+    # The matrix file is immutable per ontology hash; the sidecar swap publishes it
+    matrix_name = f".pattern_embeddings.{content_hash[:16]}.{dtype}.npy"
+    _atomic_write(store_dir / matrix_name, lambda f: np.save(f, matrix))
+    sidecar = {
+        'store_version': STORE_VERSION,
+        'content_hash': content_hash,
+        'model': MODEL_NAME,
+        'dtype': dtype,
+        'shape': list(matrix.shape),
+        'matrix_file': matrix_name,
+        'row_scales': row_scales.tolist() if row_scales is not None else None,
+        'patterns': index.patterns,
+    }
+    _atomic_write(_sidecar_path(dtype), lambda f: f.write(json.dumps(sidecar, indent=1).encode()))
+
+    # Matrices for older ontology versions (readers that still map them keep their pages)
+    for old_matrix in store_dir.glob(f".pattern_embeddings.*.{dtype}.npy"):
+        if old_matrix.name != matrix_name:
+            old_matrix.unlink(missing_ok=True)
+    (store_dir / ".pattern_embeddings_cache.pkl").unlink(missing_ok=True)  # Pre-.npy cache format
+
+
+def load_embedding_store(content_hash, dtype=EMBEDDING_DTYPE):
+    """
+    Open the on-disk pattern index for an ontology hash as a read-only memmap
+
+    Returns:
+        PatternIndex, or None if the store is missing, stale or unreadable
+    """
+    sidecar_path = _sidecar_path(dtype)
+    if not sidecar_path.exists():
+        return None
+    try:
+        with open(sidecar_path) as f:
+            sidecar = json.load(f)
+        if (sidecar['store_version'] != STORE_VERSION or sidecar['content_hash'] != content_hash
+                or sidecar['model'] != MODEL_NAME or sidecar['dtype'] != dtype):
+            return None
+        matrix = np.load(_store_dir() / sidecar['matrix_file'], mmap_mode='r', allow_pickle=False)
+        if list(matrix.shape) != sidecar['shape'] or matrix.dtype != np.dtype(dtype) \
+                or matrix.shape[0] != len(sidecar['patterns']):
+            raise ValueError(f"matrix {matrix.shape}/{matrix.dtype} does not match sidecar")
+        row_scales = sidecar['row_scales']
+        if row_scales is not None:
+            row_scales = np.asarray(row_scales, dtype=np.float32)
+        return PatternIndex(sidecar['patterns'], matrix, row_scales=row_scales, normalized=True)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Warning: Pattern embedding store {sidecar_path.name} unreadable, rebuilding: {e}")
+        return None
+
+
+def get_pattern_index(ontology_path=None, use_cache=True, dtype=EMBEDDING_DTYPE):
+    """
+    Return the resident pattern index for an ontology, building it once per content hash
+
+    Args:
+        ontology_path: Path to ontology file (defaults to ontology/convfinqa-ontology.ttl)
+        use_cache: If False, re-embed all patterns (and refresh the on-disk store)
+        dtype: 'float32' or 'int8' matrix
+
+    Returns:
+        PatternIndex over a memory-mapped matrix
+    """
+    artifact = load_ontology_artifact(ontology_path, use_cache=use_cache)
+    content_hash = artifact['content_hash']
+    with _lock:
+        index = _indexes.get((content_hash, dtype)) if use_cache else None
+        if index is not None:
+            return index
+
+        if use_cache:
+            index = load_embedding_store(content_hash, dtype)
+        if index is None:
+            built = _build_index(artifact)
+            save_embedding_store(built, content_hash, dtype)
+            # Serve from the mapped file so workers share its pages
+            index = load_embedding_store(content_hash, dtype) or built
+
+        _indexes[(content_hash, dtype)] = index
+        return index
+
+
+def question_relevant_patterns(question, ontology_path=None, use_cache=True, top_k=10):
+    """
+    Top-k ontology patterns for a question by embedding similarity
+
+    Returns:
+        List of pattern dicts (phrase, operation, guidance), most similar first
+    """
+    index = get_pattern_index(ontology_path, use_cache=use_cache)
+    return [pattern for pattern, _ in index.top_k(embed_question(question), top_k)]
@@ -151,11 +151,14 @@ def run_phase1(test_case, previous_results, calculation_rules, verbose=False, kg
     env = Environment(loader=FileSystemLoader(str(template_dir)))
     template = env.get_template('value_planning.j2')
 
+    # Static prefix (calculation rules, task, output format) is identical on every
+    # turn, so it is sent as a prompt-cache breakpoint ahead of the per-turn part
+    static_prefix = env.get_template('value_planning_prefix.j2').render(calculation_rules=calculation_rules)
+
     # Render prompt with RESOLVED question
     prompt = template.render(
         question=resolved_question,  # Use resolved question from Phase 0
         previous_results=previous_results,
-        calculation_rules=calculation_rules,
         kg_data=kg_data
     )
 
@@ -169,9 +172,9 @@ def run_phase1(test_case, previous_results, calculation_rules, verbose=False, kg
 
     if verbose:
         print(f"\n--- PHASE 1: Value Planning ---")
-        print(f"Prompt length: {len(prompt)} chars")
+        print(f"Prompt length: {len(static_prefix) + len(prompt)} chars ({len(static_prefix)} cacheable)")
 
-    response = call_llm(prompt, metadata)
+    response = call_llm(prompt, metadata, static_prefix=static_prefix)
 
     # Parse JSON response
     try:
@@ -8,7 +8,7 @@ from jinja2 import Environment, FileSystemLoader
 # Add parent directories to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from common.llm_client import call_llm
-from execution import load_graph, extract_sample_entities
+from kg_prompt_data import kg_prompt_data_for_graph, load_kg_prompt_data
 
 
 def parse_json_response(response):
@@ -86,122 +86,8 @@ def extract_table_data_for_prompt(graph):
 
     This format is more natural for LLMs - they can read row by row like a human.
     """
-    from rdflib.namespace import RDF, RDFS
-    from rdflib import Namespace
-    from collections import defaultdict
-
-    KG = Namespace('http://example.org/convfinqa/')
-
-    # First pass: collect all data grouped by row
-    rows_data = defaultdict(dict)  # {row_label: {col_label: {value, scale} or text_value}}
-    column_header_values = []  # Metrics with only column label (header values)
-    row_header_values = []  # Metrics with only row label (header values)
-    text_derived_metrics = []  # Metrics from text (no tableRow/tableColumn)
-    metric_comments = {}  # {row_label: footnote_explanation} for semantic matching
-
-    # Query for all metrics with tableRow and tableColumn
-    for metric in graph.subjects(RDF.type, KG.FinancialMetric):
-        row_label = None
-        col_label = None
-        value = None
-        scale = None
-        text_value = None
-        comment = None
-
-        # Get row label
-        for row in graph.objects(metric, KG.tableRow):
-            row_label = str(row)
-            break
-
-        # Get column label
-        for col in graph.objects(metric, KG.tableColumn):
-            col_label = str(col)
-            break
-
-        # Get comment if present (footnote explanation)
-        for cmt in graph.objects(metric, RDFS.comment):
-            comment = str(cmt)
-            break
-
-        # Try to get numeric value first
-        for value_entity in graph.objects(metric, KG.hasValue):
-            # Get numeric value
-            for num_val in graph.objects(value_entity, KG.numericValue):
-                value = float(num_val)
-
-            # Get scale
-            for scale_uri in graph.objects(value_entity, KG.hasScale):
-                scale = str(scale_uri).split('/')[-1].split('#')[-1]
-
-            break
-
-        # If no numeric value, check for text value
-        if value is None:
-            for text_val in graph.objects(metric, KG.textValue):
-                text_value = str(text_val)
-                break
-
-        # Skip if neither value type found
-        if value is None and text_value is None:
-            continue
-
-        # Store comment for this row label (if present)
-        if row_label and comment:
-            # Store comment (only need one per row_label, even if multiple columns)
-            if row_label not in metric_comments:
-                metric_comments[row_label] = comment
-
-        # Categorize metric based on what it has
-        if row_label and col_label:
-            # Regular table cell (numeric or text)
-            if value is not None:
-                rows_data[row_label][col_label] = {
-                    "value": value,
-                    "scale": scale or "Units"
-                }
-            else:
-                # Text cell - store as simple string
-                rows_data[row_label][col_label] = text_value
-        elif col_label and not row_label and value is not None:
-            # Column header value (e.g., "$ 9889" column header)
-            column_header_values.append({
-                "label": col_label,
-                "value": value,
-                "scale": scale or "Units"
-            })
-        elif row_label and not col_label and value is not None:
-            # Row header value (less common)
-            row_header_values.append({
-                "label": row_label,
-                "value": value,
-                "scale": scale or "Units"
-            })
-        elif not row_label and not col_label and value is not None:
-            # Text-derived metric (no table structure)
-            # Get the metric label
-            for label in graph.objects(metric, KG.label):
-                metric_label = str(label)
-                text_derived_metrics.append({
-                    "label": metric_label,
-                    "value": value,
-                    "scale": scale or "Units"
-                })
-                break
-
-    # Second pass: convert rows_data to list of row objects
-    table_rows = []
-    for row_label, columns in rows_data.items():
-        row_obj = {"metric": row_label}
-        row_obj.update(columns)
-        table_rows.append(row_obj)
-
-    return {
-        "table_cells": table_rows,
-        "column_header_values": column_header_values,
-        "row_header_values": row_header_values,
-        "text_derived_metrics": text_derived_metrics,
-        "metric_comments": metric_comments
-    }
+    # Single scan shared with extract_sample_entities (see kg_prompt_data.py)
+    return kg_prompt_data_for_graph(graph)['table_data']
 
 
 def run_phase2_llm_extraction(values_spec, kg_schema, test_case, verbose=False):
@@ -232,11 +118,12 @@ def run_phase2_llm_extraction(values_spec, kg_schema, test_case, verbose=False):
 
     # Load graph and extract entities + table data
     try:
-        kg_graph = load_graph(test_case['example_id'])
-        sample_entities = extract_sample_entities(kg_graph)
+        # One scan per KG content hash for both structures
+        kg_prompt_data = load_kg_prompt_data(test_case['example_id'])
+        sample_entities = kg_prompt_data['sample_entities']
 
         # Extract full table data for LLM (including header values and comments!)
-        table_data_full = extract_table_data_for_prompt(kg_graph)
+        table_data_full = kg_prompt_data['table_data']
         sample_entities['table_data'] = table_data_full['table_cells']
         sample_entities['column_header_values'] = table_data_full['column_header_values']
         sample_entities['row_header_values'] = table_data_full['row_header_values']
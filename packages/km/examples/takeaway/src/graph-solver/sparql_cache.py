@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Bounded cache of prepared SPARQL queries with literal re-binding
+
+LLM-generated queries for different turns usually differ only in their
+constants ("granted" vs "vested", 2012 vs 2013). Literal constants inside
+the query body are lifted into placeholder variables, so all those queries
+share one normalized template that rdflib parses and compiles to algebra
+once; the constants are then re-bound through initBindings on every run.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from rdflib import Literal
+from rdflib.namespace import XSD
+from rdflib.plugins.sparql import prepareQuery
+
+PLACEHOLDER_PREFIX = '__pq'
+
+_SCAN_RE = re.compile(r'''
+    (?P<comment>\#[^\n]*)
+  | (?P<ws>\s+)
+  | (?P<iri><[^<>"{}|^`\\\s]*>)
+  | (?P<longstring>"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\')
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<var>[?$][A-Za-z0-9_]+)
+  | (?P<pname>(?:[A-Za-z][A-Za-z0-9_\-.]*)?:[A-Za-z0-9_\-.%:]*)
+  | (?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<lang>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<other>\^\^|&&|\|\||!=|<=|>=|.)
+''', re.VERBOSE | re.DOTALL)
+
+_UNESCAPE = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+_ESCAPE_RE = re.compile(r'\\(.)')
+
+# Query features where a literal must stay a literal or variable scoping differs
+_NO_LIFT_KEYWORDS = {'VALUES', 'SERVICE', 'SEPARATOR', 'CONSTRUCT', 'DESCRIBE', 'ASK'}
+
+
+def _unescape(body):
+    return _ESCAPE_RE.sub(lambda m: _UNESCAPE.get(m.group(1), m.group(0)), body)
+
+
+def _selects_star(tokens):
+    """True for SELECT * / SELECT DISTINCT * (placeholders would leak into results)"""
+    for i, (kind, text) in enumerate(tokens):
+        if kind == 'word' and text.upper() == 'SELECT':
+            rest = [t for _, t in tokens[i + 1:i + 3]]
+            if rest[:1] == ['*'] or (rest[:1] and rest[0].upper() in ('DISTINCT', 'REDUCED') and rest[1:] == ['*']):
+                return True
+    return False
+
+
+def parameterize_query(sparql_query):
+    """
+    Split a SPARQL query into a normalized template and its literal constants
+
+    Plain string and numeric literals in the query body (inside braces, not
+    LIMIT/OFFSET) become ?__pq0, ?__pq1, ... Queries whose semantics could
+    change under that rewrite (SELECT *, sub-selects, VALUES, GROUP_CONCAT
+    separators, non-SELECT forms) are normalized but not parameterized.
+
+    Args:
+        sparql_query: SPARQL query text (with prefixes)
+
+    Returns:
+        (template, bindings) where bindings maps placeholder names to rdflib Literals
+    """
+    tokens = []
+    pos = 0
+    while pos < len(sparql_query):
+        match = _SCAN_RE.match(sparql_query, pos)
+        kind = match.lastgroup
+        if kind not in ('ws', 'comment'):
+            tokens.append((kind, match.group(kind)))
+        pos = match.end()
+
+    words = [text.upper() for kind, text in tokens if kind == 'word']
+    can_lift = (words.count('SELECT') == 1 and not _NO_LIFT_KEYWORDS.intersection(words)
+                and not _selects_star(tokens))
+
+    parts = []
+    bindings = {}
+    depth = 0
+    for i, (kind, text) in enumerate(tokens):
+        prev = tokens[i - 1][1].upper() if i > 0 else ''
+        nxt = tokens[i + 1][1] if i + 1 < len(tokens) else ''
+        liftable = (can_lift and depth > 0 and nxt != '^^' and not nxt.startswith('@')
+                    and prev not in ('^^', 'LIMIT', 'OFFSET'))
+
+        if kind == 'string' and liftable:
+            name = f"{PLACEHOLDER_PREFIX}{len(bindings)}"
+            bindings[name] = Literal(_unescape(text[1:-1]))
+            parts.append('?' + name)
+        elif kind == 'number' and liftable and prev not in ('+', '-'):
+            name = f"{PLACEHOLDER_PREFIX}{len(bindings)}"
+            if 'e' in text.lower():
+                datatype = XSD.double
+            else:
+                datatype = XSD.decimal if '.' in text else XSD.integer
+            bindings[name] = Literal(text, datatype=datatype)
+            parts.append('?' + name)
+        elif (kind == 'lang' or text == '^^' or prev == '^^') and parts:
+            parts[-1] += text  # Language tags and datatypes must touch their string
+        else:
+            if text == '{':
+                depth += 1
+            elif text == '}':
+                depth -= 1
+            parts.append(text)
+
+    return ' '.join(parts), bindings
+
+
+class PreparedQueryCache:
+    """
+    LRU cache of prepared (parsed + algebra-compiled) SPARQL queries
+
+    Keyed by the normalized template from parameterize_query(). Tracks time
+    spent preparing queries separately from time spent evaluating them.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # template -> prepared Query
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fallbacks = 0
+        self.parse_seconds = 0.0
+        self.eval_seconds = 0.0
+
+    def prepare(self, sparql_query):
+        """
+        Return (prepared_query, init_bindings) for a query, compiling it on a miss
+
+        If the parameterized template fails to compile, the original text is
+        prepared and cached unparameterized instead.
+        """
+        template, bindings = parameterize_query(sparql_query)
+        with self._lock:
+            # Queries whose template failed to compile are cached by raw text
+            for key, key_bindings in ((template, bindings), (sparql_query, {})):
+                prepared = self._entries.get(key)
+                if prepared is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return prepared, key_bindings
+            self.misses += 1
+
+        start = time.perf_counter()
+        try:
+            prepared = prepareQuery(template)
+        except Exception:
+            if not bindings:
+                raise
+            # Lifting produced something rdflib rejects - cache the literal form
+            self.fallbacks += 1
+            template, bindings = sparql_query, {}
+            prepared = prepareQuery(sparql_query)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.parse_seconds += elapsed
+
+        with self._lock:
+            self._entries[template] = prepared
+            self._entries.move_to_end(template)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return prepared, bindings
+
+    def query(self, graph, sparql_query):
+        """Run a query through the cache and return its result rows as a list"""
+        prepared, bindings = self.prepare(sparql_query)
+        start = time.perf_counter()
+        try:
+            return list(graph.query(prepared, initBindings=bindings))
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.eval_seconds += elapsed
+
+    def clear(self):
+        """Drop all prepared queries (stats are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a snapshot of cache counters and parse/eval timings"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'fallbacks': self.fallbacks,
+                'parse_seconds': self.parse_seconds,
+                'eval_seconds': self.eval_seconds,
+            }
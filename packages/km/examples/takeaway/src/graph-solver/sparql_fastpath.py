@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""Fast-path evaluator for simple basic-graph-pattern SPARQL
+
+Most execute_sparql() calls are a single BGP over kg:tableRow / kg:tableColumn /
+kg:hasValue / kg:numericValue / kg:hasScale, plus string FILTERs, a REPLACE
+BIND and sometimes SUM. For that subset this module plans the query itself
+(join order by selectivity, filters pushed down to the first step that binds
+their variables) and runs it against graph.triples(), skipping rdflib's
+algebra translation and general evaluator. Anything else returns None so the
+caller falls back to rdflib.
+"""
+import re
+from functools import lru_cache
+from itertools import islice
+from rdflib import Literal, URIRef, Variable
+from rdflib.namespace import RDF, XSD
+from rdflib.plugins.sparql.aggregates import type_safe_numbers
+from rdflib.plugins.sparql.operators import numeric, type_promotion
+from rdflib.query import ResultRow
+from fact_index import KG, parse_select_query
+
+# Stop counting candidates past this - enough to rank patterns
+_ESTIMATE_CAP = 10000
+
+_STRING_DATATYPES = (None, XSD.string)
+
+
+class Unsupported(Exception):
+    """The query (or a value met while evaluating it) is outside the fast-path subset"""
+
+
+class _EvalError(Exception):
+    """SPARQL expression error - the FILTER is false / the BIND leaves its variable unbound"""
+
+
+@lru_cache(maxsize=512)
+def plan_query(sparql_query):
+    """
+    Compile a query into a fast-path plan
+
+    Returns:
+        dict with 'patterns', 'filters', 'binds', 'select', 'aggregates' and
+        'distinct', or None if the query is outside the supported subset
+    """
+    try:
+        parsed = parse_select_query(sparql_query)
+        return _plan(parsed)
+    except (ValueError, IndexError, Unsupported):
+        return None
+
+
+def _plan(parsed):
+    if parsed['modifiers']:
+        raise Unsupported("Solution modifiers (GROUP BY, ORDER BY, LIMIT, ...) are not supported")
+
+    patterns = tuple(tuple(_rdf_term(term, parsed['prefixes']) for term in triple)
+                     for triple in parsed['triples'])
+    if not patterns:
+        raise Unsupported("Empty graph pattern")
+    pattern_vars = {term for triple in patterns for term in triple if isinstance(term, Variable)}
+
+    binds = []
+    for expr, alias in parsed['binds']:
+        alias = Variable(alias)
+        if alias in pattern_vars or alias in (b[1] for b in binds):
+            raise Unsupported("BIND target already in scope")
+        binds.append((_compile_expr(expr, parsed['prefixes']), alias))
+    bound_vars = pattern_vars | {alias for _, alias in binds}
+
+    filters = [_compile_expr(expr, parsed['prefixes']) for expr in parsed['filters']]
+
+    aggregates = []
+    for func, var, alias in parsed['aggregates']:
+        if func not in ('SUM', 'COUNT'):
+            raise Unsupported(f"Aggregate {func} is not supported")
+        if Variable(alias) in bound_vars:
+            raise Unsupported("Aggregate alias already in scope")
+        aggregates.append((func, Variable(var), Variable(alias)))
+
+    select = [Variable(var) for var in parsed['select']]
+    if not select and not aggregates:
+        raise Unsupported("SELECT * is not supported")
+    if select and aggregates:
+        raise Unsupported("Mixing aggregates and plain variables needs GROUP BY")
+    if len(set(select)) != len(select):
+        raise Unsupported("Duplicate projection")
+
+    return {
+        'patterns': patterns,
+        'filters': filters,
+        'binds': binds,
+        'select': select,
+        'aggregates': aggregates,
+        'distinct': parsed['distinct'],
+    }
+
+
+def _rdf_term(term, prefixes):
+    kind, value = term
+    if kind == 'var':
+        return Variable(value)
+    if kind == 'literal':
+        return Literal(value)
+    if value == 'rdf:type':
+        return RDF.type
+    if value.startswith('<'):
+        return URIRef(value[1:-1])
+    prefix, local = value.split(':', 1)
+    if prefix not in prefixes:
+        raise Unsupported(f"Undeclared prefix {prefix}:")
+    return {'kg': KG, 'rdf': RDF}[prefix][local]
+
+
+def _compile_expr(expr, prefixes):
+    """Turn a parsed expression into a nested tuple of rdflib terms"""
+    kind = expr[0]
+    if kind == 'and':
+        return ('and', [_compile_expr(atom, prefixes) for atom in expr[1]])
+    if kind == '=':
+        return ('=', _compile_expr(expr[1], prefixes), _compile_expr(expr[2], prefixes))
+    if kind == 'term':
+        return ('term', _rdf_term(expr[1], prefixes))
+    if kind == 'call':
+        func, args = expr[1], expr[2]
+        arity = {'STR': 1, 'LCASE': 1, 'UCASE': 1, 'CONTAINS': 2, 'STRSTARTS': 2, 'STRENDS': 2, 'REPLACE': 3}
+        if arity.get(func) != len(args):
+            raise Unsupported(f"Function {func}/{len(args)} is not supported")
+        compiled = [_compile_expr(arg, prefixes) for arg in args]
+        if func == 'REPLACE':
+            # Only constant patterns without group references ($1) in the replacement
+            pattern, replacement = compiled[1], compiled[2]
+            if pattern[0] != 'term' or replacement[0] != 'term' \
+                    or not isinstance(pattern[1], Literal) or not isinstance(replacement[1], Literal) \
+                    or '$' in replacement[1] or '\\' in replacement[1]:
+                raise Unsupported("Only REPLACE with literal pattern/replacement is supported")
+            compiled[1] = ('regex', re.compile(str(pattern[1])))
+        return ('call', func, compiled)
+    raise Unsupported(f"Unsupported expression {kind}")
+
+
+# ---------------------------------------------------------------------------
+# Expression evaluation (SPARQL error semantics: errors make FILTERs false)
+# ---------------------------------------------------------------------------
+
+def _string_literal(value):
+    """Check a value is a simple/xsd:string/language-tagged literal"""
+    if not isinstance(value, Literal) or value.datatype not in _STRING_DATATYPES:
+        raise _EvalError("Expected a string literal")
+    return value
+
+
+def _compatible(a, b):
+    # SPARQL argument compatibility rules for string functions
+    return b.language is None or a.language == b.language
+
+
+def _eval(expr, bindings):
+    kind = expr[0]
+    if kind == 'term':
+        term = expr[1]
+        if isinstance(term, Variable):
+            value = bindings.get(term)
+            if value is None:
+                raise _EvalError(f"Unbound variable ?{term}")
+            return value
+        return term
+    if kind == 'and':
+        # SPARQL &&: false if any operand is false, error only if no operand is false
+        error = None
+        for atom in expr[1]:
+            try:
+                if not _effective_boolean(_eval(atom, bindings)):
+                    return Literal(False)
+            except _EvalError as e:
+                error = e
+        if error is not None:
+            raise error
+        return Literal(True)
+    if kind == '=':
+        left, right = _eval(expr[1], bindings), _eval(expr[2], bindings)
+        if not (isinstance(left, Literal) and isinstance(right, Literal)):
+            if isinstance(left, Literal) or isinstance(right, Literal):
+                return Literal(False)
+            return Literal(left == right)
+        if left.datatype not in _STRING_DATATYPES or right.datatype not in _STRING_DATATYPES:
+            raise Unsupported("Only string equality is evaluated on the fast path")
+        if left.language != right.language:
+            raise Unsupported("Language-tag mismatch in =")
+        return Literal(str(left) == str(right))
+
+    func, args = expr[1], expr[2]
+    if func == 'STR':
+        value = _eval(args[0], bindings)
+        if not isinstance(value, (Literal, URIRef)):
+            raise _EvalError("STR of a blank node")
+        return Literal(str(value))
+    if func in ('LCASE', 'UCASE'):
+        value = _string_literal(_eval(args[0], bindings))
+        text = str(value).lower() if func == 'LCASE' else str(value).upper()
+        return Literal(text, lang=value.language, datatype=value.datatype)
+    if func in ('CONTAINS', 'STRSTARTS', 'STRENDS'):
+        haystack = _string_literal(_eval(args[0], bindings))
+        needle = _string_literal(_eval(args[1], bindings))
+        if not _compatible(haystack, needle):
+            raise _EvalError("Incompatible string arguments")
+        test = {'CONTAINS': str.__contains__, 'STRSTARTS': str.startswith, 'STRENDS': str.endswith}[func]
+        return Literal(test(str(haystack), str(needle)))
+    if func == 'REPLACE':
+        value = _string_literal(_eval(args[0], bindings))
+        text = args[1][1].sub(str(args[2][1]), str(value))
+        return Literal(text, lang=value.language, datatype=value.datatype)
+    raise Unsupported(f"Function {func}")
+
+
+def _effective_boolean(value):
+    if isinstance(value, Literal) and value.datatype == XSD.boolean:
+        return bool(value.toPython())
+    if isinstance(value, Literal) and value.datatype in _STRING_DATATYPES:
+        return len(str(value)) > 0
+    raise Unsupported("Effective boolean value of a non-boolean, non-string term")
+
+
+def _expr_vars(expr):
+    if expr[0] == 'term':
+        return {expr[1]} if isinstance(expr[1], Variable) else set()
+    if expr[0] == 'and':
+        return set().union(*(_expr_vars(atom) for atom in expr[1]))
+    if expr[0] == '=':
+        return _expr_vars(expr[1]) | _expr_vars(expr[2])
+    if expr[0] == 'call':
+        return set().union(*(_expr_vars(arg) for arg in expr[2]))
+    return set()
+
+
+# ---------------------------------------------------------------------------
+# Planning and evaluation
+# ---------------------------------------------------------------------------
+
+def _estimate(graph, pattern):
+    """Number of triples matching the constant parts of a pattern (capped)"""
+    constant = tuple(None if isinstance(term, Variable) else term for term in pattern)
+    return sum(1 for _ in islice(graph.triples(constant), _ESTIMATE_CAP))
+
+
+def order_patterns(graph, patterns):
+    """
+    Greedy join order by selectivity
+
+    Starts from the pattern with the fewest candidate triples; afterwards
+    prefers patterns that share a variable with what is already bound, so no
+    step is a cross product unless the BGP itself is disconnected.
+    """
+    remaining = list(patterns)
+    estimates = {pattern: _estimate(graph, pattern) for pattern in remaining}
+    ordered = []
+    bound = set()
+    while remaining:
+        def cost(pattern):
+            pattern_vars = [t for t in pattern if isinstance(t, Variable)]
+            joined = sum(1 for v in pattern_vars if v in bound)
+            connected = joined > 0 or not bound
+            # Each already-bound variable is treated as an equality on that position
+            return (not connected, estimates[pattern] / (100 ** joined), len(pattern_vars) - joined)
+        best = min(remaining, key=cost)
+        remaining.remove(best)
+        ordered.append(best)
+        bound.update(t for t in best if isinstance(t, Variable))
+    return ordered
+
+
+def _solutions(graph, steps, bindings, depth=0):
+    if depth == len(steps):
+        yield bindings
+        return
+    pattern, filters = steps[depth]
+    lookup = tuple(bindings.get(t) if isinstance(t, Variable) else t for t in pattern)
+    for triple in graph.triples(lookup):
+        extended = dict(bindings)
+        consistent = True
+        for term, value in zip(pattern, triple, strict=True):
+            if isinstance(term, Variable):
+                current = extended.get(term)
+                if current is None:
+                    extended[term] = value
+                elif current != value:
+                    consistent = False  # Same variable twice in one pattern
+                    break
+        if not consistent or not all(_passes(f, extended) for f in filters):
+            continue
+        yield from _solutions(graph, steps, extended, depth + 1)
+
+
+def _passes(filter_expr, bindings):
+    try:
+        return _effective_boolean(_eval(filter_expr, bindings))
+    except _EvalError:
+        return False
+
+
+def evaluate_plan(graph, plan):
+    """
+    Run a fast-path plan against a graph
+
+    Returns:
+        List of rdflib ResultRow, as list(graph.query(...)) would give
+
+    Raises:
+        Unsupported: if evaluation meets a value outside the subset
+    """
+    ordered = order_patterns(graph, plan['patterns'])
+
+    # Push each FILTER down to the first step that binds all its variables;
+    # filters that mention BIND targets run after the binds
+    bind_targets = {alias for _, alias in plan['binds']}
+    steps = [(pattern, []) for pattern in ordered]
+    late_filters = []
+    for filter_expr in plan['filters']:
+        needed = _expr_vars(filter_expr)
+        if needed & bind_targets:
+            late_filters.append(filter_expr)
+            continue
+        seen = set()
+        for pattern, step_filters in steps:
+            seen.update(t for t in pattern if isinstance(t, Variable))
+            if needed <= seen:
+                step_filters.append(filter_expr)
+                break
+        else:
+            late_filters.append(filter_expr)  # Mentions a variable the BGP never binds
+
+    solutions = []
+    for bindings in _solutions(graph, steps, {}):
+        for expr, alias in plan['binds']:
+            try:
+                bindings[alias] = _eval(expr, bindings)
+            except _EvalError:
+                pass  # Leaves the variable unbound
+        if all(_passes(f, bindings) for f in late_filters):
+            solutions.append(bindings)
+
+    if plan['aggregates']:
+        return [_aggregate_row(plan['aggregates'], solutions)]
+
+    labels = plan['select']
+    rows = [ResultRow({v: b[v] for v in labels if v in b}, labels) for b in solutions]
+    if plan['distinct']:
+        rows = list(dict.fromkeys(rows))
+    return rows
+
+
+def _aggregate_row(aggregates, solutions):
+    values = {}
+    for func, var, alias in aggregates:
+        bound = [b[var] for b in solutions if var in b]
+        if func == 'COUNT':
+            values[alias] = Literal(len(bound))
+            continue
+        total, datatype = 0, None
+        for value in bound:
+            try:
+                number = numeric(value)
+                datatype = value.datatype if datatype is None else type_promotion(datatype, value.datatype)
+            except Exception:
+                raise Unsupported("SUM over non-numeric values") from None
+            total = sum(type_safe_numbers(total, number))
+        values[alias] = Literal(total, datatype=datatype)
+    labels = [alias for _, _, alias in aggregates]
+    return ResultRow(values, labels)
+
+
+def fast_query(graph, sparql_query):
+    """
+    Evaluate a query on the fast path
+
+    Returns:
+        List of ResultRow, or None if the query must go through rdflib
+    """
+    plan = plan_query(sparql_query)
+    if plan is None:
+        return None
+    try:
+        return evaluate_plan(graph, plan)
+    except Unsupported:
+        return None
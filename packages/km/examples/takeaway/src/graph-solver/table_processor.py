@@ -7,13 +7,16 @@ Two-stage approach:
 """
 import os
 import re
+import sys
 from typing import Dict, Any, Optional
-from dotenv import load_dotenv
-import instructor
-from anthropic import Anthropic
-from jinja2 import Environment, FileSystemLoader
 from pathlib import Path
 
+# Add parent directories to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from common.anthropic_client import get_instructor_client
+from common.env import load_env
+from common.llm_cache import cached_structured_call
+
 from table_models import (
     TableStructure, Column, Row, Cell, TextCell,
     TableSemantics
@@ -25,20 +28,20 @@ class TableProcessor:
 
     def __init__(self):
         """Initialize with LLM client for semantic enhancement"""
-        load_dotenv()
+        from jinja2 import Environment, FileSystemLoader
 
-        # Create Anthropic client wrapped with Instructor
-        base_client = Anthropic(
-            api_key=os.getenv("ANTHROPIC_API_KEY"),
-            base_url=os.getenv("ANTHROPIC_BASE_URL")
-        )
-        self.client = instructor.from_anthropic(base_client)
+        load_env()
         self.model = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
 
         # Set up Jinja2 for templates
         template_dir = Path(__file__).parent / "prompts"
         self.jinja_env = Environment(loader=FileSystemLoader(str(template_dir)))
 
+    @property
+    def client(self):
+        """Shared pooled Anthropic client wrapped with Instructor (built on first use)"""
+        return get_instructor_client()
+
     def _extract_numeric_from_label(self, label: str) -> Optional[float]:
         """
         Extract numeric value from a label if present.
@@ -285,6 +288,18 @@ class TableProcessor:
         Returns:
             TableSemantics with LLM understanding
         """
+        # Call LLM with structured output (through the response cache)
+        result = cached_structured_call(
+            self.client.messages.create,
+            TableSemantics,
+            phase='kg_table_semantics',
+            **self.semantics_request(structure, surrounding_text)
+        )
+
+        return result
+
+    def semantics_request(self, structure: TableStructure, surrounding_text: str) -> dict:
+        """messages.create parameters (without response_model) for enhance_with_semantics"""
         # Load prompt template
         template = self.jinja_env.get_template('table_semantics.j2')
 
@@ -294,16 +309,12 @@ class TableProcessor:
             text=surrounding_text
         )
 
-        # Call LLM with structured output
-        result = self.client.messages.create(
-            model=self.model,
-            max_tokens=4000,
-            temperature=0,
-            messages=[{"role": "user", "content": prompt}],
-            response_model=TableSemantics
-        )
-
-        return result
+        return {
+            'model': self.model,
+            'max_tokens': 4000,
+            'temperature': 0,
+            'messages': [{"role": "user", "content": prompt}]
+        }
 
 
 if __name__ == "__main__":
@@ -2,14 +2,19 @@
 MongoDB Logger for Document Preprocessing
 
 Logs all document preprocessing runs with prompts, responses, and extracted knowledge bases.
+With LOG_BACKEND=local (or auto and MongoDB down) they go to local log files
+instead (see common.log_backend).
 """
 
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
-from pymongo import MongoClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from common.log_backend import log_backend, log_database
 
 
 class PreprocessorLogger:
@@ -50,11 +55,11 @@ class PreprocessorLogger:
 
         if mongo_uri is None:
             mongo_uri = os.getenv('MONGO_URI')
-            if not mongo_uri:
+            if not mongo_uri and log_backend() == 'mongo':
                 raise ValueError("MONGO_URI environment variable not set")
 
-        self.client = MongoClient(mongo_uri)
-        self.db = self.client[database]
+        self.db = log_database(database, mongo_uri)
+        self.client = self.db.client
         self.collection = self.db[collection]
 
     def log_preprocessing(
@@ -92,5 +97,5 @@ class PreprocessorLogger:
         self.collection.insert_one(document)
 
     def close(self) -> None:
-        """Close MongoDB connection."""
+        """Close MongoDB connection (or local log files)."""
         self.client.close()
@@ -6,13 +6,17 @@ The structured hints eliminate ambiguity and guide the LLM to the correct format
 """
 
 import os
+import sys
 import json
 from pathlib import Path
 from typing import Dict, List, Any, Optional
-from anthropic import Anthropic
 from dotenv import load_dotenv
 from prompt_loader import PromptLoader
 
+# Add parent directories to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from common.anthropic_client import get_anthropic_client
+
 
 class AnswerGenerator:
     """
@@ -26,10 +30,8 @@ class AnswerGenerator:
         """Initialize the answer generator with Anthropic client."""
         load_dotenv()
 
-        self.client = Anthropic(
-            api_key=os.getenv("ANTHROPIC_API_KEY"),
-            base_url=os.getenv("ANTHROPIC_BASE_URL")
-        )
+        # Shared pooled client (HTTP keep-alive across calls and components)
+        self.client = get_anthropic_client()
         self.model = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
         self.prompt_loader = PromptLoader()
 
@@ -3,14 +3,79 @@ MongoDB Logger for ConvFinQA Evaluation
 
 Logs all evaluation runs to MongoDB for analysis and debugging.
 One document per example, automatically replaces on rerun.
+With LOG_BACKEND=local (or auto and MongoDB down) the same documents go to
+local log files instead (see common.log_backend).
+
+Each example is built up in memory and written once, with an upsert, by
+finalize_example (or close, for examples that never finish). With
+write_ahead=True (or CONVFINQA_LOG_WRITE_AHEAD=1) every call is also
+appended to a local journal in data/.log_wal/, and the next logger recovers
+the examples a crashed run left unfinished.
 """
 
+import hashlib
+import json
 import os
+import sys
+import threading
+import uuid
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, Any, Optional
-from pymongo import MongoClient
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from common.log_backend import LocalLogCollection, apply_update, decode_document, encode_document, log_database
+
+INDEXES = ("example_id", "run_timestamp", "summary.accuracy")
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+INDEX_MARKER_PATH = DATA_DIR / ".log_indexes.json"
+DEFAULT_WAL_DIR = DATA_DIR / ".log_wal"
+
+_index_lock = threading.Lock()
+_indexed = set()  # Marker keys this process has checked
+
+
+def ensure_indexes(collection, mongo_uri: str, database: str, name: str) -> None:
+    """
+    Create the evaluation_runs indexes once per deployment.
+
+    The first logger for a (MongoDB URI, database, collection, INDEXES)
+    records it in data/.log_indexes.json; later solver instances and
+    processes skip the create_index round trips. Local log files (including
+    LOG_BACKEND=auto falling back while MongoDB is down) record nothing, so
+    the indexes are created once MongoDB is back.
+    """
+    if isinstance(collection, LocalLogCollection):
+        return
+    key = hashlib.sha256(json.dumps([mongo_uri, database, name, INDEXES]).encode()).hexdigest()
+    with _index_lock:
+        if key in _indexed:
+            return
+        try:
+            created = json.loads(INDEX_MARKER_PATH.read_text())
+        except (FileNotFoundError, ValueError):
+            created = {}
+        if key not in created:
+            for index in INDEXES:
+                collection.create_index(index)
+            created[key] = datetime.utcnow().isoformat()
+            INDEX_MARKER_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = INDEX_MARKER_PATH.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(created, indent=2))
+            tmp_path.replace(INDEX_MARKER_PATH)
+        _indexed.add(key)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
 
 class ConvFinQALogger:
     """
@@ -19,48 +84,130 @@ class ConvFinQALogger:
     Schema: One document per example with all turns and evaluation data.
     """
 
-    def __init__(self, mongo_uri: str = None, database: str = "convfinqa", collection: str = "evaluation_runs"):
+    def __init__(
+        self,
+        mongo_uri: str = None,
+        database: str = "convfinqa",
+        collection: str = "evaluation_runs",
+        write_ahead: Optional[bool] = None,
+        wal_dir: Optional[Path] = None
+    ):
         """
-        Initialize MongoDB logger.
+        Initialize MongoDB (or local) logger.
 
         Args:
             mongo_uri: MongoDB connection string (defaults to env var)
             database: Database name
             collection: Collection name
+            write_ahead: Journal every call locally until its example is written
+                (defaults to CONVFINQA_LOG_WRITE_AHEAD env var)
+            wal_dir: Journal directory (default: data/.log_wal)
         """
         load_dotenv()
 
         self.mongo_uri = mongo_uri or os.getenv("MONGO_URI", "mongodb://localhost:27017")
-        self.client = MongoClient(self.mongo_uri)
-        self.db = self.client[database]
+        self.db = log_database(database, self.mongo_uri)
+        self.client = self.db.client
         self.collection = self.db[collection]
+        ensure_indexes(self.collection, self.mongo_uri, database, collection)
+
+        # Examples started but not yet written: {example_id: document}
+        self._buffers: Dict[str, Dict] = {}
+
+        if write_ahead is None:
+            write_ahead = os.getenv("CONVFINQA_LOG_WRITE_AHEAD", "").lower() in ("1", "true", "yes")
+        self.write_ahead = write_ahead
+        self._wal_dir = Path(wal_dir) if wal_dir is not None else DEFAULT_WAL_DIR
+        self._wal_prefix = f"{database}.{collection}."
+        self._wal_path = self._wal_dir / f"{self._wal_prefix}{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+        self._wal = None
+        if write_ahead:
+            self.recover()
+
+    def _journal(self, entry: Dict) -> None:
+        """Append an entry to the write-ahead journal and fsync it."""
+        if not self.write_ahead:
+            return
+        if self._wal is None:
+            self._wal_dir.mkdir(parents=True, exist_ok=True)
+            self._wal = open(self._wal_path, "a", encoding="utf-8")
+        self._wal.write(encode_document(entry) + "\n")
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+
+    def _truncate_journal(self) -> None:
+        """Drop the journal once every journaled example has been written."""
+        if self._wal is not None and not self._buffers:
+            self._wal.close()
+            self._wal = None
+            self._wal_path.unlink(missing_ok=True)
+
+    def recover(self) -> int:
+        """
+        Write examples left unfinished in journals of processes that are no longer running.
 
-        # Create index on example_id for faster queries
-        self.collection.create_index("example_id")
-        self.collection.create_index("run_timestamp")
-        self.collection.create_index("summary.accuracy")
+        Recovered documents keep the turns logged so far and are marked
+        "recovered": True (their summary is empty).
+
+        Returns:
+            Number of examples recovered
+        """
+        recovered = 0
+        for path in sorted(self._wal_dir.glob(f"{self._wal_prefix}*.jsonl")):
+            pid = path.name[len(self._wal_prefix):].split("-")[0]
+            if not pid.isdigit() or _process_alive(int(pid)):
+                continue
+            documents: Dict[str, Dict] = {}
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = decode_document(line)
+                    except ValueError:
+                        break  # Torn final line from the crash
+                    if entry["op"] == "start":
+                        documents[entry["document"]["_id"]] = entry["document"]
+                    elif entry["op"] == "done":
+                        documents.pop(entry["example_id"], None)
+                    elif entry["example_id"] in documents:
+                        apply_update(documents[entry["example_id"]], entry["update"])
+            for example_id, document in documents.items():
+                document["recovered"] = True
+                self.collection.replace_one({"_id": example_id}, document, upsert=True)
+            path.unlink()
+            recovered += len(documents)
+        if recovered:
+            print(f"Recovered {recovered} unfinished example(s) from the ConvFinQA log journal")
+        return recovered
+
+    def _update(self, example_id: str, update: Dict) -> None:
+        """Apply an update to the buffered example, or directly to its stored document."""
+        document = self._buffers.get(example_id)
+        if document is None:
+            self.collection.update_one({"_id": example_id}, update)
+            return
+        self._journal({"op": "update", "example_id": example_id, "update": update})
+        apply_update(document, update)
 
     def start_example(self, example_id: str, table: Dict) -> None:
         """
         Start logging a new example.
-        Deletes any existing record for this example (for clean reruns).
+        The document is written by finalize_example and replaces any
+        existing record for this example (for clean reruns).
 
         Args:
             example_id: Unique identifier for the example
             table: Table data from preprocessed document
         """
-        # Delete existing record
-        self.collection.delete_one({"_id": example_id})
-
-        # Insert new record
-        self.collection.insert_one({
+        document = {
             "_id": example_id,
             "example_id": example_id,
             "run_timestamp": datetime.utcnow(),
             "table": table,
             "conversation_turns": [],
             "summary": {}
-        })
+        }
+        self._journal({"op": "start", "document": document})
+        self._buffers[example_id] = document
 
     def log_turn(
         self,
@@ -105,10 +252,7 @@ class ConvFinQALogger:
             turn_data["evaluation"] = evaluation
 
         # Append turn to conversation
-        self.collection.update_one(
-            {"_id": example_id},
-            {"$push": {"conversation_turns": turn_data}}
-        )
+        self._update(example_id, {"$push": {"conversation_turns": turn_data}})
 
     def update_turn(
         self,
@@ -130,10 +274,7 @@ class ConvFinQALogger:
             for key, value in update_data.items()
         }
 
-        self.collection.update_one(
-            {"_id": example_id},
-            {"$set": update_fields}
-        )
+        self._update(example_id, {"$set": update_fields})
 
     def finalize_example(
         self,
@@ -141,19 +282,34 @@ class ConvFinQALogger:
         summary: Dict[str, Any]
     ) -> None:
         """
-        Finalize example with summary statistics.
+        Finalize example with summary statistics and write its document.
 
         Args:
             example_id: Example identifier
             summary: Summary dict with accuracy, correct_turns, etc.
         """
-        self.collection.update_one(
-            {"_id": example_id},
-            {"$set": {"summary": summary}}
-        )
+        self._update(example_id, {"$set": {"summary": summary}})
+        self._write(example_id)
+
+    def _write(self, example_id: str) -> None:
+        """Upsert a buffered example's complete document."""
+        document = self._buffers.get(example_id)
+        if document is None:
+            return
+        self.collection.replace_one({"_id": example_id}, document, upsert=True)
+        del self._buffers[example_id]
+        self._journal({"op": "done", "example_id": example_id})
+        self._truncate_journal()
+
+    def flush(self) -> None:
+        """Write examples started but not finalized (e.g., after an error)."""
+        for example_id in list(self._buffers):
+            self._write(example_id)
 
     def get_example(self, example_id: str) -> Optional[Dict]:
-        """Get logged data for an example."""
+        """Get logged data for an example (including one still being logged)."""
+        if example_id in self._buffers:
+            return self._buffers[example_id]
         return self.collection.find_one({"_id": example_id})
 
     def get_failures(self, min_accuracy: float = 1.0) -> list:
@@ -177,7 +333,8 @@ class ConvFinQALogger:
         }))
 
     def close(self):
-        """Close MongoDB connection."""
+        """Write unfinished examples, then close MongoDB connection (or local log files)."""
+        self.flush()
         self.client.close()
 
 
@@ -6,13 +6,17 @@ This eliminates ambiguity around question types, units, and expected formats.
 """
 
 import os
+import sys
 import json
 from pathlib import Path
 from typing import Dict, List, Any, Optional
-from anthropic import Anthropic
 from dotenv import load_dotenv
 from prompt_loader import PromptLoader
 
+# Add parent directories to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from common.anthropic_client import get_anthropic_client
+
 
 class QuestionAnalyzer:
     """
@@ -29,10 +33,8 @@ class QuestionAnalyzer:
         """Initialize the question analyzer with Anthropic client."""
         load_dotenv()
 
-        self.client = Anthropic(
-            api_key=os.getenv("ANTHROPIC_API_KEY"),
-            base_url=os.getenv("ANTHROPIC_BASE_URL")
-        )
+        # Shared pooled client (HTTP keep-alive across calls and components)
+        self.client = get_anthropic_client()
         self.model = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
         self.prompt_loader = PromptLoader()
 
@@ -0,0 +1,59 @@
+"""
+Tests for the pooled process-wide Anthropic client
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from common import anthropic_client
+from common.anthropic_client import get_anthropic_client, get_instructor_client, reset_clients
+
+
+@pytest.fixture(autouse=True)
+def stub_env(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", "http://127.0.0.1:9")
+    reset_clients()
+    yield
+    reset_clients()
+
+
+class TestPooledClient:
+    """Test that callers share one configured client"""
+
+    def test_same_instance(self):
+        assert get_anthropic_client() is get_anthropic_client()
+
+    def test_instructor_wraps_shared_client(self):
+        assert get_instructor_client() is get_instructor_client()
+        assert get_instructor_client().client is get_anthropic_client()
+
+    def test_new_client_per_base_url(self, monkeypatch):
+        first = get_anthropic_client()
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", "http://127.0.0.1:10")
+        second = get_anthropic_client()
+        assert second is not first
+        assert str(second.base_url).startswith("http://127.0.0.1:10")
+
+    def test_reset_builds_new_client(self):
+        first = get_anthropic_client()
+        reset_clients()
+        assert get_anthropic_client() is not first
+
+    def test_settings_from_env(self, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_TIMEOUT", "30")
+        monkeypatch.setenv("ANTHROPIC_CONNECT_TIMEOUT", "2")
+        monkeypatch.setenv("ANTHROPIC_MAX_CONNECTIONS", "5")
+        monkeypatch.setenv("ANTHROPIC_MAX_RETRIES", "4")
+        client = get_anthropic_client()
+        assert client.max_retries == 4
+        assert client.timeout.read == 30.0
+        assert client.timeout.connect == 2.0
+        assert anthropic_client.client_settings()['max_connections'] == 5
+        pool = client._client._transport._pool
+        assert pool._max_connections == 5
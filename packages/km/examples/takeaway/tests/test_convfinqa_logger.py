@@ -0,0 +1,169 @@
+"""
+Tests for buffered per-example writes in the ConvFinQA evaluation logger
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "simple-solver"))
+
+pytest.importorskip("dotenv")
+
+import mongo_logger
+from common.log_backend import LocalLogDatabase, apply_update, matches
+from mongo_logger import ConvFinQALogger
+
+DEAD_PID = 2 ** 22 + 1  # Above Linux's pid_max
+
+
+class FakeCollection:
+    """Records every call that would be a MongoDB round trip"""
+
+    def __init__(self):
+        self.calls = []
+        self.documents = {}
+
+    def create_index(self, key):
+        self.calls.append(('create_index', key))
+
+    def replace_one(self, query, document, upsert=False):
+        self.calls.append(('replace_one', query['_id']))
+        self.documents[query['_id']] = document
+
+    def update_one(self, query, update):
+        self.calls.append(('update_one', query['_id']))
+        apply_update(self.documents[query['_id']], update)
+
+    def find_one(self, query):
+        return self.documents.get(query['_id'])
+
+    def find(self, query):
+        return [document for document in self.documents.values() if matches(document, query)]
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    @property
+    def client(self):
+        return self
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    database = FakeDatabase()
+    monkeypatch.setattr(mongo_logger, "log_database", lambda name, uri: database)
+    monkeypatch.setattr(mongo_logger, "INDEX_MARKER_PATH", tmp_path / ".log_indexes.json")
+    monkeypatch.setattr(mongo_logger, "_indexed", set())
+    monkeypatch.delenv("CONVFINQA_LOG_WRITE_AHEAD", raising=False)
+    return database
+
+
+def log_example(logger, example_id, turns=3, finalize=True):
+    logger.start_example(example_id, table={"2009": {"revenue": 1000}})
+    for turn in range(turns):
+        logger.log_turn(example_id, turn_number=turn, question=f"q{turn}", gold_answer=turn,
+                        stage1_data={"hints": {}}, evaluation={"correct": turn != 1})
+    logger.update_turn(example_id, 0, {"stage2_answer": {"answer": 0}})
+    if finalize:
+        logger.finalize_example(example_id, summary={"accuracy": (turns - 1) / turns})
+
+
+class TestBufferedWrites:
+    """Test one upsert per example"""
+
+    def test_one_write_per_example(self, db):
+        logger = ConvFinQALogger()
+        collection = db["evaluation_runs"]
+        collection.calls.clear()
+        log_example(logger, "ex1")
+        assert collection.calls == [('replace_one', "ex1")]
+
+        document = collection.documents["ex1"]
+        assert [turn["turn_number"] for turn in document["conversation_turns"]] == [0, 1, 2]
+        assert document["conversation_turns"][0]["stage2_answer"] == {"answer": 0}
+        assert document["summary"]["accuracy"] == pytest.approx(2 / 3)
+        assert [failure["_id"] for failure in logger.get_turn_failures()] == ["ex1"]
+
+    def test_rerun_replaces_example(self, db):
+        logger = ConvFinQALogger()
+        log_example(logger, "ex1", turns=3)
+        log_example(logger, "ex1", turns=1)
+        assert len(db["evaluation_runs"].documents["ex1"]["conversation_turns"]) == 1
+
+    def test_unfinished_examples_written_on_close(self, db):
+        logger = ConvFinQALogger()
+        log_example(logger, "ex1", turns=2, finalize=False)
+        assert logger.get_example("ex1")["summary"] == {}
+        assert "ex1" not in db["evaluation_runs"].documents
+        logger.close()
+        assert len(db["evaluation_runs"].documents["ex1"]["conversation_turns"]) == 2
+
+    def test_indexes_created_once_per_deployment(self, db, monkeypatch):
+        ConvFinQALogger()
+        ConvFinQALogger()
+        monkeypatch.setattr(mongo_logger, "_indexed", set())  # A new process reads the marker file
+        ConvFinQALogger()
+        created = [call for call in db["evaluation_runs"].calls if call[0] == 'create_index']
+        assert created == [('create_index', index) for index in mongo_logger.INDEXES]
+
+    def test_local_fallback_does_not_mark_indexes(self, db, monkeypatch, tmp_path):
+        local = LocalLogDatabase(tmp_path / "convfinqa", segment_bytes=1 << 20)
+        monkeypatch.setattr(mongo_logger, "log_database", lambda name, uri: local)
+        logger = ConvFinQALogger()
+        assert not mongo_logger.INDEX_MARKER_PATH.exists()
+        log_example(logger, "ex1")
+        assert logger.get_example("ex1")["summary"]["accuracy"] == pytest.approx(2 / 3)
+
+        # MongoDB is back: the indexes are created
+        monkeypatch.setattr(mongo_logger, "log_database", lambda name, uri: db)
+        ConvFinQALogger()
+        created = [call for call in db["evaluation_runs"].calls if call[0] == 'create_index']
+        assert created == [('create_index', index) for index in mongo_logger.INDEXES]
+
+
+class TestWriteAhead:
+    """Test the crash-safe journal"""
+
+    def test_journal_removed_after_write(self, db, tmp_path):
+        logger = ConvFinQALogger(write_ahead=True, wal_dir=tmp_path)
+        logger.start_example("ex1", table={})
+        assert logger._wal_path.exists()
+        logger.finalize_example("ex1", summary={"accuracy": 1.0})
+        assert list(tmp_path.glob("*.jsonl")) == []
+
+    def test_recovers_crashed_run(self, db, tmp_path):
+        crashed = ConvFinQALogger(write_ahead=True, wal_dir=tmp_path)
+        log_example(crashed, "done", turns=1)
+        log_example(crashed, "ex2", turns=2, finalize=False)
+        crashed._wal.close()
+        crashed._wal_path.rename(tmp_path / f"convfinqa.evaluation_runs.{DEAD_PID}-0.jsonl")
+        with open(tmp_path / f"convfinqa.evaluation_runs.{DEAD_PID}-0.jsonl", "a") as f:
+            f.write('{"op": "upd')  # Torn write
+
+        db["evaluation_runs"].documents.clear()
+        ConvFinQALogger(write_ahead=True, wal_dir=tmp_path)
+        assert list(db["evaluation_runs"].documents) == ["ex2"]
+        recovered = db["evaluation_runs"].documents["ex2"]
+        assert recovered["recovered"] is True
+        assert len(recovered["conversation_turns"]) == 2
+        assert recovered["run_timestamp"].year >= 2025
+        assert list(tmp_path.glob("*.jsonl")) == []
+
+    def test_live_process_journal_is_left_alone(self, db, tmp_path):
+        running = ConvFinQALogger(write_ahead=True, wal_dir=tmp_path)
+        running.start_example("ex1", table={})
+        ConvFinQALogger(write_ahead=True, wal_dir=tmp_path)
+        assert running._wal_path.exists()
+        assert "ex1" not in db["evaluation_runs"].documents
@@ -0,0 +1,104 @@
+"""
+Import-time checks: modules and CLI tools must not pay for SDKs, drivers or
+connections they don't use
+
+The deferred-import checks always run. Wall-clock budgets depend on the
+machine, so they only run with IMPORT_TIME_BUDGETS=1.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+TAKEAWAY_DIR = Path(__file__).parent.parent
+SRC_DIR = TAKEAWAY_DIR / "src"
+
+# Loaded on first use only - importing any of these at module level is a regression
+DEFERRED_MODULES = {'anthropic', 'httpx', 'instructor', 'pymongo', 'bson', 'rdflib', 'jinja2', 'dotenv'}
+IMPORT_BUDGET_SECONDS = 0.5  # Cumulative import time of the module under test
+CLI_BUDGET_SECONDS = 1.0  # Wall time of a CLI tool that has nothing to do
+
+timing_budget = pytest.mark.skipif(os.getenv("IMPORT_TIME_BUDGETS") != "1",
+                                   reason="wall-clock budgets are opt-in (IMPORT_TIME_BUDGETS=1)")
+DEFERRED_IMPORTS = [
+    ("common.llm_client", [SRC_DIR]),
+    ("common.anthropic_client", [SRC_DIR]),
+    ("common.log_sink", [SRC_DIR]),
+    ("kg_extractor", [SRC_DIR, SRC_DIR / "graph-solver"]),
+    ("phase1", [SRC_DIR, SRC_DIR / "graph-solver"]),
+]
+CLI_TOOLS = [
+    ("report-status.py", ["999999"]),
+    ("query-llm-logs.py", []),  # Usage message
+]
+
+
+def import_profile(module, *paths):
+    """
+    Import a module in a fresh interpreter under -X importtime
+
+    Returns:
+        (set of top-level packages imported, cumulative seconds for the module)
+    """
+    setup = "import sys; sys.path[:0] = " + repr([str(p) for p in paths])
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"{setup}; import {module}"],
+                               capture_output=True, text=True, cwd=TAKEAWAY_DIR)
+    if completed.returncode != 0:
+        missing = [line for line in completed.stderr.splitlines() if "ModuleNotFoundError" in line]
+        if missing:
+            pytest.skip(missing[-1])
+        raise AssertionError(completed.stderr)
+    imported, cumulative = set(), None
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if not total.strip().isdigit():
+            continue  # Header line
+        imported.add(name.strip().split(".")[0])
+        if name.strip() == module:
+            cumulative = int(total) / 1e6
+    return imported, cumulative
+
+
+def run_cli(script, args):
+    """Run a CLI tool; returns (completed process, wall seconds)"""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, str(TAKEAWAY_DIR / "scripts" / script), *args],
+                               capture_output=True, text=True, cwd=TAKEAWAY_DIR)
+    return completed, time.perf_counter() - start
+
+
+@pytest.mark.parametrize("module, paths", DEFERRED_IMPORTS)
+def test_heavy_dependencies_are_deferred(module, paths):
+    imported, _ = import_profile(module, *paths)
+    eager = imported & DEFERRED_MODULES
+    if module == "phase1":
+        eager -= {'jinja2', 'rdflib'}  # Its prompt rendering and KG context need them on every call
+    assert not eager, f"{module} imports {sorted(eager)} at import time"
+
+
+@timing_budget
+@pytest.mark.parametrize("module, paths", [entry for entry in DEFERRED_IMPORTS if entry[0] != "phase1"])
+def test_import_budget(module, paths):
+    # phase1 is exempt: rdflib alone takes about the whole budget
+    _, cumulative = import_profile(module, *paths)
+    assert cumulative is not None and cumulative < IMPORT_BUDGET_SECONDS, \
+        f"{module} took {cumulative:.3f}s to import"
+
+
+@pytest.mark.parametrize("script, args", CLI_TOOLS)
+def test_cli_startup(script, args):
+    completed, _ = run_cli(script, args)
+    assert "Traceback" not in completed.stderr, completed.stderr
+
+
+@timing_budget
+@pytest.mark.parametrize("script, args", CLI_TOOLS)
+def test_cli_startup_budget(script, args):
+    _, elapsed = run_cli(script, args)
+    assert elapsed < CLI_BUDGET_SECONDS, f"{script} took {elapsed:.2f}s to start"
@@ -0,0 +1,118 @@
+"""
+Tests for the content-addressed LLM response cache
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from common import llm_cache
+from common.llm_cache import LLMCacheMiss, LLMResponseCache, cache_key, cached_structured_call
+
+
+class Answer(BaseModel):
+    value: float
+
+
+REQUEST = {
+    'model': 'stub-model',
+    'max_tokens': 100,
+    'temperature': 0,
+    'messages': [{"role": "user", "content": "What is 2 + 2?"}]
+}
+
+
+@pytest.fixture(autouse=True)
+def cache_path(tmp_path, monkeypatch):
+    path = tmp_path / "llm_cache.db"
+    monkeypatch.setenv("LLM_CACHE_PATH", str(path))
+    monkeypatch.delenv("LLM_CACHE_MODE", raising=False)
+    yield path
+    for _, cache in llm_cache._caches.values():
+        cache.close()
+    llm_cache._caches.clear()
+
+
+class CountingCreate:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, response_model, **request):
+        self.calls += 1
+        return response_model(value=4.0)
+
+
+class TestCacheKey:
+    """Test what identifies a request"""
+
+    def test_stable(self):
+        assert cache_key(dict(REQUEST)) == cache_key(dict(REQUEST))
+
+    def test_prompt_and_params_change_key(self):
+        assert cache_key({**REQUEST, 'max_tokens': 200}) != cache_key(REQUEST)
+        assert cache_key({**REQUEST, 'messages': [{"role": "user", "content": "3 + 3?"}]}) != cache_key(REQUEST)
+
+    def test_response_schema_changes_key(self):
+        assert cache_key(REQUEST, Answer) != cache_key(REQUEST)
+
+
+class TestModes:
+    """Test read-through, write-through, replay and off"""
+
+    def test_read_through(self):
+        create = CountingCreate()
+        first = cached_structured_call(create, Answer, **REQUEST)
+        second = cached_structured_call(create, Answer, **REQUEST)
+        assert create.calls == 1
+        assert second == first
+
+    def test_write_through_always_calls(self, monkeypatch):
+        monkeypatch.setenv("LLM_CACHE_MODE", "write-through")
+        create = CountingCreate()
+        cached_structured_call(create, Answer, **REQUEST)
+        cached_structured_call(create, Answer, **REQUEST)
+        assert create.calls == 2
+        assert llm_cache.get_llm_cache().stats()['entries'] == 1
+
+    def test_replay_serves_cached_and_fails_on_miss(self, monkeypatch):
+        cached_structured_call(CountingCreate(), Answer, **REQUEST)
+        monkeypatch.setenv("LLM_CACHE_MODE", "replay")
+        create = CountingCreate()
+        assert cached_structured_call(create, Answer, **REQUEST).value == 4.0
+        assert create.calls == 0
+        with pytest.raises(LLMCacheMiss):
+            cached_structured_call(create, Answer, **{**REQUEST, 'max_tokens': 1})
+
+    def test_off_bypasses_cache(self, monkeypatch, cache_path):
+        monkeypatch.setenv("LLM_CACHE_MODE", "off")
+        create = CountingCreate()
+        cached_structured_call(create, Answer, **REQUEST)
+        cached_structured_call(create, Answer, **REQUEST)
+        assert create.calls == 2
+        assert not cache_path.exists()
+
+    def test_unknown_mode(self, monkeypatch):
+        monkeypatch.setenv("LLM_CACHE_MODE", "sometimes")
+        with pytest.raises(ValueError):
+            llm_cache.lookup(REQUEST)
+
+
+class TestEviction:
+    """Test size-capped LRU eviction"""
+
+    def test_evicts_least_recently_used(self, cache_path):
+        cache = LLMResponseCache(cache_path, max_bytes=250)
+        cache.put('a', 'm', 'x' * 100)
+        cache.put('b', 'm', 'x' * 100)
+        cache.get('a')
+        cache.put('c', 'm', 'x' * 100)
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+        assert cache.stats()['bytes'] <= 250
+        cache.close()
@@ -0,0 +1,216 @@
+"""
+Tests for acall_llm/call_llm and the LLM rate limiter
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from common import llm_client
+from common.anthropic_client import reset_clients
+from common.mock_llm_server import MockLLMServer
+from common.prompt_cache import llm_usage_stats, reset_usage_stats
+from common.rate_limiter import LLMRateLimiter, TokenBucket, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket:
+    """Test continuous refill and debt"""
+
+    def test_burst_then_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock)  # 1 per second
+        assert all(bucket.reserve(1) == 0 for _ in range(60))
+        assert bucket.reserve(1) == pytest.approx(1.0)
+        clock.now += 1.0
+        assert bucket.reserve(1) == pytest.approx(1.0)  # Still repaying the previous debt
+
+    def test_oversized_reservation_does_not_deadlock(self):
+        bucket = TokenBucket(600, FakeClock())  # 10 per second
+        assert bucket.reserve(1200) == pytest.approx(60.0)
+
+    def test_adjust_refunds_unused(self):
+        bucket = TokenBucket(60, FakeClock())
+        bucket.reserve(60)
+        bucket.adjust(-30)
+        assert bucket.reserve(30) == 0
+
+
+class TestRetryAfter:
+    """Test retry-after header parsing"""
+
+    def test_seconds_and_ms(self):
+        assert retry_after_seconds({'retry-after': '7'}, 1) == 7.0
+        assert retry_after_seconds({'retry-after-ms': '1500', 'retry-after': '7'}, 1) == 1.5
+
+    def test_missing_or_invalid(self):
+        assert retry_after_seconds({}, 3) == 3
+        assert retry_after_seconds(None, 3) == 3
+        assert retry_after_seconds({'retry-after': 'soon'}, 3) == 3
+
+
+class TestLimiter:
+    """Test the semaphore and buckets with a fake clock"""
+
+    def test_requests_per_minute(self):
+        clock = FakeClock()
+        limiter = LLMRateLimiter(4, requests_per_minute=120, clock=clock, sleep=clock.sleep)
+
+        async def run():
+            for _ in range(130):
+                async with limiter.slot():
+                    pass
+
+        asyncio.run(run())
+        assert clock.now == pytest.approx(5.0)  # 120 burst, then 10 more at 2/s
+
+    def test_pause_holds_every_caller(self):
+        clock = FakeClock()
+        limiter = LLMRateLimiter(4, clock=clock, sleep=clock.sleep)
+        limiter.pause(30)
+
+        async def run():
+            async with limiter.slot():
+                return clock.now
+
+        assert asyncio.run(run()) == pytest.approx(30.0)
+        assert limiter.stats()['rate_limited'] == 1
+
+    def test_concurrency_cap(self):
+        limiter = LLMRateLimiter(3)
+
+        async def call():
+            async with limiter.slot():
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(call() for _ in range(12)))
+
+        asyncio.run(run())
+        assert limiter.stats()['peak_in_flight'] == 3
+        assert limiter.stats()['requests'] == 12
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    rate_limit_first = 0  # Number of 429s to send before succeeding
+    delay = 0.0
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        StubHandler.requests += 1
+        if StubHandler.rate_limit_first > 0:
+            StubHandler.rate_limit_first -= 1
+            body = json.dumps({"type": "error", "error": {"type": "rate_limit_error", "message": "slow down"}})
+            self._reply(429, body.encode(), {'retry-after': '0.2'})
+            return
+        time.sleep(StubHandler.delay)
+        body = json.dumps({
+            "id": "msg_stub", "type": "message", "role": "assistant", "model": "stub-model",
+            "content": [{"type": "text", "text": "42"}], "stop_reason": "end_turn",
+            "stop_sequence": None, "usage": {"input_tokens": 10, "output_tokens": 1},
+        })
+        self._reply(200, body.encode())
+
+    def _reply(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setenv("ANTHROPIC_MODEL", "stub-model")
+    monkeypatch.setenv("LLM_CACHE_MODE", "off")
+    monkeypatch.setattr(llm_client, "llm_logs", None)
+    StubHandler.rate_limit_first, StubHandler.delay, StubHandler.requests = 0, 0.0, 0
+    reset_clients()
+    llm_client._llm_loop()
+    monkeypatch.setattr(llm_client, "_limiter", LLMRateLimiter(4))
+    yield server
+    server.shutdown()
+    reset_clients()
+
+
+class TestCallLLM:
+    """Test call_llm/acall_llm against a local stub endpoint"""
+
+    def test_sync_wrapper(self, stub_server):
+        assert llm_client.call_llm("What is 6 * 7?", {'phase': 'test'}) == "42"
+
+    def test_429_retry_after_pauses_and_retries(self, stub_server):
+        StubHandler.rate_limit_first = 2
+        start = time.perf_counter()
+        assert llm_client.call_llm("ping") == "42"
+        assert time.perf_counter() - start >= 0.4
+        assert StubHandler.requests == 3
+        assert llm_client.llm_limiter_stats()['rate_limited'] == 2
+
+    def test_retried_429_refunds_token_reservation(self, stub_server, monkeypatch):
+        limiter = LLMRateLimiter(4, tokens_per_minute=60000)  # Refills 1000 tokens per second
+        monkeypatch.setattr(llm_client, "_limiter", limiter)
+        StubHandler.rate_limit_first = 2
+        assert llm_client.call_llm("x" * 40000) == "42"  # Reserves 10000 tokens per attempt
+        assert StubHandler.requests == 3
+        # Only the successful attempt's 11 tokens stay charged, not three reservations
+        assert limiter._tokens.level > limiter._tokens.capacity - 100
+
+    def test_concurrent_calls_respect_limit(self, stub_server):
+        StubHandler.delay = 0.1
+
+        async def run():
+            return await asyncio.gather(*(llm_client.acall_llm(f"q{i}") for i in range(8)))
+
+        start = time.perf_counter()
+        assert asyncio.run(run()) == ["42"] * 8
+        elapsed = time.perf_counter() - start
+        stats = llm_client.llm_limiter_stats()
+        assert stats['peak_in_flight'] == 4
+        assert 0.2 <= elapsed < 0.8  # Two waves of 4, not 8 serial calls
+
+    def test_static_prefix_is_read_from_prompt_cache(self, stub_server, monkeypatch):
+        with MockLLMServer() as server:
+            monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+            reset_clients()
+            reset_usage_stats()
+            prefix = "Calculation rules. " * 400
+            for turn in range(3):
+                llm_client.call_llm(f"Turn {turn} question", {'phase': 'test_prefix'}, static_prefix=prefix)
+            assert server.stats()['prompt_cache_writes'] == 1
+            assert server.stats()['prompt_cache_reads'] == 2
+        usage = llm_usage_stats()['test_prefix']
+        assert usage['calls'] == 3
+        assert usage['cache_read_input_tokens'] == 2 * usage['cache_creation_input_tokens'] > 0
+        assert usage['cache_read_share'] > 0.5
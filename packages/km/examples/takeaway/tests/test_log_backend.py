@@ -0,0 +1,148 @@
+"""
+Tests for the local log backend (segmented gzip JSONL + SQLite index)
+"""
+
+import gzip
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from common import env, log_backend
+from common.log_backend import LocalLogDatabase, local_log_database, log_database, matches
+from common.log_sink import MongoLogSink
+from common.prompt_store import load_prompt, prompt_fields
+
+
+@pytest.fixture(autouse=True)
+def local_logs(monkeypatch, tmp_path):
+    monkeypatch.setattr(env, "_loaded", True)  # Settings come from the test, not .env
+    monkeypatch.setenv("LOG_BACKEND", "local")
+    monkeypatch.setenv("LOG_LOCAL_DIR", str(tmp_path))
+    monkeypatch.setattr(log_backend, "_databases", {})
+    monkeypatch.setattr(log_backend, "_reachable", {})
+
+
+def interaction(example_id, turn, phase, minutes):
+    return {
+        'timestamp': datetime(2025, 1, 1) + timedelta(minutes=minutes),
+        'metadata': {'example_id': str(example_id), 'turn': turn, 'phase': phase},
+        'response': f"{phase} response",
+    }
+
+
+class TestQueries:
+    """Test the queries the log scripts run"""
+
+    def test_phase_lookups(self):
+        logs = log_database().llm_interactions
+        logs.insert_many([interaction(8, 1, 'phase1_value_planning', 1),
+                          interaction(8, 1, 'phase2a_query_generation', 2),
+                          interaction(8, 2, 'phase1_value_planning', 3),
+                          interaction(9, 1, 'phase1_value_planning', 4)])
+        logs.insert_one(interaction(8, 1, 'phase1_value_planning', 5))
+
+        flow = list(logs.find({'metadata.example_id': '8', 'metadata.turn': 1}).sort('timestamp', 1))
+        assert [log['metadata']['phase'] for log in flow] == \
+            ['phase1_value_planning', 'phase2a_query_generation', 'phase1_value_planning']
+
+        latest = logs.find_one({'metadata.example_id': '8', 'metadata.turn': 1,
+                                'metadata.phase': 'phase1_value_planning'}, sort=[('timestamp', -1)])
+        assert latest['timestamp'] == datetime(2025, 1, 1, 0, 5)
+
+        recent = logs.find({'metadata.example_id': '8', 'metadata.turn': 1,
+                            'timestamp': {'$gte': datetime(2025, 1, 1, 0, 2)}}).sort('timestamp', -1)
+        assert [log['timestamp'].minute for log in recent] == [5, 2]
+        assert logs.find_one({'metadata.example_id': 8}) is None  # Types must match, as in MongoDB
+
+    def test_reopened_database_reads_index(self, tmp_path):
+        local_log_database().llm_interactions.insert_one(interaction(8, 1, 'phase1_value_planning', 1))
+        reopened = LocalLogDatabase(tmp_path / log_backend.LOG_DATABASE, segment_bytes=1 << 20)
+        assert reopened.llm_interactions.find_one({'metadata.turn': 1})['response'] == "phase1_value_planning response"
+
+    def test_prompt_blobs(self, monkeypatch):
+        monkeypatch.setenv("LOG_PROMPT_STORE", "blobs")
+        monkeypatch.setenv("LOG_PROMPT_COMPRESSION", "none")
+        monkeypatch.setattr("common.prompt_store._known_blobs", set())
+        db = log_database()
+        prompt = "".join(f"line {i} of the ontology guidance\n" for i in range(500))
+
+        class Sink:
+            def put(self, document):
+                db.prompt_blobs.insert_one(document)
+
+            def stats(self):
+                return {'dropped': 0, 'failed_batches': 0}
+
+        document = prompt_fields(prompt, Sink())
+        db.prompt_blobs.insert_many([dict(blob) for blob in db.prompt_blobs.find()])  # Duplicates are skipped
+        assert len(list(db.prompt_blobs.find())) == len(set(document['prompt_blobs']))
+        assert load_prompt(document, db.prompt_blobs) == prompt
+
+
+class TestStorage:
+    """Test segments, rotation and updates"""
+
+    def test_rotation_and_plain_gzip_segments(self, tmp_path):
+        db = LocalLogDatabase(tmp_path / "rotating", segment_bytes=2048)
+        logs = db.llm_interactions
+        for minute in range(40):
+            logs.insert_one({**interaction(minute, 0, 'phase1_value_planning', minute),
+                             'response': f"{minute} " * 200, 'raw': bytes([minute])})
+        segments = sorted((tmp_path / "rotating" / "llm_interactions").glob("*.jsonl.gz"))
+        assert len(segments) > 1
+        lines = [line for segment in segments for line in gzip.open(segment, 'rt')]
+        assert len(lines) == 40
+        found = logs.find_one({'metadata.example_id': '17'})
+        assert found['raw'] == bytes([17]) and found['timestamp'] == datetime(2025, 1, 1, 0, 17)
+
+    def test_example_document_updates(self):
+        runs = log_database('convfinqa').evaluation_runs
+        runs.create_index("summary.accuracy")
+        for example_id, correct in (('a', True), ('b', False)):
+            runs.delete_one({'_id': example_id})
+            runs.insert_one({'_id': example_id, 'example_id': example_id, 'conversation_turns': [], 'summary': {}})
+            runs.update_one({'_id': example_id}, {'$push': {'conversation_turns': {'turn_number': 0}}})
+            runs.update_one({'_id': example_id}, {'$set': {'conversation_turns.0.evaluation': {'correct': correct}}})
+            runs.update_one({'_id': example_id}, {'$set': {'summary': {'accuracy': 1.0 if correct else 0.0}}})
+        assert [run['_id'] for run in runs.find({'summary.accuracy': {'$lt': 1.0}})] == ['b']
+        assert [run['_id'] for run in runs.find({'conversation_turns.evaluation.correct': False})] == ['b']
+
+        # Rerun replaces the example
+        runs.delete_one({'_id': 'b'})
+        runs.insert_one({'_id': 'b', 'example_id': 'b', 'conversation_turns': [], 'summary': {}})
+        assert runs.find_one({'_id': 'b'})['conversation_turns'] == []
+        assert len(list(runs.find())) == 2
+
+    def test_unsupported_operator(self):
+        with pytest.raises(ValueError):
+            matches({'a': 1}, {'a': {'$regex': '1'}})
+
+
+class TestBackendSelection:
+    """Test LOG_BACKEND and the writers on top of it"""
+
+    def test_auto_falls_back_when_mongo_unreachable(self, monkeypatch, capsys):
+        monkeypatch.setenv("LOG_BACKEND", "auto")
+        monkeypatch.setenv("LOG_BACKEND_PROBE_MS", "200")
+        assert isinstance(log_database(mongo_uri='mongodb://127.0.0.1:1/'), LocalLogDatabase)
+        assert capsys.readouterr().out.count("Warning") == 1
+        log_database(mongo_uri='mongodb://127.0.0.1:1/')
+        assert capsys.readouterr().out == ""  # Probed once
+
+    def test_unknown_backend(self, monkeypatch):
+        monkeypatch.setenv("LOG_BACKEND", "files")
+        with pytest.raises(ValueError):
+            log_database()
+
+    def test_log_sink_batches_into_segments(self):
+        sink = MongoLogSink('llm_interactions', lambda: log_database()['llm_interactions'], flush_seconds=0.05)
+        for minute in range(50):
+            sink.put(interaction(8, 1, 'phase1_value_planning', minute))
+        assert sink.flush(timeout=5)
+        assert sink.stats()['written'] == 50
+        assert len(list(log_database().llm_interactions.find({'metadata.example_id': '8'}))) == 50
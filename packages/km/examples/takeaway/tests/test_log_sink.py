@@ -0,0 +1,189 @@
+"""
+Tests for the background MongoDB log writer
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from common.log_sink import MongoLogSink
+
+
+class FakeCollection:
+    """Records insert_many batches; can block, fail, or reject documents"""
+
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = False
+        self.reject = set()  # Document 'n' values to reject as write errors
+        self.error_code = 121  # Document validation failure
+
+    def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        self.gate.wait(5)
+        if self.fail:
+            raise ConnectionError("mongo down")
+        errors = [{'index': i, 'code': self.error_code} for i, document in enumerate(documents) if document.get('n') in self.reject]
+        self.batches.append([document for document in documents if document.get('n') not in self.reject])
+        if errors:
+            error = Exception("batch op errors occurred")
+            error.details = {'writeErrors': errors}
+            raise error
+
+    @property
+    def documents(self):
+        return [document for batch in self.batches for document in batch]
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection()
+
+
+def make_sink(collection, **kwargs):
+    return MongoLogSink('test_logs', lambda: collection, **{'flush_seconds': 0.05, **kwargs})
+
+
+class TestWrites:
+    """Test batching and flushing"""
+
+    def test_batches_and_flush(self, collection):
+        sink = make_sink(collection, batch_size=10)
+        collection.gate.clear()
+        for n in range(25):
+            assert sink.put({'n': n})
+        collection.gate.set()
+        assert sink.flush(timeout=5)
+        assert [document['n'] for document in collection.documents] == list(range(25))
+        assert all(len(batch) <= 10 for batch in collection.batches)
+        stats = sink.stats()
+        assert stats['written'] == 25 and stats['queue_depth'] == 0 and stats['dropped'] == 0
+
+    def test_put_does_not_wait_for_mongo(self, collection):
+        sink = make_sink(collection)
+        collection.gate.clear()
+        start = time.perf_counter()
+        for n in range(100):
+            sink.put({'n': n})
+        assert time.perf_counter() - start < 0.5
+        assert not sink.flush(timeout=0.1)
+        collection.gate.set()
+        assert sink.flush(timeout=5)
+
+    def test_rejected_documents_are_not_retried(self, collection):
+        collection.reject = {3}
+        sink = make_sink(collection)
+        for n in range(5):
+            sink.put({'n': n})
+        assert sink.flush(timeout=5)
+        stats = sink.stats()
+        assert stats['written'] == 4 and stats['dropped'] == 1 and stats['failed_batches'] == 1
+
+    def test_duplicate_keys_are_not_failures(self, collection):
+        collection.reject, collection.error_code = {1, 2}, 11000
+        sink = make_sink(collection)
+        for n in range(5):
+            sink.put({'n': n})
+        assert sink.flush(timeout=5)
+        stats = sink.stats()
+        assert stats['written'] == 3 and stats['duplicates'] == 2
+        assert stats['dropped'] == 0 and stats['failed_batches'] == 0
+
+
+class TestBackpressure:
+    """Test the overflow policies"""
+
+    def test_drop_when_full(self, collection):
+        collection.gate.clear()
+        sink = make_sink(collection, max_queue=5, batch_size=1)
+        accepted = [sink.put({'n': n}) for n in range(20)]
+        # One document is held by the blocked writer, five are queued
+        assert accepted.count(True) <= 6
+        assert sink.stats()['dropped'] == accepted.count(False)
+        collection.gate.set()
+        assert sink.flush(timeout=5)
+        assert sink.stats()['written'] == accepted.count(True)
+
+    def test_unreachable_mongo_drops(self, collection, capsys):
+        collection.fail = True
+        sink = make_sink(collection)
+        for n in range(3):
+            sink.put({'n': n})
+        assert sink.flush(timeout=5)
+        assert sink.stats()['dropped'] == 3
+        assert capsys.readouterr().out.count("Warning") == 1
+
+    def test_spill_and_replay(self, collection, tmp_path):
+        pytest.importorskip("bson")
+        spill_path = tmp_path / "test_logs.jsonl"
+        sink = make_sink(collection, overflow='spill', spill_path=spill_path)
+        collection.fail = True
+        sink.put({'n': 0})
+        assert sink.flush(timeout=5)
+        assert sink.stats()['spilled'] == 1 and spill_path.exists()
+
+        collection.fail = False
+        sink.put({'n': 1})
+        assert sink.flush(timeout=5)
+        assert sorted(document['n'] for document in collection.documents) == [0, 1]
+        assert sink.stats()['replayed'] == 1 and not spill_path.exists()
+
+    def test_unwritable_spill_falls_back_to_drop(self, collection, tmp_path, capsys):
+        (tmp_path / "not-a-dir").write_text("")
+        sink = make_sink(collection, overflow='spill', spill_path=tmp_path / "not-a-dir" / "test_logs.jsonl")
+        collection.fail = True
+        for n in range(3):
+            sink.put({'n': n})
+        assert sink.flush(timeout=5)
+        assert sink.stats()['dropped'] == 3 and sink.stats()['spilled'] == 0
+
+        # The writer thread survived and writes once MongoDB is back
+        collection.fail = False
+        sink.put({'n': 3})
+        assert sink.flush(timeout=5)
+        assert [document['n'] for document in collection.documents] == [3]
+
+    def test_writer_survives_replay_errors(self, collection):
+        sink = make_sink(collection, overflow='spill')
+
+        def broken_replay():
+            raise RuntimeError("corrupt spill file")
+
+        sink._replay_spill = broken_replay
+        for n in range(2):
+            sink.put({'n': n})
+            assert sink.flush(timeout=5)
+        assert sink._thread.is_alive()
+        assert sink.stats()['written'] == 2 and sink.stats()['failed_batches'] == 2
+
+    def test_corrupt_spill_lines_are_dropped(self, collection, tmp_path):
+        pytest.importorskip("bson")
+        spill_path = tmp_path / "test_logs.jsonl"
+        spill_path.write_text('{"n": 0}\n{"n": \n')
+        sink = make_sink(collection, overflow='spill', spill_path=spill_path)
+        sink.put({'n': 1})
+        assert sink.flush(timeout=5)
+        assert sorted(document['n'] for document in collection.documents) == [0, 1]
+        assert sink.stats()['dropped'] == 1
+
+    def test_close_hands_leftovers_to_policy(self, collection):
+        collection.gate.clear()
+        sink = make_sink(collection, batch_size=1)
+        for n in range(4):
+            sink.put({'n': n})
+        sink.close(timeout=0.1)
+        assert sink.stats()['dropped'] >= 3
+        assert not sink.put({'n': 99})
+        collection.gate.set()
+
+    def test_unknown_policy(self, collection):
+        with pytest.raises(ValueError):
+            make_sink(collection, overflow='block')
@@ -0,0 +1,227 @@
+"""
+Tests for the local Anthropic/OpenAI/Serper stand-in server
+"""
+
+import json
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from common.llm_cache import LLMResponseCache, prompt_key
+from common.mock_llm_server import MockLLMServer, example_from_schema, parse_latency
+
+MESSAGES = [{"role": "user", "content": "What were net sales in 2009?"}]
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "metrics": {"type": "array", "items": {"$ref": "#/$defs/Metric"}},
+        "scale": {"enum": ["Units", "Millions"]},
+        "note": {"anyOf": [{"type": "string"}, {"type": "null"}], "default": None},
+    },
+    "required": ["metrics", "scale"],
+    "$defs": {
+        "Metric": {
+            "type": "object",
+            "properties": {"label": {"type": "string"}, "value": {"type": "number"}, "year": {"type": "integer"}},
+            "required": ["label", "value"],
+        }
+    },
+}
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.read()
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer(seed=0) as server:
+        yield server
+
+
+class TestSchemaInstances:
+    """Test synthesized structured responses"""
+
+    def test_refs_enums_and_optionals(self):
+        instance = example_from_schema(SCHEMA)
+        assert instance['scale'] == "Units"
+        assert instance['metrics'] == [{"label": "mock label", "value": 1.0, "year": 1}]
+        assert instance['note'] == "mock note"
+
+    def test_recursive_schema_terminates(self):
+        schema = {"$ref": "#/$defs/Node", "$defs": {"Node": {
+            "type": "object", "properties": {"children": {"type": "array", "items": {"$ref": "#/$defs/Node"}}}}}}
+        assert isinstance(example_from_schema(schema), dict)
+
+
+class TestLatency:
+    """Test latency specs"""
+
+    @pytest.mark.parametrize("spec", ["0.2", "fixed:0.2", "uniform:0.1:0.3", "normal:0.2:0.05", "lognormal:0.2:0.5"])
+    def test_valid_specs(self, spec):
+        delay = parse_latency(spec)(random.Random(0))
+        assert delay >= 0
+
+    @pytest.mark.parametrize("spec", ["gamma:1:2", "uniform:0.1"])
+    def test_invalid_specs(self, spec):
+        with pytest.raises(ValueError):
+            parse_latency(spec)
+
+
+class TestAnthropic:
+    """Test the Messages API endpoint"""
+
+    def test_text(self, server):
+        response = post(f"{server.url}/v1/messages", {"model": "m", "max_tokens": 10, "messages": MESSAGES})
+        assert response['content'] == [{"type": "text", "text": "42"}]
+        assert response['stop_reason'] == "end_turn"
+        assert server.stats()['anthropic_requests'] == 1
+
+    def test_tool_use(self, server):
+        tools = [{"name": "Other", "input_schema": {"type": "object"}},
+                 {"name": "ExtractionResult", "input_schema": SCHEMA}]
+        response = post(f"{server.url}/v1/messages", {
+            "model": "m", "max_tokens": 10, "messages": MESSAGES, "tools": tools,
+            "tool_choice": {"type": "tool", "name": "ExtractionResult"}})
+        block = response['content'][0]
+        assert block['type'] == "tool_use"
+        assert block['name'] == "ExtractionResult"
+        assert block['input'] == example_from_schema(SCHEMA)
+
+    def test_template_wins(self):
+        templates = [{"match": r"net sales", "text": "1200.5"}]
+        with MockLLMServer(templates=templates) as server:
+            response = post(f"{server.url}/v1/messages", {"model": "m", "max_tokens": 10, "messages": MESSAGES})
+        assert response['content'][0]['text'] == "1200.5"
+
+    def test_replays_recordings(self, tmp_path):
+        recordings = LLMResponseCache(tmp_path / "cache.db", max_bytes=1 << 20)
+        recordings.put("k", "m", "recorded answer", prompt_key({"model": "m", "messages": MESSAGES}))
+        with MockLLMServer(recordings=recordings) as server:
+            response = post(f"{server.url}/v1/messages", {"model": "m", "max_tokens": 10, "messages": MESSAGES})
+            other = post(f"{server.url}/v1/messages", {"model": "other", "max_tokens": 10, "messages": MESSAGES})
+            assert server.stats()['recorded'] == 1
+        assert response['content'][0]['text'] == "recorded answer"
+        assert other['content'][0]['text'] == "42"
+        recordings.close()
+
+    def test_prompt_cache_accounting(self, server):
+        prefix = {"type": "text", "text": "Ontology guidance. " * 400, "cache_control": {"type": "ephemeral"}}
+        usages = []
+        for question in ("First question", "Second question"):
+            messages = [{"role": "user", "content": [prefix, {"type": "text", "text": question}]}]
+            usages.append(post(f"{server.url}/v1/messages", {"model": "m", "messages": messages})['usage'])
+        assert usages[0]['cache_creation_input_tokens'] > 0 and usages[0]['cache_read_input_tokens'] == 0
+        assert usages[1]['cache_read_input_tokens'] == usages[0]['cache_creation_input_tokens']
+        assert usages[1]['cache_creation_input_tokens'] == 0
+        assert usages[1]['input_tokens'] < 10
+        assert server.stats()['prompt_cache_writes'] == 1 and server.stats()['prompt_cache_reads'] == 1
+
+    def test_short_prefix_not_cached(self, server):
+        messages = [{"role": "user", "content": [
+            {"type": "text", "text": "short", "cache_control": {"type": "ephemeral"}}, {"type": "text", "text": "q"}]}]
+        usage = post(f"{server.url}/v1/messages", {"model": "m", "messages": messages})['usage']
+        assert usage['cache_creation_input_tokens'] == 0 and usage['cache_read_input_tokens'] == 0
+
+    def test_injected_faults(self):
+        with MockLLMServer(error_rate=1.0) as server:
+            with pytest.raises(urllib.error.HTTPError) as error:
+                post(f"{server.url}/v1/messages", {"model": "m", "messages": MESSAGES})
+            assert error.value.code == 529
+        with MockLLMServer(rate_limit_rate=1.0, retry_after=3) as server:
+            with pytest.raises(urllib.error.HTTPError) as error:
+                post(f"{server.url}/v1/messages", {"model": "m", "messages": MESSAGES})
+            assert error.value.code == 429
+            assert error.value.headers['retry-after'] == "3"
+            assert server.stats()['rate_limited'] == 1
+
+
+class TestOpenAI:
+    """Test the Chat Completions endpoint"""
+
+    def test_text(self, server):
+        response = post(f"{server.url}/v1/chat/completions", {"model": "m", "messages": MESSAGES})
+        assert response['choices'][0]['message']['content'] == "42"
+        assert response['usage']['total_tokens'] > 0
+
+    def test_tool_calls(self, server):
+        tools = [{"type": "function", "function": {"name": "SearchQuery", "parameters": SCHEMA}}]
+        response = post(f"{server.url}/v1/chat/completions", {"model": "m", "messages": MESSAGES, "tools": tools})
+        choice = response['choices'][0]
+        assert choice['finish_reason'] == "tool_calls"
+        call = choice['message']['tool_calls'][0]['function']
+        assert call['name'] == "SearchQuery"
+        assert json.loads(call['arguments']) == example_from_schema(SCHEMA)
+
+    def test_json_schema(self, server):
+        response = post(f"{server.url}/v1/chat/completions", {
+            "model": "m", "messages": MESSAGES,
+            "response_format": {"type": "json_schema", "json_schema": {"name": "R", "schema": SCHEMA}}})
+        assert json.loads(response['choices'][0]['message']['content']) == example_from_schema(SCHEMA)
+
+
+class TestSearch:
+    """Test the Serper stand-in and its pages"""
+
+    def test_results_link_to_pages(self, server):
+        response = post(f"{server.url}/search", {"q": "ai agents", "num": 3})
+        links = [item['link'] for item in response['organic']]
+        assert links == [f"{server.url}/pages/{i}" for i in (1, 2, 3)]
+        with urllib.request.urlopen(links[0], timeout=5) as page:
+            assert b"Mock page 1" in page.read()
+
+
+class TestMessageBatches:
+    """Test the Message Batches endpoints"""
+
+    def test_batch_lifecycle(self):
+        requests = [{"custom_id": f"req-{i}", "params": {"model": "m", "max_tokens": 10, "messages": MESSAGES}}
+                    for i in range(3)]
+        with MockLLMServer(batch_latency=0.3) as server:
+            batch = post(f"{server.url}/v1/messages/batches", {"requests": requests})
+            assert batch['processing_status'] == "in_progress"
+            assert batch['request_counts']['processing'] == 3
+            assert batch['results_url'] is None
+
+            time.sleep(0.35)
+            batch = json.loads(get(f"{server.url}/v1/messages/batches/{batch['id']}"))
+            assert batch['processing_status'] == "ended"
+            assert batch['request_counts']['succeeded'] == 3
+            lines = [json.loads(line) for line in get(batch['results_url']).splitlines()]
+        assert [line['custom_id'] for line in lines] == ["req-0", "req-1", "req-2"]
+        assert lines[0]['result']['message']['content'][0]['text'] == "42"
+
+    def test_errored_and_canceled(self):
+        requests = [{"custom_id": "req", "params": {"model": "m", "messages": MESSAGES}}]
+        with MockLLMServer(error_rate=1.0) as server:
+            batch = post(f"{server.url}/v1/messages/batches", {"requests": requests})
+            assert batch['request_counts']['errored'] == 1
+            line = json.loads(get(batch['results_url']))
+            assert line['result']['type'] == "errored"
+        with MockLLMServer(batch_latency=60) as server:
+            batch = post(f"{server.url}/v1/messages/batches", {"requests": requests})
+            batch = post(f"{server.url}/v1/messages/batches/{batch['id']}/cancel", {})
+            assert batch['processing_status'] == "ended"
+            assert batch['request_counts']['canceled'] == 1
+
+    def test_unknown_batch(self, server):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            get(f"{server.url}/v1/messages/batches/msgbatch_missing")
+        assert error.value.code == 404
@@ -0,0 +1,58 @@
+"""
+Tests for static prompt prefixes and per-phase token usage counters
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from common.prompt_cache import content_text, llm_usage_stats, prompt_content, record_usage, reset_usage_stats
+
+
+@pytest.fixture(autouse=True)
+def clean_usage():
+    reset_usage_stats()
+    yield
+    reset_usage_stats()
+
+
+class TestPromptContent:
+    """Test cache breakpoint placement"""
+
+    def test_no_prefix_keeps_string(self):
+        assert prompt_content(None, "question") == "question"
+        assert prompt_content("", "question") == "question"
+
+    def test_prefix_is_breakpoint(self):
+        content = prompt_content("rules", "question")
+        assert content[0] == {"type": "text", "text": "rules", "cache_control": {"type": "ephemeral"}}
+        assert content[1] == {"type": "text", "text": "question"}
+        assert content_text(content) == "rules\n\nquestion"
+
+
+class TestUsageStats:
+    """Test per-phase usage counters"""
+
+    def test_accumulates_dicts_and_objects(self):
+        record_usage('phase1', {'input_tokens': 100, 'cache_creation_input_tokens': 900, 'output_tokens': 10})
+        record_usage('phase1', SimpleNamespace(input_tokens=100, cache_creation_input_tokens=0,
+                                               cache_read_input_tokens=900, output_tokens=12))
+        stats = llm_usage_stats()['phase1']
+        assert stats['calls'] == 2
+        assert stats['input_tokens'] == 200
+        assert stats['cache_creation_input_tokens'] == 900
+        assert stats['cache_read_input_tokens'] == 900
+        assert stats['output_tokens'] == 22
+        assert stats['cache_read_share'] == pytest.approx(0.45)
+
+    def test_missing_usage_and_phase(self):
+        record_usage('phase1', None)
+        record_usage(None, {'input_tokens': 5})
+        stats = llm_usage_stats()
+        assert 'phase1' not in stats
+        assert stats['unknown']['cache_read_share'] == 0.0
@@ -0,0 +1,124 @@
+"""
+Tests for content-addressed prompt blobs
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from common import env, prompt_store
+from common.prompt_store import chunk_prompt, decode_blob, encode_blob, load_prompt, prompt_fields
+
+rng = random.Random(0)
+WORDS = ["revenue", "net", "sales", "metric", "scale", "millions", "table", "row", "column", "year", "value"]
+
+
+def paragraph(lines=40):
+    return "".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))) + "\n" for _ in range(lines))
+
+
+GUIDANCE = paragraph(600)  # Static block shared by every prompt
+
+
+class FakeSink:
+    def __init__(self):
+        self.documents = []
+
+    def put(self, document):
+        self.documents.append(document)
+        return True
+
+    def stats(self):
+        return {"dropped": 0, "failed_batches": 0}
+
+
+class FakeBlobs:
+    def __init__(self, documents):
+        self.documents = {document["_id"]: document for document in documents}
+
+    def find(self, query):
+        return [self.documents[i] for i in query["_id"]["$in"] if i in self.documents]
+
+
+@pytest.fixture(autouse=True)
+def blob_mode(monkeypatch):
+    monkeypatch.setattr(env, "_loaded", True)  # Settings come from the test, not .env
+    monkeypatch.setenv("LOG_PROMPT_STORE", "blobs")
+    monkeypatch.setenv("LOG_PROMPT_COMPRESSION", "none")
+    monkeypatch.setattr(prompt_store, "_known_blobs", set())
+    monkeypatch.setattr(prompt_store, "_failures_seen", 0)
+
+
+class TestChunking:
+    """Test content-defined chunks"""
+
+    def test_round_trip(self):
+        text = paragraph(300) + "no trailing newline"
+        chunks = chunk_prompt(text)
+        assert "".join(chunks) == text
+        assert len(chunks) > 1
+        assert all(len(chunk) <= prompt_store.MAX_CHUNK_CHARS for chunk in chunks)
+
+    def test_shared_block_at_any_offset(self):
+        first = set(chunk_prompt("QUESTION: a\n" + GUIDANCE + paragraph()))
+        second = set(chunk_prompt(paragraph(25) + GUIDANCE + "QUESTION: b\n"))
+        guidance = set(chunk_prompt(GUIDANCE))
+        # All but the chunks at the block's edges are shared
+        assert len(first & second) >= len(guidance) - 2
+
+
+class TestPromptFields:
+    """Test log document fields and reassembly"""
+
+    def test_dedup_and_reassembly(self):
+        sink = FakeSink()
+        prompts = [GUIDANCE + f"QUESTION {i}:\n" + paragraph() for i in range(20)]
+        documents = [prompt_fields(prompt, sink) for prompt in prompts]
+        blobs = FakeBlobs(sink.documents)
+        for prompt, document in zip(prompts, documents, strict=True):
+            assert document["prompt_chars"] == len(prompt)
+            assert load_prompt(document, blobs) == prompt
+        stored = sum(blob["size"] for blob in sink.documents)
+        assert stored * 5 < sum(len(prompt) for prompt in prompts)
+
+    def test_inline_mode_and_old_documents(self, monkeypatch):
+        monkeypatch.setenv("LOG_PROMPT_STORE", "inline")
+        sink = FakeSink()
+        assert prompt_fields("hello", sink) == {"prompt": "hello"}
+        assert sink.documents == []
+        assert load_prompt({"prompt": "hello"}, FakeBlobs([])) == "hello"
+        assert load_prompt({"response": "42"}, FakeBlobs([])) is None
+
+    def test_missing_blob_placeholder(self):
+        document = prompt_fields(GUIDANCE, FakeSink())
+        assert "[missing prompt blob" in load_prompt(document, FakeBlobs([]))
+
+    def test_blobs_resent_after_failed_write(self):
+        sink = FakeSink()
+        prompt_fields(GUIDANCE, sink)
+        written = len(sink.documents)
+        prompt_fields(GUIDANCE, sink)
+        assert len(sink.documents) == written
+        sink.stats = lambda: {"dropped": 1, "failed_batches": 0}
+        prompt_fields(GUIDANCE, sink)
+        assert len(sink.documents) == 2 * written
+
+
+class TestCompression:
+    """Test zstd blobs"""
+
+    def test_zstd_round_trip(self):
+        pytest.importorskip("zstandard")
+        document = encode_blob(GUIDANCE, compression="zstd")
+        assert document["encoding"] == "zstd"
+        assert len(document["data"]) < len(GUIDANCE) / 2
+        assert decode_blob(document) == GUIDANCE
+
+    def test_uncompressed(self):
+        document = encode_blob("abc", compression="none")
+        assert document == {"_id": prompt_store.blob_id("abc"), "size": 3, "data": "abc", "encoding": "utf-8"}
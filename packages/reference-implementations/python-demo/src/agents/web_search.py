@@ -37,10 +37,13 @@ async def web_search_node(state: ResearchState) -> dict:
     if not serper_key:
         raise RuntimeError("SERPER_API_KEY not found in environment variables")
 
+    # Overridable so benchmarks can point search at a local stand-in server
+    serper_url = os.getenv('SERPER_BASE_URL', 'https://google.serper.dev')
+
     # Real Serper API call
     try:
         response = requests.post(
-            "https://google.serper.dev/search",
+            f"{serper_url}/search",
             headers={
                 "X-API-KEY": serper_key,
                 "Content-Type": "application/json"